@@ -1,21 +1,184 @@
 """
 Utilities to download and process audio
 """
+import logging
 import os
-import ssl
-import urllib.request
+import threading
+import weakref
 
+from .core import mp3
+from .services.cache import file_sha256, get_cache
+from .services.http_client import get_client
+from .telemetry import stages
 
-def download_audio(url, output_path):
-    """Download an audio file from a URL"""
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
+logger = logging.getLogger(__name__)
 
-    request = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-    with urllib.request.urlopen(request, context=ssl_context) as response:
-        with open(output_path, 'wb') as f:
-            f.write(response.read())
+# Bytes requested up front to read the ID3 size, first frame and Xing/VBRI TOC
+_PROBE_BYTES = 64 * 1024
+
+
+class _Decoded:
+    __slots__ = ('key', 'audio', 'nbytes', '__weakref__')
+
+    def __init__(self, key, audio):
+        self.key = key
+        self.audio = audio
+        self.nbytes = len(audio.raw_data)
+
+
+# Last decoded file of each thread, reused while several soundbites are cut
+# from one episode. Per thread, so a thread preparing the next episode ahead
+# of rendering never loses its decode to another thread's clear.
+_decoded = threading.local()
+# Every thread's decode, for ``decoded_bytes``; gone with its thread
+_decoded_lock = threading.Lock()
+_decoded_all: "weakref.WeakSet[_Decoded]" = weakref.WeakSet()
+
+
+def download_audio(url, output_path, timeout=None, segments=None):
+    """Download an audio file from a URL, streaming it to disk in chunks.
+
+    The file is written to a temporary ``.part`` name and renamed atomically
+    once complete. With ``segments`` > 1 (default: ``http.download_segments``)
+    the file is split into byte ranges fetched concurrently. Returns the
+    ``DownloadStats`` of the transfer.
+    """
+    client = get_client()
+    if (segments or client.settings.download_segments) > 1:
+        return client.download_segmented(url, output_path, segments=segments, timeout=timeout)
+    return client.download_to_file(url, output_path, timeout=timeout)
+
+
+def _get_range(url, first, last, timeout=None):
+    """GET ``bytes=first-last``; return ``(data, total_size)`` or None without 206."""
+    headers = {'Range': f'bytes={first}-{last}', 'Accept-Encoding': 'identity'}
+    # Stream so a server ignoring Range (200 + full body) is not read into memory
+    with get_client().get(url, headers=headers, stream=True, timeout=timeout) as response:
+        content_range = response.headers.get('Content-Range', '')
+        if response.status_code != 206 or '/' not in content_range:
+            return None
+        total = content_range.rsplit('/', 1)[1]
+        stages.count('http.bytes', len(response.content))
+        return response.content, (int(total) if total.isdigit() else None)
+
+
+def fetch_audio_range(url, start_time, duration, output_path, margin=3.0, timeout=None):
+    """Fetch only the bytes of an MP3 enclosure that cover a soundbite.
+
+    Maps ``[start_time - margin, start_time + duration + margin]`` to byte
+    offsets using the Xing/VBRI TOC (or a CBR bitrate estimate), downloads that
+    range with HTTP ``Range`` and writes it to ``output_path`` starting at the
+    first complete frame.
+
+    Returns the offset in seconds at which the soundbite starts inside
+    ``output_path``, or None when the server does not honour range requests or
+    the file layout cannot be read (callers then fall back to a full download).
+
+    The offset assumes the first fetched frame plays exactly at the time its
+    byte offset was mapped from. The seek tables and the CBR estimate are
+    approximate, so the cut and the subtitles can be shifted by that mapping
+    error; the margin only makes sure the range covers the soundbite.
+    """
+    probe = _get_range(url, 0, _PROBE_BYTES - 1, timeout=timeout)
+    if probe is None:
+        logger.info("Server does not support range requests: %s", url)
+        return None
+    head, total_size = probe
+    if total_size is None:
+        return None
+
+    tag_size = mp3.id3v2_size(head)
+    if tag_size + 4096 > len(head):
+        # Large ID3 tag (embedded artwork): read the region right after it
+        more = _get_range(url, len(head), tag_size + _PROBE_BYTES - 1, timeout=timeout)
+        if more is None:
+            return None
+        head += more[0]
+
+    layout = mp3.parse_layout(head, total_size)
+    if layout is None:
+        logger.info("Could not read MP3 layout, falling back to full download: %s", url)
+        return None
+
+    first, last, fetch_start = mp3.plan_range(layout, float(start_time), float(duration), margin)
+    chunk = _get_range(url, first, last, timeout=timeout)
+    if chunk is None:
+        return None
+    data = chunk[0]
+    # Drop the partial frame at the start so the decoder begins on a frame boundary
+    found = mp3.find_frame(data)
+    skip = found[0] if found else 0
+    with open(output_path, 'wb') as f:
+        f.write(data[skip:])
+
+    logger.info(
+        "Fetched %d of %d bytes (%s layout) for soundbite at %.2fs",
+        len(data) - skip, total_size, layout.kind, float(start_time),
+    )
+    return max(0.0, float(start_time) - fetch_start)
+
+
+def content_digest(path):
+    """SHA-256 of a file; free for cache blobs, which are named by their hash."""
+    cache = get_cache()
+    if cache is not None and os.path.abspath(path).startswith(os.path.join(cache.root, 'blobs')):
+        return os.path.splitext(os.path.basename(path))[0]
+    return file_sha256(path)
+
+
+def decode_audio(audio_path):
+    """Decode an audio file to a pydub ``AudioSegment``.
+
+    The last file each thread decoded is kept in memory so cutting several
+    soundbites from one episode decodes it once, until that thread calls
+    ``clear_decoded_cache``. When the asset cache has ``store_pcm``
+    enabled, decoded PCM is also persisted as WAV and reused across runs.
+    """
+    # Lazy import to avoid importing heavy dependencies at module import time
+    # and to keep unit tests independent from optional binary deps.
+    from pydub import AudioSegment  # type: ignore
+
+    st = os.stat(audio_path)
+    mem_key = (os.path.abspath(audio_path), st.st_size, st.st_mtime)
+    held = getattr(_decoded, 'held', None)
+    if held is not None and held.key == mem_key:
+        return held.audio
+
+    cache = get_cache()
+    audio = None
+    pcm_key = None
+    if cache is not None and cache.store_pcm:
+        pcm_key = f"pcm:{content_digest(audio_path)}"
+        cached = cache.get_derived(pcm_key, kind='pcm')
+        if cached:
+            audio = AudioSegment.from_file(cached, format='wav')
+    if audio is None:
+        audio = AudioSegment.from_file(audio_path)
+        if cache is not None and pcm_key is not None:
+            tmp = cache.tmp_path('.wav')
+            audio.export(tmp, format='wav')
+            cache.put_derived(pcm_key, tmp, kind='pcm')
+
+    held = _Decoded(mem_key, audio)
+    _decoded.held = held
+    with _decoded_lock:
+        _decoded_all.add(held)
+    return audio
+
+
+def clear_decoded_cache():
+    """Release the decoded audio ``decode_audio`` keeps for the calling thread."""
+    held = getattr(_decoded, 'held', None)
+    _decoded.held = None
+    if held is not None:
+        with _decoded_lock:
+            _decoded_all.discard(held)
+
+
+def decoded_bytes():
+    """Bytes of decoded audio kept in memory by the threads of this process."""
+    with _decoded_lock:
+        return sum(held.nbytes for held in list(_decoded_all))
 
 
 def extract_audio_segment(audio_path, start_time, duration, output_path):
@@ -28,11 +191,7 @@ def extract_audio_segment(audio_path, start_time, duration, output_path):
         duration: Durata del segmento in secondi
         output_path: Percorso del file di output
     """
-    # Lazy import to avoid importing heavy dependencies at module import time
-    # and to keep unit tests independent from optional binary deps.
-    from pydub import AudioSegment  # type: ignore
-
-    audio = AudioSegment.from_file(audio_path)
+    audio = decode_audio(audio_path)
 
     start_ms = int(float(start_time) * 1000)
     end_ms = start_ms + int(float(duration) * 1000)
@@ -11,10 +11,21 @@ import os
 import tempfile
 import argparse
 import shutil
-from typing import List
-from .audio_utils import download_audio, extract_audio_segment
+import sys
+import itertools
+import concurrent.futures
+import json
+import socket
+import time
+from typing import Dict, List, NamedTuple, Optional
+import yaml
+from .audio_utils import (
+    download_audio, extract_audio_segment, fetch_audio_range, clear_decoded_cache, content_digest,
+)
 from .services.assets import download_image
-from .rendering.facade import generate_audiogram
+from .rendering.facade import generate_audiogram, RENDERER_VERSION
+from .rendering.executor import RenderExecutor, timed_call
+from .video_generator import FORMATS
 from .config import Config
 from .core.captioning import build_caption_text
 from .core import (
@@ -25,6 +36,22 @@ from .core import (
 )
 from .services import transcript as transcript_svc
 from .services import rss as rss_svc
+from .services.episode_index import EpisodeIndex
+from .services import http_client
+from .services import cache as asset_cache
+from .services import prefetch as prefetch_svc
+from .core.units import parse_size, format_bytes
+from .core.pipeline import run_ahead
+from .core.fingerprint import fingerprint
+from .core.cost import CostModel, cost_units, estimate_render_memory, lpt_order
+from .core.jobs import (
+    RenderJob, JobSpec, parse_jobs, expand_jobs, parse_shard, select_shard, added_soundbites,
+    episode_key,
+)
+from .services.manifest import BuildManifest
+from .services.timings import RenderTimings
+from .services.job_queue import JobQueue, LeaseKeeper
+from .telemetry import profiling, progress, stages
 
 
 _ffmpeg_warned = False
@@ -127,17 +154,480 @@ def generate_caption_file(output_path, episode_number, episode_title, episode_li
 ## - parse_soundbite_selection
 
 
-def process_one_episode(selected, podcast_info, colors, formats_config, config_hashtags, show_subtitles, output_dir, soundbites_choice, dry_run=False, use_episode_cover=False):
+class _EpisodeAudio:
+    """Provide soundbite audio segments for one episode.
+
+    By default the full enclosure is downloaded once and every segment is cut
+    from it. With ``partial_fetch`` each soundbite is fetched with an HTTP
+    ``Range`` request instead; the first time the server turns out not to
+    support ranges, it falls back to the single full download.
+    """
+
+    def __init__(self, audio_url, temp_dir, partial_fetch=False, margin=3.0):
+        self.audio_url = audio_url
+        self.temp_dir = temp_dir
+        self.partial_fetch = partial_fetch
+        self.margin = margin
+        self.full_path = None
+
+    def download_full(self):
+        if self.full_path is None:
+            print("Downloading audio...")
+            with stages.stage('audio_download'):
+                cache = asset_cache.get_cache()
+                if cache is not None:
+                    segmented = http_client.get_client().settings.download_segments > 1
+                    self.full_path = cache.fetch(self.audio_url, 'audio', segmented=segmented)
+                else:
+                    path = os.path.join(self.temp_dir, "full_audio.mp3")
+                    download_audio(self.audio_url, path)
+                    self.full_path = path
+        return self.full_path
+
+    def segment(self, number, start, duration):
+        segment_path = os.path.join(self.temp_dir, f"segment_{number}.mp3")
+        if self.partial_fetch and self.full_path is None:
+            partial_path = os.path.join(self.temp_dir, f"partial_{number}.mp3")
+            try:
+                with stages.stage('audio_download'):
+                    offset = fetch_audio_range(self.audio_url, start, duration, partial_path,
+                                               margin=self.margin)
+            except Exception as e:
+                logging.getLogger(__name__).warning("Range fetch failed for %s: %s",
+                                                    self.audio_url, e)
+                offset = None
+            if offset is not None:
+                print("Extracting audio segment (partial fetch)...")
+                with stages.stage('segment_extract', children=True):
+                    extract_audio_segment(partial_path, offset, duration, segment_path)
+                return segment_path
+            print("Range requests unavailable, falling back to full download.")
+            self.partial_fetch = False
+        source = self.download_full()
+        print("Extracting audio segment...")
+        with stages.stage('segment_extract', children=True):
+            extract_audio_segment(source, start, duration, segment_path)
+        return segment_path
+
+
+def _artwork_url(selected, podcast_info, use_episode_cover):
+    # Scegli URL locandina da usare (episodio se richiesto e disponibile, altrimenti podcast)
+    if use_episode_cover and selected.get('image_url'):
+        return selected['image_url']
+    return podcast_info.get('image_url')
+
+
+def _soundbite_numbers(choice, count):
+    """Soundbite numbers for a non-interactive choice ('all', '2', '1,3', '2-4').
+
+    Returns None when the choice is 'n' or not a valid selection.
+    """
+    if choice is None:
+        return None
+    try:
+        return parse_soundbite_selection(str(choice), count)
+    except ValueError:
+        return None
+
+
+class _PreparedEpisode:
+    """Downloaded and cut inputs of one episode, ready to render.
+
+    Owns ``temp_dir``; ``cleanup`` removes it once rendering is done.
+    """
+
+    def __init__(self, selected, soundbite_nums, temp_dir, logo_path):
+        self.selected = selected
+        self.soundbite_nums = list(soundbite_nums)
+        self.temp_dir = temp_dir
+        self.logo_path = logo_path
+        # soundbite number -> (segment path, transcript chunks, transcript text)
+        self.soundbites = {}
+
+    def cleanup(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+def prepare_episode(selected, soundbite_nums, temp_dir, artwork_url,
+                    partial_audio_fetch=False, partial_audio_margin=3.0, keep_decoded=False):
+    """Network/decoding stage: audio segments, artwork and transcripts.
+
+    Everything the render stage needs ends up in ``temp_dir``, so this can
+    run ahead of rendering on a background thread. The decoded episode is
+    dropped on the thread that decoded it, once its segments are cut;
+    ``keep_decoded`` keeps it for the next request (long-running services).
+    """
+    prepared = _PreparedEpisode(selected, soundbite_nums, temp_dir,
+                                os.path.join(temp_dir, "logo.png"))
+    # Warn about FFmpeg if missing (once)
+    _warn_if_no_ffmpeg()
+    try:
+        # Download full audio once (or fetch per-soundbite ranges)
+        audio = _EpisodeAudio(selected['audio_url'], temp_dir, partial_audio_fetch,
+                              partial_audio_margin)
+        if not partial_audio_fetch:
+            audio.download_full()
+
+        # Download artwork once
+        print("Downloading artwork...")
+        if artwork_url:
+            with stages.stage('artwork_download'):
+                download_image(artwork_url, prepared.logo_path)
+
+        for soundbite_num in prepared.soundbite_nums:
+            soundbite = selected['soundbites'][soundbite_num - 1]
+            # Extract audio segment
+            segment_path = audio.segment(soundbite_num, soundbite['start'], soundbite['duration'])
+
+            # Build transcript chunks
+            print("Processing transcript...")
+            transcript_chunks = []
+            if selected['transcript_url']:
+                with stages.stage('transcript'):
+                    transcript_chunks = get_transcript_chunks(
+                        selected['transcript_url'],
+                        soundbite['start'],
+                        soundbite['duration']
+                    )
+                    # Estrai testo completo per caption
+                    transcript_text = get_transcript_text(
+                        selected['transcript_url'],
+                        soundbite['start'],
+                        soundbite['duration']
+                    ) or (soundbite.get('text') or soundbite.get('title'))
+            else:
+                transcript_text = soundbite.get('text') or soundbite.get('title')
+            prepared.soundbites[soundbite_num] = (segment_path, transcript_chunks, transcript_text)
+    except BaseException:
+        # Nothing will be cut from this decode any more
+        clear_decoded_cache()
+        raise
+
+    # All segments are cut: drop the decoded full episode
+    if not keep_decoded:
+        clear_decoded_cache()
+    return prepared
+
+
+def _video_inputs(prepared, soundbite, segment_path, transcript_chunks, format_name,
+                  podcast_info, colors, formats_config, show_subtitles):
+    """Fingerprint of everything that determines one rendered video."""
+    logo = prepared.logo_path
+    return fingerprint({
+        'output': 'video',
+        'renderer': RENDERER_VERSION,
+        'audio': content_digest(segment_path),
+        'artwork': content_digest(logo) if os.path.exists(logo) else None,
+        'cues': transcript_chunks if show_subtitles else [],
+        'duration': float(soundbite['duration']),
+        'format': format_name,
+        'format_config': (formats_config or {}).get(format_name),
+        'colors': colors,
+        'show_subtitles': bool(show_subtitles),
+        'podcast_title': podcast_info.get('title'),
+        'episode_title': prepared.selected['title'],
+    })
+
+
+def _caption_inputs(selected, soundbite, transcript_text, podcast_info, config_hashtags):
+    """Fingerprint of everything that determines one caption file."""
+    return fingerprint({
+        'output': 'caption',
+        'renderer': RENDERER_VERSION,
+        'episode': [selected['number'], selected['title'], selected['link'],
+                    selected.get('keywords')],
+        'soundbite_title': soundbite.get('text') or soundbite.get('title') or '',
+        'transcript_text': transcript_text,
+        'podcast_keywords': podcast_info.get('keywords'),
+        'hashtags': config_hashtags,
+        'labels': [CAPTION_LABEL_EPISODE_PREFIX, CAPTION_LABEL_LISTEN_PREFIX],
+    })
+
+
+def video_output_path(output_dir, episode_number, job):
+    """Path of the video produced by ``job`` (a ``RenderJob``)."""
+    # Add a suffix to filename if subtitles are disabled
+    nosubs_suffix = "_nosubs" if not job.show_subtitles else ""
+    return os.path.join(output_dir,
+                        f"ep{episode_number}_sb{job.soundbite}{nosubs_suffix}_{job.format}.mp4")
+
+
+def caption_output_path(output_dir, episode_number, soundbite_num):
+    return os.path.join(output_dir, f"ep{episode_number}_sb{soundbite_num}_caption.txt")
+
+
+def _format_size(formats_config, format_name):
+    """``(width, height)`` of a format, as the video generator resolves it."""
+    default = FORMATS.get(format_name, (1080, 1080))
+    fmt = (formats_config or {}).get(format_name) or {}
+    return fmt.get('width', default[0]), fmt.get('height', default[1])
+
+
+def _video_memory(formats_config, format_name, duration):
+    """Peak memory of one render: the format's ``memory`` setting, or an estimate."""
+    measured = ((formats_config or {}).get(format_name) or {}).get('memory')
+    if measured:
+        return parse_size(measured)
+    return estimate_render_memory(*_format_size(formats_config, format_name), duration)
+
+
+class _Video(NamedTuple):
+    """One video of an ``_EpisodeRender`` still to render."""
+
+    job: RenderJob
+    soundbite: Dict
+    segment_path: str
+    transcript_chunks: List[Dict]
+    output_path: str
+    inputs: Optional[str]  # manifest fingerprint, None without a manifest
+    units: float
+    predicted: float
+
+
+class _EpisodeRender:
+    """The videos and captions of one prepared episode.
+
+    Creating it writes the captions and lists in ``videos`` the renders still
+    to run, with their predicted seconds; ``submit`` starts one video on an
+    executor and ``finish`` records its outcome. Callers choose the order, so
+    the videos of several episodes can share one longest-first schedule.
+    Failed renders are collected in ``errors``.
+    """
+
+    def __init__(self, prepared, podcast_info, colors, formats_config, config_hashtags,
+                 show_subtitles, output_dir, manifest=None, jobs=None, timings=None):
+        self.prepared = prepared
+        self.podcast_info = podcast_info
+        self.colors = colors
+        self.formats_config = formats_config
+        self.manifest = manifest
+        self.timings = timings
+        self.model = timings.model if timings is not None else CostModel()
+        self.videos = []
+        self.errors = []
+        selected = prepared.selected
+        # Create output directory
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Genera audiogram per ogni formato abilitato
+        self.formats_info = {}
+        for fmt_name, fmt_config in formats_config.items():
+            if fmt_config.get('enabled', True):
+                self.formats_info[fmt_name] = fmt_config.get('description', fmt_name)
+        if jobs is None:
+            jobs = [
+                RenderJob(selected['number'], sb, fmt, bool(show_subtitles))
+                for sb in prepared.soundbite_nums for fmt in self.formats_info
+            ]
+
+        for soundbite_num in prepared.soundbite_nums:
+            soundbite_jobs = [job for job in jobs if job.soundbite == soundbite_num]
+            if not soundbite_jobs:
+                continue
+            soundbite = selected['soundbites'][soundbite_num - 1]
+            segment_path, transcript_chunks, transcript_text = prepared.soundbites[soundbite_num]
+
+            print(f"\n{'='*60}")
+            label = soundbite.get('text') or soundbite.get('title')
+            print(f"Soundbite {soundbite_num}/{len(selected['soundbites'])}: {label}")
+            print(f"{'='*60}")
+
+            for job in soundbite_jobs:
+                format_name = job.format
+                output_path = video_output_path(output_dir, selected['number'], job)
+                inputs = None
+                if manifest is not None:
+                    inputs = _video_inputs(prepared, soundbite, segment_path, transcript_chunks,
+                                           format_name, podcast_info, colors, formats_config,
+                                           job.show_subtitles)
+                    if manifest.is_up_to_date(output_path, inputs):
+                        print(f"= {format_name}: up to date, skipped ({output_path})")
+                        progress.skipped(output_path)
+                        continue
+
+                progress.queued(output_path, soundbite['duration'])
+                units = cost_units(soundbite['duration'],
+                                   *_format_size(formats_config, format_name))
+                self.videos.append(_Video(job, soundbite, segment_path, transcript_chunks,
+                                          output_path, inputs, units, self.model.predict(units)))
+
+            # Genera file caption .txt
+            caption_path = caption_output_path(output_dir, selected['number'], soundbite_num)
+            caption_inputs = None
+            if manifest is not None:
+                caption_inputs = _caption_inputs(selected, soundbite, transcript_text, podcast_info,
+                                                 config_hashtags)
+                if manifest.is_up_to_date(caption_path, caption_inputs):
+                    print(f"= Caption: up to date, skipped ({caption_path})")
+                    continue
+            print("Generating caption file...")
+            with stages.stage('caption_write'):
+                generate_caption_file(
+                    caption_path,
+                    selected['number'],
+                    selected['title'],
+                    selected['link'],
+                    soundbite.get('text') or soundbite.get('title') or '',
+                    transcript_text,
+                    podcast_info.get('keywords'),
+                    selected.get('keywords'),
+                    config_hashtags
+                )
+            if caption_inputs is not None and os.path.exists(caption_path):
+                manifest.record(caption_path, caption_inputs)
+            print(f"✓ Caption: {caption_path}")
+
+    def submit(self, executor, video):
+        """Start rendering ``video``; waits while the renders in flight fill the memory budget."""
+        format_name = video.job.format
+        print(f"Generating audiogram {self.formats_info.get(format_name, format_name)}"
+              f" (sb{video.job.soundbite}, ~{video.predicted:.0f}s)...")
+        return executor.submit_within_budget(
+            _video_memory(self.formats_config, format_name, video.soundbite['duration']),
+            timed_call,
+            generate_audiogram,
+            video.segment_path,
+            video.output_path,
+            format_name,
+            self.prepared.logo_path,
+            self.podcast_info['title'],
+            self.prepared.selected['title'],
+            video.transcript_chunks,
+            float(video.soundbite['duration']),
+            self.formats_config,
+            self.colors,
+            video.job.show_subtitles
+        )
+
+    def finish(self, future, video):
+        """Record the outcome of ``video``, waiting for ``future`` if needed."""
+        selected = self.prepared.selected
+        job, output_path, format_name = video.job, video.output_path, video.job.format
+        if not future.done():
+            # The render pool is behind: shows up as back-pressure in a trace
+            with stages.span('wait_render', cat='wait', output=os.path.basename(output_path)):
+                concurrent.futures.wait([future])
+        try:
+            _result, seconds, job_stages, error = future.result()
+        except Exception as e:
+            # The render never ran, or its outcome could not be sent back
+            seconds, job_stages, error = 0.0, None, stages.failure(e)
+        if error is not None:
+            print(f"✗ {format_name}: {output_path}: {error}")
+            self.errors.append(error)
+            run = stages.get_run()
+            if run is not None:
+                # The snapshot counts the failure by its type
+                run.add_job({'output': output_path, 'episode': selected['number'],
+                             'soundbite': job.soundbite, 'format': format_name,
+                             'error': type(error).__name__, 'message': str(error)},
+                            job_stages)
+                _refresh_metrics(run)
+            return
+        if video.inputs is not None and os.path.exists(output_path):
+            self.manifest.record(output_path, video.inputs)
+        if self.timings is not None:
+            self.timings.record(output_path, format_name, video.units, seconds, video.predicted)
+        run = stages.get_run()
+        if run is not None:
+            run.add_job({
+                'output': output_path,
+                'episode': selected['number'],
+                'soundbite': job.soundbite,
+                'format': format_name,
+                'show_subtitles': job.show_subtitles,
+                'duration': float(video.soundbite['duration']),
+                'units': round(video.units, 3),
+                'predicted': round(video.predicted, 3),
+                'seconds': round(seconds, 3),
+            }, job_stages)
+            _refresh_metrics(run)
+        print(f"✓ {format_name}: {output_path} ({seconds:.1f}s, predicted {video.predicted:.1f}s)")
+
+    def save(self):
+        """Persist what was built so far (manifest and render timings)."""
+        if self.manifest is not None:
+            self.manifest.save()
+        if self.timings is not None:
+            self.timings.save()
+
+
+def render_prepared_episode(prepared, podcast_info, colors, formats_config, config_hashtags,
+                            show_subtitles, output_dir, manifest=None, jobs=None, executor=None,
+                            timings=None):
+    """CPU stage: render the videos and write the caption of each soundbite.
+
+    ``jobs`` (``core.jobs.RenderJob`` list) selects exactly which videos to
+    build; by default every enabled format of every prepared soundbite with
+    ``show_subtitles``. Videos run on ``executor`` (``RenderExecutor``), inline
+    when omitted, longest predicted render first. With a ``manifest``
+    (``services.manifest.BuildManifest``), outputs whose input fingerprint is
+    unchanged since they were last built are skipped. ``timings``
+    (``services.timings.RenderTimings``) calibrates the predictions and
+    records the actual render times. Returns the enabled formats as
+    ``{name: description}``.
+    """
+    executor = executor or RenderExecutor(1)
+    episode = None
+    try:
+        episode = _EpisodeRender(prepared, podcast_info, colors, formats_config, config_hashtags,
+                                 show_subtitles, output_dir, manifest=manifest, jobs=jobs,
+                                 timings=timings)
+        # Longest predicted render first, so no long video starts last on an
+        # otherwise idle worker pool
+        pending = []
+        for video in lpt_order(episode.videos, lambda video: video.predicted):
+            future = episode.submit(executor, video)
+            if future.done():
+                episode.finish(future, video)
+            else:
+                pending.append((future, video))
+
+        # Videos rendered on worker processes complete here
+        for future, video in pending:
+            episode.finish(future, video)
+    finally:
+        # Persist what was built so far, also when a render fails midway
+        if manifest is not None:
+            manifest.save()
+        if timings is not None:
+            timings.save()
+    if episode.errors:
+        raise episode.errors[0]
+    return episode.formats_info
+
+
+def _generate_soundbites(selected, podcast_info, soundbite_nums, colors, formats_config,
+                         config_hashtags, show_subtitles, output_dir, artwork_url,
+                         partial_audio_fetch, partial_audio_margin, prepared=None, manifest=None,
+                         executor=None, timings=None):
+    """Prepare (unless already prepared ahead) and render the given soundbites."""
+    if prepared is None or prepared.soundbite_nums != list(soundbite_nums):
+        if prepared is not None:
+            prepared.cleanup()
+        prepared = prepare_episode(
+            selected, soundbite_nums, tempfile.mkdtemp(prefix='audiogram-'), artwork_url,
+            partial_audio_fetch, partial_audio_margin,
+        )
+    try:
+        return render_prepared_episode(
+            prepared, podcast_info, colors, formats_config, config_hashtags, show_subtitles,
+            output_dir, manifest=manifest, executor=executor, timings=timings,
+        )
+    finally:
+        prepared.cleanup()
+
+
+def process_one_episode(selected, podcast_info, colors, formats_config, config_hashtags,
+                        show_subtitles, output_dir, soundbites_choice, dry_run=False,
+                        use_episode_cover=False, partial_audio_fetch=False,
+                        partial_audio_margin=3.0, prepared=None, manifest=None,
+                        executor=None, timings=None):
     print(f"\nEpisode {selected['number']}: {selected['title']}")
     if selected['audio_url']:
         print(f"Audio: {selected['audio_url']}")
 
-    # Scegli URL locandina da usare (episodio se richiesto e disponibile, altrimenti podcast)
-    artwork_url = None
-    if use_episode_cover and selected.get('image_url'):
-        artwork_url = selected['image_url']
-    else:
-        artwork_url = podcast_info.get('image_url')
+    artwork_url = _artwork_url(selected, podcast_info, use_episode_cover)
 
     # Dry-run mode: print intervals and subtitles only, then exit
     if dry_run:
@@ -209,264 +699,964 @@ def process_one_episode(selected, podcast_info, colors, formats_config, config_h
         else:
             choice = str(soundbites_choice)
 
+        soundbite_nums = _soundbite_numbers(choice, len(selected['soundbites']))
         if choice.lower() == 'a' or choice.lower() == 'all':
             # Generate all soundbites
             print(f"\nGenerating audiograms for all {len(selected['soundbites'])} soundbites...")
+            formats_info = _generate_soundbites(
+                selected, podcast_info, soundbite_nums, colors, formats_config, config_hashtags,
+                show_subtitles, output_dir, artwork_url, partial_audio_fetch, partial_audio_margin,
+                prepared=prepared, manifest=manifest, executor=executor, timings=timings,
+            )
+            print(f"\n{'='*60}")
+            print(f"All audiograms generated successfully into the 'output' folder!")
+            total = len(selected['soundbites'])
+            print(f"Total: {total} soundbites × {len(formats_info)} formats = "
+                  f"{total * len(formats_info)} videos")
+            print(f"{'='*60}")
 
-            # Create temporary directory
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Warn about FFmpeg if missing (once)
-                _warn_if_no_ffmpeg()
-                # Download full audio once
-                print("\nDownloading audio...")
-                full_audio_path = os.path.join(temp_dir, "full_audio.mp3")
-                download_audio(selected['audio_url'], full_audio_path)
-
-                # Download artwork once
-                print("Downloading artwork...")
-                logo_path = os.path.join(temp_dir, "logo.png")
-                if artwork_url:
-                    download_image(artwork_url, logo_path)
-
-                # Create output directory
-                os.makedirs(output_dir, exist_ok=True)
-
-                # Process each soundbite
-                for soundbite_num, soundbite in enumerate(selected['soundbites'], 1):
-                    print(f"\n{'='*60}")
-                    print(f"Soundbite {soundbite_num}/{len(selected['soundbites'])}: {soundbite.get('text') or soundbite.get('title')}")
-                    print(f"{'='*60}")
-
-                    # Extract audio segment
-                    print("Extracting audio segment...")
-                    segment_path = os.path.join(temp_dir, f"segment_{soundbite_num}.mp3")
-                    extract_audio_segment(
-                        full_audio_path,
-                        soundbite['start'],
-                        soundbite['duration'],
-                        segment_path
-                    )
-
-                    # Build transcript chunks
-                    print("Processing transcript...")
-                    transcript_chunks = []
-                    transcript_text = ""
-                    if selected['transcript_url']:
-                        transcript_chunks = get_transcript_chunks(
-                            selected['transcript_url'],
-                            soundbite['start'],
-                            soundbite['duration']
-                        )
-                        # Estrai testo completo per caption
-                        transcript_text = get_transcript_text(
-                            selected['transcript_url'],
-                            soundbite['start'],
-                            soundbite['duration']
-                        ) or (soundbite.get('text') or soundbite.get('title'))
-                    else:
-                        transcript_text = soundbite.get('text') or soundbite.get('title')
-
-                    # Genera audiogram per ogni formato abilitato
-                    formats_info = {}
-                    for fmt_name, fmt_config in formats_config.items():
-                        if fmt_config.get('enabled', True):
-                            formats_info[fmt_name] = fmt_config.get('description', fmt_name)
-
-                    for format_name, format_desc in formats_info.items():
-                        print(f"Generating audiogram {format_desc}...")
-                        # Add a suffix to filename if subtitles are disabled
-                        nosubs_suffix = "_nosubs" if not show_subtitles else ""
-                        output_path = os.path.join(
-                            output_dir,
-                            f"ep{selected['number']}_sb{soundbite_num}{nosubs_suffix}_{format_name}.mp4"
-                        )
-
-                        generate_audiogram(
-                            segment_path,
-                            output_path,
-                            format_name,
-                            logo_path,
-                            podcast_info['title'],
-                            selected['title'],
-                            transcript_chunks,
-                            float(soundbite['duration']),
-                            formats_config,
-                            colors,
-                            show_subtitles
-                        )
-
-                        print(f"✓ {format_name}: {output_path}")
-
-                    # Genera file caption .txt
-                    print("Generazione file caption...")
-                    caption_path = os.path.join(
-                        output_dir,
-                        f"ep{selected['number']}_sb{soundbite_num}_caption.txt"
-                    )
-                    generate_caption_file(
-                        caption_path,
-                        selected['number'],
-                        selected['title'],
-                        selected['link'],
-                        soundbite.get('text') or soundbite.get('title') or '',
-                        transcript_text,
-                        podcast_info.get('keywords'),
-                        selected.get('keywords'),
-                        config_hashtags
-                    )
-                    print(f"✓ Caption: {caption_path}")
+        elif choice.lower() != 'n':
+            if soundbite_nums is None:
+                print(f"Error: invalid soundbite selection '{choice}'. "
+                      f"Choose between 1 and {len(selected['soundbites'])}")
+                return
+            try:
+                # Genera audiogram per i soundbites selezionati
+                print(f"\nGenerating audiogram for {len(soundbite_nums)} soundbite(s)...")
+                _generate_soundbites(
+                    selected, podcast_info, soundbite_nums, colors, formats_config, config_hashtags,
+                    show_subtitles, output_dir, artwork_url, partial_audio_fetch,
+                    partial_audio_margin, prepared=prepared, manifest=manifest, executor=executor,
+                    timings=timings,
+                )
 
                 print(f"\n{'='*60}")
-                print(f"All audiograms generated successfully into the 'output' folder!")
-                print(f"Total: {len(selected['soundbites'])} soundbites × {len(formats_info)} formats = {len(selected['soundbites']) * len(formats_info)} videos")
+                print(f"Audiograms successfully generated in folder: {output_dir}")
                 print(f"{'='*60}")
+            except Exception as e:
+                print(f"Error during generation: {e}")
+    else:
+        print("\nNo soundbites found for this episode.")
 
-        elif choice.lower() != 'n':
+
+def _prefetch_assets(episodes, podcast_info, settings, use_episode_cover, audio):
+    """Fill the asset cache with everything the render loop will download."""
+    if asset_cache.get_cache() is None:
+        print("Prefetch skipped: the asset cache is disabled.")
+        return None
+    items = prefetch_svc.plan_prefetch(
+        episodes, podcast_info,
+        use_episode_cover=use_episode_cover,
+        audio=audio,
+        segmented=http_client.get_client().settings.download_segments > 1,
+    )
+    print(f"Prefetching {len(items)} assets...")
+    result = prefetch_svc.prefetch(
+        items,
+        per_host=settings.get('per_host', 4),
+        max_concurrency=settings.get('max_concurrency', 16),
+    )
+    print(f"Prefetched {result.fetched} assets in {result.elapsed:.1f}s"
+          + (f" ({len(result.failed)} failed)" if result.failed else ""))
+    return result
+
+
+def _load_config(config_path=None):
+    """Load the YAML config, falling back to config.yml/config.yaml in the CWD."""
+    # Se non viene passato --config, prova a usare un file di default (config.yml o config.yaml)
+    default_config_path = None
+    if not config_path:
+        # Cerca nella directory corrente
+        cwd = os.getcwd()
+        candidates = [
+            os.path.join(cwd, 'config.yml'),
+            os.path.join(cwd, 'config.yaml'),
+        ]
+        for candidate in candidates:
+            if os.path.exists(candidate):
+                default_config_path = candidate
+                break
+    return Config(config_file=config_path or default_config_path)
+
+
+def _load_episodes(feed_url, index_path=None):
+    """Fetch the feed, through the episode index when one is configured.
+
+    Returns ``(listing, podcast_info, lookup, sync_result, index)`` where
+    ``listing`` holds ``(number, title)`` pairs, ``lookup`` maps episode
+    numbers to episode dicts, and ``index`` (to be closed by the caller) and
+    ``sync_result`` are None without an index.
+    """
+    if index_path:
+        # Incremental sync into the local index; selections are resolved by key
+        index = EpisodeIndex(index_path)
+        sync_result = rss_svc.sync_feed_index(feed_url, index)
+        print(f"Episode index: {len(sync_result.new)} new, {len(sync_result.updated)} updated, "
+              f"{len(sync_result.removed)} removed")
+        podcast_info = index.podcast_info(feed_url)
+        listing = index.list_titles(feed_url)
+
+        def lookup(numbers):
+            return index.get_by_numbers(feed_url, numbers)
+        return listing, podcast_info, lookup, sync_result, index
+
+    episodes, podcast_info = get_podcast_episodes(feed_url)
+    listing = [(ep['number'], ep['title']) for ep in episodes]
+    episodes_by_number = {ep['number']: ep for ep in episodes}
+
+    def lookup(numbers):
+        return {n: episodes_by_number[n] for n in numbers if n in episodes_by_number}
+    return listing, podcast_info, lookup, None, None
+
+
+def _memory_budget(config):
+    """The ``memory_budget`` setting in bytes, or None when unset."""
+    value = config.get('memory_budget')
+    return parse_size(value) if value not in (None, '', 0) else None
+
+
+def _apply_caption_labels(config):
+    """Caption labels (allow overriding fixed strings in caption)"""
+    try:
+        labels = config.get('caption_labels', {}) or {}
+    except Exception:
+        labels = {}
+    global CAPTION_LABEL_EPISODE_PREFIX, CAPTION_LABEL_LISTEN_PREFIX
+    CAPTION_LABEL_EPISODE_PREFIX = labels.get('episode_prefix', CAPTION_LABEL_EPISODE_PREFIX)
+    CAPTION_LABEL_LISTEN_PREFIX = labels.get('listen_full_prefix', CAPTION_LABEL_LISTEN_PREFIX)
+
+
+def _configure_cache(config, cache_dir=None, no_cache=False):
+    """Install the shared asset cache from the ``cache`` config section."""
+    cache_settings = dict(config.get('cache') or {})
+    if cache_dir:
+        cache_settings['dir'] = cache_dir
+    if no_cache:
+        cache_settings['enabled'] = False
+    return asset_cache.configure(**cache_settings)
+
+
+def _cmd_cache(argv):
+    """``cache stats|gc|clear``: inspect and maintain the asset cache."""
+    parser = argparse.ArgumentParser(prog='audiogram-generator cache',
+                                     description='Inspect and maintain the asset cache')
+    parser.add_argument('action', choices=['stats', 'gc', 'clear'],
+                        help='stats: report usage; gc: drop stale files and enforce the budget; '
+                             'clear: empty the cache')
+    parser.add_argument('--config', type=str, help='Path to the YAML configuration file')
+    parser.add_argument('--cache-dir', type=str, help='Cache directory (overrides config)')
+    parser.add_argument('--max-bytes', type=str,
+                        help="Byte budget for gc (e.g. 2G); defaults to cache.max_bytes")
+    args = parser.parse_args(argv)
+
+    config = _load_config(args.config)
+    settings = dict(config.get('cache') or {})
+    settings['enabled'] = True
+    if args.cache_dir:
+        settings['dir'] = args.cache_dir
+    cache = asset_cache.configure(**settings)
+
+    if args.action == 'gc':
+        budget = parse_size(args.max_bytes) if args.max_bytes else None
+        evicted, freed = cache.gc(budget)
+        print(f"Evicted {evicted} blobs ({format_bytes(freed)} freed)")
+    elif args.action == 'clear':
+        cache.clear()
+        print(f"Cache cleared: {cache.root}")
+
+    st = cache.stats()
+    print(f"Cache: {st.root}")
+    print(f"Size: {format_bytes(st.total_bytes)} of {format_bytes(st.max_bytes)} budget "
+          f"({st.blobs} blobs, {st.entries} keys)")
+    for kind, (count, nbytes) in sorted(st.by_kind.items()):
+        print(f"  {kind:<10} {count:>6} files  {format_bytes(nbytes):>10}")
+    lookups = st.hits + st.misses
+    ratio = (st.hits / lookups * 100) if lookups else 0.0
+    print(f"Lookups: {st.hits} hits, {st.misses} misses ({ratio:.1f}% hit rate)")
+    return 0
+
+
+def _warm_decoded(episodes, cache, fps=24):
+    """Decode cached enclosures to PCM and cache each soundbite's waveform."""
+    # Lazy import: the renderer pulls in MoviePy
+    from .video_generator import get_waveform_data
+
+    store_pcm = cache.store_pcm
+    cache.store_pcm = True
+    try:
+        for ep in episodes:
+            path = cache.lookup_url(ep['audio_url']) if ep.get('audio_url') else None
+            if path is None:
+                continue
+            print(f"Decoding episode {ep['number']}...")
+            with tempfile.TemporaryDirectory() as temp_dir:
+                for i, sb in enumerate(ep.get('soundbites') or [], 1):
+                    segment = os.path.join(temp_dir, f"segment_{i}.mp3")
+                    extract_audio_segment(path, sb['start'], sb['duration'], segment)
+                    get_waveform_data(segment, fps=fps)
+            clear_decoded_cache()
+    finally:
+        cache.store_pcm = store_pcm
+
+
+def _cmd_prefetch(argv):
+    """``prefetch``: warm the asset cache for later (offline) rendering runs."""
+    parser = argparse.ArgumentParser(
+        prog='audiogram-generator prefetch',
+        description='Download episode assets into the asset cache without rendering')
+    parser.add_argument('--config', type=str, help='Path to the YAML configuration file')
+    parser.add_argument('--feed-url', type=str, help='URL of the podcast RSS feed')
+    parser.add_argument('--episode', type=str, default='all',
+                        help="Episodes to prefetch: number, list, range (e.g. 1-200), 'all', "
+                             "'last' or 'new' (default: all)")
+    parser.add_argument('--episode-index', type=str,
+                        help='Path to the SQLite episode index synced incrementally from the feed')
+    parser.add_argument('--cache-dir', type=str, help='Asset cache directory (overrides config)')
+    parser.add_argument('--no-audio', action='store_true',
+                        help='Skip episode audio; fetch only transcripts and artwork')
+    parser.add_argument('--decode', action='store_true',
+                        help='Also decode audio to PCM and cache the waveform of every soundbite '
+                             '(needs FFmpeg)')
+    parser.add_argument('--use-episode-cover', action='store_true', default=None,
+                        help="Fetch episode-specific cover art when available")
+    parser.add_argument('--per-host', type=int, help='Concurrent requests per host')
+    parser.add_argument('--max-concurrency', type=int, help='Concurrent requests overall')
+    parser.add_argument('--log-level', type=str,
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        help='Logging level')
+    args = parser.parse_args(argv)
+    if args.log_level:
+        logging.getLogger().setLevel(getattr(logging, args.log_level.upper(), logging.INFO))
+
+    config = _load_config(args.config)
+    config.update_from_args({
+        'feed_url': args.feed_url,
+        'episode_index': args.episode_index,
+        'use_episode_cover': args.use_episode_cover,
+    })
+    feed_url = config.get('feed_url')
+    if not feed_url:
+        print("Error: a feed URL is required (--feed-url or feed_url in the config).")
+        return 2
+    http_client.configure(**dict(config.get('http') or {}))
+    cache = _configure_cache(config, cache_dir=args.cache_dir)
+    if cache is None:
+        print("Error: prefetch needs the asset cache, which is disabled in the config.")
+        return 2
+    settings = dict(config.get('prefetch') or {})
+
+    listing, podcast_info, lookup, sync_result, index = _load_episodes(
+        feed_url, config.get('episode_index'))
+    try:
+        if args.episode.strip().lower() == 'new':
+            if sync_result is None:
+                print("Error: --episode new requires an episode index (--episode-index).")
+                return 2
+            numbers = sorted(sync_result.new_numbers)
+        else:
+            try:
+                numbers = parse_episode_selection(args.episode, len(listing))
+            except ValueError as e:
+                print(f"Episode selection error: {e}")
+                return 2
+        by_number = lookup(numbers)
+        episodes = [by_number[n] for n in numbers if n in by_number]
+    finally:
+        if index is not None:
+            index.close()
+
+    items = prefetch_svc.plan_prefetch(
+        episodes, podcast_info,
+        use_episode_cover=bool(config.get('use_episode_cover', False)),
+        audio=not args.no_audio,
+        segmented=http_client.get_client().settings.download_segments > 1,
+    )
+    print(f"Prefetching {len(items)} assets for {len(episodes)} episodes into {cache.root}...")
+    result = prefetch_svc.prefetch(
+        items,
+        per_host=args.per_host or settings.get('per_host', 4),
+        max_concurrency=args.max_concurrency or settings.get('max_concurrency', 16),
+    )
+    print(f"Prefetched {result.fetched} assets in {result.elapsed:.1f}s")
+    for url, error in result.failed:
+        print(f"  failed: {url}: {error}")
+    if args.decode and not args.no_audio:
+        _warn_if_no_ffmpeg()
+        _warm_decoded(episodes, cache)
+    st = cache.stats()
+    print(f"Cache: {format_bytes(st.total_bytes)} of {format_bytes(st.max_bytes)} budget")
+    return 1 if result.failed else 0
+
+
+def _queue_path(config, path=None):
+    """Queue file: ``path``, else ``queue.path``, else inside ``output_dir``."""
+    output_dir = config.get('output_dir') or os.path.join(os.getcwd(), 'output')
+    return (path or (config.get('queue') or {}).get('path')
+            or os.path.join(output_dir, '.audiogram-queue.sqlite'))
+
+
+def _print_queue_status(queue):
+    counts = queue.counts()
+    print("Queue: " + ", ".join(f"{n} {status}" for status, n in counts.items()))
+    timing = queue.timings()
+    if timing['jobs']:
+        print(f"Render time: {timing['total']:.1f}s total, {timing['mean']:.1f}s mean, "
+              f"{timing['max']:.1f}s max over {timing['jobs']} jobs")
+    for failure in queue.failures():
+        print(f"  failed: {failure['key']} after {failure['attempts']} attempts: "
+              f"{failure['last_error']}")
+    return counts
+
+
+def _cmd_enqueue(argv):
+    """``enqueue``: add render jobs to the shared work queue."""
+    parser = argparse.ArgumentParser(
+        prog='audiogram-generator enqueue',
+        description='Add render jobs to a SQLite work queue processed by `worker`')
+    parser.add_argument('--config', type=str, help='Path to the YAML configuration file')
+    parser.add_argument('--feed-url', type=str, help='URL of the podcast RSS feed')
+    parser.add_argument('--queue', type=str,
+                        help='Queue file (default: queue.path, or .audiogram-queue.sqlite in the '
+                             'output directory)')
+    parser.add_argument('--output-dir', type=str,
+                        help='Output directory (locates the default queue file)')
+    parser.add_argument('--episode', type=str, default='all',
+                        help="Episodes to enqueue: number, list, range (e.g. 1-200), 'all', "
+                             "'last' or 'new' (default: all)")
+    parser.add_argument('--soundbites', type=str, default='all',
+                        help='Soundbites of each episode (default: all)')
+    parser.add_argument('--jobs-file', type=str,
+                        help='Enqueue the jobs listed in a YAML/JSON jobs file instead')
+    parser.add_argument('--episode-index', type=str,
+                        help='Path to the SQLite episode index synced incrementally from the feed')
+    parser.add_argument('--max-attempts', type=int, help='Attempts before a job is marked failed')
+    parser.add_argument('--requeue', action='store_true',
+                        help='Queue jobs that are already done or failed again')
+    parser.add_argument('--status', action='store_true', help='Only print the queue status')
+    parser.add_argument('--log-level', type=str,
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        help='Logging level')
+    args = parser.parse_args(argv)
+    if args.log_level:
+        logging.getLogger().setLevel(getattr(logging, args.log_level.upper(), logging.INFO))
+
+    config = _load_config(args.config)
+    config.update_from_args({
+        'feed_url': args.feed_url,
+        'output_dir': args.output_dir,
+        'episode_index': args.episode_index,
+    })
+    queue_settings = dict(config.get('queue') or {})
+    with JobQueue(_queue_path(config, args.queue)) as queue:
+        if args.status:
+            counts = _print_queue_status(queue)
+            return 1 if counts['failed'] else 0
+
+        feed_url = config.get('feed_url')
+        if not feed_url:
+            print("Error: a feed URL is required (--feed-url or feed_url in the config).")
+            return 2
+        if args.jobs_file:
             try:
-                # Supporta lista di numeri separati da virgola
-                if ',' in choice:
-                    soundbite_nums = [int(n.strip()) for n in choice.split(',')]
+                specs = parse_jobs(_read_jobs_file(args.jobs_file))
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                print(f"Error: invalid jobs file {args.jobs_file}: {e}")
+                return 2
+        http_client.configure(**dict(config.get('http') or {}))
+
+        listing, podcast_info, lookup, sync_result, index = _load_episodes(
+            feed_url, config.get('episode_index'))
+        try:
+            if not args.jobs_file:
+                if args.episode.strip().lower() == 'new':
+                    if sync_result is None:
+                        print("Error: --episode new requires an episode index (--episode-index).")
+                        return 2
+                    numbers = sorted(sync_result.new_numbers)
                 else:
-                    soundbite_nums = [int(choice)]
+                    try:
+                        numbers = parse_episode_selection(args.episode, len(listing))
+                    except ValueError as e:
+                        print(f"Episode selection error: {e}")
+                        return 2
+                specs = [JobSpec(episode=n, soundbites=args.soundbites) for n in numbers]
+            formats_config = config.get('formats')
+            enabled_formats = [name for name, fmt in formats_config.items()
+                               if fmt.get('enabled', True)]
+            plans, problems = expand_jobs(
+                specs, _episode_resolver(feed_url, listing, lookup, index), enabled_formats,
+                bool(config.get('show_subtitles', True)),
+            )
+        finally:
+            if index is not None:
+                index.close()
+        for problem in problems:
+            print(f"Skipped: {problem}")
+
+        jobs = [job for plan in plans for job in plan.jobs]
+        added = queue.enqueue(
+            feed_url, jobs,
+            max_attempts=args.max_attempts or queue_settings.get('max_attempts', 3),
+            requeue=args.requeue,
+        )
+        print(f"Enqueued {added} of {len(jobs)} jobs into {queue.path}")
+        _print_queue_status(queue)
+    return 1 if problems else 0
 
-                # Valida tutti i numeri
-                for num in soundbite_nums:
-                    if not (1 <= num <= len(selected['soundbites'])):
-                        print(f"Error: invalid number {num}. Choose between 1 and {len(selected['soundbites'])}")
-                        return
 
-                # Genera audiogram per i soundbites selezionati
-                print(f"\nGenerating audiogram for {len(soundbite_nums)} soundbite(s)...")
+def _work_batch(queue, owner, batch, feed, settings, manifest, lease_seconds, backoff):
+    """Prepare one claimed episode and render its jobs, recording each outcome.
 
-                # Crea directory temporanea
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    # Warn about FFmpeg if missing (once)
-                    _warn_if_no_ffmpeg()
-                    # Scarica audio completo una sola volta
-                    print("Downloading audio...")
-                    full_audio_path = os.path.join(temp_dir, "full_audio.mp3")
-                    download_audio(selected['audio_url'], full_audio_path)
-
-                    # Scarica logo una sola volta
-                    print("Downloading artwork...")
-                    logo_path = os.path.join(temp_dir, "logo.png")
-                    if artwork_url:
-                        download_image(artwork_url, logo_path)
-
-                    # Crea directory output
-                    os.makedirs(output_dir, exist_ok=True)
-
-                    # Processa ogni soundbite selezionato
-                    for soundbite_num in soundbite_nums:
-                        soundbite = selected['soundbites'][soundbite_num - 1]
-
-                        print(f"\n{'='*60}")
-                        print(f"Soundbite {soundbite_num}: {soundbite.get('text') or soundbite.get('title')}")
-                        print(f"{'='*60}")
-
-                        # Estrai segmento
-                        print("Extracting audio segment...")
-                        segment_path = os.path.join(temp_dir, f"segment_{soundbite_num}.mp3")
-                        extract_audio_segment(
-                            full_audio_path,
-                            soundbite['start'],
-                            soundbite['duration'],
-                            segment_path
-                        )
-
-                        # Ottieni chunk trascrizione
-                        print("Processing transcript...")
-                        transcript_chunks = []
-                        transcript_text = ""
-                        if selected['transcript_url']:
-                            transcript_chunks = get_transcript_chunks(
-                                selected['transcript_url'],
-                                soundbite['start'],
-                                soundbite['duration']
-                            )
-                            # Estrai testo completo per caption
-                            transcript_text = get_transcript_text(
-                                selected['transcript_url'],
-                                soundbite['start'],
-                                soundbite['duration']
-                            ) or (soundbite.get('text') or soundbite.get('title'))
-                        else:
-                            transcript_text = soundbite.get('text') or soundbite.get('title')
-
-                        # Genera audiogram per ogni formato abilitato
-                        formats_info = {}
-                        for fmt_name, fmt_config in formats_config.items():
-                            if fmt_config.get('enabled', True):
-                                formats_info[fmt_name] = fmt_config.get('description', fmt_name)
-
-                        for format_name, format_desc in formats_info.items():
-                            print(f"Generating audiogram {format_desc}...")
-                            # Add a suffix to filename if subtitles are disabled
-                            nosubs_suffix = "_nosubs" if not show_subtitles else ""
-                            output_path = os.path.join(
-                                output_dir,
-                                f"ep{selected['number']}_sb{soundbite_num}{nosubs_suffix}_{format_name}.mp4"
-                            )
-
-                            generate_audiogram(
-                                segment_path,
-                                output_path,
-                                format_name,
-                                logo_path,
-                                podcast_info['title'],
-                                selected['title'],
-                                transcript_chunks,
-                                float(soundbite['duration']),
-                                formats_config,
-                                colors,
-                                show_subtitles
-                            )
-
-                            print(f"✓ {format_name}: {output_path}")
-
-                        # Genera file caption .txt
-                        print("Generating caption file...")
-                        caption_path = os.path.join(
-                            output_dir,
-                            f"ep{selected['number']}_sb{soundbite_num}_caption.txt"
-                        )
-                        generate_caption_file(
-                            caption_path,
-                            selected['number'],
-                            selected['title'],
-                            selected['link'],
-                            soundbite.get('text') or soundbite.get('title') or '',
-                            transcript_text,
-                            podcast_info.get('keywords'),
-                            selected.get('keywords'),
-                            config_hashtags
-                        )
-                        print(f"✓ Caption: {caption_path}")
-
-                    print(f"\n{'='*60}")
-                    print(f"Audiograms successfully generated in folder: {output_dir}")
-                    print(f"{'='*60}")
-            except ValueError:
-                print("Invalid input")
+    Returns the number of jobs completed. Failures go back to the queue,
+    which schedules the retry.
+    """
+    podcast_info, resolve = feed
+    job = batch[0].job
+    selected = resolve(job)
+    with LeaseKeeper(queue.path, owner, batch, lease_seconds):
+        if selected is None:
+            # Never fall back to the number: it may now belong to another episode
+            missing = job.guid if job.guid is not None else job.episode
+            for queued in batch:
+                queue.fail(owner, queued, f"episode {missing} not found in the feed",
+                           backoff=backoff)
+            return 0
+        print(f"\nEpisode {selected['number']}: {selected['title']} ({len(batch)} jobs)")
+        temp_dir = tempfile.mkdtemp(prefix='audiogram-')
+        prepared = None
+        try:
+            started = time.time()
+            try:
+                prepared = prepare_episode(
+                    selected, sorted({queued.job.soundbite for queued in batch}), temp_dir,
+                    _artwork_url(selected, podcast_info, settings['use_episode_cover']),
+                    settings['partial_audio_fetch'], settings['partial_audio_margin'],
+                )
             except Exception as e:
-                print(f"Error during generation: {e}")
-    else:
-        print("\nNo soundbites found for this episode.")
+                print(f"Error preparing episode {selected['number']}: {e}")
+                for queued in batch:
+                    queue.fail(owner, queued, str(e), time.time() - started, backoff=backoff)
+                return 0
+            done = 0
+            for queued in batch:
+                started = time.time()
+                try:
+                    render_prepared_episode(
+                        prepared, podcast_info, settings['colors'], settings['formats'],
+                        settings['hashtags'], queued.job.show_subtitles, settings['output_dir'],
+                        manifest=manifest, jobs=[queued.job],
+                    )
+                except Exception as e:
+                    status = queue.fail(owner, queued, str(e), time.time() - started,
+                                        backoff=backoff)
+                    outcome = 'will retry' if status == 'pending' else status
+                    print(f"✗ {queued.key}: {e} ({outcome})")
+                    continue
+                if queue.complete(owner, queued, time.time() - started):
+                    done += 1
+                else:
+                    print(f"! {queued.key}: lease lost, another worker may render it again")
+            return done
+        except BaseException:
+            # Interrupted: hand the unfinished jobs back without counting an attempt
+            queue.release(owner, batch)
+            raise
+        finally:
+            if prepared is not None:
+                prepared.cleanup()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            clear_decoded_cache()
+
+
+def _render_settings(config):
+    """Render settings of queue workers and batch runs, read from the configuration."""
+    return {
+        'colors': config.get('colors'),
+        'formats': config.get('formats'),
+        'hashtags': config.get('hashtags', []),
+        'show_subtitles': config.get('show_subtitles', True),
+        'output_dir': config.get('output_dir') or os.path.join(os.getcwd(), 'output'),
+        'use_episode_cover': config.get('use_episode_cover', False),
+        'partial_audio_fetch': config.get('partial_audio_fetch', False),
+        'partial_audio_margin': float(config.get('partial_audio_margin', 3.0)),
+    }
+
+
+class _FeedTargets:
+    """Render settings and build manifest of each feed a queue worker renders.
+
+    Feeds listed in the ``feeds`` config section use their own settings and
+    output directory (see ``Config.feed_configs``). The global settings and
+    output directory serve a single other feed: output names only carry the
+    episode number, so two feeds sharing a directory would overwrite each
+    other's videos.
+    """
+
+    def __init__(self, config, incremental=True):
+        self.incremental = incremental
+        self.default = _render_settings(config)
+        self.by_url = {}
+        for feed in (config.feed_configs() if config.get('feeds') else []):
+            self.by_url.setdefault(feed.get('feed_url'), _render_settings(feed))
+        dirs = [os.path.abspath(s['output_dir']) for s in self.by_url.values()]
+        if os.path.abspath(self.default['output_dir']) in dirs or len(set(dirs)) < len(dirs):
+            raise ValueError("every feed in the 'feeds' section needs its own output directory")
+        self._default_feed = None
+        self._manifests = {}
+
+    def check(self, feed_urls):
+        """Raise ``ValueError`` unless ``feed_urls`` can all be rendered side by side."""
+        unlisted = sorted({url for url in feed_urls if url not in self.by_url})
+        if len(unlisted) > 1:
+            raise ValueError(
+                f"{len(unlisted)} feeds would share the output directory "
+                f"{self.default['output_dir']}; list them in the 'feeds' section "
+                f"so each gets its own: {', '.join(unlisted)}"
+            )
+
+    def resolve(self, feed_url):
+        """``(settings, manifest)`` of ``feed_url``; ``ValueError`` on a shared directory."""
+        settings = self.by_url.get(feed_url)
+        if settings is None:
+            if self._default_feed not in (None, feed_url):
+                raise ValueError(
+                    f"output directory {self.default['output_dir']} already holds "
+                    f"{self._default_feed}; add {feed_url} to the 'feeds' section"
+                )
+            self._default_feed = feed_url
+            settings = self.default
+        return settings, self.manifest(settings)
 
+    def manifest(self, settings):
+        if not self.incremental:
+            return None
+        output_dir = settings['output_dir']
+        if output_dir not in self._manifests:
+            self._manifests[output_dir] = BuildManifest(output_dir)
+        return self._manifests[output_dir]
 
-def main():
+
+def _queued_episode_resolver(listing, lookup):
+    """Return a ``RenderJob -> episode dict`` resolver for queued jobs.
+
+    Jobs are matched by GUID (``episode_key``), since episode numbers shift
+    when old items leave the feed; only jobs queued without one fall back to
+    the number.
+    """
+    by_number = lookup([number for number, _ in listing])
+    by_key = {episode_key(ep): ep for ep in by_number.values()}
+
+    def resolve(job):
+        if job.guid is None:
+            return by_number.get(job.episode)
+        return by_key.get(job.guid)
+    return resolve
+
+
+def _drain_queue(queue, owner, targets, lease_seconds, backoff, batch_size,
+                 poll=5.0, wait=False, feeds=None):
+    """Claim and render jobs until the queue is drained; returns the jobs rendered.
+
+    ``targets`` (a ``_FeedTargets``) gives each job's feed its settings and
+    output directory. Keeps polling while retries back off or other workers
+    hold leases, and forever with ``wait``. ``feeds`` caches parsed feeds
+    between calls.
+    """
+    feeds = {} if feeds is None else feeds
+    done = 0
+    while True:
+        batch = queue.claim(owner, lease_seconds, limit=batch_size, backoff=backoff)
+        if not batch:
+            # Stay around while retries back off or other leases may expire
+            if wait or queue.has_unfinished():
+                time.sleep(max(0.1, poll))
+                continue
+            return done
+        feed_url = batch[0].feed_url
+        try:
+            settings, manifest = targets.resolve(feed_url)
+        except ValueError as e:
+            for queued in batch:
+                queue.fail(owner, queued, str(e), backoff=backoff)
+            print(f"Error: {e}")
+            continue
+        # Reload the feed when it may have gained episodes since it was read
+        if feed_url not in feeds or feeds[feed_url][1](batch[0].job) is None:
+            try:
+                listing, podcast_info, lookup, _sync, _index = _load_episodes(feed_url)
+            except Exception as e:
+                for queued in batch:
+                    queue.fail(owner, queued, f"feed unavailable: {e}", backoff=backoff)
+                continue
+            feeds[feed_url] = (podcast_info, _queued_episode_resolver(listing, lookup))
+        done += _work_batch(queue, owner, batch, feeds[feed_url], settings, manifest,
+                            lease_seconds, backoff)
+
+
+def _cmd_worker(argv):
+    """``worker``: claim jobs from the work queue and render them until it drains."""
+    parser = argparse.ArgumentParser(
+        prog='audiogram-generator worker',
+        description='Render jobs claimed from a SQLite work queue filled by `enqueue`')
+    parser.add_argument('--config', type=str, help='Path to the YAML configuration file')
+    parser.add_argument('--queue', type=str,
+                        help='Queue file (default: queue.path, or .audiogram-queue.sqlite in the '
+                             'output directory)')
+    parser.add_argument('--output-dir', type=str, help='Output directory for generated files')
+    parser.add_argument('--worker-id', type=str,
+                        help='Name recorded on leased jobs (default: host:pid)')
+    parser.add_argument('--lease', type=float,
+                        help='Lease duration in seconds, renewed by heartbeats while rendering')
+    parser.add_argument('--batch', type=int, help='Jobs claimed at once (always from one episode)')
+    parser.add_argument('--poll', type=float, default=5.0,
+                        help='Seconds between polls while other jobs are leased or backing off '
+                             '(default: 5)')
+    parser.add_argument('--wait', action='store_true',
+                        help='Keep polling for new jobs when the queue is empty')
+    parser.add_argument('--cache-dir', type=str, help='Asset cache directory (overrides config)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Disable the persistent asset cache')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-render outputs even if the build manifest says they are up '
+                             'to date')
+    parser.add_argument('--log-level', type=str,
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        help='Logging level')
+    parser.add_argument('--metrics-file', type=str,
+                        help='Write and refresh a Prometheus textfile with render, download, cache '
+                             'and failure metrics')
+    args = parser.parse_args(argv)
+    if args.log_level:
+        logging.getLogger().setLevel(getattr(logging, args.log_level.upper(), logging.INFO))
+
+    config = _load_config(args.config)
+    config.update_from_args({'output_dir': args.output_dir, 'metrics_file': args.metrics_file})
+    if config.get('metrics_file'):
+        stages.start_run(metrics_path=config.get('metrics_file'))
+    queue_settings = dict(config.get('queue') or {})
+    lease_seconds = float(args.lease or queue_settings.get('lease_seconds', 300))
+    backoff = float(queue_settings.get('backoff', 30))
+    batch_size = int(args.batch or queue_settings.get('batch', 32))
+    owner = args.worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    try:
+        targets = _FeedTargets(config, bool(config.get('incremental', True)) and not args.force)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    http_client.configure(**dict(config.get('http') or {}))
+    _configure_cache(config, cache_dir=args.cache_dir, no_cache=args.no_cache)
+    _apply_caption_labels(config)
+    _warn_if_no_ffmpeg()
+
+    with JobQueue(_queue_path(config, args.queue)) as queue:
+        print(f"Worker {owner} on {queue.path}")
+        try:
+            done = _drain_queue(queue, owner, targets, lease_seconds, backoff, batch_size,
+                                poll=args.poll, wait=args.wait)
+        except KeyboardInterrupt:
+            print("\nWorker interrupted; unfinished jobs were returned to the queue.")
+            return 130
+        print(f"\nWorker {owner}: {done} jobs rendered")
+        counts = _print_queue_status(queue)
+    return 1 if counts['failed'] else 0
+
+
+def _watch_jobs(feed_url, sync_result, index, enabled_formats, show_subtitles):
+    """Render jobs for what a sync found: new episodes and added soundbites."""
+    specs = []
+    for key in sync_result.new + sync_result.updated:
+        episode = index.get_by_guid(feed_url, key)
+        if episode is None:
+            continue
+        nums = added_soundbites(sync_result.previous.get(key), episode)
+        if nums:
+            specs.append(JobSpec(guid=key, soundbites=','.join(map(str, nums))))
+    if not specs:
+        return []
+    plans, problems = expand_jobs(
+        specs, lambda spec: index.get_by_guid(feed_url, spec.guid), enabled_formats,
+        show_subtitles,
+    )
+    for problem in problems:
+        print(f"Skipped: {problem}")
+    return [job for plan in plans for job in plan.jobs]
+
+
+def _watch_once(feed_urls, index, queue, targets, max_attempts, feeds=None):
+    """Sync every feed once and enqueue the new renders; returns jobs queued.
+
+    Each feed's formats and subtitle mode come from ``targets`` (a ``_FeedTargets``).
+    ``feeds`` is the parsed-feed cache of ``_drain_queue``: feeds whose items
+    changed are dropped from it, so their jobs render the episodes as just synced.
+    """
+    queued = 0
+    for feed_url in feed_urls:
+        settings = targets.by_url.get(feed_url, targets.default)
+        enabled_formats = [name for name, fmt in settings['formats'].items()
+                           if fmt.get('enabled', True)]
+        show_subtitles = bool(settings['show_subtitles'])
+        try:
+            result = rss_svc.sync_feed_index(feed_url, index)
+        except Exception as e:
+            print(f"{feed_url}: sync failed: {e}")
+            continue
+        if result.not_modified or not result.parsed:
+            print(f"{feed_url}: unchanged")
+            continue
+        if feeds is not None and (result.new or result.updated or result.removed):
+            feeds.pop(feed_url, None)
+        if result.initial:
+            # Start from the current state; only later additions are rendered
+            print(f"{feed_url}: watching {len(result.new)} episodes")
+            continue
+        jobs = _watch_jobs(feed_url, result, index, enabled_formats, show_subtitles)
+        # A soundbite edited in place keeps its job key: render it again
+        added = 0
+        if jobs:
+            added = queue.enqueue(feed_url, jobs, max_attempts=max_attempts, requeue=True)
+        queued += added
+        print(f"{feed_url}: {len(result.new)} new, {len(result.updated)} updated episodes; "
+              f"{added} jobs queued")
+    return queued
+
+
+def _cmd_watch(argv):
+    """``watch``: poll feeds and queue renders for new episodes and soundbites."""
+    parser = argparse.ArgumentParser(
+        prog='audiogram-generator watch',
+        description='Poll feeds and queue renders for new episodes and soundbites')
+    parser.add_argument('--config', type=str, help='Path to the YAML configuration file')
+    parser.add_argument('--feed-url', type=str, action='append',
+                        help='Feed to watch (repeatable; default: feed_url from the config)')
+    parser.add_argument('--interval', type=float,
+                        help='Seconds between polls (default: watch.interval)')
+    parser.add_argument('--once', action='store_true', help='Poll once and exit')
+    parser.add_argument('--render', action='store_true',
+                        help='Also render the queued jobs in this process after each poll')
+    parser.add_argument('--queue', type=str,
+                        help='Queue file (default: queue.path, or .audiogram-queue.sqlite in the '
+                             'output directory)')
+    parser.add_argument('--episode-index', type=str,
+                        help='Episode index holding the watched state (default: episode_index, or '
+                             '.audiogram-index.sqlite in the output directory)')
+    parser.add_argument('--output-dir', type=str, help='Output directory for generated files')
+    parser.add_argument('--cache-dir', type=str, help='Asset cache directory (overrides config)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Disable the persistent asset cache')
+    parser.add_argument('--log-level', type=str,
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        help='Logging level')
+    args = parser.parse_args(argv)
+    if args.log_level:
+        logging.getLogger().setLevel(getattr(logging, args.log_level.upper(), logging.INFO))
+
+    config = _load_config(args.config)
+    config.update_from_args({
+        'output_dir': args.output_dir,
+        'episode_index': args.episode_index,
+    })
+    feed_urls = args.feed_url or [url for url in [config.get('feed_url')] if url]
+    if not feed_urls:
+        print("Error: a feed URL is required (--feed-url or feed_url in the config).")
+        return 2
+    watch_settings = dict(config.get('watch') or {})
+    interval = float(args.interval or watch_settings.get('interval', 900))
+    queue_settings = dict(config.get('queue') or {})
+    try:
+        targets = _FeedTargets(config, bool(config.get('incremental', True)))
+        if args.render:
+            targets.check(feed_urls)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    index_path = config.get('episode_index') or os.path.join(
+        targets.default['output_dir'], '.audiogram-index.sqlite'
+    )
+    http_client.configure(**dict(config.get('http') or {}))
+    _configure_cache(config, cache_dir=args.cache_dir, no_cache=args.no_cache)
+    _apply_caption_labels(config)
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    feeds = {}
+
+    with EpisodeIndex(index_path) as index, JobQueue(_queue_path(config, args.queue)) as queue:
+        print(f"Watching {len(feed_urls)} feed(s) every {interval:g}s; jobs go to {queue.path}")
+        try:
+            while True:
+                _watch_once(feed_urls, index, queue, targets,
+                            int(queue_settings.get('max_attempts', 3)), feeds=feeds)
+                if args.render:
+                    _drain_queue(
+                        queue, owner, targets,
+                        float(queue_settings.get('lease_seconds', 300)),
+                        float(queue_settings.get('backoff', 30)),
+                        int(queue_settings.get('batch', 32)),
+                        feeds=feeds,
+                    )
+                if args.once:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+    return 0
+
+
+def _cmd_serve(argv):
+    """``serve``: run the local HTTP render service until interrupted."""
+    parser = argparse.ArgumentParser(
+        prog='audiogram-generator serve',
+        description='Serve an HTTP API that renders audiograms on a warm worker pool')
+    parser.add_argument('--config', type=str, help='Path to the YAML configuration file')
+    parser.add_argument('--feed-url', type=str,
+                        help='Default feed for requests that do not name one')
+    parser.add_argument('--host', type=str, help='Address to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, help='Port to bind (default: 8750)')
+    parser.add_argument('--workers', type=int,
+                        help='Render worker processes kept warm (default: workers)')
+    parser.add_argument('--memory-budget', type=str,
+                        help='Cap on the estimated memory of the videos rendering at once, '
+                             'e.g. 4GB')
+    parser.add_argument('--output-dir', type=str, help='Output directory for generated files')
+    parser.add_argument('--cache-dir', type=str, help='Asset cache directory (overrides config)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Disable the persistent asset cache')
+    parser.add_argument('--log-level', type=str,
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        help='Logging level')
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(getattr(logging, (args.log_level or 'INFO').upper(), logging.INFO))
+    from .server import RenderService, make_server
+
+    config = _load_config(args.config)
+    config.update_from_args({
+        'feed_url': args.feed_url,
+        'output_dir': args.output_dir,
+        'workers': args.workers,
+        'memory_budget': args.memory_budget,
+    })
+    try:
+        memory_budget = _memory_budget(config)
+    except ValueError as e:
+        parser.error(f"memory budget: {e}")
+    serve_settings = dict(config.get('serve') or {})
+    http_client.configure(**dict(config.get('http') or {}))
+    _configure_cache(config, cache_dir=args.cache_dir, no_cache=args.no_cache)
+    _apply_caption_labels(config)
+    _warn_if_no_ffmpeg()
+    service = RenderService(
+        {
+            'feed_url': config.get('feed_url'),
+            'colors': config.get('colors'),
+            'formats': config.get('formats'),
+            'hashtags': config.get('hashtags', []),
+            'show_subtitles': config.get('show_subtitles', True),
+            'output_dir': config.get('output_dir') or os.path.join(os.getcwd(), 'output'),
+            'use_episode_cover': config.get('use_episode_cover', False),
+            'partial_audio_fetch': config.get('partial_audio_fetch', False),
+            'partial_audio_margin': float(config.get('partial_audio_margin', 3.0)),
+            'incremental': bool(config.get('incremental', True)),
+        },
+        workers=int(config.get('workers', 1) or 1),
+        feed_ttl=float(serve_settings.get('feed_ttl', 300)),
+        max_jobs=int(serve_settings.get('max_jobs', 1000)),
+        memory_budget=memory_budget,
+    )
+    port = args.port if args.port is not None else int(serve_settings.get('port', 8750))
+    server = make_server(service, args.host or serve_settings.get('host', '127.0.0.1'), port)
+    print("Starting render workers...")
+    service.start()
+    host, port = server.server_address[:2]
+    print(f"Serving on http://{host}:{port} ({service.workers} render worker(s))")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.server_close()
+        service.stop()
+    return 0
+
+
+# Subcommands dispatched on the first CLI argument; anything else is the
+# classic flag-based render run.
+_SUBCOMMANDS = {
+    'cache': _cmd_cache,
+    'prefetch': _cmd_prefetch,
+    'enqueue': _cmd_enqueue,
+    'worker': _cmd_worker,
+    'serve': _cmd_serve,
+    'watch': _cmd_watch,
+}
+
+
+def main(argv=None):
     """Funzione principale CLI"""
+    try:
+        return _main(argv)
+    finally:
+        progress.stop_reporter()
+        _write_run_report()
+        profiling.configure(None)
+
+
+def _write_run_report():
+    """End the run started by ``_main`` and write its report and trace."""
+    run = stages.end_run()
+    if run is None:
+        return
+    if run.report_dir:
+        try:
+            print(f"Run report: {run.write()}")
+        except OSError as e:
+            print(f"Warning: could not write the run report: {e}")
+    if run.trace_path:
+        try:
+            print(f"Trace: {run.write_trace()}")
+        except OSError as e:
+            print(f"Warning: could not write the trace: {e}")
+    if run.metrics_path:
+        try:
+            print(f"Metrics: {run.write_metrics()}")
+        except OSError as e:
+            print(f"Warning: could not write the metrics file: {e}")
+
+
+def _refresh_metrics(run):
+    """Rewrite the run's Prometheus textfile, if any, after a finished video."""
+    if run.metrics_path:
+        try:
+            run.write_metrics()
+        except OSError as e:
+            logging.getLogger(__name__).warning("Could not write the metrics file %s: %s",
+                                                run.metrics_path, e)
+
+
+def _main(argv):
     # Argument parsing
     # Minimal logging setup; default to WARNING (less noisy). Will adjust level
     # after parsing if --log-level is set.
     logging.basicConfig(level=logging.WARNING)
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in _SUBCOMMANDS:
+        return _SUBCOMMANDS[argv[0]](argv[1:])
+
     parser = argparse.ArgumentParser(description='Audiogram generator from podcast RSS')
     parser.add_argument('--config', type=str, help='Path to the YAML configuration file')
     parser.add_argument('--feed-url', type=str, help='URL of the podcast RSS feed')
-    parser.add_argument('--episode', type=str, help="Episode(s) to process: number (e.g., 5), list (e.g., 1,3,5), 'all'/'a' for all, or 'last' for the most recent episode")
+    parser.add_argument('--episode', type=str,
+                        help="Episode(s) to process: number (e.g., 5), list (e.g., 1,3,5), "
+                             "'all'/'a' for all, 'last' for the most recent episode, or 'new' "
+                             "for episodes added since the last indexed run")
     parser.add_argument('--soundbites', type=str, help='Soundbites to generate: specific number, "all" for all, or comma-separated list (e.g., 1,3,5)')
     parser.add_argument('--output-dir', type=str, help='Output directory for generated files')
     parser.add_argument('--log-level', type=str, choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'], help='Logging level (default: INFO)')
+    parser.add_argument('--episode-index', type=str,
+                        help='Path to the SQLite episode index synced incrementally from the feed')
+    parser.add_argument('--partial-audio-fetch', dest='partial_audio_fetch', action='store_true',
+                        default=None,
+                        help='Fetch only the byte ranges of each soundbite via HTTP Range '
+                             '(falls back to a full download)')
+    parser.add_argument('--download-segments', type=int,
+                        help='Split audio downloads into N byte ranges fetched concurrently')
     parser.add_argument('--dry-run', action='store_true', help='Stampa solo intervalli e sottotitoli dei soundbite senza generare file')
     # Sottotitoli on/off
     subs_group = parser.add_mutually_exclusive_group()
@@ -480,7 +1670,56 @@ def main():
     cover_group.add_argument('--no-use-episode-cover', dest='use_episode_cover', action='store_false', help="Non usare la copertina episodio, usa quella del podcast")
     parser.set_defaults(use_episode_cover=None)
 
-    args = parser.parse_args()
+    parser.add_argument('--cache-dir', type=str,
+                        help='Asset cache directory (default: ~/.cache/audiogram-generator)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Disable the persistent asset cache for this run')
+    parser.add_argument('--prefetch', action='store_true',
+                        help='Download transcripts and artwork of all selected episodes '
+                             'concurrently before rendering')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-render every output even if the build manifest says it is up '
+                             'to date')
+    parser.add_argument('--pipeline-depth', type=int,
+                        help='Episodes downloaded and cut ahead while the current one renders '
+                             '(default: 1, 0 = sequential)')
+    parser.add_argument('--prefetch-audio', action='store_true',
+                        help='Like --prefetch, and also download the episode audio')
+    parser.add_argument('--jobs-file', type=str,
+                        help='YAML/JSON file listing the episodes, soundbites, formats and '
+                             'subtitle modes to render (non-interactive)')
+    parser.add_argument('--workers', type=int,
+                        help='Render processes running in parallel (default: 1)')
+    parser.add_argument('--shard', type=str,
+                        help='Render only shard K of N of the selected jobs (e.g. 2/4), split by a '
+                             'stable hash of each job')
+    parser.add_argument('--memory-budget', type=str,
+                        help='Cap on the estimated memory of the videos rendering at once, '
+                             'e.g. 4GB (default: no cap)')
+    parser.add_argument('--feed', type=str, action='append',
+                        help='With a `feeds` config section: render only the named feed '
+                             '(repeatable; default: all feeds)')
+    parser.add_argument('--report-dir', type=str,
+                        help='Write a JSON report with per-stage wall/CPU times of the run and of '
+                             'every video to this directory')
+    parser.add_argument('--trace', type=str,
+                        help='Write a Chrome/Perfetto trace-event JSON file of the run '
+                             '(stages per process and thread)')
+    parser.add_argument('--profile', type=str, choices=profiling.PROFILE_MODES,
+                        help='Profile every render with cProfile (cpu) or tracemalloc (mem); '
+                             'reports are written next to each video')
+    parser.add_argument('--progress', dest='progress', action='store_true', default=None,
+                        help='Show live progress of all renders (fps per job, realtime factor, '
+                             'download MB/s, queue and ETA) on stderr')
+    parser.add_argument('--metrics-file', type=str,
+                        help='Write and refresh a Prometheus textfile (e.g. for the node-exporter '
+                             'textfile collector) with render, download, cache and failure metrics')
+
+    args = parser.parse_args(argv)
+    try:
+        shard = parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
 
     # Apply log level if provided
     if args.log_level:
@@ -488,31 +1727,29 @@ def main():
         logging.getLogger().setLevel(level)
 
     # Carica configurazione
-    # Se non viene passato --config, prova a usare un file di default (config.yml o config.yaml)
-    default_config_path = None
-    if not args.config:
-        # Cerca nella directory corrente
-        cwd = os.getcwd()
-        candidates = [
-            os.path.join(cwd, 'config.yml'),
-            os.path.join(cwd, 'config.yaml'),
-        ]
-        for candidate in candidates:
-            if os.path.exists(candidate):
-                default_config_path = candidate
-                break
-    config = Config(config_file=args.config or default_config_path)
+    config = _load_config(args.config)
 
     # Aggiorna configurazione con argomenti CLI (hanno precedenza)
-    config.update_from_args({
+    cli_args = {
         'feed_url': args.feed_url,
         'episode': args.episode,
         'soundbites': args.soundbites,
         'output_dir': args.output_dir,
         'dry_run': args.dry_run,
         'show_subtitles': args.show_subtitles,
-        'use_episode_cover': args.use_episode_cover
-    })
+        'use_episode_cover': args.use_episode_cover,
+        'episode_index': args.episode_index,
+        'partial_audio_fetch': args.partial_audio_fetch,
+        'pipeline_depth': args.pipeline_depth,
+        'workers': args.workers,
+        'memory_budget': args.memory_budget,
+        'report_dir': args.report_dir,
+        'trace': args.trace,
+        'profile': args.profile,
+        'progress': args.progress,
+        'metrics_file': args.metrics_file,
+    }
+    config.update_from_args(cli_args)
 
     # Usa argomenti o richiedi input interattivo
     feed_url = config.get('feed_url')
@@ -527,15 +1764,70 @@ def main():
     show_subtitles = config.get('show_subtitles', True)
     dry_run = config.get('dry_run', False)
     use_episode_cover = config.get('use_episode_cover', False)
-
-    # Caption labels (allow overriding fixed strings in caption)
+    partial_audio_fetch = config.get('partial_audio_fetch', False)
+    partial_audio_margin = float(config.get('partial_audio_margin', 3.0))
+    pipeline_depth = int(config.get('pipeline_depth', 1) or 0)
+    incremental = bool(config.get('incremental', True)) and not args.force
+    workers = int(config.get('workers', 1) or 1)
     try:
-        labels = config.get('caption_labels', {}) or {}
-    except Exception:
-        labels = {}
-    global CAPTION_LABEL_EPISODE_PREFIX, CAPTION_LABEL_LISTEN_PREFIX
-    CAPTION_LABEL_EPISODE_PREFIX = labels.get('episode_prefix', CAPTION_LABEL_EPISODE_PREFIX)
-    CAPTION_LABEL_LISTEN_PREFIX = labels.get('listen_full_prefix', CAPTION_LABEL_LISTEN_PREFIX)
+        memory_budget = _memory_budget(config)
+    except ValueError as e:
+        parser.error(f"memory budget: {e}")
+    try:
+        profiling.configure(None if dry_run else config.get('profile'))
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Shared HTTP client settings (timeouts, pool size, TLS verification)
+    http_settings = dict(config.get('http') or {})
+    if args.download_segments is not None:
+        http_settings['download_segments'] = args.download_segments
+    http_client.configure(**http_settings)
+    _configure_cache(config, cache_dir=args.cache_dir, no_cache=args.no_cache)
+    prefetch_settings = dict(config.get('prefetch') or {})
+    if args.prefetch or args.prefetch_audio:
+        prefetch_settings['enabled'] = True
+    if args.prefetch_audio:
+        prefetch_settings['audio'] = True
+
+    _apply_caption_labels(config)
+
+    # Per-stage timings from here on: feed fetch and parse, downloads, renders
+    outputs = config.get('report_dir'), config.get('trace'), config.get('metrics_file')
+    if any(outputs) and not dry_run:
+        run = stages.start_run(*outputs)
+        run.extra['argv'] = argv
+    if config.get('progress') and not dry_run:
+        progress.start_reporter(interval=config.get('progress_interval'))
+
+    # Multi-feed batch run over the `feeds` section, unless --feed-url picks one feed
+    if config.get('feeds') and not args.feed_url:
+        try:
+            # Each feed keeps its own output directory under the global one
+            feed_configs = config.feed_configs(
+                names=args.feed,
+                overrides={k: v for k, v in cli_args.items() if k != 'output_dir'},
+            )
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 2
+        specs = None
+        if args.jobs_file:
+            if len(feed_configs) != 1:
+                print("Error: with a `feeds` section, --jobs-file needs a single --feed.")
+                return 2
+            try:
+                specs = parse_jobs(_read_jobs_file(args.jobs_file))
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                print(f"Error: invalid jobs file {args.jobs_file}: {e}")
+                return 1
+        if dry_run:
+            print("Error: --dry-run is not supported for multi-feed runs; use --feed-url.")
+            return 2
+        return _run_feeds(
+            feed_configs, specs=specs, prefetch=prefetch_settings, pipeline_depth=pipeline_depth,
+            incremental=incremental, workers=workers, shard=shard, memory_budget=memory_budget,
+        )
 
     # Chiedi feed_url interattivamente se non specificato
     if feed_url is None:
@@ -553,9 +1845,84 @@ def main():
             return
 
     print("\nRecupero episodi dal feed...")
-    episodes, podcast_info = get_podcast_episodes(feed_url)
+    listing, podcast_info, lookup, sync_result, index = _load_episodes(
+        feed_url, config.get('episode_index')
+    )
+
+    try:
+        if args.jobs_file:
+            try:
+                specs = parse_jobs(_read_jobs_file(args.jobs_file))
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                print(f"Error: invalid jobs file {args.jobs_file}: {e}")
+                return 1
+            return _run_jobs(
+                specs=specs,
+                resolve=_episode_resolver(feed_url, listing, lookup, index),
+                podcast_info=podcast_info,
+                colors=colors,
+                formats_config=formats_config,
+                config_hashtags=config_hashtags,
+                show_subtitles=show_subtitles,
+                output_dir=output_dir,
+                use_episode_cover=use_episode_cover,
+                partial_audio_fetch=partial_audio_fetch,
+                partial_audio_margin=partial_audio_margin,
+                prefetch=prefetch_settings,
+                pipeline_depth=pipeline_depth,
+                incremental=incremental,
+                workers=workers,
+                shard=shard,
+                memory_budget=memory_budget,
+            )
+        _run_selection(
+            listing=listing,
+            podcast_info=podcast_info,
+            lookup=lookup,
+            sync_result=sync_result,
+            episode_input=episode_input,
+            colors=colors,
+            formats_config=formats_config,
+            config_hashtags=config_hashtags,
+            show_subtitles=show_subtitles,
+            output_dir=output_dir,
+            soundbites_choice=soundbites_choice,
+            dry_run=dry_run,
+            use_episode_cover=use_episode_cover,
+            partial_audio_fetch=partial_audio_fetch,
+            partial_audio_margin=partial_audio_margin,
+            prefetch=prefetch_settings,
+            pipeline_depth=pipeline_depth,
+            incremental=incremental,
+            workers=workers,
+            shard=shard,
+            memory_budget=memory_budget,
+        )
+    finally:
+        if index is not None:
+            index.close()
 
-    if not episodes:
+    return
+
+
+def _run_selection(listing, podcast_info, lookup, sync_result, episode_input,
+                   colors, formats_config, config_hashtags, show_subtitles, output_dir,
+                   soundbites_choice, dry_run, use_episode_cover,
+                   partial_audio_fetch=False, partial_audio_margin=3.0, prefetch=None,
+                   pipeline_depth=1, incremental=False, workers=1, shard=None,
+                   memory_budget=None):
+    """Print the feed listing, resolve the episode selection and process it.
+
+    ``listing`` is a list of ``(number, title)`` pairs and ``lookup`` maps a
+    list of episode numbers to their episode dicts. ``prefetch`` holds the
+    ``prefetch`` config section. With ``pipeline_depth`` > 0 that many
+    episodes are downloaded and cut ahead while the current one renders.
+    With ``incremental`` a build manifest in ``output_dir`` skips outputs
+    whose inputs did not change. ``workers`` > 1 renders videos on that many
+    processes, at most ``memory_budget`` bytes of estimated render memory at
+    a time. ``shard`` (``(K, N)``) renders only that shard of the jobs.
+    """
+    if not listing:
         print("Nessun episodio trovato nel feed.")
         return
 
@@ -567,17 +1934,29 @@ def main():
     print(f"{'='*60}")
 
     # Mostra episodi dal primo all'ultimo
-    print(f"\nTrovati {len(episodes)} episodi:\n")
-    for episode in episodes:
-        print(f"{episode['number']}. {episode['title']}")
+    print(f"\nTrovati {len(listing)} episodi:\n")
+    for number, title in listing:
+        print(f"{number}. {title}")
 
     # Determina quali episodi processare (singolo, lista o tutti)
-    max_episode = len(episodes)
-    try:
-        selected_episode_numbers = parse_episode_selection(episode_input, max_episode)
-    except ValueError as e:
-        print(f"Errore input episodio: {e}")
-        return
+    max_episode = len(listing)
+    if isinstance(episode_input, str) and episode_input.strip().lower() == 'new':
+        if sync_result is None:
+            print("Error: --episode new requires an episode index (--episode-index).")
+            return
+        if sync_result.initial:
+            print("Episode index initialised: no new episodes on the first sync.")
+            return
+        selected_episode_numbers = sorted(sync_result.new_numbers)
+        if not selected_episode_numbers:
+            print("No new episodes since the last sync.")
+            return
+    else:
+        try:
+            selected_episode_numbers = parse_episode_selection(episode_input, max_episode)
+        except ValueError as e:
+            print(f"Errore input episodio: {e}")
+            return
 
     if not selected_episode_numbers:
         # Modalità interattiva
@@ -594,30 +1973,434 @@ def main():
                 return
 
     # Processa gli episodi selezionati
+    selected_by_number = lookup(selected_episode_numbers)
+    if shard is not None:
+        if dry_run or soundbites_choice is None:
+            print("Error: --shard requires --soundbites and cannot be combined with --dry-run.")
+            return
+        # Sharding works on the expanded job list, like a jobs file
+        specs = [JobSpec(episode=n, soundbites=soundbites_choice) for n in selected_episode_numbers]
+        return _run_jobs(
+            specs, lambda spec: selected_by_number.get(spec.episode), podcast_info, colors,
+            formats_config, config_hashtags, show_subtitles, output_dir,
+            use_episode_cover=use_episode_cover,
+            partial_audio_fetch=partial_audio_fetch,
+            partial_audio_margin=partial_audio_margin,
+            prefetch=prefetch,
+            pipeline_depth=pipeline_depth,
+            incremental=incremental,
+            workers=workers,
+            shard=shard,
+            memory_budget=memory_budget,
+        )
+    if prefetch and prefetch.get('enabled'):
+        _prefetch_assets(
+            [selected_by_number[n] for n in selected_episode_numbers if n in selected_by_number],
+            podcast_info, prefetch, use_episode_cover,
+            # Partial fetch downloads only ranges; a dry run needs no audio
+            audio=bool(prefetch.get('audio')) and not partial_audio_fetch and not dry_run,
+        )
+
+    manifest = BuildManifest(output_dir) if incremental and not dry_run else None
+    timings = RenderTimings(output_dir) if not dry_run else None
+    episodes = []
     for episode_num in selected_episode_numbers:
-        selected = None
-        for ep in episodes:
-            if ep['number'] == episode_num:
-                selected = ep
-                break
+        selected = selected_by_number.get(episode_num)
         if selected is None:
             print(f"Episodio {episode_num} non trovato nel feed. Skip.")
             continue
+        episodes.append(selected)
+
+    def prepare(selected):
+        # Runs on the background worker: download and cut the next episode
+        nums = _soundbite_numbers(soundbites_choice, len(selected.get('soundbites') or []))
+        if not nums:
+            return None
+        temp_dir = tempfile.mkdtemp(prefix='audiogram-')
+        try:
+            return prepare_episode(
+                selected, nums, temp_dir,
+                _artwork_url(selected, podcast_info, use_episode_cover),
+                partial_audio_fetch, partial_audio_margin,
+            )
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+    # Overlap episode N+1's downloads with episode N's rendering. Interactive
+    # soundbite choices and dry runs stay sequential.
+    if pipeline_depth and not dry_run and soundbites_choice is not None and len(episodes) > 1:
+        stream = run_ahead(episodes, prepare, depth=pipeline_depth,
+                           discard=lambda p: p.cleanup())
+    else:
+        stream = ((selected, None, None) for selected in episodes)
+
+    with RenderExecutor(workers, memory_budget) as executor:
+        for selected, prepared, error in _traced_waits(stream, 'wait_prepared'):
+            if error is not None:
+                logging.getLogger(__name__).warning(
+                    "Preparing episode %s ahead failed, retrying in the foreground: %s",
+                    selected['number'], error,
+                )
+            try:
+                process_one_episode(
+                    selected=selected,
+                    podcast_info=podcast_info,
+                    colors=colors,
+                    formats_config=formats_config,
+                    config_hashtags=config_hashtags,
+                    show_subtitles=show_subtitles,
+                    output_dir=output_dir,
+                    soundbites_choice=soundbites_choice,
+                    dry_run=dry_run,
+                    use_episode_cover=use_episode_cover,
+                    partial_audio_fetch=partial_audio_fetch,
+                    partial_audio_margin=partial_audio_margin,
+                    prepared=prepared,
+                    manifest=manifest,
+                    executor=executor,
+                    timings=timings,
+                )
+            finally:
+                if prepared is not None:
+                    prepared.cleanup()
+    if timings is not None:
+        _print_timing_summary([timings])
 
-        process_one_episode(
-            selected=selected,
-            podcast_info=podcast_info,
-            colors=colors,
-            formats_config=formats_config,
-            config_hashtags=config_hashtags,
-            show_subtitles=show_subtitles,
-            output_dir=output_dir,
-            soundbites_choice=soundbites_choice,
-            dry_run=dry_run,
-            use_episode_cover=use_episode_cover
+
+_END = object()
+
+
+def _traced_waits(items, name):
+    """Yield from ``items``, tracing the time spent waiting for each one as ``name``.
+
+    Waits on the prepare-ahead pipeline are the pipeline stalls of a trace.
+    """
+    iterator = iter(items)
+    while True:
+        with stages.span(name, cat='wait'):
+            item = next(iterator, _END)
+        if item is _END:
+            return
+        yield item
+
+
+def _print_timing_summary(timings):
+    """Print predicted versus actual render time of the videos just rendered."""
+    summaries = [t.summary() for t in timings]
+    videos = sum(s['videos'] for s in summaries)
+    if not videos:
+        return
+    predicted = sum(s['predicted'] for s in summaries)
+    actual = sum(s['actual'] for s in summaries)
+    error = sum(s['error_pct'] * s['videos'] for s in summaries) / videos
+    print(f"\nRender time: {videos} videos, predicted {predicted:.0f}s, actual {actual:.0f}s"
+          f" (mean error {error:.0f}%)")
+
+
+def _read_jobs_file(path):
+    """Decode a jobs file: JSON for ``.json``, YAML otherwise."""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.lower().endswith('.json'):
+            return json.load(f)
+        return yaml.safe_load(f)
+
+
+def _episode_resolver(feed_url, listing, lookup, index=None):
+    """Return a ``JobSpec -> episode dict`` resolver for ``expand_jobs``."""
+    by_guid = None
+
+    def resolve(spec):
+        nonlocal by_guid
+        if spec.episode is not None:
+            return lookup([spec.episode]).get(spec.episode)
+        if index is not None:
+            return index.get_by_guid(feed_url, spec.guid)
+        if by_guid is None:
+            episodes = lookup([number for number, _ in listing]).values()
+            by_guid = {ep.get('guid'): ep for ep in episodes if ep.get('guid')}
+        return by_guid.get(spec.guid)
+    return resolve
+
+
+def _run_jobs(specs, resolve, podcast_info, colors, formats_config, config_hashtags,
+              show_subtitles, output_dir, use_episode_cover=False,
+              partial_audio_fetch=False, partial_audio_margin=3.0, prefetch=None,
+              pipeline_depth=1, incremental=False, workers=1, shard=None, memory_budget=None):
+    """Render the jobs of a jobs file without prompting.
+
+    The specs are expanded into one de-duplicated job list per episode, so an
+    episode mentioned by several entries is downloaded and cut once. Episodes
+    are prepared ahead (``pipeline_depth``) while videos render on
+    ``workers`` processes (within ``memory_budget``). With ``shard``
+    (``(K, N)``) only the jobs hashed to shard K are kept. Returns 0 on
+    success, 1 if any job failed.
+    """
+    enabled_formats = [name for name, fmt in formats_config.items() if fmt.get('enabled', True)]
+    plans, problems = expand_jobs(specs, resolve, enabled_formats, bool(show_subtitles))
+    for problem in problems:
+        print(f"Skipped: {problem}")
+    total = sum(len(plan.jobs) for plan in plans)
+    if shard is not None:
+        plans = select_shard(plans, shard)
+        in_shard = sum(len(plan.jobs) for plan in plans)
+        print(f"\nShard {shard[0]}/{shard[1]}: {in_shard} of {total} videos")
+        total = in_shard
+    print(f"\nJobs: {total} videos across {len(plans)} episodes")
+    if not plans:
+        return 1 if problems else 0
+
+    if prefetch and prefetch.get('enabled'):
+        _prefetch_assets(
+            [plan.episode for plan in plans], podcast_info, prefetch, use_episode_cover,
+            audio=bool(prefetch.get('audio')) and not partial_audio_fetch,
         )
 
-    return
+    settings = {
+        'colors': colors,
+        'formats': formats_config,
+        'hashtags': config_hashtags,
+        'show_subtitles': show_subtitles,
+        'output_dir': output_dir,
+        'use_episode_cover': use_episode_cover,
+        'partial_audio_fetch': partial_audio_fetch,
+        'partial_audio_margin': partial_audio_margin,
+    }
+    manifest = BuildManifest(output_dir) if incremental else None
+    run = _FeedRun(None, podcast_info, settings, plans, manifest, RenderTimings(output_dir))
+    failed = _render_plans([run], pipeline_depth=pipeline_depth, workers=workers,
+                           memory_budget=memory_budget)
+    return 1 if failed or problems else 0
+
+
+class _FeedRun:
+    """One feed's expanded episode plans and render settings (see ``_render_settings``)."""
+
+    def __init__(self, name, podcast_info, settings, plans, manifest=None, timings=None):
+        self.name = name
+        self.podcast_info = podcast_info
+        self.settings = settings
+        self.plans = plans
+        self.manifest = manifest
+        self.timings = timings
+
+
+def _plan_outputs(run, plan):
+    """``(job, video path)`` of every render job of ``plan``."""
+    output_dir, number = run.settings['output_dir'], plan.episode['number']
+    return [(job, video_output_path(output_dir, number, job)) for job in plan.jobs]
+
+
+def _render_plans(runs, pipeline_depth=1, workers=1, memory_budget=None):
+    """Render the plans of one or more feeds; returns the number of failed episodes.
+
+    All feeds share one prepare-ahead pipeline and one pool of ``workers``
+    render processes (and its ``memory_budget``). Feeds take turns episode by
+    episode, so a feed with a long backlog does not hold back the others.
+    Videos are submitted longest predicted render first across every episode
+    prepared so far, and the next episode starts while the last videos of the
+    previous one still render.
+    """
+    queues = [[(run, plan) for plan in run.plans] for run in runs]
+    items = [item for turn in itertools.zip_longest(*queues) for item in turn if item is not None]
+    for run, plan in items:
+        for job, output_path in _plan_outputs(run, plan):
+            progress.queued(output_path, plan.episode['soundbites'][job.soundbite - 1]['duration'])
+
+    def prepare(item):
+        run, plan = item
+        s = run.settings
+        temp_dir = tempfile.mkdtemp(prefix='audiogram-')
+        try:
+            return prepare_episode(
+                plan.episode, plan.soundbites, temp_dir,
+                _artwork_url(plan.episode, run.podcast_info, s['use_episode_cover']),
+                s['partial_audio_fetch'], s['partial_audio_margin'],
+            )
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+    failed = 0
+    if pipeline_depth and len(items) > 1:
+        stream = run_ahead(items, prepare, depth=pipeline_depth, discard=lambda p: p.cleanup())
+    else:
+        stream = ((item, None, None) for item in items)
+    stream = iter(_traced_waits(stream, 'wait_prepared'))
+    # Videos of the episodes started so far, not submitted yet: (render, video)
+    ready = []
+    # Render future -> (render, video)
+    in_flight = {}
+    # Episode render -> [(run, plan), videos not finished yet]
+    open_episodes = {}
+
+    def discard(run, plan, prepared, error):
+        nonlocal failed
+        prefix = f"[{run.name}] " if run.name else ""
+        print(f"{prefix}Error during generation of episode {plan.episode['number']}: {error}")
+        failed += 1
+        if prepared is not None:
+            prepared.cleanup()
+        # Outputs of a failed episode will not be rendered any more
+        for _job, output_path in _plan_outputs(run, plan):
+            progress.skipped(output_path)
+
+    def start(item, prepared, _error):
+        run, plan = item
+        s = run.settings
+        selected = plan.episode
+        prefix = f"[{run.name}] " if run.name else ""
+        print(f"\n{prefix}Episode {selected['number']}: {selected['title']}")
+        try:
+            if prepared is None:
+                # Not prepared ahead, or preparing ahead failed: retry here
+                prepared = prepare(item)
+            render = _EpisodeRender(
+                prepared, run.podcast_info, s['colors'], s['formats'], s['hashtags'],
+                s['show_subtitles'], s['output_dir'], manifest=run.manifest, jobs=plan.jobs,
+                timings=run.timings,
+            )
+        except Exception as e:
+            discard(run, plan, prepared, e)
+            return
+        open_episodes[render] = [item, len(render.videos)]
+        ready.extend((render, video) for video in render.videos)
+        if not render.videos:
+            finish(render)
+
+    def finish(render):
+        (run, plan), _remaining = open_episodes.pop(render)
+        render.save()
+        if render.errors:
+            discard(run, plan, render.prepared, render.errors[0])
+        else:
+            render.prepared.cleanup()
+
+    with RenderExecutor(workers, memory_budget) as executor:
+        more = True
+        try:
+            while more or ready or in_flight:
+                for future in [f for f in in_flight if f.done()]:
+                    render, video = in_flight.pop(future)
+                    render.finish(future, video)
+                    open_episodes[render][1] -= 1
+                    if not open_episodes[render][1]:
+                        finish(render)
+                # Know a pool's worth of videos before choosing: the longest
+                # render of all started episodes goes first, and the pool
+                # keeps working across episode boundaries
+                if more and len(ready) < executor.workers:
+                    entry = next(stream, _END)
+                    if entry is _END:
+                        more = False
+                    else:
+                        start(*entry)
+                elif ready and len(in_flight) < executor.workers:
+                    render, video = max(ready, key=lambda entry: entry[1].predicted)
+                    ready.remove((render, video))
+                    in_flight[render.submit(executor, video)] = (render, video)
+                elif in_flight:
+                    with stages.span('wait_render', cat='wait'):
+                        concurrent.futures.wait(
+                            in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+        finally:
+            # Interrupted: keep what was built, drop the temporary files
+            for render in list(open_episodes):
+                render.save()
+                render.prepared.cleanup()
+    _print_timing_summary([run.timings for run in runs if run.timings is not None])
+    return failed
+
+
+def _selection_specs(config, listing, sync_result):
+    """Job specs of a non-interactive ``episode``/``soundbites`` selection.
+
+    Raises ``ValueError`` when the selection is missing or invalid.
+    """
+    episode_input = config.get('episode')
+    soundbites = config.get('soundbites')
+    if episode_input is None or soundbites is None:
+        raise ValueError("'episode' and 'soundbites' are required "
+                         "(config or --episode/--soundbites)")
+    if isinstance(episode_input, str) and episode_input.strip().lower() == 'new':
+        if sync_result is None:
+            raise ValueError("episode 'new' requires an episode index (episode_index)")
+        numbers = sorted(sync_result.new_numbers)
+    else:
+        numbers = parse_episode_selection(episode_input, len(listing))
+    return [JobSpec(episode=n, soundbites=soundbites) for n in numbers]
+
+
+def _run_feeds(feed_configs, specs=None, prefetch=None, pipeline_depth=1,
+               incremental=False, workers=1, shard=None, memory_budget=None):
+    """Render several feeds in one batch run (the ``feeds`` config section).
+
+    ``feed_configs`` come from ``Config.feed_configs``: each feed has its own
+    colors, formats, hashtags and output directory, selected by its
+    ``episode``/``soundbites`` settings or by ``specs`` (a jobs file). The
+    feeds share the HTTP pool, the asset cache, one prepare-ahead pipeline
+    and one pool of ``workers`` render processes. Returns 0 on success, 1 if
+    any feed, selection or job failed.
+    """
+    runs = []
+    problems = 0
+    for feed in feed_configs:
+        name = feed.get('name')
+        feed_url = feed.get('feed_url')
+        settings = _render_settings(feed)
+        print(f"\n[{name}] Recupero episodi da {feed_url}...")
+        try:
+            listing, podcast_info, lookup, sync_result, index = _load_episodes(
+                feed_url, feed.get('episode_index')
+            )
+        except Exception as e:
+            print(f"[{name}] Error: feed unavailable: {e}")
+            problems += 1
+            continue
+        try:
+            feed_specs = specs
+            if feed_specs is None:
+                feed_specs = _selection_specs(feed, listing, sync_result)
+            enabled_formats = [n for n, fmt in settings['formats'].items()
+                               if fmt.get('enabled', True)]
+            plans, skipped = expand_jobs(
+                feed_specs, _episode_resolver(feed_url, listing, lookup, index),
+                enabled_formats, bool(settings['show_subtitles']),
+            )
+        except ValueError as e:
+            print(f"[{name}] Episode selection error: {e}")
+            problems += 1
+            continue
+        finally:
+            if index is not None:
+                index.close()
+        for problem in skipped:
+            print(f"[{name}] Skipped: {problem}")
+        problems += len(skipped)
+        if shard is not None:
+            plans = select_shard(plans, shard)
+        videos = sum(len(plan.jobs) for plan in plans)
+        print(f"[{name}] {videos} videos across {len(plans)} episodes"
+              f" -> {settings['output_dir']}")
+        if not plans:
+            continue
+        if prefetch and prefetch.get('enabled'):
+            _prefetch_assets(
+                [plan.episode for plan in plans], podcast_info, prefetch,
+                settings['use_episode_cover'],
+                audio=bool(prefetch.get('audio')) and not settings['partial_audio_fetch'],
+            )
+        manifest = None
+        if incremental and feed.get('incremental', True):
+            manifest = BuildManifest(settings['output_dir'])
+        runs.append(_FeedRun(name, podcast_info, settings, plans, manifest,
+                             RenderTimings(settings['output_dir'])))
+
+    total = sum(len(plan.jobs) for run in runs for plan in run.plans)
+    print(f"\nJobs: {total} videos across {len(runs)} feeds")
+    failed = _render_plans(runs, pipeline_depth=pipeline_depth, workers=workers,
+                           memory_budget=memory_budget) if runs else 0
+    return 1 if failed or problems else 0
 
 
 if __name__ == "__main__":
@@ -3,7 +3,7 @@ Configuration management module for the audiogram generator
 """
 import os
 import yaml
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 
 class Config:
@@ -17,6 +17,56 @@ class Config:
         'dry_run': False,
         'show_subtitles': True,
         'use_episode_cover': False,
+        'episode_index': None,
+        'partial_audio_fetch': False,
+        'partial_audio_margin': 3.0,
+        'pipeline_depth': 1,  # Episodes prepared ahead while one renders (0 = off)
+        'incremental': True,  # Skip outputs whose inputs match the build manifest
+        'workers': 1,  # Render processes running in parallel
+        'memory_budget': None,  # Cap on the estimated memory of concurrent renders (e.g. '4GB')
+        'report_dir': None,     # Directory of the JSON run reports (per-stage timings)
+        'trace': None,          # Chrome trace-event JSON file written at the end of a run
+        'profile': None,        # 'cpu' (cProfile) or 'mem' (tracemalloc) profile of every render
+        'progress': False,      # Live progress of all renders on stderr
+        'progress_interval': None,  # Seconds between updates (default: 0.5 on a terminal, else 30)
+        'metrics_file': None,   # Prometheus textfile refreshed during the run (node-exporter)
+        'http': {
+            'timeout': 10,          # Read timeout in seconds
+            'connect_timeout': 5,   # Connect timeout in seconds
+            'pool_size': 8,         # Pooled keep-alive connections per host
+            'verify_tls': False,    # Verify TLS certificates
+            'chunk_size': 1048576,  # Streaming download chunk size in bytes
+            'download_segments': 1  # Parallel byte ranges per audio download
+        },
+        'cache': {
+            'enabled': True,
+            'dir': None,            # Default: ~/.cache/audiogram-generator
+            'max_bytes': '5G',      # Byte budget enforced with LRU eviction
+            'revalidate': False,    # Conditional GET before reusing cached downloads
+            'store_pcm': False      # Also keep decoded PCM (large) for reuse
+        },
+        'prefetch': {
+            'enabled': False,       # Download transcripts/artwork up front, concurrently
+            'audio': False,         # Also prefetch full episode audio
+            'per_host': 4,          # Concurrent requests per host
+            'max_concurrency': 16   # Concurrent requests overall
+        },
+        'queue': {
+            'path': None,           # SQLite queue file (default: in output_dir)
+            'lease_seconds': 300,   # A claimed job returns to the queue if not renewed in time
+            'max_attempts': 3,      # Attempts before a job is marked failed
+            'backoff': 30,          # Seconds before the first retry; doubles on each attempt
+            'batch': 32             # Jobs claimed at once (always from a single episode)
+        },
+        'watch': {
+            'interval': 900         # Seconds between feed polls
+        },
+        'serve': {
+            'host': '127.0.0.1',    # Address of the HTTP render service
+            'port': 8750,
+            'feed_ttl': 300,        # Seconds a parsed feed is reused between requests
+            'max_jobs': 1000        # Finished jobs remembered for status queries
+        },
         'caption_labels': {
             'episode_prefix': 'Episode',
             'listen_full_prefix': 'Listen to the full episode',
@@ -49,6 +99,10 @@ class Config:
         }
     }
 
+    # Sections deep-merged when loaded from YAML instead of being replaced
+    NESTED_KEYS = ('colors', 'formats', 'caption_labels', 'http', 'cache', 'prefetch', 'queue',
+                   'serve', 'watch')
+
     def __init__(self, config_file: Optional[str] = None):
         """
         Inizializza la configurazione
@@ -74,9 +128,9 @@ class Config:
             with open(config_file, 'r', encoding='utf-8') as f:
                 file_config = yaml.safe_load(f)
                 if file_config:
-                    # Deep merge for colors, formats and caption_labels
+                    # Deep merge for nested sections (colors, formats, ...)
                     for key, value in file_config.items():
-                        if key in ['colors', 'formats', 'caption_labels'] and isinstance(value, dict):
+                        if key in self.NESTED_KEYS and isinstance(value, dict):
                             if key not in self.config:
                                 self.config[key] = {}
                             self._deep_merge(self.config[key], value)
@@ -125,6 +179,61 @@ class Config:
         """
         return self.config.get(key, default)
 
+    def feed_configs(self, names: Optional[List[str]] = None,
+                     overrides: Optional[Dict[str, Any]] = None) -> List["Config"]:
+        """
+        Configurazioni per-feed della sezione ``feeds`` (run multi-feed)
+
+        Ogni voce richiede ``feed_url`` e può impostare ``name``, ``output_dir``
+        e qualsiasi chiave di primo livello (colors, formats, hashtags, episode,
+        ...). Le voci ereditano la configurazione globale; le sezioni nested
+        sono unite in profondità. ``output_dir`` di default è
+        ``<output_dir>/<name>``.
+
+        Args:
+            names: Nomi dei feed da includere (default: tutti)
+            overrides: Argomenti CLI, con precedenza sulle voci dei feed
+
+        Returns:
+            Una Config per ogni feed selezionato
+
+        Raises:
+            ValueError: voci non valide, nomi duplicati o sconosciuti
+        """
+        import copy
+        entries = self.config.get('feeds') or []
+        if not isinstance(entries, list):
+            raise ValueError("'feeds' must be a list of feed entries")
+        base_output = self.config.get('output_dir') or os.path.join(os.getcwd(), 'output')
+        result = []
+        seen = set()
+        for i, entry in enumerate(entries, 1):
+            if not isinstance(entry, dict) or not entry.get('feed_url'):
+                raise ValueError(f"feeds entry {i}: 'feed_url' is required")
+            name = str(entry.get('name') or f"feed{i}")
+            if name in seen:
+                raise ValueError(f"feeds entry {i}: duplicate name '{name}'")
+            seen.add(name)
+            if names and name not in names:
+                continue
+            feed = Config()
+            feed.config = copy.deepcopy({k: v for k, v in self.config.items() if k != 'feeds'})
+            for key, value in entry.items():
+                if key in self.NESTED_KEYS and isinstance(value, dict):
+                    feed._deep_merge(feed.config.setdefault(key, {}), copy.deepcopy(value))
+                else:
+                    feed.config[key] = copy.deepcopy(value)
+            feed.config['name'] = name
+            if 'output_dir' not in entry:
+                feed.config['output_dir'] = os.path.join(base_output, name)
+            if overrides:
+                feed.update_from_args(overrides)
+            result.append(feed)
+        unknown = set(names or []) - seen
+        if unknown:
+            raise ValueError(f"Unknown feeds: {', '.join(sorted(unknown))}")
+        return result
+
     def get_all(self) -> Dict[str, Any]:
         """
         Ottiene tutta la configurazione
@@ -0,0 +1,102 @@
+"""Render cost model used to schedule videos longest-first.
+
+Rendering time grows with the number of pixels drawn and encoded, so a
+video's cost is measured in megapixel-frames: ``duration x fps x width x
+height / 1e6``. ``CostModel`` turns that into seconds with a linear fit
+(fixed per-video overhead plus seconds per unit), calibrated from the times
+recorded by earlier runs.
+
+Ordering jobs longest-processing-time first (LPT) keeps a long render from
+starting last on an otherwise idle pool, which bounds the makespan to 4/3 of
+the optimum.
+
+``estimate_render_memory`` sizes the peak memory of one render, used to
+admit concurrent renders under a memory budget.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# Frame rate of the video generator
+RENDER_FPS = 24
+
+# Peak memory model of one render process (see estimate_render_memory)
+RENDER_BASE_MEMORY = 200 * 1024 ** 2  # interpreter, NumPy, MoviePy, PIL, fonts
+FRAME_COPIES = 6  # frame being drawn, PIL image, array, MoviePy and pipe buffers
+ENCODER_FRAMES = 60  # x264 lookahead, reference and B-frames (YUV 4:2:0)
+AUDIO_BYTES_PER_SECOND = 44100 * 2 * 8  # decoded stereo float64 samples
+
+
+def cost_units(duration: float, width: int, height: int, fps: int = RENDER_FPS) -> float:
+    """Megapixel-frames rendered by a video of ``duration`` seconds."""
+    return max(0.0, float(duration)) * fps * int(width) * int(height) / 1e6
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """Predicted seconds = ``overhead + per_unit * units``.
+
+    The defaults are a rough guess for an uncalibrated machine (about 30 s for
+    a 30-second 1080x1920 video); ``fit`` replaces them with measured values.
+    """
+
+    per_unit: float = 0.02
+    overhead: float = 1.0
+    samples: int = 0
+
+    def predict(self, units: float) -> float:
+        return self.overhead + self.per_unit * units
+
+    @classmethod
+    def fit(cls, samples: Iterable[Tuple[float, float]],
+            default: Optional["CostModel"] = None) -> "CostModel":
+        """Least-squares fit of ``(units, seconds)`` samples.
+
+        With fewer than two distinct sizes the overhead is kept and only the
+        slope is scaled to the observations; without samples ``default`` (or
+        the built-in guess) is returned.
+        """
+        default = default or cls()
+        points = [(float(u), float(s)) for u, s in samples if u > 0 and s >= 0]
+        n = len(points)
+        if n == 0:
+            return default
+        mean_u = sum(u for u, _ in points) / n
+        mean_s = sum(s for _, s in points) / n
+        var_u = sum((u - mean_u) ** 2 for u, _ in points)
+        if n >= 2 and var_u > 1e-9 * max(1.0, mean_u ** 2):
+            per_unit = sum((u - mean_u) * (s - mean_s) for u, s in points) / var_u
+            overhead = mean_s - per_unit * mean_u
+            if per_unit > 0 and overhead >= 0:
+                return cls(per_unit, overhead, n)
+        # Degenerate or non-physical fit: keep the overhead, scale the slope
+        per_unit = max(0.0, mean_s - default.overhead) / mean_u
+        return cls(per_unit or default.per_unit, default.overhead, n)
+
+
+def estimate_render_memory(width: int, height: int, duration: float) -> int:
+    """Estimated peak bytes of one render: process, frame buffers, encoder and audio.
+
+    About 450 MiB for a 60-second 1080x1920 video.
+    """
+    pixels = int(width) * int(height)
+    return int(
+        RENDER_BASE_MEMORY
+        + pixels * 3 * FRAME_COPIES
+        + pixels * 1.5 * ENCODER_FRAMES
+        + max(0.0, float(duration)) * AUDIO_BYTES_PER_SECOND
+    )
+
+
+def lpt_order(items: Sequence[T], cost: Callable[[T], float]) -> List[T]:
+    """``items`` sorted by decreasing cost; ties keep their original order."""
+    return sorted(items, key=cost, reverse=True)
+
+
+def prediction_error(pairs: Iterable[Tuple[float, float]]) -> float:
+    """Mean absolute percentage error of ``(predicted, actual)`` pairs."""
+    errors = [abs(p - a) / a for p, a in pairs if a > 0]
+    return 100.0 * sum(errors) / len(errors) if errors else 0.0
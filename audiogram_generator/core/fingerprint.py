@@ -0,0 +1,16 @@
+"""Stable content fingerprints for build inputs."""
+from __future__ import annotations
+
+from typing import Any
+import hashlib
+import json
+
+
+def fingerprint(value: Any) -> str:
+    """SHA-256 of ``value`` serialised as canonical JSON.
+
+    Dict key order does not matter, tuples hash like lists, and values that
+    JSON cannot represent fall back to ``str()``.
+    """
+    data = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
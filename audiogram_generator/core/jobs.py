@@ -0,0 +1,267 @@
+"""Batch job manifests: parsing, expansion and de-duplication.
+
+A jobs file lists explicit render requests, for example::
+
+    defaults:
+      formats: [vertical, square]
+      show_subtitles: true
+    jobs:
+      - episode: 142
+        soundbites: all
+      - guid: "https://example.com/?p=123"
+        soundbites: [1, 3]
+        formats: [horizontal]
+        show_subtitles: false
+
+A bare list of entries (without ``defaults``/``jobs``) is accepted too.
+Entries are validated into ``JobSpec`` objects, then expanded against the feed
+into one ``RenderJob`` per output video. Duplicates collapse, and the result
+is grouped per episode so each episode is downloaded and decoded once, however
+many entries mention it.
+
+``--shard K/N`` keeps the jobs whose identity hashes to shard K, so N render
+nodes sharing an output directory split the work without a coordinator. The
+identity is the episode's ``episode_key`` (its GUID where the feed has one),
+soundbite, format and subtitle mode, not the episode number, so the split is
+stable as episodes are added to or removed from the feed.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+
+from .selections import parse_soundbite_selection
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    """One validated entry of a jobs file (episode not yet resolved)."""
+
+    episode: Optional[int] = None
+    guid: Optional[str] = None
+    soundbites: Any = 'all'
+    formats: Optional[Tuple[str, ...]] = None  # None = every enabled format
+    show_subtitles: Optional[bool] = None  # None = configuration default
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    """A single output video: episode x soundbite x format x subtitles.
+
+    ``episode`` is the episode number when the job was planned; ``guid`` is
+    the episode's ``episode_key``, which stays the same when older episodes
+    leave the feed and the numbers shift.
+    """
+
+    episode: int
+    soundbite: int
+    format: str
+    show_subtitles: bool
+    guid: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """Stable identity, used for queueing: the GUID when known, else the number."""
+        subs = '' if self.show_subtitles else ':nosubs'
+        episode = self.guid if self.guid is not None else f"ep{self.episode}"
+        return f"{episode}:sb{self.soundbite}:{self.format}{subs}"
+
+
+@dataclass
+class EpisodePlan:
+    """All jobs of one episode; ``soundbites`` is the union to prepare."""
+
+    episode: Dict
+    soundbites: List[int]
+    jobs: List[RenderJob]
+
+
+def episode_key(episode: Dict) -> str:
+    """Return the stable identity of an episode.
+
+    Uses the GUID when present, otherwise falls back to the enclosure URL,
+    the link and finally the title.
+    """
+    for k in ('guid', 'audio_url', 'link'):
+        value = episode.get(k)
+        if value:
+            return str(value)
+    return f"title:{episode.get('title', '')}"
+
+
+_ENTRY_KEYS = {'episode', 'guid', 'soundbites', 'formats', 'show_subtitles'}
+
+
+def _as_formats(value, where: str) -> Optional[Tuple[str, ...]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [v.strip() for v in value.split(',') if v.strip()]
+    if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f"{where}: 'formats' must be a list of format names")
+    return tuple(value)
+
+
+def parse_jobs(data: Any) -> List[JobSpec]:
+    """Validate the decoded content of a jobs file. Raises ``ValueError``."""
+    defaults: Dict[str, Any] = {}
+    entries = data
+    if isinstance(data, dict):
+        defaults = dict(data.get('defaults') or {})
+        entries = data.get('jobs')
+        unknown = set(defaults) - (_ENTRY_KEYS - {'episode', 'guid'})
+        if unknown:
+            raise ValueError(f"defaults: unknown keys {sorted(unknown)}")
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("The jobs file must contain a non-empty list of jobs")
+
+    specs: List[JobSpec] = []
+    for i, entry in enumerate(entries, 1):
+        where = f"job {i}"
+        if isinstance(entry, (int, str)) and not isinstance(entry, bool):
+            entry = {'episode': entry}
+        if not isinstance(entry, dict):
+            raise ValueError(f"{where}: expected a mapping")
+        unknown = set(entry) - _ENTRY_KEYS
+        if unknown:
+            raise ValueError(f"{where}: unknown keys {sorted(unknown)}")
+        merged = {**defaults, **entry}
+        episode, guid = merged.get('episode'), merged.get('guid')
+        if (episode is None) == (guid is None):
+            raise ValueError(f"{where}: give exactly one of 'episode' or 'guid'")
+        if episode is not None:
+            try:
+                episode = int(episode)
+            except (TypeError, ValueError):
+                raise ValueError(f"{where}: 'episode' must be a number") from None
+        subs = merged.get('show_subtitles')
+        if subs is not None and not isinstance(subs, bool):
+            raise ValueError(f"{where}: 'show_subtitles' must be true or false")
+        soundbites = merged.get('soundbites', 'all')
+        if isinstance(soundbites, list):
+            soundbites = ','.join(str(s) for s in soundbites)
+        specs.append(JobSpec(
+            episode=episode,
+            guid=str(guid) if guid is not None else None,
+            soundbites=soundbites,
+            formats=_as_formats(merged.get('formats'), where),
+            show_subtitles=subs,
+        ))
+    return specs
+
+
+def expand_jobs(
+    specs: List[JobSpec],
+    resolve: Callable[[JobSpec], Optional[Dict]],
+    enabled_formats: List[str],
+    default_subtitles: bool = True,
+) -> Tuple[List[EpisodePlan], List[str]]:
+    """Expand specs into de-duplicated per-episode plans.
+
+    ``resolve`` maps a spec to its episode dict (or None if not in the feed).
+    Returns ``(plans, problems)``: plans keep first-mention order of episodes,
+    and problems are human-readable reasons for skipped entries.
+    """
+    plans: Dict[int, EpisodePlan] = {}
+    seen = set()
+    problems: List[str] = []
+    for i, spec in enumerate(specs, 1):
+        episode = resolve(spec)
+        if episode is None:
+            ref = spec.guid if spec.guid is not None else spec.episode
+            problems.append(f"job {i}: episode {ref} not found in the feed")
+            continue
+        count = len(episode.get('soundbites') or [])
+        try:
+            soundbites = parse_soundbite_selection(spec.soundbites, count)
+        except ValueError as e:
+            problems.append(f"job {i}: episode {episode['number']}: {e}")
+            continue
+        formats = list(spec.formats) if spec.formats is not None else list(enabled_formats)
+        unknown = [f for f in formats if f not in enabled_formats]
+        if unknown:
+            problems.append(f"job {i}: unknown or disabled formats {unknown}")
+            formats = [f for f in formats if f in enabled_formats]
+        subs = default_subtitles if spec.show_subtitles is None else spec.show_subtitles
+
+        plan = plans.get(episode['number'])
+        if plan is None:
+            plan = plans[episode['number']] = EpisodePlan(episode, [], [])
+        for sb in soundbites:
+            for fmt in formats:
+                job = RenderJob(episode['number'], sb, fmt, subs, episode_key(episode))
+                if job in seen:
+                    continue
+                seen.add(job)
+                plan.jobs.append(job)
+                if sb not in plan.soundbites:
+                    plan.soundbites.append(sb)
+    result = []
+    for plan in plans.values():
+        if plan.jobs:
+            plan.soundbites.sort()
+            result.append(plan)
+    return result, problems
+
+
+def parse_shard(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Parse ``"K/N"`` (1 <= K <= N) into ``(K, N)``; None passes through."""
+    if value is None:
+        return None
+    try:
+        k, n = (int(part) for part in str(value).split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{value}': use K/N, e.g. 1/4") from None
+    if n < 1 or not 1 <= k <= n:
+        raise ValueError(f"Invalid shard '{value}': K must be between 1 and N")
+    return k, n
+
+
+def shard_of(job: RenderJob, count: int, episode_id: str) -> int:
+    """1-based shard of ``job`` among ``count``; stable across runs and hosts.
+
+    ``episode_id`` is the ``episode_key`` of the job's episode, hashed in place
+    of its number, which shifts when an older episode leaves the feed.
+    """
+    subs = '' if job.show_subtitles else ':nosubs'
+    identity = f"{episode_id}:sb{job.soundbite}:{job.format}{subs}"
+    digest = hashlib.sha1(identity.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def select_shard(plans: List[EpisodePlan], shard: Optional[Tuple[int, int]]) -> List[EpisodePlan]:
+    """Keep only the jobs of ``shard`` (``(K, N)``); episodes left empty are dropped."""
+    if shard is None:
+        return plans
+    k, n = shard
+    result = []
+    for plan in plans:
+        episode_id = episode_key(plan.episode)
+        jobs = [job for job in plan.jobs if shard_of(job, n, episode_id) == k]
+        if jobs:
+            result.append(EpisodePlan(plan.episode, sorted({job.soundbite for job in jobs}), jobs))
+    return result
+
+
+def _soundbite_signature(soundbite: Dict) -> Tuple[str, str, str]:
+    return (
+        str(soundbite.get('start', '')).strip(),
+        str(soundbite.get('duration', '')).strip(),
+        (soundbite.get('text') or soundbite.get('title') or '').strip(),
+    )
+
+
+def added_soundbites(previous: Optional[Dict], current: Dict) -> List[int]:
+    """1-based numbers of the soundbites of ``current`` missing from ``previous``.
+
+    Soundbites are compared by content (start, duration, text), not position,
+    so one inserted before existing ones does not mark those as new. A
+    soundbite whose timing or text changed counts as added. Without a
+    ``previous`` version every soundbite is new.
+    """
+    sbs = current.get('soundbites') or []
+    if previous is None:
+        return list(range(1, len(sbs) + 1))
+    known = {_soundbite_signature(sb) for sb in previous.get('soundbites') or []}
+    return [i for i, sb in enumerate(sbs, 1) if _soundbite_signature(sb) not in known]
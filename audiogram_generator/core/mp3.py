@@ -0,0 +1,267 @@
+"""Pure MP3 stream layout helpers used to map times to byte offsets.
+
+Only the first few kilobytes of a file are needed: the ID3v2 tag size, the
+first MPEG audio frame header and, for VBR files, the Xing/Info or VBRI seek
+table (TOC). With those, a time position can be mapped to an approximate byte
+offset so a soundbite can be fetched with an HTTP ``Range`` request instead of
+downloading the whole enclosure. Without a TOC the stream is treated as CBR.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+import struct
+
+
+# Bitrates in kbps indexed by [version_family][layer][index]; family 0 = MPEG1,
+# family 1 = MPEG2/2.5. Layers are 1..3.
+_BITRATES = {
+    (0, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (0, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (0, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (1, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (1, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (1, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {
+    1.0: [44100, 48000, 32000],
+    2.0: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+
+@dataclass
+class FrameHeader:
+    version: float  # 1.0, 2.0 or 2.5
+    layer: int
+    bitrate_kbps: int
+    sample_rate: int
+    padding: int
+    mono: bool
+    frame_length: int
+    samples_per_frame: int
+
+
+@dataclass
+class Mp3Layout:
+    """Where audio frames live in a file and how time maps onto bytes.
+
+    ``kind`` is ``'xing'``, ``'vbri'`` or ``'cbr'``. ``toc`` holds the Xing
+    percent table (100 entries, values 0..255) or the VBRI cumulative byte
+    offsets (one per TOC entry, relative to ``audio_start``).
+    """
+
+    audio_start: int
+    audio_bytes: int
+    duration: float
+    header: FrameHeader
+    kind: str = 'cbr'
+    toc: List[int] = field(default_factory=list)
+    toc_seconds_per_entry: float = 0.0
+
+
+def id3v2_size(data: bytes) -> int:
+    """Return the total size of a leading ID3v2 tag (0 when absent)."""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    flags = data[5]
+    size = 0
+    for b in data[6:10]:
+        size = (size << 7) | (b & 0x7F)
+    footer = 10 if flags & 0x10 else 0
+    return 10 + size + footer
+
+
+def parse_frame_header(data: bytes, offset: int = 0) -> Optional[FrameHeader]:
+    """Decode a 4-byte MPEG audio frame header at ``offset`` (None if invalid)."""
+    if offset + 4 > len(data):
+        return None
+    b1, b2, b3, b4 = data[offset:offset + 4]
+    if b1 != 0xFF or (b2 & 0xE0) != 0xE0:
+        return None
+    version_bits = (b2 >> 3) & 0x03
+    layer_bits = (b2 >> 1) & 0x03
+    if version_bits == 1 or layer_bits == 0:
+        return None
+    version = {0: 2.5, 2: 2.0, 3: 1.0}[version_bits]
+    layer = 4 - layer_bits
+    bitrate_idx = (b3 >> 4) & 0x0F
+    sr_idx = (b3 >> 2) & 0x03
+    if bitrate_idx in (0, 15) or sr_idx == 3:
+        return None
+    family = 0 if version == 1.0 else 1
+    bitrate = _BITRATES[(family, layer)][bitrate_idx]
+    sample_rate = _SAMPLE_RATES[version][sr_idx]
+    padding = (b3 >> 1) & 0x01
+    mono = ((b4 >> 6) & 0x03) == 3
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or version == 1.0) else 576
+        length = samples // 8 * bitrate * 1000 // sample_rate + padding
+    return FrameHeader(version, layer, bitrate, sample_rate, padding, mono, length, samples)
+
+
+def find_frame(data: bytes, start: int = 0, confirm: int = 2) -> Optional[Tuple[int, FrameHeader]]:
+    """Find the first frame at or after ``start`` followed by ``confirm`` valid frames.
+
+    Requiring consecutive headers avoids false syncs inside tag or audio data.
+    """
+    i = start
+    end = len(data) - 4
+    while i <= end:
+        i = data.find(b'\xff', i)
+        if i < 0 or i > end:
+            return None
+        header = parse_frame_header(data, i)
+        if header is not None:
+            nxt = i + header.frame_length
+            ok = True
+            for _ in range(confirm):
+                if nxt + 4 > len(data):
+                    break  # cannot confirm past the buffer end: accept
+                h2 = parse_frame_header(data, nxt)
+                if h2 is None or h2.sample_rate != header.sample_rate:
+                    ok = False
+                    break
+                nxt += h2.frame_length
+            if ok:
+                return i, header
+        i += 1
+    return None
+
+
+def _side_info_size(header: FrameHeader) -> int:
+    if header.version == 1.0:
+        return 17 if header.mono else 32
+    return 9 if header.mono else 17
+
+
+def _parse_xing(data: bytes, offset: int, header: FrameHeader):
+    pos = offset + 4 + _side_info_size(header)
+    tag = data[pos:pos + 4]
+    if tag not in (b'Xing', b'Info'):
+        return None
+    flags = struct.unpack('>I', data[pos + 4:pos + 8])[0]
+    pos += 8
+    frames = nbytes = None
+    toc: List[int] = []
+    if flags & 0x1:
+        frames = struct.unpack('>I', data[pos:pos + 4])[0]
+        pos += 4
+    if flags & 0x2:
+        nbytes = struct.unpack('>I', data[pos:pos + 4])[0]
+        pos += 4
+    if flags & 0x4:
+        toc = list(data[pos:pos + 100])
+    return frames, nbytes, toc
+
+
+def _parse_vbri(data: bytes, offset: int):
+    pos = offset + 4 + 32
+    if data[pos:pos + 4] != b'VBRI':
+        return None
+    (nbytes, frames) = struct.unpack('>II', data[pos + 10:pos + 18])
+    entries, scale, entry_size, frames_per_entry = struct.unpack('>HHHH', data[pos + 18:pos + 26])
+    pos += 26
+    toc: List[int] = []
+    total = 0
+    for i in range(entries):
+        raw = data[pos + i * entry_size:pos + (i + 1) * entry_size]
+        if len(raw) < entry_size:
+            break
+        total += int.from_bytes(raw, 'big') * scale
+        toc.append(total)
+    return frames, nbytes, toc, frames_per_entry
+
+
+def parse_layout(data: bytes, file_size: int) -> Optional[Mp3Layout]:
+    """Build the stream layout from the head of a file (after any ID3v2 tag).
+
+    ``data`` must start at byte 0 of the file and cover the first audio frame.
+    Returns None when no MPEG audio frame can be found.
+    """
+    found = find_frame(data, id3v2_size(data))
+    if found is None:
+        return None
+    offset, header = found
+    seconds_per_frame = header.samples_per_frame / header.sample_rate
+
+    xing = _parse_xing(data, offset, header)
+    if xing is not None:
+        frames, nbytes, toc = xing
+        audio_start = offset + header.frame_length  # the Xing frame carries no audio
+        audio_bytes = nbytes or (file_size - offset)
+        if frames:
+            duration = frames * seconds_per_frame
+        else:
+            duration = audio_bytes * 8 / (header.bitrate_kbps * 1000)
+        kind = 'xing' if len(toc) == 100 else 'cbr'
+        return Mp3Layout(audio_start, audio_bytes, duration, header, kind,
+                         toc if kind == 'xing' else [])
+
+    vbri = _parse_vbri(data, offset)
+    if vbri is not None:
+        frames, nbytes, toc, frames_per_entry = vbri
+        audio_start = offset + header.frame_length
+        return Mp3Layout(
+            audio_start, nbytes, frames * seconds_per_frame, header, 'vbri', toc,
+            toc_seconds_per_entry=frames_per_entry * seconds_per_frame,
+        )
+
+    audio_bytes = max(0, file_size - offset)
+    duration = audio_bytes * 8 / (header.bitrate_kbps * 1000)
+    return Mp3Layout(offset, audio_bytes, duration, header, 'cbr')
+
+
+def time_to_byte(layout: Mp3Layout, seconds: float) -> int:
+    """Map a time position to an (approximate) absolute byte offset."""
+    t = min(max(0.0, float(seconds)), layout.duration)
+    if layout.kind == 'xing' and layout.duration > 0:
+        percent = t / layout.duration * 100.0
+        a = min(int(percent), 99)
+        fa = layout.toc[a]
+        fb = layout.toc[a + 1] if a < 99 else 256
+        fx = fa + (fb - fa) * (percent - a)
+        rel = int(fx / 256.0 * layout.audio_bytes)
+    elif layout.kind == 'vbri' and layout.toc_seconds_per_entry > 0:
+        idx = t / layout.toc_seconds_per_entry
+        i = int(idx)
+        lo = layout.toc[i - 1] if 0 < i <= len(layout.toc) else 0
+        hi = layout.toc[i] if i < len(layout.toc) else layout.audio_bytes
+        rel = int(lo + (hi - lo) * (idx - i))
+    else:
+        rel = int(t * layout.header.bitrate_kbps * 1000 / 8)
+    return layout.audio_start + min(rel, layout.audio_bytes)
+
+
+def plan_range(layout: Mp3Layout, start: float, duration: float,
+               margin: float) -> Tuple[int, int, float]:
+    """Return ``(first_byte, last_byte, fetch_start_time)`` covering a soundbite.
+
+    The interval is widened by ``margin`` seconds on both sides so that TOC
+    imprecision cannot leave the soundbite outside the range.
+    ``fetch_start_time`` is the time the first byte maps to, so the soundbite
+    begins ``start - fetch_start_time`` seconds into the range, give or take
+    the same imprecision.
+    """
+    t0 = max(0.0, float(start) - margin)
+    t1 = float(start) + float(duration) + margin
+    first = time_to_byte(layout, t0)
+    last = min(time_to_byte(layout, t1), layout.audio_start + layout.audio_bytes) - 1
+    return first, max(first, last), t0
+
+
+def looks_intact(head: bytes, windows: Iterable[bytes]) -> bool:
+    """Cheap structural check of an MP3 file without decoding it.
+
+    ``head`` is the start of the file (covering any ID3v2 tag and the first
+    frames); ``windows`` are slices sampled further into the stream, e.g. the
+    middle and the tail. Every slice must contain a run of valid frame
+    headers: a truncated, zero-filled or otherwise mangled file fails.
+    """
+    if find_frame(head, id3v2_size(head)) is None:
+        return False
+    return all(find_frame(w) is not None for w in windows)
@@ -0,0 +1,74 @@
+"""Bounded producer/consumer helper to overlap preparation with processing.
+
+``run_ahead`` prepares upcoming items on a background thread while the caller
+consumes the current one, e.g. downloading and cutting episode N+1's audio
+(network bound) while episode N renders (CPU bound). At most ``depth`` items
+are prepared ahead of the consumer, so disk and memory use stay bounded.
+"""
+from __future__ import annotations
+
+from typing import Callable, Iterable, Iterator, Optional, Tuple, TypeVar
+import queue
+import threading
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+_DONE = object()
+
+
+def run_ahead(
+    items: Iterable[T],
+    prepare: Callable[[T], R],
+    depth: int = 1,
+    discard: Optional[Callable[[R], None]] = None,
+) -> Iterator[Tuple[T, Optional[R], Optional[BaseException]]]:
+    """Yield ``(item, prepared, error)`` in input order.
+
+    ``prepare`` runs on one background thread; an exception it raises is
+    handed to the consumer as ``error`` (with ``prepared`` None) instead of
+    stopping the pipeline. If the consumer stops early, items that were
+    prepared but never consumed are passed to ``discard`` for cleanup.
+    """
+    depth = max(1, int(depth))
+    ready: "queue.Queue" = queue.Queue()
+    slots = threading.Semaphore(depth)
+    stop = threading.Event()
+
+    def producer() -> None:
+        try:
+            for item in items:
+                slots.acquire()
+                if stop.is_set():
+                    return
+                try:
+                    ready.put((item, prepare(item), None))
+                except Exception as e:
+                    ready.put((item, None, e))
+        finally:
+            ready.put(_DONE)
+
+    worker = threading.Thread(target=producer, name='prepare-ahead', daemon=True)
+    worker.start()
+    finished = False
+    try:
+        while True:
+            entry = ready.get()
+            if entry is _DONE:
+                finished = True
+                break
+            # Free a slot as soon as the consumer takes an item, so the next
+            # one is prepared while this one is processed
+            slots.release()
+            yield entry
+    finally:
+        if not finished:
+            stop.set()
+            slots.release()  # wake the producer if it waits for a slot
+            worker.join()
+            while True:
+                entry = ready.get()
+                if entry is _DONE:
+                    break
+                if discard is not None and entry[1] is not None:
+                    discard(entry[1])
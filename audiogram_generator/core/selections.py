@@ -6,8 +6,40 @@ from __future__ import annotations
 from typing import List
 
 
+def _parse_number_list(value: str, maximum: int, label: str) -> List[int]:
+    """Parse ``"1, 3, 5-8"`` into unique numbers in order, within 1..maximum."""
+    nums: List[int] = []
+    seen = set()
+    for p in (p.strip() for p in value.split(',')):
+        if not p:
+            continue
+        if '-' in p:
+            first, _, last = (x.strip() for x in p.partition('-'))
+            if not (first.isdigit() and last.isdigit()):
+                raise ValueError('Intervallo non valido')
+            lo, hi = int(first), int(last)
+            if lo > hi:
+                raise ValueError('Intervallo non valido')
+            # Bounds first, so a huge range never becomes a huge list
+            if lo < 1 or hi > maximum:
+                raise ValueError(f'Numero {label} fuori intervallo')
+            candidates = list(range(lo, hi + 1))
+        elif p.isdigit():
+            candidates = [int(p)]
+        else:
+            raise ValueError('Valore non numerico nella lista')
+        for n in candidates:
+            if not (1 <= n <= maximum):
+                raise ValueError(f'Numero {label} fuori intervallo')
+            if n not in seen:
+                seen.add(n)
+                nums.append(n)
+    return nums
+
+
 def parse_episode_selection(value, max_episode: int) -> List[int]:
-    """Parse episode selection: single int, comma list, 'all'/'a', or 'last'.
+    """Parse episode selection: single int, comma list, range ('1-200'),
+    'all'/'a', or 'last'.
 
     Returns a list of episode numbers (1-based). Raises ``ValueError`` for
     invalid inputs or out-of-range values.
@@ -24,16 +56,7 @@ def parse_episode_selection(value, max_episode: int) -> List[int]:
             return list(range(1, max_episode + 1))
         if v == 'last':
             return [max_episode]
-        parts = [p.strip() for p in v.split(',') if p.strip()]
-        nums: List[int] = []
-        for p in parts:
-            if not p.isdigit():
-                raise ValueError('Valore non numerico nella lista')
-            n = int(p)
-            if not (1 <= n <= max_episode):
-                raise ValueError('Numero episodio fuori intervallo')
-            if n not in nums:
-                nums.append(n)
+        nums = _parse_number_list(v, max_episode, 'episodio')
         if not nums:
             raise ValueError('Nessun episodio valido specificato')
         return nums
@@ -41,7 +64,7 @@ def parse_episode_selection(value, max_episode: int) -> List[int]:
 
 
 def parse_soundbite_selection(value, max_soundbites: int) -> List[int]:
-    """Parse soundbite selection (single int, list, 'all') to list of ints."""
+    """Parse soundbite selection (single int, list, range, 'all') to list of ints."""
     if value is None:
         return list(range(1, max_soundbites + 1))
     if isinstance(value, int):
@@ -52,16 +75,7 @@ def parse_soundbite_selection(value, max_soundbites: int) -> List[int]:
         v = value.strip().lower()
         if v in ('all', 'a'):
             return list(range(1, max_soundbites + 1))
-        parts = [p.strip() for p in v.split(',') if p.strip()]
-        nums: List[int] = []
-        for p in parts:
-            if not p.isdigit():
-                raise ValueError('Valore non numerico nella lista')
-            n = int(p)
-            if not (1 <= n <= max_soundbites):
-                raise ValueError('Numero soundbite fuori intervallo')
-            if n not in nums:
-                nums.append(n)
+        nums = _parse_number_list(v, max_soundbites, 'soundbite')
         if not nums:
             raise ValueError('Nessun soundbite valido specificato')
         return nums
@@ -0,0 +1,50 @@
+"""Pure helpers to parse and format byte sizes used in configuration."""
+from __future__ import annotations
+
+import re
+from typing import Union
+
+
+_UNITS = {
+    '': 1,
+    'b': 1,
+    'k': 1024,
+    'kb': 1024,
+    'kib': 1024,
+    'm': 1024 ** 2,
+    'mb': 1024 ** 2,
+    'mib': 1024 ** 2,
+    'g': 1024 ** 3,
+    'gb': 1024 ** 3,
+    'gib': 1024 ** 3,
+    't': 1024 ** 4,
+    'tb': 1024 ** 4,
+    'tib': 1024 ** 4,
+}
+
+
+def parse_size(value: Union[int, float, str, None]) -> int:
+    """Parse a byte size like ``1048576``, ``"512M"`` or ``"5 GiB"``.
+
+    Units are binary (``K`` = 1024). Raises ``ValueError`` for invalid input.
+    """
+    if value is None:
+        raise ValueError('Size not specified')
+    if isinstance(value, (int, float)):
+        if value < 0:
+            raise ValueError('Size cannot be negative')
+        return int(value)
+    m = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*', str(value))
+    if not m or m.group(2).lower() not in _UNITS:
+        raise ValueError(f'Invalid size: {value!r}')
+    return int(float(m.group(1)) * _UNITS[m.group(2).lower()])
+
+
+def format_bytes(n: float) -> str:
+    """Format a byte count with a binary unit, e.g. ``"1.5 GiB"``."""
+    value = float(n)
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(value) < 1024:
+            return f"{value:.0f} {unit}" if unit == 'B' else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
@@ -7,4 +7,7 @@ direction one‑way (CLI -> rendering) and simplifies future refactors.
 
 __all__ = [
     "facade",
+    "artwork",
+    "executor",
+    "fonts",
 ]
@@ -0,0 +1,91 @@
+"""Artwork loader that decodes each cover once and reuses resized copies.
+
+Podcast artwork is usually a 3000x3000 JPEG/PNG, while a frame needs a logo
+of a few hundred pixels. Covers are decoded once with JPEG draft mode (DCT
+downscaling while decoding), resized with LANCZOS and kept as RGBA per
+``(content hash, size)``: in memory for the current process and, when the
+asset cache is enabled, on disk as PNG for later runs. Keying by content hash
+means the same podcast cover is shared across episodes and formats even when
+it was downloaded to different paths.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import io
+import os
+import threading
+
+from PIL import Image
+
+from audiogram_generator.services.cache import file_sha256, get_cache
+
+
+_MAX_MEMORY_ENTRIES = 32
+
+_lock = threading.Lock()
+_resized: "OrderedDict[Tuple[str, int], Image.Image]" = OrderedDict()
+_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+def _digest(path: str) -> str:
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _lock:
+        digest = _digests.get(key)
+    if digest is None:
+        digest = file_sha256(path)
+        with _lock:
+            _digests[key] = digest
+    return digest
+
+
+def _decode_resized(path: str, size: int) -> Image.Image:
+    with Image.open(path) as im:
+        if im.format == 'JPEG':
+            # Let libjpeg downscale by 1/2..1/8 while decoding (never below size)
+            im.draft('RGB', (size, size))
+        rgba = im.convert('RGBA')
+    return rgba.resize((size, size), Image.Resampling.LANCZOS)
+
+
+def load_logo(path: str, size: int) -> Optional[Image.Image]:
+    """Return the artwork at ``path`` as a ``size`` x ``size`` RGBA image.
+
+    Returns None when the file does not exist. The returned image is shared:
+    callers must treat it as read-only (pasting it is fine).
+    """
+    if not path or not os.path.exists(path):
+        return None
+    key = (_digest(path), int(size))
+    with _lock:
+        logo = _resized.get(key)
+        if logo is not None:
+            _resized.move_to_end(key)
+            return logo
+
+    cache = get_cache()
+    cache_key = f"logo:{key[0]}:{key[1]}"
+    cached = cache.get_derived(cache_key, kind='artwork') if cache is not None else None
+    if cached:
+        with Image.open(cached) as im:
+            logo = im.convert('RGBA')
+    else:
+        logo = _decode_resized(path, key[1])
+        if cache is not None:
+            buf = io.BytesIO()
+            logo.save(buf, format='PNG')
+            cache.put_derived_bytes(cache_key, buf.getvalue(), kind='artwork', ext='.png')
+
+    with _lock:
+        _resized[key] = logo
+        while len(_resized) > _MAX_MEMORY_ENTRIES:
+            _resized.popitem(last=False)
+    return logo
+
+
+def clear_memory_cache() -> None:
+    """Forget in-memory decoded artwork (the on-disk cache is kept)."""
+    with _lock:
+        _resized.clear()
+        _digests.clear()
@@ -0,0 +1,222 @@
+"""Parallel executor for render tasks.
+
+Rendering is CPU bound (per-frame PIL drawing plus FFmpeg encoding), so jobs
+run on a process pool. With ``workers=1`` tasks run inline in the calling
+process, which keeps behaviour (and mocking in tests) identical to the
+sequential code path.
+
+Worker processes re-install the parent's asset cache, HTTP, tracing and
+profiling settings so derived artifacts (waveforms, resized artwork) are shared across
+workers through the cache directory. With a progress reporter running, they
+send their job progress to it over a queue.
+
+With a ``memory_budget`` every task declares its estimated peak memory and
+is only started while the estimates of the tasks in flight, plus the decoded
+audio the parent process holds, stay within the budget; a task larger than
+the whole budget runs alone. The pool never has more workers than the
+budget holds idle worker processes.
+"""
+from __future__ import annotations
+
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+from .. import audio_utils
+from ..core.cost import RENDER_BASE_MEMORY
+from ..telemetry import profiling, progress, stages
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(cache_settings: Optional[Dict[str, Any]], http_settings: Optional[Dict[str, Any]],
+                 telemetry_settings: Optional[Dict[str, Any]] = None) -> None:
+    from audiogram_generator.services import cache as asset_cache
+    from audiogram_generator.services import http_client
+
+    if http_settings:
+        http_client.configure(**http_settings)
+    if cache_settings:
+        asset_cache.configure(**cache_settings)
+    if telemetry_settings:
+        stages.configure_trace(**telemetry_settings['trace'])
+        profiling.configure(telemetry_settings['profile'])
+        queue = telemetry_settings.get('progress')
+        progress.set_sink(queue.put if queue is not None else None)
+
+
+def _warm() -> int:
+    # Import the heavy rendering stack (MoviePy, NumPy, PIL) ahead of the first job
+    from audiogram_generator import video_generator  # noqa: F401
+
+    return os.getpid()
+
+
+def timed_call(fn: Callable, *args, **kwargs):
+    """Run ``fn`` and return ``(result, seconds, snapshot, error)``, timed where it runs.
+
+    ``snapshot`` holds the measurements of the job scope ``fn`` ran in (see
+    ``telemetry.stages``), so a worker's stage times reach the parent, also
+    for a failed job. An exception ``fn`` raises is returned as ``error``
+    (``result`` is then None) and counted in the snapshot as
+    ``failures.<exception type>``, unless the code raising it already did.
+    """
+    started = time.perf_counter()
+    result, error = None, None
+    with stages.job_scope() as times:
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            error = e
+            if 'failures.' + type(e).__name__ not in times.counters:
+                stages.failure(e)
+    return result, time.perf_counter() - started, times.snapshot(), error
+
+
+def _current_settings():
+    from audiogram_generator.services import cache as asset_cache
+    from audiogram_generator.services import http_client
+
+    cache = asset_cache.get_cache()
+    cache_settings = None
+    if cache is not None:
+        cache_settings = {
+            'dir': cache.root,
+            'max_bytes': cache.max_bytes,
+            'revalidate': cache.revalidate,
+            'store_pcm': cache.store_pcm,
+        }
+    telemetry_settings = {
+        'trace': stages.trace_settings(),
+        'profile': profiling.get_mode(),
+        'progress': progress.worker_queue(),
+    }
+    return cache_settings, dict(http_client.get_client().settings.__dict__), telemetry_settings
+
+
+class RenderExecutor:
+    """Run render callables inline or on a pool of ``workers`` processes.
+
+    ``memory_budget`` (bytes) caps the summed memory estimates of the tasks
+    running at once, and the number of workers to what the budget can hold
+    at ``RENDER_BASE_MEMORY`` each; None means no cap.
+    """
+
+    def __init__(self, workers: int = 1, memory_budget: Optional[int] = None):
+        self.workers = max(1, int(workers or 1))
+        self.memory_budget = memory_budget or None
+        if self.memory_budget is not None:
+            # Every worker process holds its interpreter and the rendering stack
+            fits = max(1, self.memory_budget // RENDER_BASE_MEMORY)
+            if fits < self.workers:
+                logger.warning("A %d MiB memory budget holds %d render worker(s), not %d",
+                               self.memory_budget >> 20, fits, self.workers)
+                self.workers = fits
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Pool futures not done yet, cancelled by hand on Python 3.8 (see shutdown)
+        self._pending: Set[Future] = set()
+        self._admission = threading.Condition()
+        self._reserved = 0
+        self._running = 0
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Never fork a process that may hold threads and pooled sockets
+            ctx = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=_current_settings(),
+            )
+        return self._pool
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Schedule ``fn(*args, **kwargs)``; ``fn`` must be picklable with workers > 1."""
+        if self.workers == 1:
+            future: Future = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        future = self._ensure_pool().submit(fn, *args, **kwargs)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        return future
+
+    def submit_within_budget(self, memory: int, fn: Callable, *args, **kwargs) -> Future:
+        """Like ``submit``, first waiting until ``memory`` bytes fit in the budget.
+
+        Blocks the caller while earlier tasks hold the budget, so tasks start
+        in submission order. The decoded audio this process keeps (see
+        ``audio_utils.decoded_bytes``) counts against the budget too.
+        """
+        budget = self.memory_budget
+        if self.workers == 1 or budget is None:
+            return self.submit(fn, *args, **kwargs)
+        memory = max(0, int(memory))
+        with self._admission:
+            if memory > budget:
+                logger.warning("Task needs about %d MiB, over the %d MiB memory budget: "
+                               "running it alone", memory >> 20, budget >> 20)
+            # An oversized task still runs, once nothing else is in flight
+            with stages.span('wait_memory_budget', cat='wait', memory=memory):
+                self._admission.wait_for(
+                    lambda: self._running == 0
+                    or self._reserved + memory + audio_utils.decoded_bytes() <= budget
+                )
+            self._reserved += memory
+            self._running += 1
+        try:
+            future = self.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release(memory)
+            raise
+        future.add_done_callback(lambda _f: self._release(memory))
+        return future
+
+    def _release(self, memory: int) -> None:
+        with self._admission:
+            self._reserved -= memory
+            self._running -= 1
+            self._admission.notify_all()
+
+    @property
+    def reserved_memory(self) -> int:
+        """Summed memory estimates of the budgeted tasks in flight."""
+        with self._admission:
+            return self._reserved
+
+    def warm_up(self) -> List[int]:
+        """Start every worker and load the rendering stack; returns worker pids.
+
+        Long-running services call this once so the first request does not pay
+        process start-up and import time.
+        """
+        futures = [self.submit(_warm) for _ in range(self.workers)]
+        wait(futures)
+        return sorted({f.result() for f in futures})
+
+    def shutdown(self, cancel: bool = False) -> None:
+        if self._pool is not None:
+            if sys.version_info >= (3, 9):
+                self._pool.shutdown(wait=True, cancel_futures=cancel)
+            else:
+                # No cancel_futures before 3.9: cancel what has not started yet
+                if cancel:
+                    for future in list(self._pending):
+                        future.cancel()
+                self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self) -> "RenderExecutor":
+        return self
+
+    def __exit__(self, exc_type, *_exc) -> None:
+        self.shutdown(cancel=exc_type is not None)
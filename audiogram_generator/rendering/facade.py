@@ -7,8 +7,28 @@ to ``video_generator.generate_audiogram``.
 from __future__ import annotations
 
 from typing import Dict, List
+import os
 
-from audiogram_generator import video_generator
+from audiogram_generator import __version__, video_generator
+from audiogram_generator.telemetry import profiling, progress, stages
+
+# Part of every output's build fingerprint (see services.manifest): bump the
+# revision whenever rendered frames change so incremental builds redo them.
+RENDER_REVISION = 1
+RENDERER_VERSION = f"{__version__}-r{RENDER_REVISION}"
+
+# Per-frame functions reported on their own by ``--profile``
+PROFILED_HOT_PATH = (
+    "create_audiogram_frame",
+    "_render_subtitle_lines",
+    "_draw_rounded_box_with_shadow",
+)
+
+
+def _profile(output_path: str):
+    # <video>.pstats / <video>.cpu.txt / <video>.alloc.txt next to the video
+    return profiling.profile_job(os.path.splitext(output_path)[0], video_generator,
+                                 PROFILED_HOT_PATH)
 
 
 def render_audiogram(
@@ -35,19 +55,21 @@ def render_audiogram(
     duration = float(meta.get("duration", 0.0))
 
     # Delegate to the legacy generator maintaining argument order/shape
-    video_generator.generate_audiogram(
-        audio_path,
-        out_path,
-        format_name,
-        logo_path,
-        podcast_title,
-        episode_title,
-        transcript_chunks,
-        duration,
-        formats,
-        colors,
-        show_subtitles,
-    )
+    with stages.span("render", cat="job", output=os.path.basename(out_path), format=format_name), \
+            progress.job(out_path, duration), _profile(out_path):
+        video_generator.generate_audiogram(
+            audio_path,
+            out_path,
+            format_name,
+            logo_path,
+            podcast_title,
+            episode_title,
+            transcript_chunks,
+            duration,
+            formats,
+            colors,
+            show_subtitles,
+        )
 
 
 def generate_audiogram(
@@ -69,16 +91,19 @@ def generate_audiogram(
     import the function from the rendering layer instead of the monolithic
     video module.
     """
-    video_generator.generate_audiogram(
-        audio_path,
-        output_path,
-        format_name,
-        logo_path,
-        podcast_title,
-        episode_title,
-        transcript_chunks,
-        duration,
-        formats,
-        colors,
-        show_subtitles,
-    )
+    with stages.span("render", cat="job", output=os.path.basename(output_path),
+                     format=format_name), \
+            progress.job(output_path, duration), _profile(output_path):
+        video_generator.generate_audiogram(
+            audio_path,
+            output_path,
+            format_name,
+            logo_path,
+            podcast_title,
+            episode_title,
+            transcript_chunks,
+            duration,
+            formats,
+            colors,
+            show_subtitles,
+        )
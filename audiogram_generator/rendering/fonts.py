@@ -0,0 +1,24 @@
+"""Font loading shared by every frame of every render.
+
+``ImageFont.truetype`` parses the font file on each call; the subtitle font
+used to be loaded once per frame. Fonts are now loaded once per (path, size)
+and kept for the life of the process, so long-running workers stay warm.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+from PIL import ImageFont
+
+
+@lru_cache(maxsize=32)
+def load_font(path: str, size: int):
+    """Return the TrueType font at ``path``, or PIL's default when unavailable."""
+    try:
+        return ImageFont.truetype(path, size=size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def clear_font_cache() -> None:
+    load_font.cache_clear()
@@ -0,0 +1,370 @@
+"""Local HTTP render service (``audiogram-generator serve``).
+
+A long-running process that accepts render requests over HTTP, runs them in
+the background and serves the resulting files::
+
+    POST /jobs                     submit {"episode": 142, "soundbites": [1]} -> 202
+    GET  /jobs/<id>                status, errors and the list of outputs
+    GET  /jobs/<id>/outputs/<name> download one output file
+    GET  /health                   liveness and job counts
+
+Request bodies use the same fields as a jobs file entry (``episode`` or
+``guid``, ``soundbites``, ``formats``, ``show_subtitles``) plus an optional
+``feed_url``. Unlike one-off CLI runs, the service stays warm between
+requests: render worker processes are started once, and fonts, resized
+artwork, decoded audio and parsed feeds stay in memory.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlsplit
+import json
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from .cli import (
+    _artwork_url, _episode_resolver, _load_episodes,
+    caption_output_path, prepare_episode, render_prepared_episode, video_output_path,
+)
+from .core.jobs import JobSpec, expand_jobs, parse_jobs
+from .rendering.executor import RenderExecutor
+from .services.errors import RenderError
+from .services.manifest import BuildManifest
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY = 64 * 1024
+
+
+@dataclass
+class ServiceJob:
+    """One submitted request and its progress."""
+
+    id: str
+    feed_url: str
+    request: Dict
+    status: str = 'queued'  # queued, running, done, failed
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    outputs: List[str] = field(default_factory=list)
+    videos: int = 0
+    spec: Optional[JobSpec] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'status': self.status,
+            'feed_url': self.feed_url,
+            'request': self.request,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+            'videos': self.videos,
+            'outputs': [
+                {
+                    'name': os.path.basename(path),
+                    'url': f"/jobs/{self.id}/outputs/{os.path.basename(path)}",
+                    'size': os.path.getsize(path) if os.path.exists(path) else None,
+                }
+                for path in self.outputs
+            ],
+        }
+
+
+class _OutputLocks:
+    """Output files being written by a running job.
+
+    Concurrent requests for the same episode write the same videos, captions
+    and soundbite MP3s; a job waits until no other job holds any of its paths.
+    """
+
+    def __init__(self):
+        self._busy: Set[str] = set()
+        self._changed = threading.Condition()
+
+    @contextmanager
+    def hold(self, paths: Iterable[str]) -> Iterator[None]:
+        wanted = set(paths)
+        with self._changed:
+            self._changed.wait_for(lambda: not wanted & self._busy)
+            self._busy |= wanted
+        try:
+            yield
+        finally:
+            with self._changed:
+                self._busy -= wanted
+                self._changed.notify_all()
+
+
+class RenderService:
+    """Queue of HTTP-submitted jobs rendered on a warm worker pool.
+
+    ``settings`` holds the render configuration (``feed_url``, ``colors``,
+    ``formats``, ``hashtags``, ``show_subtitles``, ``output_dir``,
+    ``use_episode_cover``, ``partial_audio_fetch``, ``partial_audio_margin``,
+    ``incremental``). ``load_feed`` (default: the CLI's feed loader) returns
+    ``(listing, podcast_info, lookup, sync_result, index)`` for a feed URL;
+    parsed feeds are reused for ``feed_ttl`` seconds. ``memory_budget``
+    (bytes) caps the estimated memory of the renders running at once.
+    """
+
+    def __init__(self, settings: Dict, workers: int = 1, feed_ttl: float = 300.0,
+                 max_jobs: int = 1000, load_feed: Optional[Callable] = None,
+                 memory_budget: Optional[int] = None):
+        self.settings = settings
+        self.workers = max(1, int(workers))
+        self.feed_ttl = feed_ttl
+        self.max_jobs = max_jobs
+        self._load_feed = load_feed or _load_episodes
+        self._jobs: Dict[str, ServiceJob] = {}
+        self._lock = threading.Lock()
+        self._feeds: Dict[str, Tuple[float, Dict, Callable]] = {}
+        self._feed_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._outputs = _OutputLocks()
+        self._threads: List[threading.Thread] = []
+        self.executor = RenderExecutor(self.workers, memory_budget)
+
+    # -- lifecycle ------------------------------------------------------------
+
+    def start(self, warm: bool = True) -> "RenderService":
+        if warm:
+            pids = self.executor.warm_up()
+            logger.info("Render pool ready: %d worker(s) %s", len(pids), pids)
+        # One scheduler thread per render worker keeps every worker busy
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f'render-scheduler-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.executor.shutdown()
+
+    # -- API ------------------------------------------------------------------
+
+    def submit(self, payload: Dict) -> ServiceJob:
+        """Validate and queue a request; raises ``ValueError`` when invalid."""
+        if not isinstance(payload, dict):
+            raise ValueError("The request body must be a JSON object")
+        request = dict(payload)
+        feed_url = request.pop('feed_url', None) or self.settings.get('feed_url')
+        if not feed_url:
+            raise ValueError("'feed_url' is required (no default feed is configured)")
+        spec = parse_jobs([request])[0]
+        job = ServiceJob(uuid.uuid4().hex[:12], feed_url, request, spec=spec)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ServiceJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def counts(self) -> Dict[str, int]:
+        result = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+        with self._lock:
+            for job in self._jobs.values():
+                result[job.status] += 1
+        return result
+
+    def wait(self, job_id: str, timeout: float = 60.0) -> ServiceJob:
+        """Block until a job finishes (for tests and scripts)."""
+        deadline = time.time() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job.status in ('done', 'failed') or time.time() > deadline:
+                return job
+            time.sleep(0.02)
+
+    def _prune(self) -> None:
+        # Forget the oldest finished jobs; their files stay in output_dir
+        finished = [j for j in self._jobs.values() if j.status in ('done', 'failed')]
+        excess = max(0, len(self._jobs) - self.max_jobs)
+        for job in sorted(finished, key=lambda j: j.created_at)[:excess]:
+            del self._jobs[job.id]
+
+    # -- execution --------------------------------------------------------------
+
+    def _feed(self, feed_url: str) -> Tuple[Dict, Callable]:
+        with self._feed_lock:
+            cached = self._feeds.get(feed_url)
+            if cached is not None and time.time() - cached[0] < self.feed_ttl:
+                return cached[1], cached[2]
+            listing, podcast_info, lookup, _sync, index = self._load_feed(feed_url)
+            if index is not None:
+                index.close()
+            resolve = _episode_resolver(feed_url, listing, lookup)
+            self._feeds[feed_url] = (time.time(), podcast_info, resolve)
+            return podcast_info, resolve
+
+    def _loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.status = 'running'
+            job.started_at = time.time()
+            try:
+                self._run(job)
+                job.status = 'done'
+            except Exception as e:
+                logger.exception("Job %s failed", job.id)
+                job.error = str(e)
+                job.status = 'failed'
+            finally:
+                job.finished_at = time.time()
+
+    def _run(self, job: ServiceJob) -> None:
+        s = self.settings
+        podcast_info, resolve = self._feed(job.feed_url)
+        enabled = [name for name, fmt in s['formats'].items() if fmt.get('enabled', True)]
+        plans, problems = expand_jobs([job.spec], resolve, enabled,
+                                      bool(s.get('show_subtitles', True)))
+        if not plans:
+            raise ValueError('; '.join(problems) or 'nothing to render')
+        plan = plans[0]
+        number = plan.episode['number']
+        job.videos = len(plan.jobs)
+
+        videos = [video_output_path(s['output_dir'], number, render_job)
+                  for render_job in plan.jobs]
+        outputs = list(videos)
+        for soundbite in plan.soundbites:
+            outputs.append(caption_output_path(s['output_dir'], number, soundbite))
+            outputs.append(os.path.join(s['output_dir'], f"ep{number}_sb{soundbite}.mp3"))
+
+        temp_dir = tempfile.mkdtemp(prefix='audiogram-')
+        prepared = None
+        try:
+            prepared = prepare_episode(
+                plan.episode, plan.soundbites, temp_dir,
+                _artwork_url(plan.episode, podcast_info, s.get('use_episode_cover', False)),
+                s.get('partial_audio_fetch', False), float(s.get('partial_audio_margin', 3.0)),
+                keep_decoded=True,
+            )
+            # A duplicate request renders after the first one, which its
+            # manifest then finds up to date
+            with self._outputs.hold(outputs):
+                manifest = BuildManifest(s['output_dir']) if s.get('incremental', True) else None
+                render_prepared_episode(
+                    prepared, podcast_info, s['colors'], s['formats'], s.get('hashtags') or [],
+                    bool(s.get('show_subtitles', True)), s['output_dir'],
+                    manifest=manifest, jobs=plan.jobs, executor=self.executor,
+                )
+        finally:
+            if prepared is not None:
+                prepared.cleanup()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        job.outputs = [path for path in outputs if os.path.exists(path)]
+        missing = [os.path.basename(path) for path in videos if not os.path.exists(path)]
+        if missing:
+            raise RenderError(f"missing outputs: {', '.join(missing)}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'audiogram-generator'
+    service: RenderService  # set by make_server
+
+    def log_message(self, fmt, *args) -> None:
+        logger.info("%s - %s", self.address_string(), fmt % args)
+
+    def _send_json(self, status: int, body: Dict) -> None:
+        raw = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send_json(status, {'error': message})
+
+    def _parts(self) -> List[str]:
+        return [unquote(p) for p in urlsplit(self.path).path.split('/') if p]
+
+    def do_GET(self) -> None:
+        parts = self._parts()
+        if parts == ['health']:
+            self._send_json(200, {'status': 'ok', 'workers': self.service.workers,
+                                  'jobs': self.service.counts()})
+            return
+        if len(parts) >= 2 and parts[0] == 'jobs':
+            job = self.service.get(parts[1])
+            if job is None:
+                self._error(404, 'unknown job')
+            elif len(parts) == 2:
+                self._send_json(200, job.to_dict())
+            elif len(parts) == 4 and parts[2] == 'outputs':
+                self._send_output(job, parts[3])
+            else:
+                self._error(404, 'not found')
+            return
+        self._error(404, 'not found')
+
+    def _send_output(self, job: ServiceJob, name: str) -> None:
+        # Only files produced by this job, never arbitrary paths
+        path = next((p for p in job.outputs if os.path.basename(p) == name), None)
+        if path is None or not os.path.exists(path):
+            self._error(404, 'unknown output')
+            return
+        content_type = {
+            '.mp4': 'video/mp4', '.mp3': 'audio/mpeg', '.txt': 'text/plain; charset=utf-8',
+        }.get(os.path.splitext(name)[1], 'application/octet-stream')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def do_POST(self) -> None:
+        if self._parts() != ['jobs']:
+            self._error(404, 'not found')
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY:
+            self._error(413, 'request body too large')
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            job = self.service.submit(payload)
+        except (ValueError, json.JSONDecodeError) as e:
+            self._error(400, str(e))
+            return
+        self.send_response(202)
+        body = json.dumps(job.to_dict()).encode('utf-8')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Location', f"/jobs/{job.id}")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(service: RenderService, host: str = '127.0.0.1',
+                port: int = 8750) -> ThreadingHTTPServer:
+    """Bind the HTTP API of ``service``; port 0 picks a free port."""
+    handler = type('Handler', (_Handler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
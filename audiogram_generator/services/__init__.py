@@ -7,4 +7,11 @@ __all__ = [
     "transcript",
     "rss",
     "assets",
+    "episode_index",
+    "http_client",
+    "cache",
+    "prefetch",
+    "manifest",
+    "job_queue",
+    "timings",
 ]
@@ -4,35 +4,37 @@ Network I/O is isolated here to keep the CLI/test flows clean and mockable.
 """
 from __future__ import annotations
 
+from typing import Optional
 import logging
-import ssl
-import urllib.request
+import shutil
 
 from .errors import AssetDownloadError
+from .http_client import get_client
+from .cache import get_cache
+from ..telemetry import stages
 
 
 logger = logging.getLogger(__name__)
 
 
-def download_image(url: str, output_path: str, timeout: int = 10) -> str:
+def download_image(url: str, output_path: str, timeout: Optional[float] = None) -> str:
     """Download an image from ``url`` into ``output_path``.
 
-    Returns the ``output_path`` on success. Raises exceptions on failure.
+    Returns the ``output_path`` on success. Raises ``AssetDownloadError`` on failure.
     """
     logger.info("Downloading image: %s -> %s", url, output_path)
 
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
-
     try:
-        request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-        with urllib.request.urlopen(request, context=ssl_context, timeout=timeout) as response:
-            data = response.read()
-            with open(output_path, "wb") as f:
-                f.write(data)
+        cache = get_cache()
+        if cache is not None:
+            shutil.copyfile(cache.fetch(url, "artwork"), output_path)
+            logger.debug("Image copied from cache to %s", output_path)
+            return output_path
+        data = get_client().get_bytes(url, timeout=timeout)
+        with open(output_path, "wb") as f:
+            f.write(data)
         logger.debug("Image saved to %s (%d bytes)", output_path, len(data))
         return output_path
     except Exception as e:
         logger.error("Failed to download image from %s: %s", url, e)
-        raise AssetDownloadError(str(e))
+        raise stages.failure(AssetDownloadError(str(e)))
@@ -0,0 +1,505 @@
+"""Persistent, content-addressed on-disk cache for downloaded and derived assets.
+
+Downloaded assets (enclosures, SRTs, artwork) are keyed by URL and remember
+their HTTP validators (ETag/Last-Modified) for optional revalidation. Derived
+artifacts (decoded PCM, waveform envelopes, resized artwork) are keyed by the
+content hash of their source plus the parameters used to build them.
+
+Bytes live once under ``blobs/<sha256[:2]>/<sha256><ext>`` no matter how many
+keys point at them, and an SQLite index tracks sizes and last access times so
+the cache can be kept under a byte budget with LRU eviction. The index uses
+SQLite locking, so several processes can share one cache directory.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+from audiogram_generator.core import mp3
+
+from .errors import AssetDownloadError
+from .http_client import TEXT_HEADERS, get_client
+from .locking import file_lock
+from ..telemetry import stages
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_blobs_access ON blobs (last_access);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    url TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_sha ON entries (sha256);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_HASH_CHUNK = 1024 * 1024
+_PROBE_BYTES = 64 * 1024
+
+# Download request headers by asset kind (default: Accept-Encoding identity)
+KIND_HEADERS: Dict[str, Dict[str, str]] = {'srt': TEXT_HEADERS}
+
+
+def default_cache_dir() -> str:
+    """``$XDG_CACHE_HOME/audiogram-generator`` (``~/.cache/...`` by default)."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'audiogram-generator')
+
+
+def _decode_body(path: str, encoding: str) -> None:
+    """Decompress a body stored with its ``Content-Encoding`` (gzip, deflate) in place."""
+    encoding = encoding.strip().lower()
+    if encoding in ('identity', ''):
+        return
+    if encoding not in ('gzip', 'x-gzip', 'deflate'):
+        raise AssetDownloadError(f"Unsupported Content-Encoding: {encoding}")
+    # gzip header, or zlib wrapper for deflate (auto-detected)
+    decoder = zlib.decompressobj(zlib.MAX_WBITS | 32)
+    tmp = path + '.decoded'
+    try:
+        with open(path, 'rb') as src, open(tmp, 'wb') as dst:
+            while True:
+                chunk = src.read(_HASH_CHUNK)
+                if not chunk:
+                    break
+                dst.write(decoder.decompress(chunk))
+            dst.write(decoder.flush())
+    except zlib.error as e:
+        os.remove(tmp)
+        raise AssetDownloadError(f"Corrupt {encoding} body: {e}")
+    os.replace(tmp, path)
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def audio_looks_intact(path: str) -> bool:
+    """Cheap sanity check of an audio file before it is cached or rendered.
+
+    MP3 files must show valid frame sync at the start, in the middle and at the
+    end, which catches truncated, zero-filled and mis-stitched downloads while
+    reading only a few hundred kilobytes. Other formats are not checked.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(10)
+        tag = mp3.id3v2_size(head)
+        f.seek(tag)
+        head = f.read(_PROBE_BYTES)
+        if mp3.find_frame(head) is None:
+            # Not an MP3 (e.g. AAC in MP4): only MP3 has a cheap structural check
+            return not path.lower().endswith('.mp3') and tag == 0
+        windows = []
+        for pos in (tag + (size - tag) // 2, size - _PROBE_BYTES - 128):
+            if pos > tag + _PROBE_BYTES:
+                f.seek(pos)
+                windows.append(f.read(_PROBE_BYTES))
+    return mp3.looks_intact(head, windows)
+
+
+@dataclass
+class CacheStats:
+    """Snapshot of the cache for ``cache stats`` and run reports."""
+
+    root: str
+    max_bytes: int
+    total_bytes: int = 0
+    blobs: int = 0
+    entries: int = 0
+    by_kind: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+
+
+class AssetCache:
+    """Content-addressed blob store with an SQLite index and LRU eviction."""
+
+    def __init__(self, root: str, max_bytes: int, revalidate: bool = False,
+                 store_pcm: bool = False):
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.max_bytes = int(max_bytes)
+        self.revalidate = revalidate
+        self.store_pcm = store_pcm
+        os.makedirs(os.path.join(self.root, 'blobs'), exist_ok=True)
+        os.makedirs(os.path.join(self.root, 'tmp'), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            os.path.join(self.root, 'index.sqlite'), timeout=30, check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        # Per-process counters by kind, e.g. {'audio': [hits, misses]}
+        self.session_counts: Dict[str, list] = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # -- bookkeeping ------------------------------------------------------
+
+    def _count(self, kind: str, hit: bool) -> None:
+        name = 'hits' if hit else 'misses'
+        stages.count(f'cache.{kind}.{name}')
+        with self._lock:
+            counts = self.session_counts.setdefault(kind, [0, 0])
+            counts[0 if hit else 1] += 1
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO counters (name, value) VALUES (?, 1)"
+                    " ON CONFLICT(name) DO UPDATE SET value = value + 1",
+                    (name,),
+                )
+
+    def _blob_path(self, sha: str, ext: str) -> str:
+        return os.path.join(self.root, 'blobs', sha[:2], sha + ext)
+
+    def tmp_path(self, suffix: str = '') -> str:
+        """A unique scratch path inside the cache (same filesystem as blobs)."""
+        return os.path.join(self.root, 'tmp', uuid.uuid4().hex + suffix)
+
+    def _lookup(self, key: str) -> Optional[sqlite3.Row]:
+        row = self._conn.execute(
+            "SELECT e.*, b.path, b.size FROM entries e JOIN blobs b ON b.sha256 = e.sha256"
+            " WHERE e.key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        if not os.path.exists(row['path']) or os.path.getsize(row['path']) != row['size']:
+            logger.warning("Dropping corrupt cache entry %s", key)
+            self._drop_blob(row['sha256'])
+            return None
+        return row
+
+    def _touch(self, sha: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE blobs SET last_access = ? WHERE sha256 = ?", (time.time(), sha)
+            )
+
+    def _drop_blob(self, sha: str) -> None:
+        row = self._conn.execute("SELECT path FROM blobs WHERE sha256 = ?", (sha,)).fetchone()
+        with self._conn:
+            self._conn.execute("DELETE FROM entries WHERE sha256 = ?", (sha,))
+            self._conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha,))
+        if row is not None and os.path.exists(row['path']):
+            os.remove(row['path'])
+
+    def _store(self, key: str, src_path: str, kind: str, url: Optional[str] = None,
+               etag: Optional[str] = None, last_modified: Optional[str] = None,
+               sha: Optional[str] = None) -> str:
+        """Move ``src_path`` into the blob store and point ``key`` at it."""
+        sha = sha or file_sha256(src_path)
+        ext = os.path.splitext(src_path)[1] or os.path.splitext(url or '')[1][:8]
+        now = time.time()
+        with self._lock:
+            existing = self._conn.execute(
+                "SELECT path FROM blobs WHERE sha256 = ?", (sha,)
+            ).fetchone()
+            if existing is not None and os.path.exists(existing['path']):
+                # Same bytes already cached under another key: dedupe
+                os.remove(src_path)
+                path = existing['path']
+            else:
+                path = self._blob_path(sha, ext)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(src_path, path)
+            size = os.path.getsize(path)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO blobs"
+                    " (sha256, path, size, kind, created_at, last_access) VALUES (?, ?, ?, ?,"
+                    " COALESCE((SELECT created_at FROM blobs WHERE sha256 = ?), ?), ?)",
+                    (sha, path, size, kind, sha, now, now),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries"
+                    " (key, sha256, kind, url, etag, last_modified, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, sha, kind, url, etag, last_modified, now),
+                )
+            self.evict(protect=sha)
+        return path
+
+    # -- downloaded assets ------------------------------------------------
+
+    def lookup_url(self, url: str) -> Optional[str]:
+        """Return the cached path for ``url`` without touching the network."""
+        with self._lock:
+            row = self._lookup('url:' + url)
+            if row is None:
+                return None
+            self._touch(row['sha256'])
+            return row['path']
+
+    def fetch(self, url: str, kind: str, *, segmented: bool = False,
+              revalidate: Optional[bool] = None, headers: Optional[Dict[str, str]] = None) -> str:
+        """Return a local path for ``url``, downloading it on a cache miss.
+
+        With ``revalidate`` a conditional GET (If-None-Match/If-Modified-Since)
+        confirms a cached copy is still current before it is used. ``headers``
+        are sent with the download; by default transcripts negotiate gzip
+        (``KIND_HEADERS``). A compressed body is stored decompressed.
+        """
+        if headers is None:
+            headers = KIND_HEADERS.get(kind)
+        key = 'url:' + url
+        with self._lock:
+            row = self._lookup(key)
+        revalidate = self.revalidate if revalidate is None else revalidate
+        if row is not None and kind == 'audio' and not audio_looks_intact(row['path']):
+            logger.warning("Dropping corrupt cached audio for %s", url)
+            with self._lock:
+                self._drop_blob(row['sha256'])
+            row = None
+        if row is not None:
+            if not revalidate or self._still_valid(url, row):
+                self._touch(row['sha256'])
+                self._count(kind, True)
+                logger.debug("Cache hit (%s): %s", kind, url)
+                return row['path']
+
+        self._count(kind, False)
+        logger.info("Cache miss (%s): %s", kind, url)
+        with file_lock(self._download_path(url) + '.lock'):
+            # Another process may have finished the same download meanwhile
+            with self._lock:
+                row = self._lookup(key)
+            if row is not None and not revalidate:
+                return row['path']
+            return self._download(url, key, kind, segmented, headers)
+
+    def _download_path(self, url: str) -> str:
+        # Stable per URL so an interrupted transfer is resumed by the next run
+        ext = os.path.splitext(url.split('?', 1)[0])[1][:8]
+        name = 'dl-' + hashlib.sha1(url.encode('utf-8')).hexdigest() + ext
+        return os.path.join(self.root, 'tmp', name)
+
+    def _download(self, url: str, key: str, kind: str, segmented: bool,
+                  headers: Optional[Dict[str, str]] = None) -> str:
+        tmp = self._download_path(url)
+        client = get_client()
+        if headers:
+            # Small text assets: byte ranges of a compressed body are not resumable
+            stats = client.download_to_file(url, tmp, headers=headers)
+            if stats.content_encoding:
+                _decode_body(tmp, stats.content_encoding)
+        elif segmented and not os.path.exists(tmp + '.part'):
+            stats = client.download_segmented(url, tmp)
+        else:
+            stats = client.download_to_file(url, tmp, resume=True)
+        if kind == 'audio' and not audio_looks_intact(tmp):
+            os.remove(tmp)
+            if not stats.resumed_from:
+                raise stages.failure(AssetDownloadError(
+                    f"Downloaded audio failed the integrity check: {url}"))
+            # The stitched file is bad: the resumed part was stale or damaged
+            logger.warning("Resumed download of %s is corrupt, downloading again", url)
+            stats = client.download_to_file(url, tmp)
+            if not audio_looks_intact(tmp):
+                os.remove(tmp)
+                raise stages.failure(AssetDownloadError(
+                    f"Downloaded audio failed the integrity check: {url}"))
+        return self._store(key, tmp, kind, url=url, etag=stats.etag,
+                           last_modified=stats.last_modified)
+
+    def _still_valid(self, url: str, row: sqlite3.Row) -> bool:
+        headers = {}
+        if row['etag']:
+            headers['If-None-Match'] = row['etag']
+        if row['last_modified']:
+            headers['If-Modified-Since'] = row['last_modified']
+        if not headers:
+            return True
+        try:
+            with get_client().get(url, headers=headers, stream=True) as response:
+                return response.status_code == 304
+        except Exception as e:
+            logger.warning("Revalidation failed for %s, using cached copy: %s", url, e)
+            return True
+
+    # -- derived artifacts ------------------------------------------------
+
+    def get_derived(self, key: str, kind: str = 'derived') -> Optional[str]:
+        with self._lock:
+            row = self._lookup('derived:' + key)
+            if row is None:
+                self._count(kind, False)
+                return None
+            self._touch(row['sha256'])
+        self._count(kind, True)
+        return row['path']
+
+    def put_derived(self, key: str, src_path: str, kind: str = 'derived') -> str:
+        """Store a file produced locally (moved into the cache) under ``key``."""
+        return self._store('derived:' + key, src_path, kind)
+
+    def put_derived_bytes(self, key: str, data: bytes, kind: str = 'derived', ext: str = '') -> str:
+        tmp = self.tmp_path(ext)
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        return self.put_derived(key, tmp, kind)
+
+    # -- maintenance ------------------------------------------------------
+
+    def total_bytes(self) -> int:
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0) AS n FROM blobs").fetchone()
+        return int(row['n'])
+
+    def evict(self, max_bytes: Optional[int] = None,
+              protect: Optional[str] = None) -> Tuple[int, int]:
+        """Evict least-recently-used blobs until the total fits ``max_bytes``.
+
+        Returns ``(blobs_evicted, bytes_freed)``.
+        """
+        budget = self.max_bytes if max_bytes is None else int(max_bytes)
+        evicted = freed = 0
+        with self._lock:
+            total = self.total_bytes()
+            if total <= budget:
+                return 0, 0
+            rows = self._conn.execute(
+                "SELECT sha256, size FROM blobs ORDER BY last_access ASC"
+            ).fetchall()
+            for row in rows:
+                if total <= budget:
+                    break
+                if row['sha256'] == protect:
+                    continue
+                self._drop_blob(row['sha256'])
+                total -= row['size']
+                evicted += 1
+                freed += row['size']
+        if evicted:
+            logger.info("Cache eviction: %d blobs, %d bytes freed", evicted, freed)
+        return evicted, freed
+
+    def gc(self, max_bytes: Optional[int] = None) -> Tuple[int, int]:
+        """Drop dangling rows and stray files, then enforce the byte budget."""
+        with self._lock:
+            for row in self._conn.execute("SELECT sha256, path, size FROM blobs").fetchall():
+                if not os.path.exists(row['path']) or os.path.getsize(row['path']) != row['size']:
+                    self._drop_blob(row['sha256'])
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE sha256 NOT IN (SELECT sha256 FROM blobs)"
+                )
+            known = {row['path'] for row in self._conn.execute("SELECT path FROM blobs")}
+            blob_root = os.path.join(self.root, 'blobs')
+            for dirpath, _dirs, files in os.walk(blob_root):
+                for name in files:
+                    path = os.path.join(dirpath, name)
+                    if path not in known:
+                        os.remove(path)
+            tmp_root = os.path.join(self.root, 'tmp')
+            cutoff = time.time() - 24 * 3600
+            for name in os.listdir(tmp_root):
+                path = os.path.join(tmp_root, name)
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+        return self.evict(max_bytes)
+
+    def clear(self) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM entries")
+                self._conn.execute("DELETE FROM blobs")
+            shutil.rmtree(os.path.join(self.root, 'blobs'), ignore_errors=True)
+            os.makedirs(os.path.join(self.root, 'blobs'), exist_ok=True)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            st = CacheStats(root=self.root, max_bytes=self.max_bytes)
+            st.total_bytes = self.total_bytes()
+            st.blobs = self._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+            st.entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            for row in self._conn.execute(
+                "SELECT kind, COUNT(*) AS n, SUM(size) AS bytes FROM blobs GROUP BY kind"
+            ):
+                st.by_kind[row['kind']] = (int(row['n']), int(row['bytes'] or 0))
+            for row in self._conn.execute("SELECT name, value FROM counters"):
+                if row['name'] == 'hits':
+                    st.hits = int(row['value'])
+                elif row['name'] == 'misses':
+                    st.misses = int(row['value'])
+        return st
+
+
+_lock = threading.Lock()
+_cache: Optional[AssetCache] = None
+
+
+def configure(enabled: bool = True, dir: Optional[str] = None, max_bytes=None,
+              revalidate: bool = False, store_pcm: bool = False,
+              **_ignored) -> Optional[AssetCache]:
+    """Install the process-wide cache from the ``cache`` config section.
+
+    Returns the cache, or None when caching is disabled.
+    """
+    from audiogram_generator.core.units import parse_size
+
+    global _cache
+    with _lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+        if enabled:
+            budget = parse_size(max_bytes) if max_bytes is not None else 5 * 1024 ** 3
+            _cache = AssetCache(dir or default_cache_dir(), budget,
+                                revalidate=bool(revalidate), store_pcm=bool(store_pcm))
+        return _cache
+
+
+def get_cache() -> Optional[AssetCache]:
+    """Return the process-wide cache, or None when caching is not configured."""
+    return _cache
+
+
+def _reset_after_fork() -> None:
+    # SQLite connections must not cross fork(); children reopen the same root
+    global _cache, _lock
+    _lock = threading.Lock()
+    if _cache is not None:
+        old = _cache
+        _cache = AssetCache(old.root, old.max_bytes, revalidate=old.revalidate,
+                            store_pcm=old.store_pcm)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,278 @@
+"""Persistent SQLite index of podcast episodes.
+
+The index mirrors the episode dictionaries produced by ``rss.parse_feed`` and
+is synced incrementally: new GUIDs are inserted, changed items are updated and
+items no longer present in the feed are removed. Episodes are indexed by GUID
+and by episode number, so resolving a selection is a keyed lookup instead of a
+linear scan over the parsed feed.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from ..core.jobs import episode_key
+
+logger = logging.getLogger(__name__)
+
+# Numbers per IN (...) query: older SQLite builds allow only 999 variables
+_MAX_NUMBERS_PER_QUERY = 900
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeds (
+    feed_url TEXT PRIMARY KEY,
+    content_hash TEXT,
+    podcast_info TEXT NOT NULL DEFAULT '{}',
+    synced_at REAL,
+    etag TEXT,
+    last_modified TEXT
+);
+CREATE TABLE IF NOT EXISTS episodes (
+    feed_url TEXT NOT NULL,
+    guid TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    content_hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (feed_url, guid)
+);
+CREATE INDEX IF NOT EXISTS idx_episodes_number ON episodes (feed_url, number);
+"""
+
+
+@dataclass
+class SyncResult:
+    """Outcome of a feed sync.
+
+    ``new``/``updated``/``removed`` hold episode keys (GUIDs). ``new_numbers``
+    holds the episode numbers of newly inserted items, and ``previous`` the
+    stored data of updated items before this sync. ``initial`` is True on
+    the first sync of a feed, when no previous state existed. ``parsed`` is
+    False when the feed content was unchanged and parsing was skipped;
+    ``not_modified`` when the server answered a conditional GET with 304.
+    """
+
+    new: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    new_numbers: List[int] = field(default_factory=list)
+    previous: Dict[str, Dict] = field(default_factory=dict)
+    unchanged: int = 0
+    initial: bool = False
+    parsed: bool = True
+    not_modified: bool = False
+
+
+def content_hash(data) -> str:
+    """Stable SHA-256 of a JSON-serializable value or of raw text/bytes."""
+    if isinstance(data, str):
+        raw = data.encode('utf-8')
+    elif isinstance(data, bytes):
+        raw = data
+    else:
+        raw = json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+
+class EpisodeIndex:
+    """SQLite-backed store of feed episodes keyed by GUID and number."""
+
+    def __init__(self, path: str):
+        self.path = path
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        # Indexes created before conditional GETs lack the validator columns
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(feeds)")}
+        with self._conn:
+            for column in ('etag', 'last_modified'):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE feeds ADD COLUMN {column} TEXT")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "EpisodeIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- feed-level state -------------------------------------------------
+
+    def feed_hash(self, feed_url: str) -> Optional[str]:
+        """Return the content hash recorded at the last sync, if any."""
+        row = self._conn.execute(
+            "SELECT content_hash FROM feeds WHERE feed_url = ?", (feed_url,)
+        ).fetchone()
+        return row['content_hash'] if row else None
+
+    def podcast_info(self, feed_url: str) -> Dict:
+        row = self._conn.execute(
+            "SELECT podcast_info FROM feeds WHERE feed_url = ?", (feed_url,)
+        ).fetchone()
+        return json.loads(row['podcast_info']) if row else {}
+
+    def feed_validators(self, feed_url: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return the ``(etag, last_modified)`` of the last fetched feed body."""
+        row = self._conn.execute(
+            "SELECT etag, last_modified FROM feeds WHERE feed_url = ?", (feed_url,)
+        ).fetchone()
+        return (row['etag'], row['last_modified']) if row else (None, None)
+
+    def touch(self, feed_url: str, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> None:
+        """Record a sync that found the feed unchanged (refreshing validators if given)."""
+        with self._conn:
+            self._conn.execute(
+                "UPDATE feeds SET synced_at = ?, etag = COALESCE(?, etag),"
+                " last_modified = COALESCE(?, last_modified) WHERE feed_url = ?",
+                (time.time(), etag, last_modified, feed_url),
+            )
+
+    # -- sync ---------------------------------------------------------------
+
+    def sync(
+        self,
+        feed_url: str,
+        episodes: Iterable[Dict],
+        podcast_info: Dict,
+        feed_content_hash: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> SyncResult:
+        """Upsert ``episodes`` for ``feed_url`` and drop items no longer present."""
+        now = time.time()
+        result = SyncResult()
+        existing: Dict[str, str] = {
+            row['guid']: row['content_hash']
+            for row in self._conn.execute(
+                "SELECT guid, content_hash FROM episodes WHERE feed_url = ?", (feed_url,)
+            )
+        }
+        result.initial = self._conn.execute(
+            "SELECT 1 FROM feeds WHERE feed_url = ?", (feed_url,)
+        ).fetchone() is None
+
+        seen = set()
+        with self._conn:
+            for ep in episodes:
+                key = episode_key(ep)
+                if key in seen:
+                    # Duplicate GUIDs in a feed: keep the first (oldest) occurrence
+                    continue
+                seen.add(key)
+                h = content_hash(ep)
+                data = json.dumps(ep, ensure_ascii=False)
+                if key not in existing:
+                    self._conn.execute(
+                        "INSERT INTO episodes (feed_url, guid, number, title, content_hash, data,"
+                        " first_seen, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (feed_url, key, ep['number'], ep.get('title', ''), h, data, now, now),
+                    )
+                    result.new.append(key)
+                    result.new_numbers.append(ep['number'])
+                elif existing[key] != h:
+                    old = self._conn.execute(
+                        "SELECT data FROM episodes WHERE feed_url = ? AND guid = ?", (feed_url, key)
+                    ).fetchone()
+                    result.previous[key] = json.loads(old['data'])
+                    self._conn.execute(
+                        "UPDATE episodes SET number = ?, title = ?, content_hash = ?, data = ?,"
+                        " updated_at = ? WHERE feed_url = ? AND guid = ?",
+                        (ep['number'], ep.get('title', ''), h, data, now, feed_url, key),
+                    )
+                    result.updated.append(key)
+                else:
+                    result.unchanged += 1
+
+            for key in existing:
+                if key not in seen:
+                    self._conn.execute(
+                        "DELETE FROM episodes WHERE feed_url = ? AND guid = ?", (feed_url, key)
+                    )
+                    result.removed.append(key)
+
+            self._conn.execute(
+                "INSERT INTO feeds"
+                " (feed_url, content_hash, podcast_info, synced_at, etag, last_modified)"
+                " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(feed_url) DO UPDATE SET"
+                " content_hash = excluded.content_hash, podcast_info = excluded.podcast_info,"
+                " synced_at = excluded.synced_at, etag = excluded.etag,"
+                " last_modified = excluded.last_modified",
+                (feed_url, feed_content_hash, json.dumps(podcast_info, ensure_ascii=False), now,
+                 etag, last_modified),
+            )
+
+        logger.info(
+            "Synced %s: %d new, %d updated, %d removed, %d unchanged",
+            feed_url, len(result.new), len(result.updated), len(result.removed), result.unchanged,
+        )
+        return result
+
+    # -- lookups ------------------------------------------------------------
+
+    def episode_count(self, feed_url: str) -> int:
+        row = self._conn.execute(
+            "SELECT COUNT(*) AS n FROM episodes WHERE feed_url = ?", (feed_url,)
+        ).fetchone()
+        return int(row['n'])
+
+    def list_titles(self, feed_url: str) -> List[Tuple[int, str]]:
+        """Return ``(number, title)`` pairs ordered by number, without decoding rows."""
+        return [
+            (row['number'], row['title'])
+            for row in self._conn.execute(
+                "SELECT number, title FROM episodes WHERE feed_url = ? ORDER BY number",
+                (feed_url,),
+            )
+        ]
+
+    def episodes(self, feed_url: str) -> List[Dict]:
+        """Return all episodes of ``feed_url`` ordered oldest -> newest."""
+        return [
+            json.loads(row['data'])
+            for row in self._conn.execute(
+                "SELECT data FROM episodes WHERE feed_url = ? ORDER BY number", (feed_url,)
+            )
+        ]
+
+    def get_by_guid(self, feed_url: str, guid: str) -> Optional[Dict]:
+        row = self._conn.execute(
+            "SELECT data FROM episodes WHERE feed_url = ? AND guid = ?", (feed_url, guid)
+        ).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def get_by_number(self, feed_url: str, number: int) -> Optional[Dict]:
+        row = self._conn.execute(
+            "SELECT data FROM episodes WHERE feed_url = ? AND number = ?", (feed_url, number)
+        ).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def get_by_numbers(self, feed_url: str, numbers: Iterable[int]) -> Dict[int, Dict]:
+        """Resolve several episode numbers, a few hundred per query."""
+        nums = list(numbers)
+        found: Dict[int, Dict] = {}
+        for start in range(0, len(nums), _MAX_NUMBERS_PER_QUERY):
+            chunk = nums[start:start + _MAX_NUMBERS_PER_QUERY]
+            placeholders = ','.join('?' for _ in chunk)
+            rows = self._conn.execute(
+                "SELECT number, data FROM episodes WHERE feed_url = ?"
+                f" AND number IN ({placeholders})",
+                (feed_url, *chunk),
+            )
+            found.update((row['number'], json.loads(row['data'])) for row in rows)
+        return found
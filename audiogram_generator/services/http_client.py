@@ -0,0 +1,456 @@
+"""Shared HTTP client used by every service that talks to the network.
+
+A single ``requests.Session`` per process keeps connections alive and pools
+them per host, so TLS handshakes and connection setup are paid once per host
+instead of once per request. Timeouts and pool sizes come from the ``http``
+section of the configuration (see ``configure``).
+
+The relaxed TLS behaviour of the legacy ``urllib`` code (no certificate
+verification) is preserved by default and can be switched off with
+``verify_tls: true``.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from typing import Callable, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..telemetry import stages
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_USER_AGENT = "Mozilla/5.0"
+# Request headers of text resources (feeds, transcripts): compression negotiated
+TEXT_HEADERS = {"Accept-Encoding": "gzip, deflate"}
+
+
+@dataclass
+class HttpSettings:
+    """Tunables for the shared client (mirrors the ``http`` config section)."""
+
+    timeout: float = 10.0
+    connect_timeout: float = 5.0
+    pool_size: int = 8
+    verify_tls: bool = False
+    user_agent: str = DEFAULT_USER_AGENT
+    chunk_size: int = 1024 * 1024
+    download_segments: int = 1
+    min_segment_size: int = 4 * 1024 * 1024
+
+
+@dataclass
+class DownloadStats:
+    """Progress/outcome of a streamed download.
+
+    ``total_bytes`` is None when the server did not announce a length.
+    ``content_encoding`` is set when the body was stored compressed.
+    """
+
+    url: str
+    bytes_done: int = 0
+    total_bytes: Optional[int] = None
+    started_at: float = 0.0
+    elapsed: float = 0.0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    resumed_from: int = 0
+    content_encoding: Optional[str] = None
+
+    @property
+    def bytes_per_second(self) -> float:
+        """Transfer rate of this session (bytes resumed from disk excluded)."""
+        transferred = self.bytes_done - self.resumed_from
+        return transferred / self.elapsed if self.elapsed > 0 else 0.0
+
+
+# Listeners receive ``(stats, done)`` while downloads progress (throttled) and
+# once more with ``done=True`` at the end. Progress/metrics reporters hook here.
+DownloadListener = Callable[[DownloadStats, bool], None]
+_download_listeners: List[DownloadListener] = []
+_PROGRESS_INTERVAL = 0.25
+
+
+def add_download_listener(listener: DownloadListener) -> None:
+    if listener not in _download_listeners:
+        _download_listeners.append(listener)
+
+
+def remove_download_listener(listener: DownloadListener) -> None:
+    if listener in _download_listeners:
+        _download_listeners.remove(listener)
+
+
+def _notify(stats: DownloadStats, done: bool) -> None:
+    for listener in list(_download_listeners):
+        try:
+            listener(stats, done)
+        except Exception:  # pragma: no cover - reporters must never break downloads
+            logger.debug("Download listener failed", exc_info=True)
+
+
+class _RangeNotHonoured(IOError):
+    """A segment request was answered with something other than 206."""
+
+
+def _strong_validator(etag: Optional[str], last_modified: Optional[str]) -> Optional[str]:
+    # If-Range only accepts strong ETags; fall back to the modification date
+    if etag and not etag.startswith("W/"):
+        return etag
+    return last_modified or None
+
+
+def _write_resume_meta(meta_path: str, stats: DownloadStats) -> None:
+    validator = _strong_validator(stats.etag, stats.last_modified)
+    if validator is None or stats.total_bytes is None:
+        return
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"url": stats.url, "validator": validator, "etag": stats.etag,
+                   "total": stats.total_bytes}, f)
+
+
+def _resume_point(part_path: str, meta_path: str) -> Tuple[int, dict]:
+    """Bytes already on disk for a resumable download (0 if not resumable)."""
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        have = os.path.getsize(part_path)
+    except (OSError, ValueError):
+        return 0, {}
+    if not meta.get("validator") or not 0 < have < int(meta.get("total") or 0):
+        return 0, {}
+    return have, meta
+
+
+def _continues(response: requests.Response, offset: int, meta: dict) -> bool:
+    """True if ``response`` is the tail of the same file starting at ``offset``."""
+    if response.status_code != 206:
+        return False
+    content_range = response.headers.get("Content-Range", "")
+    try:
+        span, total = content_range.split(" ", 1)[1].split("/", 1)
+        first = int(span.split("-", 1)[0])
+    except (IndexError, ValueError):
+        return False
+    if first != offset or total != str(meta["total"]):
+        return False
+    etag = response.headers.get("ETag")
+    return not (etag and meta.get("etag") and etag != meta["etag"])
+
+
+def _discard(*paths: str) -> None:
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class HttpClient:
+    """Thin wrapper around a pooled, keep-alive ``requests.Session``."""
+
+    def __init__(self, settings: Optional[HttpSettings] = None):
+        self.settings = settings or HttpSettings()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.settings.pool_size,
+            pool_maxsize=self.settings.pool_size,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"User-Agent": self.settings.user_agent})
+        self.session.verify = self.settings.verify_tls
+        if not self.settings.verify_tls:
+            import urllib3
+
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    def _timeout(self, timeout: Optional[float]):
+        read_timeout = timeout if timeout is not None else self.settings.timeout
+        return (self.settings.connect_timeout, read_timeout)
+
+    def get(
+        self,
+        url: str,
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        stream: bool = False,
+        timeout: Optional[float] = None,
+    ) -> requests.Response:
+        """Issue a GET and raise ``requests.HTTPError`` on 4xx/5xx responses."""
+        response = self.session.get(url, headers=headers, stream=stream,
+                                    timeout=self._timeout(timeout))
+        response.raise_for_status()
+        if not stream:
+            stages.count("http.bytes", len(response.content))
+        return response
+
+    def get_text(self, url: str, timeout: Optional[float] = None) -> str:
+        """GET a text resource (XML, SRT) with gzip negotiated; returns UTF-8 text."""
+        response = self.get(url, headers=TEXT_HEADERS, timeout=timeout)
+        return response.content.decode("utf-8")
+
+    def get_bytes(self, url: str, timeout: Optional[float] = None) -> bytes:
+        """GET a small binary resource fully into memory."""
+        return self.get(url, timeout=timeout).content
+
+    def download_to_file(
+        self,
+        url: str,
+        output_path: str,
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        chunk_size: Optional[int] = None,
+        resume: bool = False,
+    ) -> DownloadStats:
+        """Stream ``url`` to ``output_path`` in fixed-size chunks.
+
+        Bytes go through one reusable buffer into ``<output_path>.part``, which
+        is atomically renamed on success, so a partial file never appears
+        under the final name. The length is checked against ``Content-Length``.
+
+        Without ``resume`` the ``.part`` file is removed on failure. With it, a
+        failed transfer keeps the ``.part`` file plus a ``.part.json`` sidecar
+        holding the validators (ETag/Last-Modified) and total size; the next
+        call asks only for the missing tail with ``Range`` and ``If-Range``. If
+        the server sends the whole body instead (the file changed, or ranges
+        are unsupported) the download restarts from zero.
+
+        ``headers`` may replace the default ``Accept-Encoding: identity``; a
+        compressed body is written as received, with its encoding in
+        ``content_encoding`` of the returned stats.
+        """
+        size = chunk_size or self.settings.chunk_size
+        req_headers = {"Accept-Encoding": "identity"}
+        req_headers.update(headers or {})
+        part_path = output_path + ".part"
+        meta_path = part_path + ".json"
+        offset, meta = _resume_point(part_path, meta_path) if resume else (0, {})
+        if offset:
+            req_headers["Range"] = f"bytes={offset}-"
+            req_headers["If-Range"] = meta["validator"]
+        stats = DownloadStats(url=url, started_at=time.time())
+        buf = bytearray(size)
+        view = memoryview(buf)
+        try:
+            with self.get(url, headers=req_headers, stream=True, timeout=timeout) as response:
+                stats.etag = response.headers.get("ETag")
+                stats.last_modified = response.headers.get("Last-Modified")
+                stats.content_encoding = response.headers.get("Content-Encoding")
+                if offset and not _continues(response, offset, meta):
+                    logger.info("Cannot resume %s, restarting from zero", url)
+                    offset = 0
+                    if response.status_code == 206:
+                        # A range of some other version of the file: ask again
+                        response.close()
+                        _discard(part_path, meta_path)
+                        return self.download_to_file(
+                            url, output_path, headers=headers, timeout=timeout,
+                            chunk_size=chunk_size, resume=resume,
+                        )
+                if offset:
+                    stats.total_bytes = meta["total"]
+                    stats.resumed_from = offset
+                    logger.info("Resuming %s at byte %d of %d", url, offset, meta["total"])
+                else:
+                    length = response.headers.get("Content-Length")
+                    stats.total_bytes = int(length) if length and length.isdigit() else None
+                stats.bytes_done = offset
+                if resume:
+                    _write_resume_meta(meta_path, stats)
+                last_report = 0.0
+                with open(part_path, "ab" if offset else "wb") as f:
+                    while True:
+                        n = response.raw.readinto(view)
+                        if not n:
+                            break
+                        f.write(view[:n])
+                        stats.bytes_done += n
+                        now = time.time()
+                        stats.elapsed = now - stats.started_at
+                        if now - last_report >= _PROGRESS_INTERVAL:
+                            last_report = now
+                            _notify(stats, False)
+            if stats.total_bytes is not None and stats.bytes_done != stats.total_bytes:
+                raise IOError(
+                    f"Incomplete download: {stats.bytes_done} of {stats.total_bytes} bytes"
+                )
+            os.replace(part_path, output_path)
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+        except BaseException:
+            if not (resume and _resume_point(part_path, meta_path)[0]):
+                _discard(part_path, meta_path)
+            raise
+        stats.elapsed = time.time() - stats.started_at
+        stages.count("http.bytes", stats.bytes_done - stats.resumed_from)
+        _notify(stats, True)
+        logger.info(
+            "Downloaded %s (%d bytes in %.2fs, %.1f MB/s)",
+            url, stats.bytes_done - stats.resumed_from, stats.elapsed, stats.bytes_per_second / 1e6,
+        )
+        return stats
+
+    def _probe_ranges(self, url: str, timeout: Optional[float]) -> Optional[Tuple[int, str, str]]:
+        """Return ``(total_size, etag, last_modified)`` if ``url`` honours byte ranges."""
+        headers = {"Range": "bytes=0-0", "Accept-Encoding": "identity"}
+        with self.get(url, headers=headers, stream=True, timeout=timeout) as response:
+            content_range = response.headers.get("Content-Range", "")
+            if response.status_code != 206 or "/" not in content_range:
+                return None
+            total = content_range.rsplit("/", 1)[1]
+            if not total.isdigit():
+                return None
+            return (
+                int(total),
+                response.headers.get("ETag", ""),
+                response.headers.get("Last-Modified", ""),
+            )
+
+    def download_segmented(
+        self,
+        url: str,
+        output_path: str,
+        *,
+        segments: Optional[int] = None,
+        timeout: Optional[float] = None,
+        chunk_size: Optional[int] = None,
+    ) -> DownloadStats:
+        """Download ``url`` as N byte ranges fetched concurrently.
+
+        The ``.part`` file is preallocated to the full size and every range is
+        written in place at its offset, then the file is renamed atomically.
+        Falls back to ``download_to_file`` when ranges are unsupported or the
+        file is too small to be worth splitting, and starts over with it when
+        a segment is not answered with 206 (the file changed since the probe,
+        or the server only honours ranges on some requests).
+        """
+        n = max(1, min(segments or self.settings.download_segments, self.settings.pool_size))
+        probe = self._probe_ranges(url, timeout) if n > 1 else None
+        if probe is None:
+            return self.download_to_file(url, output_path, timeout=timeout, chunk_size=chunk_size)
+        total, etag, last_modified = probe
+        n = min(n, max(1, total // max(1, self.settings.min_segment_size)))
+        if n == 1:
+            return self.download_to_file(url, output_path, timeout=timeout, chunk_size=chunk_size)
+
+        size = chunk_size or self.settings.chunk_size
+        part_path = output_path + ".part"
+        stats = DownloadStats(
+            url=url, total_bytes=total, started_at=time.time(),
+            etag=etag or None, last_modified=last_modified or None,
+        )
+        lock = threading.Lock()
+        last_report = [0.0]
+        step = -(-total // n)
+        ranges = [(i * step, min(total, (i + 1) * step) - 1) for i in range(n)]
+
+        validator = _strong_validator(etag, last_modified)
+
+        def fetch(first: int, last: int) -> int:
+            headers = {"Range": f"bytes={first}-{last}", "Accept-Encoding": "identity"}
+            if validator:
+                # Refuse to mix ranges of two different versions of the file
+                headers["If-Range"] = validator
+            buf = bytearray(size)
+            view = memoryview(buf)
+            written = 0
+            with self.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code != 206:
+                    raise _RangeNotHonoured(f"Range {first}-{last} not honoured "
+                                            f"(HTTP {response.status_code})")
+                with open(part_path, "r+b") as f:
+                    f.seek(first)
+                    while True:
+                        k = response.raw.readinto(view)
+                        if not k:
+                            break
+                        f.write(view[:k])
+                        written += k
+                        with lock:
+                            stats.bytes_done += k
+                            now = time.time()
+                            stats.elapsed = now - stats.started_at
+                            if now - last_report[0] >= _PROGRESS_INTERVAL:
+                                last_report[0] = now
+                                _notify(stats, False)
+            if written != last - first + 1:
+                raise IOError(f"Range {first}-{last} incomplete: {written} bytes")
+            return written
+
+        try:
+            with open(part_path, "wb") as f:
+                f.truncate(total)
+            with ThreadPoolExecutor(max_workers=n, thread_name_prefix="segdl") as pool:
+                futures = [pool.submit(fetch, a, b) for a, b in ranges]
+                for fut in futures:
+                    fut.result()
+            os.replace(part_path, output_path)
+        except BaseException as e:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            if not isinstance(e, _RangeNotHonoured):
+                raise
+            # The file changed since the probe, or the server ignores ranges on GET
+            logger.info("%s; downloading %s in one piece", e, url)
+            return self.download_to_file(url, output_path, timeout=timeout, chunk_size=chunk_size)
+        stats.elapsed = time.time() - stats.started_at
+        stages.count("http.bytes", stats.bytes_done)
+        _notify(stats, True)
+        logger.info(
+            "Downloaded %s in %d segments (%d bytes in %.2fs, %.1f MB/s)",
+            url, n, stats.bytes_done, stats.elapsed, stats.bytes_per_second / 1e6,
+        )
+        return stats
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_lock = threading.Lock()
+_settings = HttpSettings()
+_client: Optional[HttpClient] = None
+
+
+def configure(**options) -> HttpSettings:
+    """Update the shared client settings; unknown keys are ignored.
+
+    The current client (if any) is closed so the next ``get_client`` call picks
+    up the new settings.
+    """
+    global _settings, _client
+    known = {f.name for f in fields(HttpSettings)}
+    values = {k: v for k, v in options.items() if k in known and v is not None}
+    with _lock:
+        _settings = HttpSettings(**{**_settings.__dict__, **values})
+        if _client is not None:
+            _client.close()
+            _client = None
+    return _settings
+
+
+def get_client() -> HttpClient:
+    """Return the process-wide shared client, creating it on first use."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = HttpClient(_settings)
+        return _client
+
+
+def _reset_after_fork() -> None:
+    # Pooled sockets must not be shared between parent and child processes
+    global _client, _lock
+    _client = None
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,354 @@
+"""SQLite work queue of render jobs, shared by worker processes and nodes.
+
+``enqueue`` writes ``core.jobs.RenderJob`` rows; workers claim them with a
+time-limited lease, renew the lease with heartbeats while rendering and
+record the outcome. A worker that dies simply stops renewing: once its lease
+expires the jobs count as failed attempts and become claimable again, so a
+crash loses at most the jobs in flight. Failures are retried with
+exponential backoff up to ``max_attempts`` times, then left in the
+``failed`` state; a job that keeps killing its worker ends up there too.
+
+Rows carry the episode's GUID (``core.jobs.episode_key``) next to its
+number: numbers shift when old items leave the feed, so workers resolve the
+episode by GUID. Claims take all available jobs of one episode at once (up
+to a limit), so a worker downloads and cuts each episode once. Every state change runs in a
+``BEGIN IMMEDIATE`` transaction, which serialises claims across processes.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from ..core.jobs import RenderJob
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT NOT NULL,
+    feed_url TEXT NOT NULL,
+    episode INTEGER NOT NULL,
+    guid TEXT,
+    soundbite INTEGER NOT NULL,
+    format TEXT NOT NULL,
+    show_subtitles INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    not_before REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    duration REAL,
+    PRIMARY KEY (feed_url, key)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, not_before);
+"""
+
+STATUSES = ('pending', 'leased', 'done', 'failed')
+
+
+@dataclass(frozen=True)
+class QueuedJob:
+    """A claimed job: the render job plus the feed it belongs to."""
+
+    feed_url: str
+    job: RenderJob
+    attempts: int
+
+    @property
+    def key(self) -> str:
+        return self.job.key
+
+
+class JobQueue:
+    """SQLite-backed queue of render jobs with leases and retries."""
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly below
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        # Queues created before jobs carried the episode GUID
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if 'guid' not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN guid TEXT")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    # -- producers ----------------------------------------------------------
+
+    def enqueue(self, feed_url: str, jobs: Iterable[RenderJob], max_attempts: int = 3,
+                requeue: bool = False) -> int:
+        """Add ``jobs``; returns how many were added or reset.
+
+        Jobs already queued are left alone, unless ``requeue`` is set and they
+        are ``done`` or ``failed``, in which case they start over.
+        """
+        now = time.time()
+        changed = 0
+        with self._transaction() as conn:
+            for job in jobs:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO jobs (key, feed_url, episode, guid, soundbite, format,"
+                    " show_subtitles, max_attempts, enqueued_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job.key, feed_url, job.episode, job.guid, job.soundbite, job.format,
+                     int(job.show_subtitles), int(max_attempts), now),
+                )
+                if cur.rowcount == 0 and requeue:
+                    cur = conn.execute(
+                        "UPDATE jobs SET status = 'pending', attempts = 0, max_attempts = ?,"
+                        " not_before = 0, last_error = NULL, lease_owner = NULL,"
+                        " lease_expires = NULL, enqueued_at = ?, episode = ?"
+                        " WHERE feed_url = ? AND key = ? AND status IN ('done', 'failed')",
+                        (int(max_attempts), now, job.episode, feed_url, job.key),
+                    )
+                changed += cur.rowcount
+        return changed
+
+    # -- workers ------------------------------------------------------------
+
+    def claim(self, owner: str, lease_seconds: float, limit: int = 32,
+              backoff: float = 30.0) -> List[QueuedJob]:
+        """Lease the next available episode's jobs (at most ``limit``).
+
+        Available means pending and past its backoff. Expired leases are
+        settled first, like a ``fail`` at expiry time: retried after the
+        backoff, or ``failed`` once ``max_attempts`` is used up. Returns an
+        empty list when nothing is available.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire_leases(conn, now, backoff)
+            first = conn.execute(
+                "SELECT feed_url, episode, guid FROM jobs"
+                " WHERE status = 'pending' AND not_before <= :now"
+                " ORDER BY enqueued_at, episode, soundbite LIMIT 1",
+                {'now': now},
+            ).fetchone()
+            if first is None:
+                return []
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'pending' AND not_before <= :now"
+                " AND feed_url = :feed AND (guid = :guid"
+                " OR (:guid IS NULL AND guid IS NULL AND episode = :ep))"
+                " ORDER BY soundbite, format, show_subtitles DESC LIMIT :limit",
+                {'now': now, 'feed': first['feed_url'], 'guid': first['guid'],
+                 'ep': first['episode'], 'limit': max(1, limit)},
+            ).fetchall()
+            for row in rows:
+                conn.execute(
+                    "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?,"
+                    " attempts = attempts + 1, started_at = ? WHERE feed_url = ? AND key = ?",
+                    (owner, now + lease_seconds, now, row['feed_url'], row['key']),
+                )
+        return [
+            QueuedJob(
+                row['feed_url'],
+                RenderJob(row['episode'], row['soundbite'], row['format'],
+                          bool(row['show_subtitles']), row['guid']),
+                row['attempts'] + 1,
+            )
+            for row in rows
+        ]
+
+    @staticmethod
+    def _expire_leases(conn: sqlite3.Connection, now: float, backoff: float) -> None:
+        expired = conn.execute(
+            "SELECT feed_url, key, attempts, max_attempts, lease_owner, lease_expires FROM jobs"
+            " WHERE status = 'leased' AND lease_expires < ?",
+            (now,),
+        ).fetchall()
+        for row in expired:
+            status = 'failed' if row['attempts'] >= row['max_attempts'] else 'pending'
+            logger.warning("Lease of %s on %s expired (attempt %d of %d): %s",
+                           row['lease_owner'], row['key'], row['attempts'], row['max_attempts'],
+                           'giving up' if status == 'failed' else 'will retry')
+            delay = backoff * 2 ** max(0, row['attempts'] - 1)
+            conn.execute(
+                "UPDATE jobs SET status = ?, not_before = ?, last_error = 'lease expired',"
+                " finished_at = ?, lease_owner = NULL, lease_expires = NULL"
+                " WHERE feed_url = ? AND key = ?",
+                (status, row['lease_expires'] + delay, row['lease_expires'],
+                 row['feed_url'], row['key']),
+            )
+
+    def heartbeat(self, owner: str, jobs: Iterable[QueuedJob], lease_seconds: float) -> int:
+        """Extend the leases ``owner`` still holds; returns how many were renewed."""
+        renewed = 0
+        expires = time.time() + lease_seconds
+        with self._transaction() as conn:
+            for queued in jobs:
+                cur = conn.execute(
+                    "UPDATE jobs SET lease_expires = ? WHERE feed_url = ? AND key = ?"
+                    " AND status = 'leased' AND lease_owner = ?",
+                    (expires, queued.feed_url, queued.key, owner),
+                )
+                renewed += cur.rowcount
+        return renewed
+
+    def complete(self, owner: str, queued: QueuedJob, duration: float) -> bool:
+        """Mark a leased job done; False if the lease was lost meanwhile."""
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, duration = ?, last_error = NULL,"
+                " lease_owner = NULL, lease_expires = NULL"
+                " WHERE feed_url = ? AND key = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time(), duration, queued.feed_url, queued.key, owner),
+            )
+        return cur.rowcount == 1
+
+    def fail(self, owner: str, queued: QueuedJob, error: str, duration: Optional[float] = None,
+             backoff: float = 30.0) -> str:
+        """Record a failure; returns the new status (``pending`` or ``failed``).
+
+        The job is retried after ``backoff * 2 ** (attempts - 1)`` seconds until
+        it has been attempted ``max_attempts`` times.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE feed_url = ? AND key = ?"
+                " AND status = 'leased' AND lease_owner = ?",
+                (queued.feed_url, queued.key, owner),
+            ).fetchone()
+            if row is None:
+                return 'lost'
+            status = 'failed' if row['attempts'] >= row['max_attempts'] else 'pending'
+            delay = backoff * 2 ** max(0, row['attempts'] - 1)
+            conn.execute(
+                "UPDATE jobs SET status = ?, not_before = ?, last_error = ?, finished_at = ?,"
+                " duration = ?, lease_owner = NULL, lease_expires = NULL"
+                " WHERE feed_url = ? AND key = ?",
+                (status, now + delay, error, now, duration, queued.feed_url, queued.key),
+            )
+        return status
+
+    def release(self, owner: str, jobs: Iterable[QueuedJob]) -> None:
+        """Give leased jobs back without counting an attempt (e.g. on shutdown)."""
+        with self._transaction() as conn:
+            for queued in jobs:
+                conn.execute(
+                    "UPDATE jobs SET status = 'pending', attempts = MAX(0, attempts - 1),"
+                    " lease_owner = NULL, lease_expires = NULL"
+                    " WHERE feed_url = ? AND key = ? AND status = 'leased' AND lease_owner = ?",
+                    (queued.feed_url, queued.key, owner),
+                )
+
+    # -- reporting ----------------------------------------------------------
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status (every status is present)."""
+        result = {status: 0 for status in STATUSES}
+        for row in self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+            result[row['status']] = row['n']
+        return result
+
+    def has_unfinished(self) -> bool:
+        """True while any job is pending or leased (possibly waiting on backoff)."""
+        row = self._conn.execute(
+            "SELECT 1 FROM jobs WHERE status IN ('pending', 'leased') LIMIT 1"
+        ).fetchone()
+        return row is not None
+
+    def failures(self) -> List[Dict]:
+        rows = self._conn.execute(
+            "SELECT feed_url, key, attempts, last_error FROM jobs"
+            " WHERE status = 'failed' ORDER BY key"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def timings(self) -> Dict[str, float]:
+        """Total, mean and max render seconds of the completed jobs."""
+        row = self._conn.execute(
+            "SELECT COUNT(*) AS n, SUM(duration) AS total, MAX(duration) AS longest"
+            " FROM jobs WHERE status = 'done' AND duration IS NOT NULL"
+        ).fetchone()
+        n = row['n'] or 0
+        total = row['total'] or 0.0
+        return {
+            'jobs': n,
+            'total': total,
+            'mean': total / n if n else 0.0,
+            'max': row['longest'] or 0.0,
+        }
+
+
+class LeaseKeeper:
+    """Renew the leases of a claimed batch on a background thread.
+
+    Heartbeats use their own connection (SQLite connections are per thread)
+    and run every third of the lease, so a busy worker keeps its jobs while a
+    crashed one loses them within ``lease_seconds``.
+    """
+
+    def __init__(self, path: str, owner: str, jobs: List[QueuedJob], lease_seconds: float,
+                 interval: Optional[float] = None):
+        self.path = path
+        self.owner = owner
+        self.jobs = list(jobs)
+        self.lease_seconds = lease_seconds
+        self.interval = interval if interval is not None else max(1.0, lease_seconds / 3)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='lease-heartbeat', daemon=True)
+
+    def _run(self) -> None:
+        queue = JobQueue(self.path)
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    queue.heartbeat(self.owner, self.jobs, self.lease_seconds)
+                except sqlite3.Error as e:
+                    # A missed beat is harmless while the lease has time left
+                    logger.warning("Lease heartbeat failed: %s", e)
+        finally:
+            queue.close()
+
+    def start(self) -> "LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def __enter__(self) -> "LeaseKeeper":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
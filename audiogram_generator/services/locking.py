@@ -0,0 +1,54 @@
+"""Advisory file locks for state shared by several processes.
+
+The asset cache serialises downloads of one URL with ``file_lock``. The
+build manifest and the render timings live in the output directory, where
+several renders may save at once: ``locked_merge_write`` merges with what
+is on disk under the lock and replaces the file atomically.
+
+Locks are POSIX ``flock`` locks; without ``fcntl`` (Windows) they are
+no-ops, so concurrent writers may then drop each other's entries.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Callable, Iterator, Optional
+import json
+import os
+
+fcntl: Optional[ModuleType]
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Hold an exclusive advisory lock on ``path``, created if missing."""
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def locked_merge_write(path: str, merge: Callable[[], Any], **dump_options: Any) -> Any:
+    """Write ``merge()`` to ``path`` as JSON while holding ``<path>.lock``.
+
+    ``merge`` runs under the lock, so it can read the file and combine it with
+    new data without losing what another process saved meanwhile. The file is
+    replaced atomically; ``dump_options`` go to ``json.dump``. Returns the
+    written document.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with file_lock(path + '.lock'):
+        document = merge()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(document, f, **dump_options)
+        os.replace(tmp, path)
+    return document
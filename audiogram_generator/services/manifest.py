@@ -0,0 +1,95 @@
+"""Incremental build manifest stored in the output directory.
+
+For every generated file the manifest records a fingerprint of the inputs
+that produced it (audio segment bytes, transcript cues, colors, format
+settings, artwork, generator version, ...). A later run computes the same
+fingerprint and skips outputs whose fingerprint matches and whose file is
+still present with the recorded size.
+
+The manifest is a JSON file named ``.audiogram-manifest.json``. Saves merge
+with what is on disk under an advisory lock, so several processes can render
+into the same directory.
+"""
+from __future__ import annotations
+
+from typing import Dict
+import json
+import logging
+import os
+import threading
+import time
+
+from .locking import locked_merge_write
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '.audiogram-manifest.json'
+_FORMAT_VERSION = 1
+
+
+class BuildManifest:
+    """Output file name -> ``{"inputs": fingerprint, "size": bytes, "built_at": ts}``."""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = self._read()
+        self._dirty: Dict[str, dict] = {}
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable build manifest %s: %s", self.path, e)
+            return {}
+        if data.get('version') != _FORMAT_VERSION:
+            return {}
+        return dict(data.get('outputs') or {})
+
+    def _key(self, output_path: str) -> str:
+        return os.path.relpath(os.path.abspath(output_path), os.path.abspath(self.output_dir))
+
+    def is_up_to_date(self, output_path: str, inputs: str) -> bool:
+        """True if ``output_path`` exists and was built from ``inputs``."""
+        with self._lock:
+            entry = self._entries.get(self._key(output_path))
+        if not entry or entry.get('inputs') != inputs:
+            return False
+        try:
+            return os.path.getsize(output_path) == entry.get('size')
+        except OSError:
+            return False
+
+    def record(self, output_path: str, inputs: str) -> None:
+        """Remember that ``output_path`` was just built from ``inputs``."""
+        entry = {
+            'inputs': inputs,
+            'size': os.path.getsize(output_path),
+            'built_at': time.time(),
+        }
+        key = self._key(output_path)
+        with self._lock:
+            self._entries[key] = entry
+            self._dirty[key] = entry
+
+    def save(self) -> None:
+        """Write pending entries, merging with entries saved by other processes."""
+        with self._lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, {}
+
+        def merge():
+            merged = self._read()
+            merged.update(dirty)
+            return {'version': _FORMAT_VERSION, 'outputs': merged}
+
+        merged = locked_merge_write(self.path, merge, indent=1, sort_keys=True)['outputs']
+        with self._lock:
+            for key, entry in merged.items():
+                self._entries.setdefault(key, entry)
+
@@ -0,0 +1,111 @@
+"""Concurrent prefetch of feed assets into the asset cache.
+
+Before the render loop starts, every transcript, artwork and (optionally)
+enclosure needed by the selected episodes is downloaded concurrently, so
+rendering reads from the cache instead of waiting on the network.
+
+Scheduling runs on an asyncio event loop; the blocking downloads themselves go
+through ``AssetCache.fetch`` on a thread pool (``run_in_executor``), reusing
+the shared pooled HTTP client. A semaphore per host caps how many requests hit
+one server at a time.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import logging
+import time
+
+from .cache import AssetCache, get_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PrefetchItem:
+    url: str
+    kind: str  # 'srt', 'artwork' or 'audio' (asset cache kinds)
+    segmented: bool = False
+
+
+@dataclass
+class PrefetchResult:
+    fetched: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+def plan_prefetch(episodes: Iterable[Dict], podcast_info: Dict, *,
+                  use_episode_cover: bool = False, audio: bool = False,
+                  segmented: bool = False) -> List[PrefetchItem]:
+    """List the unique assets the render loop will need for ``episodes``.
+
+    Mirrors what ``process_one_episode`` downloads: the SRT transcript, the
+    artwork (episode cover if requested and available, else the podcast
+    cover) and, with ``audio``, the enclosure.
+    """
+    items: List[PrefetchItem] = []
+    seen = set()
+
+    def add(url: Optional[str], kind: str, seg: bool = False) -> None:
+        if url and url not in seen:
+            seen.add(url)
+            items.append(PrefetchItem(url, kind, seg))
+
+    for ep in episodes:
+        add(ep.get('transcript_url'), 'srt')
+        if use_episode_cover and ep.get('image_url'):
+            add(ep['image_url'], 'artwork')
+        else:
+            add(podcast_info.get('image_url'), 'artwork')
+        if audio:
+            add(ep.get('audio_url'), 'audio', segmented)
+    return items
+
+
+async def _prefetch_async(cache: AssetCache, items: List[PrefetchItem], per_host: int,
+                          executor: ThreadPoolExecutor, result: PrefetchResult) -> None:
+    loop = asyncio.get_running_loop()
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def one(item: PrefetchItem) -> None:
+        host = urlsplit(item.url).netloc
+        sem = semaphores.setdefault(host, asyncio.Semaphore(per_host))
+        async with sem:
+            try:
+                await loop.run_in_executor(
+                    executor, lambda: cache.fetch(item.url, item.kind, segmented=item.segmented)
+                )
+                result.fetched += 1
+            except Exception as e:
+                # The render loop retries on its own and reports the error there
+                logger.warning("Prefetch failed for %s: %s", item.url, e)
+                result.failed.append((item.url, str(e)))
+
+    # Small assets first so transcripts and covers are ready early
+    order = {'srt': 0, 'artwork': 1, 'audio': 2}
+    await asyncio.gather(*(one(i) for i in sorted(items, key=lambda i: order.get(i.kind, 3))))
+
+
+def prefetch(items: List[PrefetchItem], *, per_host: int = 4, max_concurrency: int = 16,
+             cache: Optional[AssetCache] = None) -> PrefetchResult:
+    """Download ``items`` into the asset cache concurrently.
+
+    Failures are logged and collected, never raised. Without a cache there is
+    nowhere to keep the files, so nothing is fetched.
+    """
+    cache = cache or get_cache()
+    result = PrefetchResult()
+    if cache is None or not items:
+        return result
+    started = time.time()
+    workers = max(1, min(int(max_concurrency), len(items)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch') as executor:
+        asyncio.run(_prefetch_async(cache, items, max(1, int(per_host)), executor, result))
+    result.elapsed = time.time() - started
+    logger.info("Prefetched %d assets in %.2fs (%d failed)",
+                result.fetched, result.elapsed, len(result.failed))
+    return result
@@ -6,37 +6,78 @@ implementation in ``cli.get_podcast_episodes`` to preserve behavior.
 """
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
-import ssl
-import urllib.request
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 import xml.etree.ElementTree as ET
 import logging
 
 import feedparser  # type: ignore
 from .errors import RssError
+from .http_client import get_client
+from .episode_index import EpisodeIndex, SyncResult, content_hash
+from ..telemetry import stages
 
 logger = logging.getLogger(__name__)
 
 
-def fetch_feed(url: str, timeout: int = 10) -> str:
-    """Fetch RSS/Atom feed XML from a URL with a relaxed SSL context.
+@dataclass
+class FeedResponse:
+    """Result of a conditional feed fetch; ``text`` is None when not modified."""
 
-    Returns the decoded UTF-8 text. Raises exceptions on network errors.
+    text: Optional[str]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.text is None
+
+
+def fetch_feed(url: str, timeout: Optional[float] = None) -> str:
+    """Fetch RSS/Atom feed XML through the shared HTTP client (gzip negotiated).
+
+    Returns the decoded UTF-8 text. Raises ``RssError`` on network errors.
     """
     logger.info("Fetching RSS feed: %s", url)
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
+    try:
+        with stages.stage("feed_fetch"):
+            xml = get_client().get_text(url, timeout=timeout)
+        logger.debug("Fetched %d bytes of feed XML", len(xml))
+        return xml
+    except Exception as e:
+        logger.error("Failed to fetch RSS feed from %s: %s", url, e)
+        raise stages.failure(RssError(str(e)))
+
 
+def fetch_feed_conditional(url: str, etag: Optional[str] = None,
+                           last_modified: Optional[str] = None,
+                           timeout: Optional[float] = None) -> FeedResponse:
+    """Fetch the feed unless it is unchanged since ``etag``/``last_modified``.
+
+    Sends ``If-None-Match``/``If-Modified-Since`` when validators are known; a
+    ``304 Not Modified`` answer yields a response whose ``text`` is None.
+    Raises ``RssError`` on network errors.
+    """
+    headers = {"Accept-Encoding": "gzip, deflate"}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    logger.info("Fetching RSS feed: %s", url)
     try:
-        request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-        with urllib.request.urlopen(request, context=ssl_context, timeout=timeout) as response:
-            xml = response.read().decode("utf-8")
-            logger.debug("Fetched %d bytes of feed XML", len(xml))
-            return xml
+        with stages.stage("feed_fetch"):
+            response = get_client().get(url, headers=headers, timeout=timeout)
     except Exception as e:
         logger.error("Failed to fetch RSS feed from %s: %s", url, e)
-        raise RssError(str(e))
+        raise stages.failure(RssError(str(e)))
+    if response.status_code == 304:
+        logger.debug("Feed not modified: %s", url)
+        return FeedResponse(None, etag, last_modified)
+    return FeedResponse(
+        response.content.decode("utf-8"),
+        response.headers.get("ETag"),
+        response.headers.get("Last-Modified"),
+    )
 
 
 def parse_feed(feed_xml: str) -> Tuple[List[Dict], Dict]:
@@ -45,7 +86,7 @@ def parse_feed(feed_xml: str) -> Tuple[List[Dict], Dict]:
     The output shape matches the legacy CLI implementation:
     - podcast_info keys: ``title``, ``image_url`` (optional), ``keywords`` (optional)
     - episodes: list of dicts ordered oldest->newest, each contains:
-      ``number``, ``title``, ``link``, ``description``, ``soundbites`` (list),
+      ``number``, ``guid``, ``title``, ``link``, ``description``, ``soundbites`` (list),
       ``transcript_url`` (optional), ``audio_url`` (optional), ``keywords`` (optional),
       ``image_url`` (optional)
     """
@@ -150,6 +191,7 @@ def parse_feed(feed_xml: str) -> Tuple[List[Dict], Dict]:
         guid = entry.get('guid', entry.get('id', ''))
         episode = {
             'number': episode_number,
+            'guid': guid,
             'title': entry.get('title', 'Senza titolo'),
             'link': entry.get('link', ''),
             'description': entry.get('description', ''),
@@ -170,4 +212,31 @@ def get_podcast_episodes(feed_url: str) -> Tuple[List[Dict], Dict]:
     Network I/O is isolated to ``fetch_feed`` to allow tests to mock it.
     """
     xml_text = fetch_feed(feed_url)
-    return parse_feed(xml_text)
+    with stages.stage("feed_parse"):
+        return parse_feed(xml_text)
+
+
+def sync_feed_index(feed_url: str, index: EpisodeIndex) -> SyncResult:
+    """Fetch ``feed_url`` and sync it incrementally into ``index``.
+
+    The fetch is conditional on the ETag/Last-Modified of the previous sync,
+    so an unchanged feed costs a ``304`` and no download. When the server
+    ignores validators but the feed XML is byte-identical to the last synced
+    version, parsing is skipped and the stored episodes are reused.
+    """
+    etag, last_modified = index.feed_validators(feed_url)
+    response = fetch_feed_conditional(feed_url, etag, last_modified)
+    xml_text = response.text
+    if xml_text is None:
+        logger.info("Feed not modified since last sync: %s", feed_url)
+        index.touch(feed_url)
+        return SyncResult(unchanged=index.episode_count(feed_url), parsed=False, not_modified=True)
+    feed_hash = content_hash(xml_text)
+    if index.feed_hash(feed_url) == feed_hash:
+        logger.info("Feed unchanged since last sync: %s", feed_url)
+        index.touch(feed_url, response.etag, response.last_modified)
+        return SyncResult(unchanged=index.episode_count(feed_url), parsed=False)
+    with stages.stage("feed_parse"):
+        episodes, podcast_info = parse_feed(xml_text)
+    return index.sync(feed_url, episodes, podcast_info, feed_content_hash=feed_hash,
+                      etag=response.etag, last_modified=response.last_modified)
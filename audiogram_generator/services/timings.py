@@ -0,0 +1,98 @@
+"""Render time history stored in the output directory.
+
+Every rendered video appends a sample (format, cost units, predicted and
+actual seconds) to ``.audiogram-timings.json``. The next run fits a
+``core.cost.CostModel`` to the most recent samples, so the longest-first
+scheduling of jobs is calibrated to the machine that renders them.
+
+Like the build manifest, saves merge with what is on disk under an advisory
+lock, so several processes can render into the same directory.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+import json
+import logging
+import os
+import threading
+import time
+
+from ..core.cost import CostModel, prediction_error
+from .locking import locked_merge_write
+
+logger = logging.getLogger(__name__)
+
+TIMINGS_NAME = '.audiogram-timings.json'
+_FORMAT_VERSION = 1
+
+
+class RenderTimings:
+    """Recorded render times of one output directory and the model fitted to them.
+
+    ``keep`` bounds the history; only the newest samples are kept, so the
+    model follows hardware and renderer changes.
+    """
+
+    def __init__(self, output_dir: str, keep: int = 500):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, TIMINGS_NAME)
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._history: List[Dict] = self._read()
+        self._run: List[Dict] = []  # recorded by this process
+        self._unsaved: List[Dict] = []
+        self.model = CostModel.fit((s['units'], s['seconds']) for s in self._history)
+
+    def _read(self) -> List[Dict]:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable render timings %s: %s", self.path, e)
+            return []
+        if data.get('version') != _FORMAT_VERSION:
+            return []
+        return [s for s in data.get('samples') or [] if 'units' in s and 'seconds' in s]
+
+    def predict(self, units: float) -> float:
+        return self.model.predict(units)
+
+    def record(self, output_path: str, format_name: str, units: float, seconds: float,
+               predicted: Optional[float] = None) -> None:
+        """Add the measured render time of one video."""
+        sample = {
+            'output': os.path.basename(output_path),
+            'format': format_name,
+            'units': round(units, 3),
+            'seconds': round(seconds, 3),
+            'predicted': round(self.predict(units) if predicted is None else predicted, 3),
+            'at': time.time(),
+        }
+        with self._lock:
+            self._run.append(sample)
+            self._unsaved.append(sample)
+
+    def summary(self) -> Dict[str, float]:
+        """Predicted versus actual seconds of the videos recorded by this run."""
+        with self._lock:
+            samples = list(self._run)
+        return {
+            'videos': len(samples),
+            'predicted': sum(s['predicted'] for s in samples),
+            'actual': sum(s['seconds'] for s in samples),
+            'error_pct': prediction_error((s['predicted'], s['seconds']) for s in samples),
+        }
+
+    def save(self) -> None:
+        """Append this run's samples to the history file."""
+        with self._lock:
+            if not self._unsaved:
+                return
+            new, self._unsaved = self._unsaved, []
+        locked_merge_write(
+            self.path,
+            lambda: {'version': _FORMAT_VERSION, 'samples': (self._read() + new)[-self.keep:]},
+            indent=1,
+        )
@@ -5,37 +5,37 @@ SRT text. Designed to be testable offline by supplying SRT strings directly.
 """
 from __future__ import annotations
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 import re
-import ssl
-import urllib.request
 import logging
 
 from audiogram_generator.core import parse_srt_time
 from .errors import SrtFetchError
+from .http_client import get_client
+from .cache import get_cache
+from ..telemetry import stages
 
 logger = logging.getLogger(__name__)
 
 
-def fetch_srt(url: str, timeout: int = 10) -> str:
-    """Fetch SRT text from a URL using a relaxed SSL context and UA header.
+def fetch_srt(url: str, timeout: Optional[float] = None) -> str:
+    """Fetch SRT text through the asset cache or the shared HTTP client.
 
-    Returns the decoded UTF‑8 text. Raises exceptions on network errors.
+    Returns the decoded UTF‑8 text. Raises ``SrtFetchError`` on network errors.
     """
     logger.info("Fetching SRT: %s", url)
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
-
     try:
-        request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-        with urllib.request.urlopen(request, context=ssl_context, timeout=timeout) as response:
-            text = response.read().decode("utf-8")
-            logger.debug("Fetched SRT with %d chars", len(text))
-            return text
+        cache = get_cache()
+        if cache is not None:
+            with open(cache.fetch(url, 'srt'), 'rb') as f:
+                text = f.read().decode("utf-8")
+        else:
+            text = get_client().get_text(url, timeout=timeout)
+        logger.debug("Fetched SRT with %d chars", len(text))
+        return text
     except Exception as e:
         logger.error("Failed to fetch SRT from %s: %s", url, e)
-        raise SrtFetchError(str(e))
+        raise stages.failure(SrtFetchError(str(e)))
 
 
 def parse_srt_to_chunks(srt_text: str, start_time: float, duration: float) -> List[Dict]:
@@ -0,0 +1,15 @@
+"""Instrumentation of render runs.
+
+Stage timings, run reports, traces, profiles, live progress and metrics.
+
+Kept free of rendering and network imports so every layer (services,
+rendering, CLI) can record measurements without import cycles.
+"""
+
+__all__ = [
+    "stages",
+    "trace",
+    "profiling",
+    "progress",
+    "metrics",
+]
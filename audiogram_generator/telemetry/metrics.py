@@ -0,0 +1,134 @@
+"""Prometheus textfile export of a run's counters and render histograms.
+
+``write_metrics`` renders a ``stages.RunReport`` in the Prometheus text
+exposition format and replaces the file atomically. Point node-exporter's
+textfile collector (``--collector.textfile.directory``) at the directory
+and the render fleet is scraped without a network listener in the tool.
+The CLI refreshes the file after every finished video and at the end of
+the run. Values cover the current run, so counters start again from zero
+with each run, which ``rate()`` and ``increase()`` treat as a reset.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import io
+import os
+
+# Failure counters always exported, zero included (see services.errors)
+FAILURE_TYPES = ('RssError', 'SrtFetchError', 'AssetDownloadError', 'RenderError')
+# Render wall seconds per second of output video
+RENDER_RATIO_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+# Frames per second through MoviePy's write loop (composition plus encoding)
+ENCODER_FPS_BUCKETS = (5.0, 10.0, 15.0, 24.0, 30.0, 48.0, 60.0, 120.0)
+
+
+def _value(value: float) -> str:
+    if isinstance(value, float) and not value.is_integer():
+        return repr(float(value))
+    return str(int(value))
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+               for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+
+class _Writer:
+    def __init__(self):
+        self.out = io.StringIO()
+
+    def family(self, name: str, kind: str, help_text: str) -> None:
+        self.out.write(f"# HELP {name} {help_text}\n# TYPE {name} {kind}\n")
+
+    def sample(self, name: str, value: float, **labels: str) -> None:
+        self.out.write(f"{name}{_labels(labels)} {_value(value)}\n")
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float],
+                  values: Iterable[float]) -> None:
+        values = list(values)
+        self.family(name, 'histogram', help_text)
+        for bound in buckets:
+            self.sample(name + '_bucket', sum(1 for v in values if v <= bound), le=_value(bound))
+        self.sample(name + '_bucket', len(values), le='+Inf')
+        self.sample(name + '_sum', round(sum(values), 6))
+        self.sample(name + '_count', len(values))
+
+
+def job_render_ratio(job: Dict) -> Optional[float]:
+    """Render seconds per second of output of a finished job's report."""
+    if job.get('error') or not job.get('duration') or 'seconds' not in job:
+        return None
+    return job['seconds'] / float(job['duration'])
+
+
+def job_encoder_fps(job: Dict) -> Optional[float]:
+    """Frames per second through ``write_videofile`` (frame composition plus encoding)."""
+    stages = job.get('stages') or {}
+    frames = stages.get('frame_composition')
+    if job.get('error') or not frames:
+        return None
+    seconds = frames['wall'] + (stages.get('encode') or {}).get('wall', 0.0)
+    return frames['count'] / seconds if seconds > 0 else None
+
+
+def render_metrics(run) -> str:
+    """Prometheus text exposition of a ``stages.RunReport``."""
+    jobs: List[Dict] = list(run.jobs)
+    snapshot = run.times.snapshot()
+    counters = snapshot['counters']
+    w = _Writer()
+
+    w.family('audiogram_run_start_timestamp_seconds', 'gauge',
+             'Start time of the run the other metrics cover.')
+    w.sample('audiogram_run_start_timestamp_seconds', round(run.started_at, 3))
+
+    w.family('audiogram_jobs_total', 'counter', 'Videos rendered, by format and status.')
+    outcomes: Dict[Tuple[str, str], int] = {}
+    for job in jobs:
+        key = (str(job.get('format') or ''), 'failed' if job.get('error') else 'succeeded')
+        outcomes[key] = outcomes.get(key, 0) + 1
+    for (format_name, status), n in sorted(outcomes.items()):
+        w.sample('audiogram_jobs_total', n, format=format_name, status=status)
+
+    w.family('audiogram_frames_total', 'counter', 'Video frames composed.')
+    frames = snapshot['stages'].get('frame_composition', {}).get('count', 0)
+    w.sample('audiogram_frames_total', frames)
+
+    w.histogram('audiogram_render_seconds_per_output_second',
+                'Render wall seconds per second of output video, per video.',
+                RENDER_RATIO_BUCKETS, (r for r in map(job_render_ratio, jobs) if r is not None))
+    w.histogram('audiogram_encoder_fps', 'Frames per second composed and encoded, per video.',
+                ENCODER_FPS_BUCKETS, (f for f in map(job_encoder_fps, jobs) if f is not None))
+
+    w.family('audiogram_downloaded_bytes_total', 'counter', 'Bytes received over HTTP.')
+    w.sample('audiogram_downloaded_bytes_total', counters.get('http.bytes', 0))
+
+    kinds = sorted({name.split('.')[1] for name in counters
+                    if name.startswith('cache.') and name.count('.') == 2})
+    for outcome in ('hits', 'misses'):
+        name = f'audiogram_cache_{outcome}_total'
+        w.family(name, 'counter', f'Asset cache {outcome}, by cache.')
+        for kind in kinds:
+            w.sample(name, counters.get(f'cache.{kind}.{outcome}', 0), cache=kind)
+
+    w.family('audiogram_failures_total', 'counter', 'Failures by exception type.')
+    failures = {name.split('.', 1)[1] for name in counters if name.startswith('failures.')}
+    for error in list(FAILURE_TYPES) + sorted(failures - set(FAILURE_TYPES)):
+        w.sample('audiogram_failures_total', counters.get(f'failures.{error}', 0), type=error)
+    return w.out.getvalue()
+
+
+def write_metrics(path: str, run) -> str:
+    """Write ``render_metrics(run)`` to ``path`` atomically; returns ``path``."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Not ending in .prom, so the collector never reads a partial file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(render_metrics(run))
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,215 @@
+"""Per-job CPU (cProfile) and memory (tracemalloc) profiles of renders.
+
+With ``configure('cpu')`` every render wrapped in ``profile_job`` writes
+``<video>.pstats`` (load it with ``pstats`` or snakeviz) and a text summary
+``<video>.cpu.txt`` next to the video. With ``configure('mem')`` it writes
+``<video>.alloc.txt``: peak traced memory, then the top allocations by line
+at the frame where traced memory was highest.
+
+Both summaries list the per-frame hot path (the ``hot_path`` functions)
+separately. cProfile attributes time to those functions on its own. In
+memory mode they are wrapped for the job, recording the peak memory each
+call allocates on top of what was live when it started.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cpu', 'mem')
+# Entries listed in the text reports
+TOP_N = 25
+# Stack depth kept per allocation; enough to reach the render call from PIL/NumPy
+TRACEMALLOC_FRAMES = 25
+
+_mode: Optional[str] = None
+
+
+def configure(mode: Optional[str]) -> None:
+    """Profile every following render job: 'cpu', 'mem', or None for off."""
+    global _mode
+    if mode is not None and mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode {mode!r} "
+                         f"(expected one of {', '.join(PROFILE_MODES)})")
+    _mode = mode
+
+
+def get_mode() -> Optional[str]:
+    return _mode
+
+
+@contextmanager
+def profile_job(path_prefix: str, module=None, hot_path: Sequence[str] = ()) -> Iterator[None]:
+    """Profile the block as one job, writing ``<path_prefix>.*`` reports.
+
+    ``module`` holds the ``hot_path`` functions. A failed job still writes
+    its profile. A report that cannot be written is logged and skipped.
+    """
+    if _mode == 'cpu':
+        with _cpu_profile(path_prefix, hot_path):
+            yield
+    elif _mode == 'mem':
+        with _mem_profile(path_prefix, module, hot_path):
+            yield
+    else:
+        yield
+
+
+def _write(path: str, text: str) -> None:
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    except OSError as e:
+        logger.warning("Could not write profile %s: %s", path, e)
+    else:
+        logger.info("Profile written to %s", path)
+
+
+@contextmanager
+def _cpu_profile(path_prefix: str, hot_path: Sequence[str]) -> Iterator[None]:
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        try:
+            profiler.dump_stats(path_prefix + '.pstats')
+        except OSError as e:
+            logger.warning("Could not write profile %s.pstats: %s", path_prefix, e)
+        _write(path_prefix + '.cpu.txt', cpu_summary(profiler, hot_path))
+
+
+def cpu_summary(profile: Union[cProfile.Profile, str], hot_path: Sequence[str] = (),
+                top: int = TOP_N) -> str:
+    """Hot-path functions, then the ``top`` functions by cumulative time.
+
+    ``profile`` is a finished ``cProfile.Profile`` or a ``.pstats`` file.
+    """
+    out = io.StringIO()
+    stats = pstats.Stats(profile, stream=out)
+    # The raw table and total are undocumented attributes (typeshed omits
+    # them); get_stats_profile() would need Python 3.9
+    table, total_tt = stats.stats, stats.total_tt  # type: ignore[attr-defined]
+    out.write(f"Total: {total_tt:.3f}s CPU\n\nHot path (per-frame functions):\n")
+    out.write(f"  {'function':<34} {'calls':>8} {'own s':>9} {'total s':>9} {'ms/call':>9}\n")
+    for name in hot_path:
+        calls = own = total = 0.0
+        for (_file, _line, func), (_cc, ncalls, tottime, cumtime, _callers) in table.items():
+            if func == name:
+                calls += ncalls
+                own += tottime
+                total += cumtime
+        per_call = 1000.0 * total / calls if calls else 0.0
+        out.write(f"  {name:<34} {int(calls):>8} {own:>9.3f} {total:>9.3f} {per_call:>9.3f}\n")
+    out.write(f"\nTop {top} by cumulative time:\n")
+    stats.sort_stats('cumulative').print_stats(top)
+    return out.getvalue()
+
+
+class _HotPathMemory:
+    """Peak memory allocated by each wrapped call, nested calls included.
+
+    ``tracemalloc`` keeps a single peak, so it is reset when a call starts and
+    folded into every open call (and the job's peak) at each boundary.
+    """
+
+    def __init__(self):
+        self.calls: Dict[str, List[int]] = {}
+        self.job_peak = 0
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.snapshot_memory = 0
+        self._open: List[List[int]] = []  # [memory at entry, peak seen since]
+
+    def fold(self) -> int:
+        current, peak = tracemalloc.get_traced_memory()
+        self.job_peak = max(self.job_peak, peak)
+        for region in self._open:
+            region[1] = max(region[1], peak)
+        if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+; before, peaks are job-wide
+            tracemalloc.reset_peak()
+        return current
+
+    def wrap(self, name: str, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            current = self.fold()
+            region = [current, current]
+            self._open.append(region)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                current = self.fold()
+                self._open.remove(region)
+                self.calls.setdefault(name, []).append(region[1] - region[0])
+                # Keep the live allocations of the fullest frame boundary seen
+                if current > self.snapshot_memory * 1.1:
+                    self.snapshot_memory = current
+                    self.snapshot = tracemalloc.take_snapshot()
+        return wrapper
+
+
+@contextmanager
+def _mem_profile(path_prefix: str, module, hot_path: Sequence[str]) -> Iterator[None]:
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    tracker = _HotPathMemory()
+    tracker.fold()
+    originals = {name: getattr(module, name) for name in hot_path
+                 if module is not None and hasattr(module, name)}
+    for name, fn in originals.items():
+        setattr(module, name, tracker.wrap(name, fn))
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        for name, fn in originals.items():
+            setattr(module, name, fn)
+        tracker.fold()
+        snapshot = tracker.snapshot or tracemalloc.take_snapshot()
+        if started_here:
+            tracemalloc.stop()
+        _write(path_prefix + '.alloc.txt',
+               mem_summary(tracker, snapshot, list(originals), time.perf_counter() - started))
+
+
+def _mib(n: float) -> str:
+    return f"{n / 2 ** 20:.1f} MiB"
+
+
+def mem_summary(tracker: _HotPathMemory, snapshot: tracemalloc.Snapshot,
+                hot_path: Sequence[str] = (), seconds: float = 0.0, top: int = TOP_N) -> str:
+    """Peak memory, hot-path peaks per call and the top allocations of ``snapshot``."""
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        # Modules imported lazily by the first frame
+        tracemalloc.Filter(False, '<frozen importlib.*>'),
+    ))
+    out = io.StringIO()
+    out.write(f"Peak traced memory: {_mib(tracker.job_peak)} ({seconds:.1f}s traced)\n")
+    out.write("\nHot path (peak allocated per call, above the memory live at entry):\n")
+    out.write(f"  {'function':<34} {'calls':>8} {'mean':>12} {'max':>12}\n")
+    for name in hot_path:
+        peaks = tracker.calls.get(name) or [0]
+        calls = len(tracker.calls.get(name) or [])
+        mean = _mib(sum(peaks) / len(peaks))
+        out.write(f"  {name:<34} {calls:>8} {mean:>12} {_mib(max(peaks)):>12}\n")
+    label = (f"at the frame with the most live memory ({_mib(tracker.snapshot_memory)})"
+             if tracker.snapshot is not None else "at the end of the job")
+    out.write(f"\nTop {top} allocations by line, {label}:\n")
+    for index, stat in enumerate(snapshot.statistics('lineno')[:top], 1):
+        frame = stat.traceback[0]
+        out.write(f"  #{index} {frame.filename}:{frame.lineno}: "
+                  f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+    return out.getvalue()
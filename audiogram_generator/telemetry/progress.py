@@ -0,0 +1,338 @@
+"""Live progress of a render run across all running jobs.
+
+Render jobs announce themselves with ``job`` and report each composed
+frame with ``frame_done``; the events go to the process's *sink*. In the
+process that runs the ``ProgressReporter`` the sink is the reporter itself.
+Render workers get a multiprocessing queue instead (see ``worker_queue``),
+drained by a reporter thread. Downloads are followed through the HTTP
+client's download listeners.
+
+The reporter shows frames/s of every running job, the aggregate encoded
+seconds per wall second (realtime factor), download MB/s, the number of
+queued videos and an ETA. On a terminal it redraws one status line; other
+streams get a plain line every ``interval`` seconds, so a regression or a
+stuck job also shows up in the log of a batch run.
+"""
+from __future__ import annotations
+
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, Optional, Tuple
+import multiprocessing
+import os
+import shutil
+import sys
+import threading
+import time
+
+# Seconds between two frame updates sent by one job
+UPDATE_INTERVAL = 0.5
+# Window of the aggregate rates (encoded seconds, download bytes)
+RATE_WINDOW = 30.0
+# A job without frame updates for this long is shown as stalled
+STALL_SECONDS = 30.0
+
+Event = Tuple
+_sink: Optional[Callable[[Event], None]] = None
+_reporter: Optional["ProgressReporter"] = None
+_local = threading.local()
+
+
+def set_sink(sink: Optional[Callable[[Event], None]]) -> None:
+    """Where this process sends job events (None: nowhere)."""
+    global _sink
+    _sink = sink
+
+
+def active() -> bool:
+    """Whether job progress is being reported (MoviePy's own bar is then off)."""
+    return _sink is not None
+
+
+class _JobState:
+    __slots__ = ('key', 'frames', 'media', 'sent')
+
+    def __init__(self, key):
+        self.key = key
+        self.frames = 0
+        self.media = 0.0
+        self.sent = 0.0
+
+
+@contextmanager
+def job(key: str, duration: float) -> Iterator[None]:
+    """Report the block as the render of ``key`` (an output path), ``duration`` seconds long."""
+    sink = _sink
+    if sink is None:
+        yield
+        return
+    state = _JobState(key)
+    _local.job = state
+    sink(('start', key, os.getpid(), float(duration), time.time()))
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        _local.job = None
+        sink(('end', key, ok, state.frames, state.media, time.time()))
+
+
+def frame_done(media_time: float) -> None:
+    """One frame of the current job composed, at ``media_time`` seconds of the video."""
+    state = getattr(_local, 'job', None)
+    sink = _sink
+    if state is None or sink is None:
+        return
+    state.frames += 1
+    state.media = media_time
+    now = time.monotonic()
+    if now - state.sent >= UPDATE_INTERVAL:
+        state.sent = now
+        sink(('frames', state.key, state.frames, media_time, time.time()))
+
+
+def queued(key: str, duration: float) -> None:
+    """Announce a video that will be rendered (counts towards queue depth and ETA)."""
+    if _reporter is not None:
+        _reporter.queue(key, duration)
+
+
+def skipped(key: str) -> None:
+    """Withdraw an announced video that will not be rendered (up to date)."""
+    if _reporter is not None:
+        _reporter.skip(key)
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class ProgressReporter:
+    """Aggregate job, frame and download events and show them periodically.
+
+    ``tty`` defaults to whether ``stream`` is a terminal; ``interval``
+    (seconds between updates) to 0.5 on a terminal and 30 otherwise.
+    """
+
+    def __init__(self, stream=None, interval: Optional[float] = None, tty: Optional[bool] = None):
+        self.stream = stream or sys.stderr
+        if tty is None:
+            isatty = getattr(self.stream, 'isatty', None)
+            tty = bool(isatty and isatty())
+        self.tty = tty
+        self.interval = interval or (0.5 if tty else 30.0)
+        self._lock = threading.Lock()
+        self._queued: Dict[str, float] = {}
+        self._running: Dict[str, Dict] = {}
+        self.done = 0
+        self.failed = 0
+        self._encoded: Deque[Tuple[float, float]] = deque()
+        self._downloaded: Deque[Tuple[float, int]] = deque()
+        self._download_seen: Dict[int, int] = {}
+        self._started = time.time()
+        self._stop = threading.Event()
+        self._ticker: Optional[threading.Thread] = None
+        self._queue: Optional[multiprocessing.Queue] = None
+        self._drainer: Optional[threading.Thread] = None
+
+    # -- events -----------------------------------------------------------
+
+    def queue(self, key: str, duration: float) -> None:
+        with self._lock:
+            if key not in self._running:
+                self._queued[key] = float(duration)
+
+    def skip(self, key: str) -> None:
+        with self._lock:
+            self._queued.pop(key, None)
+
+    def handle(self, event: Event) -> None:
+        kind, key = event[0], event[1]
+        with self._lock:
+            if kind == 'start':
+                _kind, _key, pid, duration, at = event
+                self._queued.pop(key, None)
+                self._running[key] = {'pid': pid, 'duration': duration, 'frames': 0, 'media': 0.0,
+                                      'started': at, 'updated': at, 'fps': 0.0}
+            elif kind == 'frames':
+                _kind, _key, frames, media, at = event
+                self._update(key, frames, media, at)
+            elif kind == 'end':
+                _kind, _key, ok, frames, media, at = event
+                self._update(key, frames, media, at)
+                self._running.pop(key, None)
+                if ok:
+                    self.done += 1
+                else:
+                    self.failed += 1
+
+    def _update(self, key: str, frames: int, media: float, at: float) -> None:
+        job = self._running.get(key)
+        if job is None:
+            return
+        elapsed = at - job['updated']
+        if elapsed > 0 and frames > job['frames']:
+            job['fps'] = (frames - job['frames']) / elapsed
+        if media > job['media']:
+            self._encoded.append((at, media - job['media']))
+        job.update(frames=frames, media=media, updated=at)
+
+    def on_download(self, stats, done: bool) -> None:
+        """``http_client`` download listener."""
+        now = time.time()
+        with self._lock:
+            key = id(stats)
+            previous = self._download_seen.get(key, stats.resumed_from)
+            if stats.bytes_done > previous:
+                self._downloaded.append((now, stats.bytes_done - previous))
+            if done:
+                self._download_seen.pop(key, None)
+            else:
+                self._download_seen[key] = stats.bytes_done
+
+    # -- rates ------------------------------------------------------------
+
+    def _window(self, samples: Deque, now: float) -> float:
+        while samples and samples[0][0] < now - RATE_WINDOW:
+            samples.popleft()
+        span = min(RATE_WINDOW, now - self._started)
+        return sum(value for _at, value in samples) / span if span > 0 else 0.0
+
+    def status(self, now: Optional[float] = None) -> Dict:
+        """Current figures: jobs with fps and progress, rates, queue depth and ETA."""
+        now = time.time() if now is None else now
+        with self._lock:
+            realtime = self._window(self._encoded, now)
+            download = self._window(self._downloaded, now)
+            jobs = []
+            remaining = sum(self._queued.values())
+            for key, job in sorted(self._running.items(), key=lambda item: item[1]['started']):
+                stalled = now - job['updated'] if now - job['updated'] >= STALL_SECONDS else None
+                jobs.append({
+                    'name': os.path.basename(key),
+                    'pid': job['pid'],
+                    'percent': 100.0 * job['media'] / job['duration'] if job['duration'] else 0.0,
+                    'fps': 0.0 if stalled else job['fps'],
+                    'stalled': stalled,
+                })
+                remaining += max(0.0, job['duration'] - job['media'])
+            return {
+                'done': self.done,
+                'failed': self.failed,
+                'queued': len(self._queued),
+                'running': jobs,
+                'realtime': realtime,
+                'download_mbps': download / 1e6,
+                'eta': remaining / realtime if realtime > 0 else None,
+                'elapsed': now - self._started,
+            }
+
+    def format_status(self, status: Dict) -> str:
+        parts = [f"{status['done']} done"]
+        if status['failed']:
+            parts[0] += f", {status['failed']} failed"
+        parts[0] += f", {len(status['running'])} running, {status['queued']} queued"
+        for job in status['running']:
+            if job['stalled']:
+                stalled = _format_duration(job['stalled'])
+                parts.append(f"{job['name']} {job['percent']:.0f}% stalled {stalled}")
+            else:
+                parts.append(f"{job['name']} {job['percent']:.0f}% {job['fps']:.0f} fps")
+        parts.append(f"{status['realtime']:.1f}x realtime")
+        if status['download_mbps'] > 0:
+            parts.append(f"↓ {status['download_mbps']:.1f} MB/s")
+        if status['eta'] is not None:
+            parts.append(f"ETA {_format_duration(status['eta'])}")
+        return " | ".join(parts)
+
+    # -- output -----------------------------------------------------------
+
+    def render(self) -> None:
+        line = self.format_status(self.status())
+        if self.tty:
+            width = shutil.get_terminal_size((120, 20)).columns - 1
+            self.stream.write("\r\x1b[K" + line[:width])
+        else:
+            self.stream.write(time.strftime('%H:%M:%S') + " progress: " + line + "\n")
+        self.stream.flush()
+
+    def _tick(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.render()
+            except (OSError, ValueError):  # pragma: no cover - stream closed
+                return
+
+    def _drain(self, queue: multiprocessing.Queue) -> None:
+        while True:
+            event = queue.get()
+            if event is None:
+                return
+            self.handle(event)
+
+    def worker_queue(self):
+        """Queue render worker processes send their events to (created on first use)."""
+        with self._lock:
+            if self._queue is None:
+                self._queue = multiprocessing.get_context('spawn').Queue()
+                self._drainer = threading.Thread(target=self._drain, args=(self._queue,),
+                                                 name='progress-drain', daemon=True)
+                self._drainer.start()
+            return self._queue
+
+    def start(self) -> "ProgressReporter":
+        from audiogram_generator.services import http_client
+
+        http_client.add_download_listener(self.on_download)
+        self._ticker = threading.Thread(target=self._tick, name='progress', daemon=True)
+        self._ticker.start()
+        return self
+
+    def stop(self) -> None:
+        from audiogram_generator.services import http_client
+
+        http_client.remove_download_listener(self.on_download)
+        self._stop.set()
+        if self._ticker is not None:
+            self._ticker.join()
+        if self._queue is not None:
+            self._queue.put(None)
+            if self._drainer is not None:
+                self._drainer.join(timeout=5)
+            self._queue.close()
+        self.render()
+        if self.tty:
+            self.stream.write("\n")
+            self.stream.flush()
+
+
+def start_reporter(stream=None, interval: Optional[float] = None) -> ProgressReporter:
+    """Start reporting the progress of this process's renders and downloads."""
+    global _reporter
+    stop_reporter()
+    _reporter = ProgressReporter(stream, interval).start()
+    set_sink(_reporter.handle)
+    return _reporter
+
+
+def get_reporter() -> Optional[ProgressReporter]:
+    return _reporter
+
+
+def stop_reporter() -> None:
+    global _reporter
+    reporter, _reporter = _reporter, None
+    if reporter is not None:
+        set_sink(None)
+        reporter.stop()
+
+
+def worker_queue():
+    """The active reporter's queue for render workers, or None."""
+    return _reporter.worker_queue() if _reporter is not None else None
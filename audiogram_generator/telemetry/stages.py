@@ -0,0 +1,443 @@
+"""Per-stage timing of render runs and the JSON run report.
+
+Instrumented code wraps each pipeline stage (feed fetch, audio download,
+waveform, frame composition, encoding, ...) in ``stage(name)``, which
+records wall and CPU seconds, and bumps counters (bytes downloaded, cache
+hits and misses, failures by exception type) with ``count``. Per-frame timings are recorded with
+``sample`` so percentiles can be reported.
+
+Measurements land in the innermost *job scope* of the current thread (see
+``job_scope``), or else in the active run (``start_run``). Render jobs run
+in a job scope, possibly in a worker process; the scope's ``snapshot`` goes
+back to the parent, which adds it to the run with ``RunReport.add_job``.
+Without a scope or an active run nothing is recorded.
+
+With tracing on (``configure_trace``) stages and ``span`` blocks are also
+kept as trace events (see ``telemetry.trace``), every Nth frame included.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import math
+import os
+import random
+import threading
+import time
+
+resource: Optional[ModuleType]
+try:  # CPU time of terminated child processes (FFmpeg)
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+# Raw samples kept per name; beyond this a uniform reservoir sample is kept
+MAX_SAMPLES = 10000
+# With tracing on, one frame in this many gets its own trace events
+TRACE_FRAME_SAMPLE = 10
+
+_tracing = False
+_frame_sample = TRACE_FRAME_SAMPLE
+# Converts perf_counter() readings to epoch seconds (trace timestamps)
+_clock_offset = time.time() - time.perf_counter()
+
+
+def children_cpu() -> float:
+    """CPU seconds used by the terminated child processes of this process."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Count, total, mean, p50/p90/p99 and max of ``values`` (nearest rank)."""
+    if not values:
+        return {'count': 0, 'total': 0.0}
+    ordered = sorted(values)
+    n = len(ordered)
+
+    def rank(p):
+        return ordered[min(n - 1, max(0, math.ceil(p / 100.0 * n) - 1))]
+
+    total = sum(ordered)
+    return {
+        'count': n,
+        'total': round(total, 6),
+        'mean': round(total / n, 6),
+        'p50': round(rank(50), 6),
+        'p90': round(rank(90), 6),
+        'p99': round(rank(99), 6),
+        'max': round(ordered[-1], 6),
+    }
+
+
+class StageTimes:
+    """Accumulated stage times, counters and samples of one scope."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, float] = {}
+        self.samples: Dict[str, List[float]] = {}
+        self.events: List[Dict] = []
+        self.threads: Dict[Tuple[int, int], str] = {}
+        self._seen: Dict[str, int] = {}
+        self._random = random.Random(0)
+
+    def add(self, name: str, wall: float, cpu: float = 0.0, count: int = 1) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(name, {'count': 0, 'wall': 0.0, 'cpu': 0.0})
+            entry['count'] += count
+            entry['wall'] += wall
+            entry['cpu'] += cpu
+
+    def count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def sample(self, name: str, value: float) -> None:
+        with self._lock:
+            self._add_samples(name, [value])
+
+    def add_event(self, event: Dict, thread_name: str) -> None:
+        with self._lock:
+            self.events.append(event)
+            self.threads[(event['pid'], event['tid'])] = thread_name
+
+    def _add_samples(self, name: str, values: List[float]) -> None:
+        kept = self.samples.setdefault(name, [])
+        for value in values:
+            seen = self._seen.get(name, 0) + 1
+            self._seen[name] = seen
+            if len(kept) < MAX_SAMPLES:
+                kept.append(value)
+            else:
+                slot = self._random.randrange(seen)
+                if slot < MAX_SAMPLES:
+                    kept[slot] = value
+
+    def snapshot(self) -> Dict:
+        """Picklable copy, raw samples and trace events included (see ``merge``)."""
+        with self._lock:
+            snapshot = {
+                'stages': {name: dict(entry) for name, entry in self.stages.items()},
+                'counters': dict(self.counters),
+                'samples': {name: list(values) for name, values in self.samples.items()},
+            }
+            if self.events:
+                snapshot['events'] = list(self.events)
+                snapshot['threads'] = [[pid, tid, name]
+                                       for (pid, tid), name in self.threads.items()]
+            return snapshot
+
+    def merge(self, snapshot: Dict) -> None:
+        """Add another scope's ``snapshot`` to this one."""
+        for name, entry in snapshot.get('stages', {}).items():
+            self.add(name, entry['wall'], entry['cpu'], entry['count'])
+        for name, n in snapshot.get('counters', {}).items():
+            self.count(name, n)
+        with self._lock:
+            for name, values in snapshot.get('samples', {}).items():
+                self._add_samples(name, values)
+            self.events.extend(snapshot.get('events', ()))
+            for pid, tid, name in snapshot.get('threads', ()):
+                self.threads[(pid, tid)] = name
+
+
+def summarize(snapshot: Dict) -> Dict:
+    """JSON-ready form of a snapshot: rounded stages, counters, sample percentiles."""
+    return {
+        'stages': {
+            name: {'count': entry['count'], 'wall': round(entry['wall'], 6),
+                   'cpu': round(entry['cpu'], 6)}
+            for name, entry in sorted(snapshot.get('stages', {}).items())
+        },
+        'counters': dict(sorted(snapshot.get('counters', {}).items())),
+        'samples': {name: percentiles(values)
+                    for name, values in sorted(snapshot.get('samples', {}).items())},
+    }
+
+
+class RunReport:
+    """Measurements of one run: run-level stages plus every job's report.
+
+    ``report_dir`` is where ``write`` puts the report by default,
+    ``trace_path`` where ``write_trace`` puts the trace events and
+    ``metrics_path`` where ``write_metrics`` puts the Prometheus textfile.
+    """
+
+    def __init__(self, report_dir: Optional[str] = None, trace_path: Optional[str] = None,
+                 metrics_path: Optional[str] = None):
+        self.report_dir = report_dir
+        self.trace_path = trace_path
+        self.metrics_path = metrics_path
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._wall0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        self._children0 = children_cpu()
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.times = StageTimes()
+        self.jobs: List[Dict] = []
+        self.extra: Dict = {}
+        self._lock = threading.Lock()
+
+    def add_job(self, info: Dict, snapshot: Optional[Dict]) -> Dict:
+        """Record one finished job; returns its JSON report."""
+        snapshot = snapshot or {}
+        self.times.merge(snapshot)
+        job = dict(info)
+        job.update(summarize(snapshot))
+        with self._lock:
+            self.jobs.append(job)
+        return job
+
+    def finish(self) -> None:
+        self.finished_at = time.time()
+        self.wall = time.perf_counter() - self._wall0
+        self.cpu = time.process_time() - self._cpu0 + children_cpu() - self._children0
+
+    def to_dict(self) -> Dict:
+        if self.finished_at is None:
+            self.finish()
+        report: Dict[str, Any] = {
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'wall': round(self.wall, 6),
+            'cpu': round(self.cpu, 6),
+            'pid': os.getpid(),
+        }
+        report.update(summarize(self.times.snapshot()))
+        report.update(self.extra)
+        with self._lock:
+            report['jobs'] = list(self.jobs)
+        return report
+
+    def write(self, report_dir: Optional[str] = None, name: Optional[str] = None) -> str:
+        """Write the run report and one file per job under ``report_dir``.
+
+        The run goes to ``<name>.json`` and each job to ``<name>/<video>.json``;
+        ``name`` defaults to ``run-<start time>-<pid>``. Returns the run's path.
+        """
+        report_dir = report_dir or self.report_dir
+        if report_dir is None:
+            raise ValueError("No report directory given")
+        data = self.to_dict()
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))
+        name = name or f"run-{stamp}-{os.getpid()}"
+        jobs_dir = os.path.join(report_dir, name)
+        os.makedirs(jobs_dir, exist_ok=True)
+        for job in data['jobs']:
+            job_name = os.path.splitext(os.path.basename(job.get('output') or 'job'))[0]
+            with open(os.path.join(jobs_dir, job_name + '.json'), 'w', encoding='utf-8') as f:
+                json.dump(job, f, indent=1)
+        path = os.path.join(report_dir, name + '.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        return path
+
+    def write_trace(self, path: Optional[str] = None) -> str:
+        """Write the recorded trace events as Chrome trace-event JSON."""
+        from .trace import write_trace
+
+        path = path or self.trace_path
+        if path is None:
+            raise ValueError("No trace file path given")
+        return write_trace(path, self.times.snapshot(), os.getpid())
+
+    def write_metrics(self, path: Optional[str] = None) -> str:
+        """Write the run's counters and render histograms as a Prometheus textfile."""
+        from .metrics import write_metrics
+
+        path = path or self.metrics_path
+        if path is None:
+            raise ValueError("No metrics file path given")
+        return write_metrics(path, self)
+
+
+_local = threading.local()
+_run: Optional[RunReport] = None
+
+
+def _scopes() -> List[StageTimes]:
+    scopes = getattr(_local, 'scopes', None)
+    if scopes is None:
+        scopes = _local.scopes = []
+    return scopes
+
+
+def _target() -> Optional[StageTimes]:
+    scopes = _scopes()
+    if scopes:
+        return scopes[-1]
+    return _run.times if _run is not None else None
+
+
+def start_run(report_dir: Optional[str] = None, trace_path: Optional[str] = None,
+              metrics_path: Optional[str] = None) -> RunReport:
+    """Begin collecting run-level measurements in this process.
+
+    With a ``trace_path`` tracing is turned on until ``end_run``.
+    """
+    global _run
+    _run = RunReport(report_dir, trace_path, metrics_path)
+    if trace_path:
+        configure_trace(True, _frame_sample)
+    return _run
+
+
+def get_run() -> Optional[RunReport]:
+    return _run
+
+
+def end_run() -> Optional[RunReport]:
+    """Stop collecting; returns the finished report (None if none was active)."""
+    global _run
+    run, _run = _run, None
+    if run is not None:
+        run.finish()
+        if run.trace_path:
+            configure_trace(False, _frame_sample)
+    return run
+
+
+@contextmanager
+def job_scope() -> Iterator[StageTimes]:
+    """Record this thread's measurements into a fresh ``StageTimes``."""
+    times = StageTimes()
+    _scopes().append(times)
+    try:
+        yield times
+    finally:
+        _scopes().pop()
+
+
+class Measurement:
+    """Wall and CPU seconds of a measured block, filled in when it exits."""
+
+    __slots__ = ('wall', 'cpu')
+
+    def __init__(self, wall: float = 0.0, cpu: float = 0.0):
+        self.wall = wall
+        self.cpu = cpu
+
+
+@contextmanager
+def measure(children: bool = False) -> Iterator[Measurement]:
+    """Time a block without recording it (wall and this thread's CPU seconds).
+
+    With ``children`` the CPU time of child processes that finished meanwhile
+    (e.g. an FFmpeg encoder) is included.
+    """
+    result = Measurement()
+    wall0 = time.perf_counter()
+    cpu0 = time.thread_time()
+    child0 = children_cpu() if children else 0.0
+    try:
+        yield result
+    finally:
+        result.cpu = time.thread_time() - cpu0
+        if children:
+            result.cpu += children_cpu() - child0
+        result.wall = time.perf_counter() - wall0
+
+
+@contextmanager
+def stage(name: str, children: bool = False, trace: bool = True) -> Iterator[Measurement]:
+    """Time a block as stage ``name``; see ``measure``.
+
+    While tracing, the block also becomes a trace event unless ``trace`` is
+    false (frames that are not sampled).
+    """
+    result = Measurement()
+    started = time.perf_counter()
+    try:
+        with measure(children) as result:
+            yield result
+    finally:
+        add(name, result.wall, result.cpu)
+        if trace and _tracing:
+            add_span(name, started, result.wall)
+
+
+@contextmanager
+def span(name: str, cat: str = 'span', **args: Any) -> Iterator[None]:
+    """Trace a block that is not a stage (a job, a wait); no-op unless tracing."""
+    if not _tracing:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_span(name, started, time.perf_counter() - started, cat, args)
+
+
+def add_span(name: str, started: float, duration: float, cat: str = 'stage',
+             args: Optional[Dict] = None) -> None:
+    """Record a trace event that began at ``started`` (a ``perf_counter`` reading)."""
+    if not _tracing:
+        return
+    target = _target()
+    if target is None:
+        return
+    thread = threading.current_thread()
+    event = {
+        'name': name,
+        'cat': cat,
+        'ph': 'X',
+        'ts': round((started + _clock_offset) * 1e6, 1),
+        'dur': round(duration * 1e6, 1),
+        'pid': os.getpid(),
+        'tid': thread.native_id or thread.ident,
+    }
+    if args:
+        event['args'] = args
+    target.add_event(event, thread.name)
+
+
+def configure_trace(enabled: bool = True, frame_sample: int = TRACE_FRAME_SAMPLE) -> None:
+    """Turn trace events on or off in this process (workers get the parent's setting)."""
+    global _tracing, _frame_sample
+    _tracing = bool(enabled)
+    _frame_sample = max(1, int(frame_sample or 1))
+
+
+def trace_settings() -> Dict:
+    return {'enabled': _tracing, 'frame_sample': _frame_sample}
+
+
+def traced_frame(index: int) -> bool:
+    """Whether frame number ``index`` of a video gets trace events."""
+    return _tracing and index % _frame_sample == 0
+
+
+def add(name: str, wall: float, cpu: float = 0.0) -> None:
+    """Record an already measured stage."""
+    target = _target()
+    if target is not None:
+        target.add(name, wall, cpu)
+
+
+def count(name: str, n: float = 1) -> None:
+    """Bump counter ``name`` (e.g. ``http.bytes``, ``cache.audio.hits``)."""
+    target = _target()
+    if target is not None:
+        target.count(name, n)
+
+
+def failure(error: BaseException) -> BaseException:
+    """Count ``error`` as ``failures.<exception type>``; returns it, to be raised."""
+    count('failures.' + type(error).__name__)
+    return error
+
+
+def sample(name: str, value: float) -> None:
+    """Record one sample (e.g. a frame's composition seconds) for percentiles."""
+    target = _target()
+    if target is not None:
+        target.sample(name, value)
@@ -0,0 +1,48 @@
+"""Chrome/Perfetto trace-event export of a run.
+
+The events recorded while tracing (see ``stages.configure_trace``) are
+complete events (``"ph": "X"``) with microsecond timestamps on the epoch
+clock, so spans from the main process and from render worker processes
+line up on one timeline. Load the file in ``chrome://tracing`` or
+https://ui.perfetto.dev.
+
+Categories: ``stage`` for pipeline stages (sampled per-frame composition
+and encoder writes included), ``job`` for whole renders and episodes, and
+``wait`` for time spent blocked on another part of the pipeline.
+"""
+from __future__ import annotations
+
+from typing import Dict, List
+import json
+import os
+
+
+def trace_events(snapshot: Dict, main_pid: int) -> List[Dict]:
+    """Events of ``snapshot`` sorted by time, after process and thread names."""
+    events = sorted(snapshot.get('events', ()), key=lambda event: event['ts'])
+    pids = sorted({event['pid'] for event in events} | {main_pid})
+    meta: List[Dict] = []
+    for pid in pids:
+        name = 'audiogram-generator' if pid == main_pid else f'render worker {pid}'
+        meta.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                     'args': {'name': name}})
+        # Main process first, workers in pid order
+        meta.append({'name': 'process_sort_index', 'ph': 'M', 'pid': pid, 'tid': 0,
+                     'args': {'sort_index': 0 if pid == main_pid else pid}})
+    for pid, tid, name in snapshot.get('threads', ()):
+        meta.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                     'args': {'name': name}})
+    return meta + events
+
+
+def write_trace(path: str, snapshot: Dict, main_pid: int) -> str:
+    """Write the trace-event JSON of ``snapshot`` to ``path``; returns ``path``."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    document = {'traceEvents': trace_events(snapshot, main_pid), 'displayTimeUnit': 'ms'}
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(document, f)
+    os.replace(tmp, path)
+    return path
@@ -5,15 +5,30 @@ import os
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 from moviepy import VideoClip, AudioFileClip
-import urllib.request
-import ssl
 import re
 import unicodedata
 import shutil
+import time
+from typing import Optional
+
+from .rendering.artwork import load_logo
+from .rendering.fonts import load_font
+from .telemetry import progress, stages
 
 # Traccia i segmenti audio già salvati per evitare copie multiple per lo stesso soundbite
 _SAVED_SEGMENTS = set()
 
+
+class _FrameClock:
+    """Frame composti finora e fine dell'ultimo, passato a MoviePy."""
+
+    __slots__ = ('index', 'last_end')
+
+    def __init__(self) -> None:
+        self.index: int = 0
+        self.last_end: Optional[float] = None
+
+
 # Formati video per social media
 FORMATS = {
     # Verticale 9:16 - Instagram Reels/Stories, YouTube Shorts, TikTok, Twitter
@@ -210,15 +225,9 @@ def _draw_pill_with_text(img, draw, text, font, center_x, y, padding_x=24, paddi
 
 
 def download_image(url, output_path):
-    """Scarica un'immagine da URL"""
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
-
-    request = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-    with urllib.request.urlopen(request, context=ssl_context) as response:
-        with open(output_path, 'wb') as f:
-            f.write(response.read())
+    """Scarica un'immagine da URL (delegates to the shared HTTP client)"""
+    from .services.assets import download_image as _download_image
+    return _download_image(url, output_path)
 
 
 def get_waveform_data(audio_path, fps=24):
@@ -232,6 +241,28 @@ def get_waveform_data(audio_path, fps=24):
     Returns:
         Array di ampiezze per ogni frame del video
     """
+    # Waveform envelopes are cached by segment content hash and fps when the
+    # asset cache is enabled
+    from .services.cache import get_cache
+    cache = get_cache()
+    cache_key = None
+    if cache is not None:
+        from .audio_utils import content_digest
+        cache_key = f"wave:{content_digest(audio_path)}:{fps}"
+        cached = cache.get_derived(cache_key, kind='waveform')
+        if cached:
+            return np.load(cached)
+
+    envelope = _compute_waveform_data(audio_path, fps)
+    if cache is not None and cache_key is not None:
+        tmp = cache.tmp_path('.npy')
+        np.save(tmp, envelope)
+        cache.put_derived(cache_key, tmp, kind='waveform')
+    return envelope
+
+
+def _compute_waveform_data(audio_path, fps):
+    """Decodifica l'audio e calcola l'ampiezza media per frame"""
     # Lazy import to avoid importing heavy dependencies at module import time
     # which can break unit tests in constrained environments
     from pydub import AudioSegment  # type: ignore
@@ -353,21 +384,20 @@ def _create_unified_layout(img, draw, width, height, podcast_logo_path, podcast_
                 draw.rectangle([(x, y_top), (x + bar_width, y_bottom)], fill=colors['primary'])
 
     # Logo podcast CENTRATO VERTICALMENTE
-    if os.path.exists(podcast_logo_path):
-        logo = Image.open(podcast_logo_path)
-
-        # Calcolo dimensione logo (horizontal ha logica diversa)
-        if 'logo_width_ratio' in layout_config:
-            logo_size = int(min(width * layout_config['logo_width_ratio'], central_height * layout_config['logo_size_ratio']))
-        else:
-            logo_size = int(min(width, central_height) * layout_config['logo_size_ratio'])
-
-        logo = logo.resize((logo_size, logo_size), Image.Resampling.LANCZOS)
+    # Calcolo dimensione logo (horizontal ha logica diversa)
+    if 'logo_width_ratio' in layout_config:
+        logo_size = int(min(width * layout_config['logo_width_ratio'],
+                            central_height * layout_config['logo_size_ratio']))
+    else:
+        logo_size = int(min(width, central_height) * layout_config['logo_size_ratio'])
 
+    # Decoded and resized once per (artwork, size), then reused for every frame
+    logo = load_logo(podcast_logo_path, logo_size)
+    if logo is not None:
         # CENTRATO VERTICALMENTE al 50%
         logo_x = (width - logo_size) // 2
         logo_y = central_top + (central_height - logo_size) // 2
-        img.paste(logo, (logo_x, logo_y), logo if logo.mode == 'RGBA' else None)
+        img.paste(logo, (logo_x, logo_y), logo)
 
     # Footer
     footer_top = central_bottom
@@ -384,11 +414,8 @@ def _create_unified_layout(img, draw, width, height, podcast_logo_path, podcast_
 
         if current_text:
             current_text = _strip_punctuation(current_text)
-            try:
-                font_transcript = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc",
-                                                     size=int(height * layout_config['transcript_font_size']))
-            except:
-                font_transcript = ImageFont.load_default()
+            font_transcript = load_font("/System/Library/Fonts/Helvetica.ttc",
+                                        int(height * layout_config['transcript_font_size']))
 
             # Posizionamento trascrizione: per square e horizontal dal basso, per vertical dall'alto
             if layout_config['transcript_y_offset'] < 0.5:
@@ -515,35 +542,48 @@ def generate_audiogram(audio_path, output_path, format_name, podcast_logo_path,
 
     print(f"  - Estrazione waveform...")
     # Estrai waveform una sola volta, campionata per frame
-    waveform_data = get_waveform_data(audio_path, fps=fps)
-
-    print(f"  - Pre-caricamento logo...")
-    # Pre-carica e ridimensiona il logo una sola volta
-    logo_img = None
-    if os.path.exists(podcast_logo_path):
-        logo = Image.open(podcast_logo_path)
-        central_height = int(height * 0.60)
-        logo_size = int(min(width, central_height) * 0.4)
-        logo_img = logo.resize((logo_size, logo_size), Image.Resampling.LANCZOS)
+    with stages.stage('waveform'):
+        waveform_data = get_waveform_data(audio_path, fps=fps)
 
     print(f"  - Generazione frame video...")
     # Prepara chunks sottotitoli in base al flag
     chunks_for_render = transcript_chunks if show_subtitles else []
     # Funzione per generare frame
+    # Tempo totale di composizione dei frame, escluso poi dal tempo di encoding
+    frames_time = stages.Measurement()
+    # Fine del frame precedente: fino alla richiesta del successivo MoviePy
+    # scrive il frame sulla pipe di FFmpeg (attesa se l'encoder è indietro)
+    clock = _FrameClock()
+
     def make_frame(t):
-        return create_audiogram_frame(
-            width, height,
-            podcast_logo_path,  # Passiamo il path per compatibilità
-            podcast_title,
-            episode_title,
-            waveform_data,
-            t,
-            chunks_for_render,
-            duration,
-            formats,
-            colors,
-            format_name,  # Passa il formato per usare il layout corretto
-        )
+        traced = stages.traced_frame(clock.index)
+        clock.index += 1
+        last_end = clock.last_end
+        if last_end is not None:
+            waited = time.perf_counter() - last_end
+            stages.sample('encoder_write', waited)
+            if traced:
+                stages.add_span('encoder_write', last_end, waited)
+        with stages.stage('frame_composition', trace=traced) as frame_time:
+            frame = create_audiogram_frame(
+                width, height,
+                podcast_logo_path,  # Passiamo il path per compatibilità
+                podcast_title,
+                episode_title,
+                waveform_data,
+                t,
+                chunks_for_render,
+                duration,
+                formats,
+                colors,
+                format_name,  # Passa il formato per usare il layout corretto
+            )
+        frames_time.wall += frame_time.wall
+        frames_time.cpu += frame_time.cpu
+        stages.sample('frame_composition', frame_time.wall)
+        progress.frame_done(t)
+        clock.last_end = time.perf_counter()
+        return frame
 
     # Crea video clip
     video = VideoClip(make_frame, duration=duration)
@@ -554,16 +594,38 @@ def generate_audiogram(audio_path, output_path, format_name, podcast_logo_path,
     audio = AudioFileClip(audio_path)
     video = video.with_audio(audio)
 
+    # MoviePy codifica prima l'audio in un file temporaneo: misuralo a parte
+    audio_time = stages.Measurement()
+    write_audiofile = video.audio.write_audiofile
+
+    def timed_write_audiofile(*args, **kwargs):
+        with stages.stage('audio_encode', children=True) as measured:
+            result = write_audiofile(*args, **kwargs)
+        audio_time.wall, audio_time.cpu = measured.wall, measured.cpu
+        clock.last_end = None
+        return result
+
+    video.audio.write_audiofile = timed_write_audiofile
+
     print(f"  - Rendering video...")
+    # Il frame di prova di VideoClip non conta come attesa dell'encoder
+    clock.last_end = None
     # Esporta con threads per velocizzare
-    video.write_videofile(
-        output_path,
-        codec='libx264',
-        audio_codec='aac',
-        fps=fps,
-        threads=4,
-        preset='veryfast'  # Velocizza la creazione per video semplici
-    )
+    with stages.measure(children=True) as total:
+        video.write_videofile(
+            output_path,
+            codec='libx264',
+            audio_codec='aac',
+            fps=fps,
+            threads=4,
+            preset='veryfast',  # Velocizza la creazione per video semplici
+            # Con --progress l'avanzamento di tutti i job è riportato insieme
+            logger=None if progress.active() else 'bar',
+        )
+    # Encoding video e mux dell'audio (un solo passaggio FFmpeg), esclusi frame e audio
+    stages.add('encode',
+               total.wall - frames_time.wall - audio_time.wall,
+               total.cpu - frames_time.cpu - audio_time.cpu)
 
     # Salva anche il segmento audio nella cartella di output.
     # Deduce il nome da output_path (es: ep145_sb1_vertical.mp4 -> ep145_sb1.mp3)
@@ -12,6 +12,7 @@ setup(
         "moviepy>=1.0.3",
         "pillow>=10.0.0",
         "numpy>=1.24.0",
+        "requests>=2.31.0",
     ],
     python_requires=">=3.8",
     entry_points={
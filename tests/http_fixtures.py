@@ -0,0 +1,152 @@
+"""Local HTTP server stand-in used by network-facing tests.
+
+Serves in-memory resources over HTTP/1.1 on localhost with keep-alive, optional
+gzip bodies, ``Range`` support and ETags (answering ``If-None-Match`` with 304),
+and records every request so tests can assert on connection reuse and request
+headers.
+"""
+import gzip
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Resource:
+    def __init__(self, body, content_type='application/octet-stream', ranges=True,
+                 gzip_ok=False, etag=None, delay=0.0):
+        self.body = body
+        self.delay = delay
+        self.content_type = content_type
+        self.ranges = ranges
+        self.gzip_ok = gzip_ok
+        self.etag = etag or '"%s"' % hashlib.sha1(body).hexdigest()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.inflight += 1
+            server.max_inflight = max(server.max_inflight, server.inflight)
+        try:
+            res = server.resources.get(self.path)
+            if res is not None and res.delay:
+                time.sleep(res.delay)
+            self._serve(head=False)
+        finally:
+            with server.lock:
+                server.inflight -= 1
+
+    def _serve(self, head):
+        server = self.server
+        server.requests.append({
+            'method': self.command,
+            'path': self.path,
+            'headers': dict(self.headers),
+            'client_port': self.client_address[1],
+        })
+        res = server.resources.get(self.path)
+        if res is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if self.headers.get('If-None-Match') == res.etag:
+            self.send_response(304)
+            self.send_header('ETag', res.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = res.body
+        status = 200
+        headers = {'Content-Type': res.content_type, 'ETag': res.etag}
+        if res.ranges:
+            headers['Accept-Ranges'] = 'bytes'
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        # A weak ETag never matches If-Range (RFC 9110 13.1.5)
+        if_range_ok = if_range is None or (if_range == res.etag and not if_range.startswith('W/'))
+        if res.ranges and range_header and if_range_ok:
+            spec = range_header.split('=', 1)[1]
+            first, last = spec.split('-', 1)
+            start = int(first)
+            end = int(last) if last else len(body) - 1
+            end = min(end, len(body) - 1)
+            headers['Content-Range'] = 'bytes %d-%d/%d' % (start, end, len(body))
+            body = body[start:end + 1]
+            status = 206
+        elif res.gzip_ok and 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+
+        truncate = server.truncate_after.get(self.path)
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if head:
+            return
+        if truncate is not None and truncate < len(body):
+            # Simulate a connection dropped mid-transfer
+            self.wfile.write(body[:truncate])
+            self.wfile.flush()
+            self.close_connection = True
+            server.truncate_after.pop(self.path, None)
+            return
+        self.wfile.write(body)
+
+
+class LocalHttpServer:
+    """Context manager running a threaded HTTP server on an ephemeral port."""
+
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.resources = {}
+        self.httpd.requests = []
+        self.httpd.truncate_after = {}
+        self.httpd.lock = threading.Lock()
+        self.httpd.inflight = 0
+        self.httpd.max_inflight = 0
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def add(self, path, body, **kwargs):
+        self.httpd.resources[path] = Resource(body, **kwargs)
+        return self.url(path)
+
+    def truncate(self, path, nbytes):
+        """Drop the connection after ``nbytes`` on the next GET of ``path``."""
+        self.httpd.truncate_after[path] = nbytes
+
+    def url(self, path):
+        host, port = self.httpd.server_address
+        return 'http://%s:%d%s' % (host, port, path)
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    @property
+    def max_inflight(self):
+        """Highest number of GETs observed in progress at the same time."""
+        return self.httpd.max_inflight
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
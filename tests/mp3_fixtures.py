@@ -0,0 +1,34 @@
+"""Synthetic MP3 streams with exact, numbered frames for audio tests."""
+import struct
+
+
+# MPEG1 Layer III, 128 kbps, 48 kHz, stereo -> exact 384-byte frames (16000 B/s)
+FRAME_HEADER = b'\xff\xfb\x94\x00'
+FRAME_LEN = 384
+SECONDS_PER_FRAME = 1152 / 48000
+
+
+def make_id3(payload_size):
+    size = payload_size
+    synchsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b'ID3\x04\x00\x00' + synchsafe + b'\x00' * payload_size
+
+
+def make_frames(count):
+    # Number each frame in its payload so tests can tell which ones were fetched
+    out = bytearray()
+    for i in range(count):
+        body = struct.pack('>I', i) + b'\x00' * (FRAME_LEN - 8)
+        out += FRAME_HEADER + body
+    return bytes(out)
+
+
+def make_xing_frame(frames, nbytes, toc):
+    body = bytearray(FRAME_LEN - 4)
+    pos = 32  # MPEG1 stereo side info
+    body[pos:pos + 4] = b'Xing'
+    body[pos + 4:pos + 8] = struct.pack('>I', 0x7)
+    body[pos + 8:pos + 12] = struct.pack('>I', frames)
+    body[pos + 12:pos + 16] = struct.pack('>I', nbytes)
+    body[pos + 16:pos + 116] = bytes(toc)
+    return FRAME_HEADER + bytes(body)
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from PIL import Image
+
+from audiogram_generator.rendering import artwork
+from audiogram_generator.services import cache as asset_cache
+
+
+class TestLoadLogo(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        self.jpeg = os.path.join(self.tmp, 'cover.jpg')
+        Image.new('RGB', (1200, 1200), (242, 101, 34)).save(self.jpeg, quality=90)
+        artwork.clear_memory_cache()
+
+    def tearDown(self):
+        artwork.clear_memory_cache()
+        asset_cache.configure(enabled=False)
+        self._tmp.cleanup()
+
+    def test_returns_resized_rgba(self):
+        logo = artwork.load_logo(self.jpeg, 300)
+        self.assertEqual(logo.size, (300, 300))
+        self.assertEqual(logo.mode, 'RGBA')
+        r, g, b, a = logo.getpixel((150, 150))
+        self.assertAlmostEqual(r, 242, delta=3)
+        self.assertEqual(a, 255)
+
+    def test_missing_file_returns_none(self):
+        self.assertIsNone(artwork.load_logo(os.path.join(self.tmp, 'nope.png'), 100))
+
+    def test_same_cover_is_decoded_once_across_paths(self):
+        """Identical bytes at another path (another episode) hit the memory cache"""
+        copy = os.path.join(self.tmp, 'other', 'cover.jpg')
+        os.makedirs(os.path.dirname(copy))
+        shutil.copy(self.jpeg, copy)
+        first = artwork.load_logo(self.jpeg, 200)
+        self.assertIs(artwork.load_logo(copy, 200), first)
+        self.assertIsNot(artwork.load_logo(copy, 250), first)
+
+    def test_resized_artwork_persists_in_asset_cache(self):
+        cache = asset_cache.configure(dir=os.path.join(self.tmp, 'cache'))
+        artwork.load_logo(self.jpeg, 200)
+        self.assertEqual(cache.stats().by_kind['artwork'][0], 1)
+        artwork.clear_memory_cache()
+        logo = artwork.load_logo(self.jpeg, 200)
+        self.assertEqual(logo.size, (200, 200))
+        self.assertEqual(cache.session_counts['artwork'], [1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
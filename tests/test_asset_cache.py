@@ -0,0 +1,173 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from audiogram_generator import cli
+from audiogram_generator.core.units import format_bytes, parse_size
+from audiogram_generator.services import cache as asset_cache
+from audiogram_generator.services.cache import AssetCache
+from audiogram_generator.services.errors import AssetDownloadError
+
+from tests.http_fixtures import LocalHttpServer
+from tests.mp3_fixtures import make_frames, make_id3
+
+
+class TestUnits(unittest.TestCase):
+    def test_parse_size(self):
+        self.assertEqual(parse_size(2048), 2048)
+        self.assertEqual(parse_size('512K'), 512 * 1024)
+        self.assertEqual(parse_size('5 GiB'), 5 * 1024 ** 3)
+        self.assertEqual(parse_size('1.5m'), int(1.5 * 1024 ** 2))
+        with self.assertRaises(ValueError):
+            parse_size('lots')
+
+    def test_format_bytes(self):
+        self.assertEqual(format_bytes(512), '512 B')
+        self.assertEqual(format_bytes(1536), '1.5 KiB')
+
+
+class TestAssetCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        self.cache = AssetCache(self.root, max_bytes=10 * 1024 * 1024)
+
+    def tearDown(self):
+        self.cache.close()
+        self._tmp.cleanup()
+
+    def test_fetch_downloads_once_then_hits(self):
+        payload = make_frames(100)
+        with LocalHttpServer() as srv:
+            url = srv.add('/ep.mp3', payload)
+            first = self.cache.fetch(url, 'audio')
+            second = self.cache.fetch(url, 'audio')
+            self.assertEqual(first, second)
+            self.assertEqual(len(srv.requests), 1)
+        with open(first, 'rb') as f:
+            self.assertEqual(f.read(), payload)
+        self.assertTrue(first.endswith('.mp3'))
+        self.assertEqual(self.cache.session_counts['audio'], [1, 1])
+
+    def test_transcripts_are_fetched_gzipped_and_stored_plain(self):
+        srt = ('1\n00:00:00,000 --> 00:00:02,000\nCiao a tutti\n\n' * 200).encode('utf-8')
+        with LocalHttpServer() as srv:
+            url = srv.add('/ep.srt', srt, content_type='text/plain', gzip_ok=True)
+            path = self.cache.fetch(url, 'srt')
+            audio = srv.add('/ep.mp3', make_frames(10), gzip_ok=True)
+            self.cache.fetch(audio, 'audio')
+            self.assertIn('gzip', srv.requests[0]['headers']['Accept-Encoding'])
+            self.assertEqual(srv.requests[1]['headers']['Accept-Encoding'], 'identity')
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), srt)
+
+    def test_interrupted_audio_download_resumes(self):
+        payload = make_id3(1000) + make_frames(2000)
+        with LocalHttpServer() as srv:
+            url = srv.add('/ep.mp3', payload)
+            srv.truncate('/ep.mp3', 500_000)
+            with self.assertRaises(Exception):
+                self.cache.fetch(url, 'audio')
+            path = self.cache.fetch(url, 'audio')
+            self.assertEqual(srv.requests[-1]['headers'].get('Range'), 'bytes=500000-')
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), payload)
+
+    def test_corrupt_audio_never_enters_the_cache(self):
+        """Zero-filled or non-audio bodies fail the MP3 sanity check"""
+        frames = make_frames(2000)
+        holed = frames[:300_000] + bytes(len(frames) - 300_000)
+        with LocalHttpServer() as srv:
+            for path, body in (('/holed.mp3', holed), ('/error.mp3', b'<html>gone</html>')):
+                with self.assertRaises(AssetDownloadError):
+                    self.cache.fetch(srv.add(path, body), 'audio')
+        self.assertEqual(self.cache.stats().blobs, 0)
+
+    def test_corrupted_cached_audio_is_refetched(self):
+        payload = make_frames(2000)
+        with LocalHttpServer() as srv:
+            url = srv.add('/ep.mp3', payload)
+            path = self.cache.fetch(url, 'audio')
+            with open(path, 'r+b') as f:
+                f.seek(len(payload) - 100_000)
+                f.write(bytes(100_000))
+            path = self.cache.fetch(url, 'audio')
+            self.assertEqual(len(srv.requests), 2)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), payload)
+
+    def test_identical_bytes_are_stored_once(self):
+        payload = os.urandom(5_000)
+        with LocalHttpServer() as srv:
+            a = self.cache.fetch(srv.add('/a.jpg', payload), 'artwork')
+            b = self.cache.fetch(srv.add('/b.jpg', payload), 'artwork')
+        self.assertEqual(a, b)
+        st = self.cache.stats()
+        self.assertEqual((st.blobs, st.entries), (1, 2))
+
+    def test_revalidate_refetches_only_when_changed(self):
+        with LocalHttpServer() as srv:
+            url = srv.add('/ep.srt', b'one')
+            self.cache.fetch(url, 'srt')
+            srv.add('/ep.srt', b'two')
+            path = self.cache.fetch(url, 'srt', revalidate=True)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'two')
+            count = len(srv.requests)
+            self.assertEqual(self.cache.fetch(url, 'srt', revalidate=True), path)
+            # One conditional GET answered with 304, no new download
+            self.assertEqual(len(srv.requests), count + 1)
+            self.assertIn('If-None-Match', srv.requests[-1]['headers'])
+
+    def test_lru_eviction_keeps_budget(self):
+        """Least recently used blobs go first when the budget is exceeded"""
+        cache = AssetCache(os.path.join(self.root, 'small'), max_bytes=25_000)
+        try:
+            a = cache.put_derived_bytes('a', os.urandom(10_000))
+            cache.put_derived_bytes('b', os.urandom(10_000))
+            cache.get_derived('a')  # a is now more recent than b
+            cache.put_derived_bytes('c', os.urandom(10_000))
+            self.assertIsNone(cache.get_derived('b'))
+            self.assertEqual(cache.get_derived('a'), a)
+            self.assertIsNotNone(cache.get_derived('c'))
+            self.assertLessEqual(cache.total_bytes(), 25_000)
+        finally:
+            cache.close()
+
+    def test_missing_blob_is_treated_as_miss(self):
+        path = self.cache.put_derived_bytes('wave:x', b'data', kind='waveform', ext='.npy')
+        os.remove(path)
+        self.assertIsNone(self.cache.get_derived('wave:x', 'waveform'))
+        self.assertEqual(self.cache.stats().blobs, 0)
+
+    def test_gc_removes_stray_files_and_clear_empties(self):
+        self.cache.put_derived_bytes('k', b'x' * 100)
+        stray = os.path.join(self.root, 'blobs', 'zz', 'stray')
+        os.makedirs(os.path.dirname(stray))
+        with open(stray, 'wb') as f:
+            f.write(b'junk')
+        self.cache.gc()
+        self.assertFalse(os.path.exists(stray))
+        self.assertEqual(self.cache.stats().blobs, 1)
+        self.cache.clear()
+        self.assertEqual(self.cache.stats().total_bytes, 0)
+
+
+class TestCacheCommand(unittest.TestCase):
+    def test_cache_stats_subcommand(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = io.StringIO()
+            try:
+                with contextlib.redirect_stdout(out):
+                    rc = cli.main(['cache', 'stats', '--cache-dir', tmp])
+            finally:
+                asset_cache.configure(enabled=False)
+            self.assertEqual(rc, 0)
+            self.assertIn(tmp, out.getvalue())
+            self.assertIn('hit rate', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import copy
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from audiogram_generator import cli
+from audiogram_generator.core.fingerprint import fingerprint
+from audiogram_generator.services.manifest import BuildManifest
+
+
+def _write(path, data=b'x'):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_key_order_does_not_matter(self):
+        self.assertEqual(fingerprint({'a': 1, 'b': [1, 2]}), fingerprint({'b': (1, 2), 'a': 1}))
+        self.assertNotEqual(fingerprint({'a': 1}), fingerprint({'a': 2}))
+
+
+class TestBuildManifest(unittest.TestCase):
+    def test_up_to_date_requires_same_inputs_and_file(self):
+        with tempfile.TemporaryDirectory() as out:
+            path = os.path.join(out, 'ep1_sb1_square.mp4')
+            _write(path, b'video')
+            manifest = BuildManifest(out)
+            self.assertFalse(manifest.is_up_to_date(path, 'h1'))
+            manifest.record(path, 'h1')
+            manifest.save()
+
+            reopened = BuildManifest(out)
+            self.assertTrue(reopened.is_up_to_date(path, 'h1'))
+            self.assertFalse(reopened.is_up_to_date(path, 'h2'))
+            _write(path, b'truncated')  # size no longer matches
+            self.assertFalse(reopened.is_up_to_date(path, 'h1'))
+            os.remove(path)
+            self.assertFalse(reopened.is_up_to_date(path, 'h1'))
+
+    def test_saves_merge_entries_from_other_writers(self):
+        with tempfile.TemporaryDirectory() as out:
+            a, b = os.path.join(out, 'a.mp4'), os.path.join(out, 'b.mp4')
+            _write(a)
+            _write(b)
+            first, second = BuildManifest(out), BuildManifest(out)
+            first.record(a, 'ha')
+            second.record(b, 'hb')
+            first.save()
+            second.save()
+            merged = BuildManifest(out)
+            self.assertTrue(merged.is_up_to_date(a, 'ha'))
+            self.assertTrue(merged.is_up_to_date(b, 'hb'))
+
+
+class TestIncrementalRender(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        self.out = os.path.join(self.tmp, 'out')
+        self.selected = {
+            'number': 7, 'title': 'Ep', 'link': 'https://example/ep7', 'keywords': None,
+            'soundbites': [{'start': 0, 'duration': 2, 'title': 'SB'}],
+        }
+        self.formats = {
+            'vertical': {'width': 1080, 'height': 1920, 'enabled': True},
+            'square': {'width': 1080, 'height': 1080, 'enabled': True},
+        }
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _render(self, formats, colors=None):
+        work = tempfile.mkdtemp(dir=self.tmp)
+        prepared = cli._PreparedEpisode(self.selected, [1], work, os.path.join(work, 'logo.png'))
+        segment = os.path.join(work, 'segment_1.mp3')
+        _write(segment, b'audio-bytes')
+        _write(prepared.logo_path, b'logo')
+        prepared.soundbites[1] = (segment, [{'start': 0, 'end': 1, 'text': 'Ciao'}], 'Ciao')
+
+        def fake_render(segment_path, output_path, *args):
+            _write(output_path, b'mp4')
+
+        with patch('audiogram_generator.cli.generate_audiogram', side_effect=fake_render) as gen, \
+                redirect_stdout(io.StringIO()):
+            cli.render_prepared_episode(
+                prepared, {'title': 'Podcast'}, colors or cli.Config.DEFAULT_CONFIG['colors'],
+                formats, None, True, self.out, manifest=BuildManifest(self.out),
+            )
+        return [os.path.basename(c.args[1]) for c in gen.call_args_list]
+
+    def test_second_run_skips_everything(self):
+        self.assertEqual(len(self._render(self.formats)), 2)
+        self.assertEqual(self._render(self.formats), [])
+
+    def test_changing_one_format_only_rerenders_that_format(self):
+        self._render(self.formats)
+        tweaked = copy.deepcopy(self.formats)
+        tweaked['square']['height'] = 1000
+        self.assertEqual(self._render(tweaked), ['ep7_sb1_square.mp4'])
+
+    def test_changing_colors_rerenders_all_formats(self):
+        self._render(self.formats)
+        colors = dict(cli.Config.DEFAULT_CONFIG['colors'], primary=[0, 0, 0])
+        self.assertEqual(len(self._render(self.formats, colors)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,8 @@
 Test del flusso CLI in dry-run e verifica suffisso _nosubs nei nomi dei file (mock I/O).
 """
 import io
+import os
+import tempfile
 import unittest
 from contextlib import redirect_stdout
 from unittest.mock import patch, MagicMock
@@ -10,6 +12,11 @@ from audiogram_generator import cli
 
 
 class TestCliFlow(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.output_dir = tmp.name
+
     def _make_selected(self, with_soundbites=True, with_transcript=True, with_image=True):
         return {
             'number': 142,
@@ -89,6 +96,25 @@ class TestCliFlow(unittest.TestCase):
         out = buf.getvalue()
         self.assertIn('Soundbite selection error', out)
 
+    @patch('audiogram_generator.cli.download_image', return_value='/tmp/cover.jpg')
+    @patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3')
+    def test_invalid_selection_renders_nothing(self, *_mocks):
+        selected = self._make_selected(with_soundbites=True)
+        with patch('audiogram_generator.cli.generate_audiogram') as gen, \
+                redirect_stdout(io.StringIO()) as buf:
+            cli.process_one_episode(
+                selected=selected,
+                podcast_info={'image_url': 'https://example/podcast.jpg', 'title': 'Podcast'},
+                colors=cli.Config.DEFAULT_CONFIG['colors'],
+                formats_config=cli.Config.DEFAULT_CONFIG['formats'],
+                config_hashtags=None,
+                show_subtitles=True,
+                output_dir=self.output_dir,
+                soundbites_choice='+1',
+            )
+        gen.assert_not_called()
+        self.assertIn("invalid soundbite selection '+1'", buf.getvalue())
+
     @patch('audiogram_generator.cli.generate_audiogram')
     @patch('audiogram_generator.cli.download_image', return_value='/tmp/cover.jpg')
     @patch('audiogram_generator.cli.extract_audio_segment', return_value='/tmp/seg.mp3')
@@ -122,5 +148,232 @@ class TestCliFlow(unittest.TestCase):
                 self.assertIn('_nosubs', output_path)
 
 
+    @patch('audiogram_generator.cli.download_image', return_value='/tmp/cover.jpg')
+    @patch('audiogram_generator.cli.extract_audio_segment', return_value='/tmp/seg.mp3')
+    @patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3')
+    def test_pipelined_selection_renders_every_episode_in_order(self, download_audio, *_mocks):
+        episodes = {}
+        for n in (1, 2, 3):
+            ep = self._make_selected(with_transcript=False)
+            ep['number'] = n
+            episodes[n] = ep
+        formats = {'square': {'width': 1080, 'height': 1080, 'enabled': True}}
+        with patch('audiogram_generator.cli.generate_audiogram') as gen, \
+                patch('audiogram_generator.cli.generate_caption_file'), \
+                redirect_stdout(io.StringIO()):
+            cli._run_selection(
+                listing=[(n, f'Ep {n}') for n in episodes],
+                podcast_info={'image_url': 'https://example/podcast.jpg', 'title': 'Podcast'},
+                lookup=lambda nums: {n: episodes[n] for n in nums},
+                sync_result=None,
+                episode_input='all',
+                colors=cli.Config.DEFAULT_CONFIG['colors'],
+                formats_config=formats,
+                config_hashtags=None,
+                show_subtitles=True,
+                output_dir=self.output_dir,
+                soundbites_choice='2',
+                dry_run=False,
+                use_episode_cover=False,
+                pipeline_depth=1,
+            )
+        outputs = [call.args[1] for call in gen.call_args_list]
+        self.assertEqual([os.path.basename(o) for o in outputs],
+                         ['ep1_sb2_square.mp4', 'ep2_sb2_square.mp4', 'ep3_sb2_square.mp4'])
+        self.assertEqual(download_audio.call_count, 3)
+        # Prepared temp dirs are removed once each episode is rendered
+        for call in gen.call_args_list:
+            self.assertFalse(os.path.exists(os.path.dirname(call.args[3])))
+
+
+    @patch('audiogram_generator.cli.download_image', return_value='/tmp/cover.jpg')
+    @patch('audiogram_generator.cli.extract_audio_segment', return_value='/tmp/seg.mp3')
+    @patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3')
+    def test_jobs_file_shares_episode_downloads(self, download_audio, extract, *_mocks):
+        episodes = {}
+        for n in (1, 2):
+            ep = self._make_selected(with_transcript=False)
+            ep['number'] = n
+            ep['guid'] = f'guid-{n}'
+            episodes[n] = ep
+        formats = {
+            'square': {'width': 1080, 'height': 1080, 'enabled': True},
+            'vertical': {'width': 1080, 'height': 1920, 'enabled': True},
+        }
+        specs = cli.parse_jobs([
+            {'episode': 1, 'soundbites': [1], 'formats': ['square']},
+            {'guid': 'guid-1', 'soundbites': [1, 2], 'formats': ['square'],
+             'show_subtitles': False},
+            {'episode': 2, 'soundbites': [2]},
+            {'episode': 7},
+        ])
+        listing = [(n, f'Ep {n}') for n in episodes]
+
+        def lookup(nums):
+            return {n: episodes[n] for n in nums if n in episodes}
+
+        with patch('audiogram_generator.cli.generate_audiogram') as gen, \
+                patch('audiogram_generator.cli.generate_caption_file'), \
+                redirect_stdout(io.StringIO()) as out:
+            status = cli._run_jobs(
+                specs=specs,
+                resolve=cli._episode_resolver('https://example/feed', listing, lookup),
+                podcast_info={'image_url': 'https://example/podcast.jpg', 'title': 'Podcast'},
+                colors=cli.Config.DEFAULT_CONFIG['colors'],
+                formats_config=formats,
+                config_hashtags=None,
+                show_subtitles=True,
+                output_dir=self.output_dir,
+            )
+        outputs = sorted(os.path.basename(call.args[1]) for call in gen.call_args_list)
+        self.assertEqual(outputs, [
+            'ep1_sb1_nosubs_square.mp4', 'ep1_sb1_square.mp4', 'ep1_sb2_nosubs_square.mp4',
+            'ep2_sb2_square.mp4', 'ep2_sb2_vertical.mp4',
+        ])
+        # One download per episode; one cut per distinct soundbite
+        self.assertEqual(download_audio.call_count, 2)
+        self.assertEqual(extract.call_count, 3)
+        self.assertEqual(status, 1)
+        self.assertIn('episode 7 not found', out.getvalue())
+
+
+    @patch('audiogram_generator.cli.download_image', return_value='/tmp/cover.jpg')
+    @patch('audiogram_generator.cli.extract_audio_segment', return_value='/tmp/seg.mp3')
+    @patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3')
+    def test_shards_split_a_selection_without_overlap(self, *_mocks):
+        episodes = {}
+        for n in (1, 2, 3):
+            ep = self._make_selected(with_transcript=False)
+            ep['number'] = n
+            episodes[n] = ep
+        formats = {
+            'square': {'width': 1080, 'height': 1080, 'enabled': True},
+            'vertical': {'width': 1080, 'height': 1920, 'enabled': True},
+        }
+        rendered = []
+        for k in (1, 2):
+            with patch('audiogram_generator.cli.generate_audiogram') as gen, \
+                    patch('audiogram_generator.cli.generate_caption_file'), \
+                    redirect_stdout(io.StringIO()):
+                cli._run_selection(
+                    listing=[(n, f'Ep {n}') for n in episodes],
+                    podcast_info={'image_url': 'https://example/podcast.jpg', 'title': 'Podcast'},
+                    lookup=lambda nums: {n: episodes[n] for n in nums},
+                    sync_result=None,
+                    episode_input='all',
+                    colors=cli.Config.DEFAULT_CONFIG['colors'],
+                    formats_config=formats,
+                    config_hashtags=None,
+                    show_subtitles=True,
+                    output_dir=self.output_dir,
+                    soundbites_choice='all',
+                    dry_run=False,
+                    use_episode_cover=False,
+                    shard=(k, 2),
+                )
+            rendered.append({os.path.basename(call.args[1]) for call in gen.call_args_list})
+        self.assertFalse(rendered[0] & rendered[1])
+        self.assertEqual(len(rendered[0] | rendered[1]), 3 * 2 * 2)
+
+
+    def test_worker_drains_the_queue_and_retries_failures(self):
+        from audiogram_generator.core.jobs import RenderJob
+        from audiogram_generator.services.job_queue import JobQueue
+
+        selected = self._make_selected(with_transcript=False)
+        feed = 'https://example/feed.xml'
+        with tempfile.TemporaryDirectory() as tmp:
+            config_path = os.path.join(tmp, 'config.yaml')
+            with open(config_path, 'w') as f:
+                f.write("queue:\n  backoff: 0\nformats:\n  square: {width: 1080, height: 1080}\n")
+            queue_path = os.path.join(tmp, 'queue.sqlite')
+            with JobQueue(queue_path) as queue:
+                queue.enqueue(feed, [RenderJob(142, sb, 'square', True) for sb in (1, 2)])
+
+            attempts = []
+
+            def render(*args):
+                attempts.append(os.path.basename(args[1]))
+                if len(attempts) == 1:
+                    raise RuntimeError('ffmpeg crashed')
+
+            loaded = ([(142, selected['title'])], {'title': 'Podcast'},
+                      lambda nums: {n: selected for n in nums if n == 142}, None, None)
+            with patch('audiogram_generator.cli._load_episodes', return_value=loaded), \
+                    patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3'), \
+                    patch('audiogram_generator.cli.extract_audio_segment',
+                          return_value='/tmp/seg.mp3'), \
+                    patch('audiogram_generator.cli.download_image', return_value=None), \
+                    patch('audiogram_generator.cli.generate_audiogram', side_effect=render), \
+                    patch('audiogram_generator.cli.generate_caption_file'), \
+                    redirect_stdout(io.StringIO()):
+                status = cli.main(['worker', '--config', config_path, '--queue', queue_path,
+                                   '--output-dir', tmp, '--no-cache', '--force', '--poll', '0.05'])
+            self.assertEqual(status, 0)
+            self.assertEqual(attempts, ['ep142_sb1_square.mp4', 'ep142_sb2_square.mp4',
+                                        'ep142_sb1_square.mp4'])
+            with JobQueue(queue_path) as queue:
+                self.assertEqual(queue.counts()['done'], 2)
+
+
+    def test_feeds_section_renders_each_feed_into_its_own_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config_path = os.path.join(tmp, 'config.yaml')
+            with open(config_path, 'w') as f:
+                f.write(
+                    "hashtags: [shared]\n"
+                    "formats:\n  vertical: {enabled: false}\n"
+                    "  square: {width: 1080, height: 1080}\n"
+                    "feeds:\n"
+                    "  - {name: alpha, feed_url: 'https://a.example/feed.xml', episode: last}\n"
+                    "  - name: beta\n    feed_url: 'https://b.example/feed.xml'\n"
+                    "    hashtags: [beta]\n    formats: {horizontal: {enabled: false}}\n"
+                )
+            selected = self._make_selected(with_transcript=False)
+            selected['number'] = 1
+
+            def load(feed_url, index_path=None):
+                title = 'Alpha' if 'a.example' in feed_url else 'Beta'
+                return ([(1, selected['title'])], {'title': title},
+                        lambda nums: {n: selected for n in nums if n == 1}, None, None)
+
+            with patch('audiogram_generator.cli._load_episodes', side_effect=load) as loader, \
+                    patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3'), \
+                    patch('audiogram_generator.cli.extract_audio_segment',
+                          return_value='/tmp/seg.mp3'), \
+                    patch('audiogram_generator.cli.download_image', return_value=None), \
+                    patch('audiogram_generator.cli.generate_audiogram') as gen, \
+                    patch('audiogram_generator.cli.generate_caption_file') as caption, \
+                    redirect_stdout(io.StringIO()):
+                status = cli.main(['--config', config_path, '--output-dir', tmp, '--episode', '1',
+                                   '--soundbites', '1', '--no-cache', '--force'])
+            self.assertEqual(status, 0)
+            self.assertEqual(loader.call_count, 2)
+            outputs = sorted(os.path.relpath(call.args[1], tmp) for call in gen.call_args_list)
+            self.assertEqual(outputs, [
+                os.path.join('alpha', 'ep1_sb1_horizontal.mp4'),
+                os.path.join('alpha', 'ep1_sb1_square.mp4'),
+                os.path.join('beta', 'ep1_sb1_square.mp4'),
+            ])
+            hashtags = {os.path.basename(os.path.dirname(call.args[0])): call.args[8]
+                        for call in caption.call_args_list}
+            self.assertIn('beta', hashtags['beta'])
+            self.assertNotIn('beta', hashtags['alpha'])
+
+            # --feed selects a subset
+            with patch('audiogram_generator.cli._load_episodes', side_effect=load) as loader, \
+                    patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3'), \
+                    patch('audiogram_generator.cli.extract_audio_segment',
+                          return_value='/tmp/seg.mp3'), \
+                    patch('audiogram_generator.cli.download_image', return_value=None), \
+                    patch('audiogram_generator.cli.generate_audiogram') as gen, \
+                    patch('audiogram_generator.cli.generate_caption_file'), \
+                    redirect_stdout(io.StringIO()):
+                cli.main(['--config', config_path, '--output-dir', tmp, '--episode', '1',
+                          '--soundbites', '1', '--no-cache', '--force', '--feed', 'beta'])
+            self.assertEqual(loader.call_count, 1)
+            self.assertEqual(gen.call_count, 1)
+
+
 if __name__ == '__main__':
     unittest.main()
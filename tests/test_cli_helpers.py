@@ -28,6 +28,9 @@ class TestCliHelpers(unittest.TestCase):
         self.assertEqual(cli.parse_episode_selection(" a ", 2), [1, 2])
         # last
         self.assertEqual(cli.parse_episode_selection("last", 7), [7])
+        # Intervalli, anche combinati con una lista
+        self.assertEqual(cli.parse_episode_selection("2-4", 5), [2, 3, 4])
+        self.assertEqual(cli.parse_episode_selection("5, 1-3, 2", 5), [5, 1, 2, 3])
 
     def test_parse_episode_selection_invalid(self):
         """Errori su valori non validi per episodi"""
@@ -39,6 +42,10 @@ class TestCliHelpers(unittest.TestCase):
             cli.parse_episode_selection("abc", 5)
         with self.assertRaises(ValueError):
             cli.parse_episode_selection("", 5)
+        with self.assertRaises(ValueError):
+            cli.parse_episode_selection("4-2", 5)
+        with self.assertRaises(ValueError):
+            cli.parse_episode_selection("1-9", 5)
 
     def test_parse_soundbite_selection_variants(self):
         """Test varianti per selezione soundbite"""
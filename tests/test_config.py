@@ -438,5 +438,51 @@ class TestConfig(unittest.TestCase):
             os.unlink(temp_file)
 
 
+    def test_feed_configs_inherit_and_override(self):
+        """Test configurazioni per-feed: ereditarietà, merge e output_dir"""
+        config = Config()
+        config.config.update({
+            'output_dir': './out',
+            'hashtags': ['global'],
+            'feeds': [
+                {'name': 'alpha', 'feed_url': 'https://a.example/feed.xml',
+                 'colors': {'primary': [1, 2, 3]}, 'hashtags': ['alpha']},
+                {'feed_url': 'https://b.example/feed.xml', 'output_dir': './b',
+                 'formats': {'square': {'enabled': False}}},
+            ],
+        })
+        alpha, second = config.feed_configs(overrides={'episode': 'last', 'feed_url': None})
+
+        self.assertEqual(alpha.get('name'), 'alpha')
+        self.assertEqual(alpha.get('output_dir'), os.path.join('./out', 'alpha'))
+        self.assertEqual(alpha.get('colors')['primary'], [1, 2, 3])
+        self.assertEqual(alpha.get('colors')['background'],
+                         Config.DEFAULT_CONFIG['colors']['background'])
+        self.assertEqual(alpha.get('hashtags'), ['alpha'])
+        self.assertEqual(alpha.get('episode'), 'last')
+        self.assertIsNone(alpha.get('feeds'))
+        self.assertEqual(second.get('name'), 'feed2')
+        self.assertEqual(second.get('output_dir'), './b')
+        self.assertEqual(second.get('hashtags'), ['global'])
+        self.assertFalse(second.get('formats')['square']['enabled'])
+        self.assertTrue(second.get('formats')['vertical']['enabled'])
+        # Il globale non viene modificato
+        self.assertTrue(config.get('formats')['square'].get('enabled', True))
+
+        self.assertEqual([c.get('name') for c in config.feed_configs(names=['feed2'])], ['feed2'])
+        with self.assertRaises(ValueError):
+            config.feed_configs(names=['missing'])
+
+    def test_feed_configs_validation(self):
+        """Test voci feeds non valide"""
+        config = Config()
+        config.config['feeds'] = [{'name': 'x'}]
+        with self.assertRaises(ValueError):
+            config.feed_configs()
+        config.config['feeds'] = [{'name': 'x', 'feed_url': 'u1'}, {'name': 'x', 'feed_url': 'u2'}]
+        with self.assertRaises(ValueError):
+            config.feed_configs()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,176 @@
+import io
+import os
+import tempfile
+import unittest
+from concurrent.futures import Future
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from audiogram_generator import cli
+from audiogram_generator.core.cost import (
+    CostModel, cost_units, estimate_render_memory, lpt_order, prediction_error,
+)
+from audiogram_generator.core.jobs import EpisodePlan, RenderJob
+from audiogram_generator.services.timings import RenderTimings
+
+
+class TestCostModel(unittest.TestCase):
+    def test_units_scale_with_duration_pixels_and_fps(self):
+        self.assertAlmostEqual(cost_units(10, 1000, 1000, fps=24), 240.0)
+        self.assertAlmostEqual(cost_units(20, 1000, 1000, fps=24),
+                               2 * cost_units(10, 1000, 1000, fps=24))
+        self.assertEqual(cost_units(-1, 1080, 1080), 0.0)
+
+    def test_fit_recovers_a_linear_relation(self):
+        model = CostModel.fit([(100, 3.0), (200, 5.0), (400, 9.0)])
+        self.assertAlmostEqual(model.per_unit, 0.02)
+        self.assertAlmostEqual(model.overhead, 1.0)
+        self.assertEqual(model.samples, 3)
+        self.assertAlmostEqual(model.predict(300), 7.0)
+
+    def test_fit_falls_back_without_usable_spread(self):
+        self.assertEqual(CostModel.fit([]), CostModel())
+        # One size only: keep the overhead, scale the slope
+        model = CostModel.fit([(100, 11.0), (100, 11.0)])
+        self.assertAlmostEqual(model.overhead, 1.0)
+        self.assertAlmostEqual(model.predict(100), 11.0)
+
+    def test_lpt_order_is_longest_first_and_stable(self):
+        items = [('a', 1), ('b', 5), ('c', 1), ('d', 3)]
+        self.assertEqual([i for i, _ in lpt_order(items, lambda x: x[1])], ['b', 'd', 'a', 'c'])
+
+    def test_memory_estimate_grows_with_resolution_and_duration(self):
+        vertical = estimate_render_memory(1080, 1920, 60)
+        self.assertGreater(vertical, estimate_render_memory(1080, 1080, 60))
+        self.assertGreater(estimate_render_memory(1080, 1920, 3600), vertical)
+        self.assertTrue(300 * 2 ** 20 < vertical < 600 * 2 ** 20)
+
+    def test_format_memory_setting_overrides_the_estimate(self):
+        formats = {'square': {'width': 1080, 'height': 1080, 'memory': '600MB'},
+                   'vertical': {'width': 1080, 'height': 1920}}
+        self.assertEqual(cli._video_memory(formats, 'square', 30), 600 * 2 ** 20)
+        self.assertEqual(cli._video_memory(formats, 'vertical', 30),
+                         estimate_render_memory(1080, 1920, 30))
+
+    def test_prediction_error(self):
+        self.assertAlmostEqual(prediction_error([(9, 10), (12, 10)]), 15.0)
+        self.assertEqual(prediction_error([]), 0.0)
+
+
+class TestRenderTimings(unittest.TestCase):
+    def test_history_calibrates_the_next_run(self):
+        with tempfile.TemporaryDirectory() as out:
+            timings = RenderTimings(out)
+            self.assertEqual(timings.model, CostModel())
+            for units, seconds in ((100, 3.0), (200, 5.0), (400, 9.0)):
+                timings.record(os.path.join(out, 'v.mp4'), 'square', units, seconds)
+            summary = timings.summary()
+            self.assertEqual(summary['videos'], 3)
+            self.assertAlmostEqual(summary['actual'], 17.0)
+            timings.save()
+
+            calibrated = RenderTimings(out)
+            self.assertAlmostEqual(calibrated.predict(300), 7.0)
+            self.assertEqual(calibrated.summary()['videos'], 0)
+
+    def test_history_is_bounded(self):
+        with tempfile.TemporaryDirectory() as out:
+            for _ in range(3):
+                timings = RenderTimings(out, keep=4)
+                for units in (100, 200):
+                    timings.record('v.mp4', 'square', units, units / 50)
+                timings.save()
+            self.assertEqual(len(RenderTimings(out)._read()), 4)
+
+
+class TestLongestFirstRendering(unittest.TestCase):
+    @patch('audiogram_generator.cli.download_image', return_value=None)
+    @patch('audiogram_generator.cli.extract_audio_segment', return_value='/tmp/seg.mp3')
+    @patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3')
+    def test_videos_are_submitted_longest_first(self, *_mocks):
+        selected = {
+            'number': 1, 'title': 'Ep', 'link': 'https://example/ep1', 'transcript_url': None,
+            'audio_url': 'https://example/a.mp3', 'image_url': None,
+            'soundbites': [{'start': 0, 'duration': 10, 'title': 'short'},
+                           {'start': 20, 'duration': 60, 'title': 'long'}],
+        }
+        formats = {
+            'square': {'width': 1080, 'height': 1080, 'enabled': True},
+            'horizontal': {'width': 1920, 'height': 1080, 'enabled': True},
+        }
+        with tempfile.TemporaryDirectory() as out, \
+                patch('audiogram_generator.cli.generate_audiogram') as gen, \
+                patch('audiogram_generator.cli.generate_caption_file'), \
+                redirect_stdout(io.StringIO()) as stdout:
+            prepared = cli.prepare_episode(selected, [1, 2], tempfile.mkdtemp(prefix='audiogram-'),
+                                           None)
+            timings = RenderTimings(out)
+            try:
+                cli.render_prepared_episode(prepared, {'title': 'Podcast'},
+                                            cli.Config.DEFAULT_CONFIG['colors'], formats, None,
+                                            True, out, timings=timings)
+            finally:
+                prepared.cleanup()
+            timings.save()
+            self.assertEqual(RenderTimings(out).summary()['videos'], 0)
+            self.assertEqual(len(RenderTimings(out)._read()), 4)
+        order = [os.path.basename(call.args[1]) for call in gen.call_args_list]
+        self.assertEqual(order, ['ep1_sb2_horizontal.mp4', 'ep1_sb2_square.mp4',
+                                 'ep1_sb1_horizontal.mp4', 'ep1_sb1_square.mp4'])
+        self.assertIn('predicted', stdout.getvalue())
+
+    @patch('audiogram_generator.cli.download_image', return_value=None)
+    @patch('audiogram_generator.cli.extract_audio_segment', return_value='/tmp/seg.mp3')
+    @patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3')
+    def test_longest_first_across_episodes(self, *_mocks):
+        class TwoWorkers:
+            # Runs each task inline, but lets two run "at once"
+            workers = 2
+
+            def __init__(self, *args):
+                pass
+
+            def submit_within_budget(self, memory, fn, *args):
+                future = Future()
+                future.set_result(fn(*args))
+                return future
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                pass
+
+        def episode(number, durations):
+            return {
+                'number': number, 'title': f'Ep {number}', 'link': 'https://example/ep',
+                'transcript_url': None, 'audio_url': f'https://example/{number}.mp3',
+                'image_url': None,
+                'soundbites': [{'start': 0, 'duration': d, 'title': 'SB'} for d in durations],
+            }
+
+        plans = [
+            EpisodePlan(episode(1, [10]), [1], [RenderJob(1, 1, 'square', True)]),
+            EpisodePlan(episode(2, [60, 5]), [1, 2], [RenderJob(2, 1, 'square', True),
+                                                      RenderJob(2, 2, 'square', True)]),
+        ]
+        with tempfile.TemporaryDirectory() as out, \
+                patch('audiogram_generator.cli.RenderExecutor', TwoWorkers), \
+                patch('audiogram_generator.cli.generate_audiogram') as gen, \
+                patch('audiogram_generator.cli.generate_caption_file'), \
+                redirect_stdout(io.StringIO()):
+            settings = {
+                'colors': cli.Config.DEFAULT_CONFIG['colors'], 'hashtags': [],
+                'show_subtitles': True, 'formats': {'square': {'width': 1080, 'height': 1080}},
+                'output_dir': out, 'use_episode_cover': False, 'partial_audio_fetch': False,
+                'partial_audio_margin': 3.0,
+            }
+            run = cli._FeedRun(None, {'title': 'Podcast'}, settings, plans)
+            self.assertEqual(cli._render_plans([run], pipeline_depth=0, workers=2), 0)
+        order = [os.path.basename(call.args[1]) for call in gen.call_args_list]
+        # Episode 2's long soundbite overtakes episode 1, instead of waiting for it
+        self.assertEqual(order, ['ep2_sb1_square.mp4', 'ep1_sb1_square.mp4', 'ep2_sb2_square.mp4'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from audiogram_generator.services import rss as rss_svc
+from audiogram_generator.services.episode_index import EpisodeIndex, episode_key
+
+from tests.test_rss_service import SAMPLE_FEED
+
+
+FEED_URL = 'https://feed.example/rss.xml'
+
+
+class TestEpisodeIndex(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.index = EpisodeIndex(os.path.join(self._tmp.name, 'index.sqlite'))
+
+    def tearDown(self):
+        self.index.close()
+        self._tmp.cleanup()
+
+    def test_initial_sync_inserts_and_indexes(self):
+        """First sync inserts all items and flags the sync as initial"""
+        episodes, info = rss_svc.parse_feed(SAMPLE_FEED)
+        result = self.index.sync(FEED_URL, episodes, info)
+        self.assertTrue(result.initial)
+        self.assertEqual(sorted(result.new), ['g1', 'g2'])
+        self.assertEqual(self.index.get_by_number(FEED_URL, 1)['title'], 'Episode A')
+        self.assertEqual(self.index.get_by_guid(FEED_URL, 'g2')['number'], 2)
+        self.assertEqual(self.index.list_titles(FEED_URL), [(1, 'Episode A'), (2, 'Episode B')])
+        self.assertEqual(self.index.podcast_info(FEED_URL)['title'], 'My Podcast')
+
+    def test_resync_detects_new_and_updated_items(self):
+        """Later syncs only insert new GUIDs and update changed ones"""
+        episodes, info = rss_svc.parse_feed(SAMPLE_FEED)
+        self.index.sync(FEED_URL, episodes, info)
+
+        changed = [dict(ep) for ep in episodes]
+        changed[1]['title'] = 'Episode B (remastered)'
+        changed.append(dict(changed[0], guid='g3', number=3, title='Episode C'))
+        result = self.index.sync(FEED_URL, changed, info)
+
+        self.assertFalse(result.initial)
+        self.assertEqual(result.new, ['g3'])
+        self.assertEqual(result.new_numbers, [3])
+        self.assertEqual(result.updated, ['g2'])
+        self.assertEqual(result.unchanged, 1)
+        self.assertEqual(self.index.get_by_numbers(FEED_URL, [2, 3])[2]['title'],
+                         'Episode B (remastered)')
+
+    def test_large_number_lookups_are_split_into_several_queries(self):
+        episodes, info = rss_svc.parse_feed(SAMPLE_FEED)
+        many = [dict(episodes[0], guid=f"g{n}", number=n) for n in range(1, 2501)]
+        self.index.sync(FEED_URL, many, info)
+        found = self.index.get_by_numbers(FEED_URL, range(1, 2502))
+        self.assertEqual(len(found), 2500)
+        self.assertEqual(found[2500]['guid'], 'g2500')
+
+    def test_removed_items_are_dropped(self):
+        episodes, info = rss_svc.parse_feed(SAMPLE_FEED)
+        self.index.sync(FEED_URL, episodes, info)
+        result = self.index.sync(FEED_URL, episodes[1:], info)
+        self.assertEqual(result.removed, ['g1'])
+        self.assertIsNone(self.index.get_by_guid(FEED_URL, 'g1'))
+
+    @patch('audiogram_generator.services.rss.parse_feed', wraps=rss_svc.parse_feed)
+    @patch('audiogram_generator.services.rss.fetch_feed_conditional',
+           return_value=rss_svc.FeedResponse(SAMPLE_FEED))
+    def test_sync_feed_index_skips_parse_when_unchanged(self, _fetch, mock_parse):
+        """An identical feed body is not parsed again"""
+        first = rss_svc.sync_feed_index(FEED_URL, self.index)
+        second = rss_svc.sync_feed_index(FEED_URL, self.index)
+        self.assertTrue(first.parsed)
+        self.assertFalse(second.parsed)
+        self.assertEqual(second.unchanged, 2)
+        self.assertEqual(mock_parse.call_count, 1)
+
+    def test_sync_feed_index_uses_conditional_get(self):
+        """Later syncs send the stored ETag; a 304 skips download and parse"""
+        from tests.http_fixtures import LocalHttpServer
+        from audiogram_generator.services import http_client
+
+        http_client.configure()
+        with LocalHttpServer() as srv:
+            srv.add('/rss.xml', SAMPLE_FEED.encode('utf-8'), content_type='application/rss+xml')
+            url = srv.url('/rss.xml')
+            first = rss_svc.sync_feed_index(url, self.index)
+            second = rss_svc.sync_feed_index(url, self.index)
+            self.assertEqual(len(first.new), 2)
+            self.assertTrue(second.not_modified)
+            self.assertEqual(second.unchanged, 2)
+            self.assertEqual(srv.requests[1]['headers'].get('If-None-Match'),
+                             self.index.feed_validators(url)[0])
+
+    def test_updated_items_keep_their_previous_data(self):
+        episodes, info = rss_svc.parse_feed(SAMPLE_FEED)
+        self.index.sync(FEED_URL, episodes, info)
+        changed = [dict(ep) for ep in episodes]
+        added = {'start': 99, 'duration': 5, 'text': 'new'}
+        changed[0]['soundbites'] = changed[0]['soundbites'] + [added]
+        result = self.index.sync(FEED_URL, changed, info)
+        self.assertEqual(result.updated, ['g1'])
+        self.assertEqual(result.previous['g1']['soundbites'], episodes[0]['soundbites'])
+
+    def test_old_index_files_gain_validator_columns(self):
+        import sqlite3
+        path = os.path.join(self._tmp.name, 'old.sqlite')
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE feeds (feed_url TEXT PRIMARY KEY, content_hash TEXT,"
+                     " podcast_info TEXT NOT NULL DEFAULT '{}', synced_at REAL)")
+        conn.commit()
+        conn.close()
+        with EpisodeIndex(path) as index:
+            self.assertEqual(index.feed_validators(FEED_URL), (None, None))
+            episodes, info = rss_svc.parse_feed(SAMPLE_FEED)
+            index.sync(FEED_URL, episodes, info, etag='"v1"')
+            self.assertEqual(index.feed_validators(FEED_URL), ('"v1"', None))
+
+    def test_episode_key_fallbacks(self):
+        self.assertEqual(episode_key({'guid': 'x', 'audio_url': 'a'}), 'x')
+        self.assertEqual(episode_key({'guid': '', 'audio_url': 'a'}), 'a')
+        self.assertEqual(episode_key({'title': 'T'}), 'title:T')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from audiogram_generator.services import http_client
+from audiogram_generator.services.http_client import HttpClient, HttpSettings
+
+from tests.http_fixtures import LocalHttpServer
+
+
+class TestHttpClient(unittest.TestCase):
+    def test_connections_are_reused_per_host(self):
+        """Consecutive requests to one host share a keep-alive connection"""
+        with LocalHttpServer() as srv:
+            srv.add('/feed.xml', b'<rss/>')
+            srv.add('/ep.srt', b'1\n00:00:00,000 --> 00:00:01,000\nHi\n')
+            client = HttpClient()
+            client.get_text(srv.url('/feed.xml'))
+            client.get_text(srv.url('/ep.srt'))
+            client.close()
+            ports = {r['client_port'] for r in srv.requests}
+            self.assertEqual(len(ports), 1)
+
+    def test_text_requests_negotiate_gzip(self):
+        with LocalHttpServer() as srv:
+            srv.add('/feed.xml', '<rss>è</rss>'.encode('utf-8'), gzip_ok=True)
+            client = HttpClient()
+            text = client.get_text(srv.url('/feed.xml'))
+            client.close()
+            self.assertEqual(text, '<rss>è</rss>')
+            self.assertIn('gzip', srv.requests[0]['headers'].get('Accept-Encoding'))
+
+    def test_http_errors_raise(self):
+        with LocalHttpServer() as srv:
+            client = HttpClient()
+            with self.assertRaises(Exception):
+                client.get(srv.url('/missing'))
+            client.close()
+
+    def test_download_to_file_streams_in_chunks_and_renames(self):
+        """Downloads stream through a small buffer and notify listeners"""
+        payload = os.urandom(100_000)
+        events = []
+
+        def listener(stats, done):
+            events.append((stats.bytes_done, done))
+
+        http_client.add_download_listener(listener)
+        try:
+            with LocalHttpServer() as srv, tempfile.TemporaryDirectory() as tmp:
+                url = srv.add('/ep.mp3', payload)
+                out = os.path.join(tmp, 'ep.mp3')
+                client = HttpClient()
+                stats = client.download_to_file(url, out, chunk_size=4096)
+                client.close()
+                with open(out, 'rb') as f:
+                    self.assertEqual(f.read(), payload)
+                self.assertFalse(os.path.exists(out + '.part'))
+                self.assertEqual(stats.bytes_done, len(payload))
+                self.assertEqual(stats.total_bytes, len(payload))
+                self.assertEqual(srv.requests[0]['headers'].get('Accept-Encoding'), 'identity')
+        finally:
+            http_client.remove_download_listener(listener)
+        self.assertEqual(events[-1], (len(payload), True))
+
+    def test_interrupted_download_leaves_no_file(self):
+        with LocalHttpServer() as srv, tempfile.TemporaryDirectory() as tmp:
+            url = srv.add('/ep.mp3', os.urandom(50_000))
+            srv.truncate('/ep.mp3', 10_000)
+            out = os.path.join(tmp, 'ep.mp3')
+            client = HttpClient()
+            with self.assertRaises(Exception):
+                client.download_to_file(url, out, chunk_size=4096)
+            client.close()
+            self.assertFalse(os.path.exists(out))
+            self.assertFalse(os.path.exists(out + '.part'))
+
+    def test_resumable_download_continues_from_part_file(self):
+        """A dropped transfer is resumed with Range/If-Range, not restarted"""
+        payload = os.urandom(50_000)
+        with LocalHttpServer() as srv, tempfile.TemporaryDirectory() as tmp:
+            url = srv.add('/ep.mp3', payload)
+            srv.truncate('/ep.mp3', 30_000)
+            out = os.path.join(tmp, 'ep.mp3')
+            client = HttpClient()
+            with self.assertRaises(Exception):
+                client.download_to_file(url, out, chunk_size=4096, resume=True)
+            self.assertEqual(os.path.getsize(out + '.part'), 30_000)
+            stats = client.download_to_file(url, out, chunk_size=4096, resume=True)
+            client.close()
+            with open(out, 'rb') as f:
+                self.assertEqual(f.read(), payload)
+            self.assertEqual(stats.resumed_from, 30_000)
+            self.assertEqual(stats.total_bytes, len(payload))
+            last = srv.requests[-1]['headers']
+            self.assertEqual(last.get('Range'), 'bytes=30000-')
+            self.assertEqual(last.get('If-Range'), srv.httpd.resources['/ep.mp3'].etag)
+            self.assertFalse(os.path.exists(out + '.part.json'))
+
+    def test_resume_restarts_when_file_changed(self):
+        with LocalHttpServer() as srv, tempfile.TemporaryDirectory() as tmp:
+            url = srv.add('/ep.mp3', os.urandom(50_000))
+            srv.truncate('/ep.mp3', 20_000)
+            out = os.path.join(tmp, 'ep.mp3')
+            client = HttpClient()
+            with self.assertRaises(Exception):
+                client.download_to_file(url, out, resume=True)
+            fresh = os.urandom(60_000)
+            srv.add('/ep.mp3', fresh)  # new ETag: If-Range yields a full 200
+            stats = client.download_to_file(url, out, resume=True)
+            client.close()
+            with open(out, 'rb') as f:
+                self.assertEqual(f.read(), fresh)
+            self.assertEqual(stats.resumed_from, 0)
+
+    def test_segmented_download_reassembles_in_place(self):
+        """Concurrent byte ranges are written at their offsets in one file"""
+        payload = os.urandom(200_000)
+        with LocalHttpServer() as srv, tempfile.TemporaryDirectory() as tmp:
+            url = srv.add('/ep.mp3', payload)
+            out = os.path.join(tmp, 'ep.mp3')
+            client = HttpClient(HttpSettings(min_segment_size=10_000))
+            stats = client.download_segmented(url, out, segments=4, chunk_size=4096)
+            client.close()
+            with open(out, 'rb') as f:
+                self.assertEqual(f.read(), payload)
+            self.assertEqual(stats.bytes_done, len(payload))
+            ranges = [r['headers'].get('Range') for r in srv.requests]
+            self.assertEqual(len(ranges), 5)  # probe + 4 segments
+            self.assertIn('bytes=150000-199999', ranges)
+            self.assertTrue(all(r['headers'].get('If-Range') for r in srv.requests[1:]))
+
+    def test_segmented_download_with_weak_etag_sends_no_if_range(self):
+        payload = os.urandom(200_000)
+        with LocalHttpServer() as srv, tempfile.TemporaryDirectory() as tmp:
+            url = srv.add('/ep.mp3', payload, etag='W/"v1"')
+            out = os.path.join(tmp, 'ep.mp3')
+            client = HttpClient(HttpSettings(min_segment_size=10_000))
+            client.download_segmented(url, out, segments=4)
+            client.close()
+            with open(out, 'rb') as f:
+                self.assertEqual(f.read(), payload)
+            self.assertEqual(len(srv.requests), 5)
+            self.assertFalse(any(r['headers'].get('If-Range') for r in srv.requests))
+
+    def test_segmented_download_starts_over_when_a_range_is_refused(self):
+        payload = os.urandom(200_000)
+        with LocalHttpServer() as srv, tempfile.TemporaryDirectory() as tmp:
+            url = srv.add('/ep.mp3', payload)
+            out = os.path.join(tmp, 'ep.mp3')
+            client = HttpClient(HttpSettings(min_segment_size=10_000))
+            # The file changed after the probe: every If-Range yields a full 200
+            with patch.object(client, '_probe_ranges', return_value=(len(payload), '"old"', '')):
+                client.download_segmented(url, out, segments=4)
+            client.close()
+            with open(out, 'rb') as f:
+                self.assertEqual(f.read(), payload)
+            self.assertFalse(os.path.exists(out + '.part'))
+
+    def test_segmented_download_falls_back_without_ranges(self):
+        payload = os.urandom(50_000)
+        with LocalHttpServer() as srv, tempfile.TemporaryDirectory() as tmp:
+            url = srv.add('/ep.mp3', payload, ranges=False)
+            out = os.path.join(tmp, 'ep.mp3')
+            client = HttpClient(HttpSettings(min_segment_size=1_000))
+            client.download_segmented(url, out, segments=4)
+            client.close()
+            with open(out, 'rb') as f:
+                self.assertEqual(f.read(), payload)
+
+    def test_configure_replaces_shared_client(self):
+        """configure() applies known keys and rebuilds the shared client"""
+        try:
+            first = http_client.get_client()
+            settings = http_client.configure(timeout=3, pool_size=2, unknown='x')
+            self.assertEqual(settings.timeout, 3)
+            self.assertEqual(settings.pool_size, 2)
+            second = http_client.get_client()
+            self.assertIsNot(first, second)
+            self.assertEqual(second.settings.timeout, 3)
+        finally:
+            http_client.configure(**HttpSettings().__dict__)
+
+
+if __name__ == '__main__':
+    unittest.main()
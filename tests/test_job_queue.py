@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from audiogram_generator.core.jobs import RenderJob
+from audiogram_generator.services.job_queue import JobQueue, LeaseKeeper
+
+FEED = 'https://example.com/feed.xml'
+CLOCK = 'audiogram_generator.services.job_queue.time.time'
+
+
+def _jobs(episodes=(1, 2), soundbites=(1, 2), formats=('square',)):
+    return [RenderJob(e, s, f, True) for e in episodes for s in soundbites for f in formats]
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'queue.sqlite')
+        self.queue = JobQueue(self.path)
+
+    def tearDown(self):
+        self.queue.close()
+        self._tmp.cleanup()
+
+    def test_enqueue_is_idempotent(self):
+        self.assertEqual(self.queue.enqueue(FEED, _jobs()), 4)
+        self.assertEqual(self.queue.enqueue(FEED, _jobs()), 0)
+        self.assertEqual(self.queue.counts()['pending'], 4)
+
+    def test_claim_takes_one_episode_per_batch(self):
+        self.queue.enqueue(FEED, _jobs())
+        first = self.queue.claim('a', 60)
+        second = self.queue.claim('b', 60)
+        self.assertEqual({q.job.episode for q in first}, {1})
+        self.assertEqual({q.job.episode for q in second}, {2})
+        self.assertEqual(len(first), 2)
+        self.assertEqual(self.queue.claim('c', 60), [])
+        self.assertEqual(self.queue.counts()['leased'], 4)
+
+    def test_expired_lease_is_reclaimed_and_old_owner_loses_it(self):
+        self.queue.enqueue(FEED, _jobs(episodes=(1,), soundbites=(1,)))
+        [stale] = self.queue.claim('crashed', 60)
+        later = time.time() + 120
+        with patch(CLOCK, return_value=later):
+            [again] = self.queue.claim('b', 60)
+            self.assertEqual(again.attempts, 2)
+            self.assertFalse(self.queue.complete('crashed', stale, 1.0))
+            self.assertTrue(self.queue.complete('b', again, 2.5))
+        self.assertEqual(self.queue.counts()['done'], 1)
+        self.assertEqual(self.queue.timings()['total'], 2.5)
+
+    def test_job_that_keeps_killing_its_worker_ends_up_failed(self):
+        self.queue.enqueue(FEED, _jobs(episodes=(1,), soundbites=(1,)), max_attempts=2)
+        now = time.time()
+        [first] = self.queue.claim('crashed-1', 5)
+        with patch(CLOCK, return_value=now + 6):
+            # Expired, but the retry waits out the backoff like a failure
+            self.assertEqual(self.queue.claim('b', 5, backoff=10), [])
+            self.assertEqual(self.queue.counts()['pending'], 1)
+        with patch(CLOCK, return_value=now + 16):
+            [second] = self.queue.claim('crashed-2', 5, backoff=10)
+            self.assertEqual(second.attempts, 2)
+        for later in (30, 60, 120):
+            with patch(CLOCK, return_value=now + later):
+                self.assertEqual(self.queue.claim('c', 5, backoff=10), [])
+        self.assertEqual(self.queue.counts()['failed'], 1)
+        self.assertFalse(self.queue.has_unfinished())
+        [failure] = self.queue.failures()
+        self.assertEqual((failure['attempts'], failure['last_error']), (2, 'lease expired'))
+
+    def test_heartbeat_keeps_the_lease(self):
+        self.queue.enqueue(FEED, _jobs(episodes=(1,), soundbites=(1,)))
+        batch = self.queue.claim('a', 60)
+        now = time.time()
+        with patch(CLOCK, return_value=now + 50):
+            self.assertEqual(self.queue.heartbeat('a', batch, 60), 1)
+        with patch(CLOCK, return_value=now + 100):
+            self.assertEqual(self.queue.claim('b', 60), [])
+
+    def test_lease_keeper_renews_in_the_background(self):
+        self.queue.enqueue(FEED, _jobs(episodes=(1,), soundbites=(1,)))
+        batch = self.queue.claim('a', 2)
+        with LeaseKeeper(self.path, 'a', batch, 600, interval=0.05):
+            time.sleep(0.3)
+        row = self.queue._conn.execute("SELECT lease_expires FROM jobs").fetchone()
+        self.assertGreater(row['lease_expires'], time.time() + 500)
+
+    def test_failures_back_off_then_fail(self):
+        self.queue.enqueue(FEED, _jobs(episodes=(1,), soundbites=(1,)), max_attempts=2)
+        now = time.time()
+        [job] = self.queue.claim('a', 60)
+        self.assertEqual(self.queue.fail('a', job, 'boom', backoff=10), 'pending')
+        self.assertEqual(self.queue.claim('a', 60), [])  # still backing off
+        self.assertTrue(self.queue.has_unfinished())
+        with patch(CLOCK, return_value=now + 11):
+            [job] = self.queue.claim('a', 60)
+            self.assertEqual(self.queue.fail('a', job, 'boom again', backoff=10), 'failed')
+        self.assertFalse(self.queue.has_unfinished())
+        [failure] = self.queue.failures()
+        self.assertEqual((failure['attempts'], failure['last_error']), (2, 'boom again'))
+        # Requeue starts failed jobs over
+        jobs = _jobs(episodes=(1,), soundbites=(1,))
+        self.assertEqual(self.queue.enqueue(FEED, jobs, requeue=True), 1)
+        self.assertEqual(self.queue.counts()['pending'], 1)
+
+    def test_release_does_not_count_an_attempt(self):
+        self.queue.enqueue(FEED, _jobs(episodes=(1,), soundbites=(1,)))
+        batch = self.queue.claim('a', 60)
+        self.queue.release('a', batch)
+        [job] = self.queue.claim('b', 60)
+        self.assertEqual(job.attempts, 1)
+
+    def test_jobs_keep_their_guid_and_are_batched_by_it(self):
+        # Episode numbers shifted between the two plans; the GUID did not
+        self.queue.enqueue(FEED, [RenderJob(2, 1, 'square', True, 'g-a')])
+        self.queue.enqueue(FEED, [RenderJob(1, 2, 'square', True, 'g-a'),
+                                  RenderJob(2, 1, 'square', True, 'g-b')])
+        batch = self.queue.claim('a', 60)
+        self.assertEqual({q.job.guid for q in batch}, {'g-a'})
+        self.assertEqual(sorted(q.key for q in batch), ['g-a:sb1:square', 'g-a:sb2:square'])
+
+    def test_queue_without_guid_column_is_migrated(self):
+        self.queue.close()
+        os.remove(self.path)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE jobs (key TEXT NOT NULL, feed_url TEXT NOT NULL,"
+                     " episode INTEGER NOT NULL, soundbite INTEGER NOT NULL, format TEXT NOT NULL,"
+                     " show_subtitles INTEGER NOT NULL, status TEXT NOT NULL DEFAULT 'pending',"
+                     " attempts INTEGER NOT NULL DEFAULT 0,"
+                     " max_attempts INTEGER NOT NULL DEFAULT 3,"
+                     " not_before REAL NOT NULL DEFAULT 0, lease_owner TEXT, lease_expires REAL,"
+                     " last_error TEXT, enqueued_at REAL NOT NULL, started_at REAL,"
+                     " finished_at REAL, duration REAL, PRIMARY KEY (feed_url, key))")
+        conn.execute("INSERT INTO jobs (key, feed_url, episode, soundbite, format, show_subtitles,"
+                     " enqueued_at) VALUES ('ep1:sb1:square', ?, 1, 1, 'square', 1, 0)", (FEED,))
+        conn.commit()
+        conn.close()
+        self.queue = JobQueue(self.path)
+        [legacy] = self.queue.claim('a', 60)
+        self.assertIsNone(legacy.job.guid)
+        self.assertEqual(legacy.key, 'ep1:sb1:square')
+
+
+if __name__ == '__main__':
+    unittest.main()
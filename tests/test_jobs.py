@@ -0,0 +1,157 @@
+import unittest
+from dataclasses import replace
+
+from audiogram_generator.core.jobs import (
+    EpisodePlan, JobSpec, RenderJob, parse_jobs, expand_jobs, parse_shard, shard_of, select_shard,
+    added_soundbites,
+)
+
+
+def _episode(number, soundbites=3, guid=None):
+    return {
+        'number': number,
+        'guid': guid or f'guid-{number}',
+        'soundbites': [{'start': i * 10, 'duration': 5} for i in range(soundbites)],
+    }
+
+
+class TestParseJobs(unittest.TestCase):
+    def test_defaults_apply_and_entries_override(self):
+        specs = parse_jobs({
+            'defaults': {'formats': ['vertical', 'square'], 'show_subtitles': True},
+            'jobs': [
+                {'episode': 142, 'soundbites': [1, 3]},
+                {'guid': 'abc', 'formats': 'horizontal', 'show_subtitles': False},
+            ],
+        })
+        self.assertEqual(specs[0], JobSpec(episode=142, soundbites='1,3',
+                                           formats=('vertical', 'square'), show_subtitles=True))
+        self.assertEqual(specs[1], JobSpec(guid='abc', formats=('horizontal',),
+                                           show_subtitles=False))
+
+    def test_bare_list_and_number_shorthand(self):
+        self.assertEqual(parse_jobs([5, '7']), [JobSpec(episode=5), JobSpec(episode=7)])
+
+    def test_invalid_entries_name_the_job(self):
+        cases = [
+            ({'jobs': []}, 'non-empty'),
+            ([{'episode': 1, 'guid': 'x'}], 'job 1'),
+            ([1, {'soundbites': 'all'}], 'job 2'),
+            ([{'episode': 'abc'}], "'episode' must be a number"),
+            ([{'episode': 1, 'colour': 'red'}], 'unknown keys'),
+            ([{'episode': 1, 'show_subtitles': 'no'}], 'true or false'),
+            ({'defaults': {'episode': 3}, 'jobs': [1]}, 'defaults'),
+        ]
+        for data, message in cases:
+            with self.subTest(data=data):
+                with self.assertRaisesRegex(ValueError, message):
+                    parse_jobs(data)
+
+
+class TestExpandJobs(unittest.TestCase):
+    def setUp(self):
+        self.episodes = {1: _episode(1), 2: _episode(2, soundbites=2)}
+
+    def resolve(self, spec):
+        if spec.guid is not None:
+            return next((ep for ep in self.episodes.values() if ep['guid'] == spec.guid), None)
+        return self.episodes.get(spec.episode)
+
+    def test_duplicates_collapse_and_episodes_are_grouped(self):
+        specs = parse_jobs([
+            {'episode': 1, 'soundbites': [1]},
+            {'episode': 2},
+            {'guid': 'guid-1', 'soundbites': '1-2', 'formats': ['square']},
+        ])
+        plans, problems = expand_jobs(specs, self.resolve, ['vertical', 'square'])
+        self.assertEqual(problems, [])
+        self.assertEqual([p.episode['number'] for p in plans], [1, 2])
+        self.assertEqual(plans[0].soundbites, [1, 2])
+        self.assertEqual([j.key for j in plans[0].jobs],
+                         ['guid-1:sb1:vertical', 'guid-1:sb1:square', 'guid-1:sb2:square'])
+        self.assertEqual(len(plans[1].jobs), 4)
+
+    def test_subtitle_variants_are_distinct_jobs(self):
+        specs = parse_jobs([
+            {'episode': 1, 'soundbites': [2], 'formats': ['square']},
+            {'episode': 1, 'soundbites': [2], 'formats': ['square'], 'show_subtitles': False},
+        ])
+        plans, _ = expand_jobs(specs, self.resolve, ['square'], default_subtitles=True)
+        self.assertEqual(plans[0].jobs, [RenderJob(1, 2, 'square', True, 'guid-1'),
+                                         RenderJob(1, 2, 'square', False, 'guid-1')])
+        self.assertEqual(plans[0].soundbites, [2])
+        self.assertEqual(plans[0].jobs[1].key, 'guid-1:sb2:square:nosubs')
+        # Jobs planned without a GUID fall back to the episode number
+        self.assertEqual(RenderJob(1, 2, 'square', False).key, 'ep1:sb2:square:nosubs')
+
+    def test_problems_are_reported_and_skipped(self):
+        specs = parse_jobs([
+            {'episode': 9},
+            {'episode': 2, 'soundbites': [5]},
+            {'episode': 1, 'soundbites': [1], 'formats': ['square', 'story']},
+        ])
+        plans, problems = expand_jobs(specs, self.resolve, ['square'])
+        self.assertEqual(len(problems), 3)
+        self.assertIn('episode 9 not found', problems[0])
+        self.assertIn("['story']", problems[2])
+        self.assertEqual([j.key for p in plans for j in p.jobs], ['guid-1:sb1:square'])
+
+
+class TestShards(unittest.TestCase):
+    def _plans(self, episodes):
+        resolve = {n: _episode(n) for n in range(1, episodes + 1)}.get
+        specs = [JobSpec(episode=n) for n in range(1, episodes + 1)]
+        plans, _ = expand_jobs(specs, lambda spec: resolve(spec.episode), ['vertical', 'square'])
+        return plans
+
+    def test_parse_shard(self):
+        self.assertIsNone(parse_shard(None))
+        self.assertEqual(parse_shard('2/4'), (2, 4))
+        for bad in ('0/4', '5/4', '1/0', 'x/2', '3'):
+            with self.subTest(bad=bad), self.assertRaises(ValueError):
+                parse_shard(bad)
+
+    def test_shards_partition_the_jobs(self):
+        plans = self._plans(10)
+        every = [j.key for p in plans for j in p.jobs]
+        shards = [[j.key for p in select_shard(plans, (k, 3)) for j in p.jobs] for k in (1, 2, 3)]
+        self.assertEqual(sorted(sum(shards, [])), sorted(every))
+        self.assertTrue(all(shards))
+        for plan in select_shard(plans, (1, 3)):
+            self.assertEqual(plan.soundbites, sorted({j.soundbite for j in plan.jobs}))
+
+    def test_assignment_is_stable_when_episodes_are_added(self):
+        before = {j.key: shard_of(j, 4, p.episode['guid']) for p in self._plans(10) for j in p.jobs}
+        after = {j.key: shard_of(j, 4, p.episode['guid']) for p in self._plans(15) for j in p.jobs}
+        self.assertEqual({k: after[k] for k in before}, before)
+
+    def test_assignment_follows_the_guid_not_the_number(self):
+        plans = self._plans(10)
+        # The oldest episode leaves the feed: every other one is renumbered
+        renumbered = [EpisodePlan(dict(p.episode, number=p.episode['number'] - 1), p.soundbites,
+                                  [replace(j, episode=j.episode - 1) for j in p.jobs])
+                      for p in plans[1:]]
+
+        def assignment(plans):
+            return {(p.episode['guid'], j.soundbite, j.format): k
+                    for k in (1, 2, 3) for p in select_shard(plans, (k, 3)) for j in p.jobs}
+
+        before = assignment(plans)
+        after = assignment(renumbered)
+        self.assertEqual({key: before[key] for key in after}, after)
+
+
+class TestAddedSoundbites(unittest.TestCase):
+    def test_compares_by_content_not_position(self):
+        old = {'soundbites': [{'start': '10', 'duration': '5', 'text': 'a'},
+                              {'start': '40', 'duration': '5', 'text': 'b'}]}
+        new = {'soundbites': [{'start': '5', 'duration': '3', 'text': 'intro'},
+                              {'start': '10', 'duration': '5', 'text': 'a'},
+                              {'start': '40', 'duration': '6', 'text': 'b'}]}
+        self.assertEqual(added_soundbites(old, new), [1, 3])
+        self.assertEqual(added_soundbites(new, new), [])
+        self.assertEqual(added_soundbites(None, new), [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from audiogram_generator import cli
+from audiogram_generator.services import rss
+from audiogram_generator.services.errors import RssError
+from audiogram_generator.telemetry import metrics, stages
+
+
+def _samples(text):
+    """``{(name, labels): value}`` of a Prometheus text exposition."""
+    result = {}
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        series, value = line.rsplit(' ', 1)
+        name, _, labels = series.partition('{')
+        result[(name, labels.rstrip('}'))] = float(value)
+    return result
+
+
+def _job(seconds, duration, frames, frames_wall, encode_wall):
+    snapshot = {'stages': {
+        'frame_composition': {'count': frames, 'wall': frames_wall, 'cpu': frames_wall},
+        'encode': {'count': 1, 'wall': encode_wall, 'cpu': encode_wall},
+    }, 'counters': {'cache.waveform.hits': 1}}
+    job = {'output': 'v.mp4', 'format': 'square', 'seconds': seconds, 'duration': duration}
+    return job, snapshot
+
+
+class TestRenderMetrics(unittest.TestCase):
+    def tearDown(self):
+        stages.end_run()
+
+    def test_counters_and_histograms_of_a_run(self):
+        run = stages.start_run()
+        run.add_job(*_job(seconds=15.0, duration=10.0, frames=240, frames_wall=6.0,
+                          encode_wall=4.0))
+        run.add_job(*_job(seconds=50.0, duration=10.0, frames=240, frames_wall=20.0,
+                          encode_wall=20.0))
+        run.add_job({'output': 'w.mp4', 'format': 'vertical', 'error': 'OSError'}, None)
+        stages.count('http.bytes', 2048)
+        stages.count('cache.audio.misses')
+        stages.failure(RssError('timeout'))
+        samples = _samples(metrics.render_metrics(run))
+
+        self.assertEqual(samples[('audiogram_jobs_total', 'format="square",status="succeeded"')], 2)
+        self.assertEqual(samples[('audiogram_jobs_total', 'format="vertical",status="failed"')], 1)
+        self.assertEqual(samples[('audiogram_frames_total', '')], 480)
+        # 1.5 and 5.0 render seconds per output second
+        ratio = 'audiogram_render_seconds_per_output_second'
+        self.assertEqual(samples[(ratio + '_bucket', 'le="1"')], 0)
+        self.assertEqual(samples[(ratio + '_bucket', 'le="2"')], 1)
+        self.assertEqual(samples[(ratio + '_bucket', 'le="8"')], 2)
+        self.assertEqual(samples[(ratio + '_bucket', 'le="+Inf"')], 2)
+        self.assertEqual(samples[(ratio + '_sum', '')], 6.5)
+        # 24 and 6 frames per second
+        self.assertEqual(samples[('audiogram_encoder_fps_bucket', 'le="5"')], 0)
+        self.assertEqual(samples[('audiogram_encoder_fps_bucket', 'le="10"')], 1)
+        self.assertEqual(samples[('audiogram_encoder_fps_bucket', 'le="24"')], 2)
+        self.assertEqual(samples[('audiogram_downloaded_bytes_total', '')], 2048)
+        self.assertEqual(samples[('audiogram_cache_hits_total', 'cache="waveform"')], 2)
+        self.assertEqual(samples[('audiogram_cache_misses_total', 'cache="waveform"')], 0)
+        self.assertEqual(samples[('audiogram_cache_misses_total', 'cache="audio"')], 1)
+        self.assertEqual(samples[('audiogram_failures_total', 'type="RssError"')], 1)
+        for error in ('SrtFetchError', 'AssetDownloadError', 'RenderError'):
+            self.assertEqual(samples[('audiogram_failures_total', f'type="{error}"')], 0)
+
+    def test_every_family_has_help_and_type(self):
+        text = metrics.render_metrics(stages.start_run())
+        names = {line.split()[2] for line in text.splitlines() if line.startswith('# TYPE')}
+        for key in _samples(text):
+            family = key[0]
+            for suffix in ('_bucket', '_sum', '_count'):
+                if family.endswith(suffix) and family[:-len(suffix)] in names:
+                    family = family[:-len(suffix)]
+            self.assertIn(family, names)
+
+    def test_failures_are_counted_where_they_are_raised(self):
+        stages.start_run()
+        with patch.object(rss, 'get_client', side_effect=OSError('unreachable')):
+            with self.assertRaises(RssError):
+                rss.fetch_feed('https://example/feed.xml')
+        self.assertEqual(stages.get_run().times.counters['failures.RssError'], 1)
+
+    def test_write_replaces_the_file_atomically(self):
+        run = stages.start_run()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'textfile', 'audiogram.prom')
+            self.assertEqual(run.write_metrics(path), path)
+            run.add_job({'output': 'a"b.mp4', 'format': 'sq"uare', 'error': 'OSError'}, None)
+            run.write_metrics(path)
+            self.assertEqual(os.listdir(os.path.dirname(path)), ['audiogram.prom'])
+            with open(path) as f:
+                self.assertIn('format="sq\\"uare",status="failed"} 1', f.read())
+
+
+class TestCliMetricsFile(unittest.TestCase):
+    def test_metrics_file_counts_failed_renders(self):
+        selected = {
+            'number': 1, 'title': 'Ep', 'link': 'https://example/ep1', 'transcript_url': None,
+            'audio_url': 'https://example/a.mp3', 'image_url': None,
+            'soundbites': [{'start': 0, 'duration': 5, 'title': 'SB1'}],
+        }
+        def load(feed_url, index_path=None):
+            return [(1, 'Ep')], {'title': 'Podcast'}, lambda nums: {1: selected}, None, None
+        with tempfile.TemporaryDirectory() as tmp:
+            config_path = os.path.join(tmp, 'config.yaml')
+            with open(config_path, 'w') as f:
+                f.write("formats:\n  vertical: {enabled: false}\n  horizontal: {enabled: false}\n")
+            metrics_path = os.path.join(tmp, 'audiogram.prom')
+            with patch('audiogram_generator.cli._load_episodes', side_effect=load), \
+                    patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3'), \
+                    patch('audiogram_generator.cli.extract_audio_segment',
+                          return_value='/tmp/seg.mp3'), \
+                    patch('audiogram_generator.cli.generate_audiogram',
+                          side_effect=OSError('ffmpeg died')), \
+                    patch('audiogram_generator.cli.generate_caption_file'), \
+                    redirect_stdout(io.StringIO()) as stdout:
+                cli.main(['--config', config_path, '--feed-url', 'https://example/feed.xml',
+                          '--output-dir', tmp, '--episode', '1', '--soundbites', '1',
+                          '--no-cache', '--force', '--metrics-file', metrics_path])
+            self.assertIn('Metrics:', stdout.getvalue())
+            with open(metrics_path) as f:
+                samples = _samples(f.read())
+        self.assertEqual(samples[('audiogram_jobs_total', 'format="square",status="failed"')], 1)
+        # Counted by the type the render raised
+        self.assertEqual(samples[('audiogram_failures_total', 'type="OSError"')], 1)
+        self.assertEqual(samples[('audiogram_failures_total', 'type="RenderError"')], 0)
+        self.assertIsNone(stages.get_run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import struct
+import tempfile
+import threading
+import unittest
+import wave
+
+from audiogram_generator import audio_utils
+from audiogram_generator.core import mp3
+
+from tests.http_fixtures import LocalHttpServer
+from tests.mp3_fixtures import (
+    FRAME_HEADER, FRAME_LEN, SECONDS_PER_FRAME, make_frames, make_id3, make_xing_frame,
+)
+
+
+class TestMp3Layout(unittest.TestCase):
+    def test_cbr_layout_and_time_mapping(self):
+        data = make_id3(1000) + make_frames(2000)
+        layout = mp3.parse_layout(data, len(data))
+        self.assertEqual(layout.kind, 'cbr')
+        self.assertEqual(layout.audio_start, 1010)
+        self.assertEqual(layout.header.frame_length, FRAME_LEN)
+        # 128 kbps -> 16000 bytes per second
+        self.assertEqual(mp3.time_to_byte(layout, 10.0), 1010 + 160000)
+        self.assertAlmostEqual(layout.duration, 2000 * FRAME_LEN / 16000.0)
+
+    def test_xing_toc_mapping(self):
+        frames = make_frames(1000)
+        toc = [int(i * 2.56) for i in range(100)]
+        data = make_id3(0) + make_xing_frame(1000, len(frames), toc) + frames
+        layout = mp3.parse_layout(data, len(data))
+        self.assertEqual(layout.kind, 'xing')
+        self.assertAlmostEqual(layout.duration, 1000 * SECONDS_PER_FRAME)
+        mid = mp3.time_to_byte(layout, layout.duration / 2)
+        self.assertAlmostEqual(mid - layout.audio_start, len(frames) / 2, delta=len(frames) * 0.01)
+
+    def test_plan_range_applies_margin(self):
+        data = make_frames(5000)
+        layout = mp3.parse_layout(data, len(data))
+        first, last, t0 = mp3.plan_range(layout, 60.0, 10.0, margin=2.0)
+        self.assertEqual(t0, 58.0)
+        self.assertEqual(first, 58 * 16000)
+        self.assertEqual(last, 72 * 16000 - 1)
+
+
+class TestFetchAudioRange(unittest.TestCase):
+    def test_fetches_only_the_needed_range(self):
+        body = make_id3(200_000) + make_frames(20_000)  # ~7.7 MB, 480 s
+        with LocalHttpServer() as srv, tempfile.TemporaryDirectory() as tmp:
+            url = srv.add('/ep.mp3', body)
+            out = os.path.join(tmp, 'partial.mp3')
+            offset = audio_utils.fetch_audio_range(url, 300.0, 30.0, out, margin=2.0)
+            self.assertAlmostEqual(offset, 2.0)
+            with open(out, 'rb') as f:
+                data = f.read()
+            # Starts on a frame boundary and covers ~34 s of 16 kB/s audio
+            self.assertEqual(data[:4], FRAME_HEADER)
+            self.assertLess(len(data), 40 * 16000)
+            self.assertGreater(len(data), 33 * 16000)
+            first_frame = struct.unpack('>I', data[4:8])[0]
+            self.assertAlmostEqual(first_frame * SECONDS_PER_FRAME, 298.0, delta=0.1)
+            self.assertTrue(all('Range' in r['headers'] for r in srv.requests))
+
+    def test_returns_none_without_range_support(self):
+        body = make_frames(1000)
+        with LocalHttpServer() as srv, tempfile.TemporaryDirectory() as tmp:
+            url = srv.add('/ep.mp3', body, ranges=False)
+            out = os.path.join(tmp, 'partial.mp3')
+            self.assertIsNone(audio_utils.fetch_audio_range(url, 5.0, 3.0, out))
+            self.assertFalse(os.path.exists(out))
+
+
+class TestDecodedAudio(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for name in ('ep1.wav', 'ep2.wav'):
+            path = os.path.join(self._tmp.name, name)
+            with wave.open(path, 'wb') as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(8000)
+                w.writeframes(b'\0\0' * 8000)
+            self.paths.append(path)
+
+    def tearDown(self):
+        audio_utils.clear_decoded_cache()
+        self._tmp.cleanup()
+
+    def test_clearing_keeps_other_threads_decodes(self):
+        # The main thread finishing episode 1 must not drop episode 2, which
+        # the prepare thread decoded ahead and is still cutting
+        main = audio_utils.decode_audio(self.paths[0])
+        ready, cleared = threading.Event(), threading.Event()
+        reused = []
+
+        def prepare_next():
+            audio = audio_utils.decode_audio(self.paths[1])
+            ready.set()
+            cleared.wait(10)
+            reused.append(audio_utils.decode_audio(self.paths[1]) is audio)
+            audio_utils.clear_decoded_cache()
+
+        thread = threading.Thread(target=prepare_next)
+        thread.start()
+        ready.wait(10)
+        self.assertEqual(audio_utils.decoded_bytes(), 32000)
+        audio_utils.clear_decoded_cache()
+        self.assertEqual(audio_utils.decoded_bytes(), 16000)
+        cleared.set()
+        thread.join(10)
+        self.assertEqual(reused, [True])
+        self.assertEqual(audio_utils.decoded_bytes(), 0)
+        self.assertIsNot(audio_utils.decode_audio(self.paths[0]), main)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import threading
+import time
+import unittest
+
+from audiogram_generator.core.pipeline import run_ahead
+
+
+class TestRunAhead(unittest.TestCase):
+    def test_yields_in_order(self):
+        out = [(item, prepared) for item, prepared, _ in run_ahead(range(5), lambda i: i * 10)]
+        self.assertEqual(out, [(i, i * 10) for i in range(5)])
+
+    def test_prepares_next_item_while_current_is_consumed(self):
+        """Preparation of item N+1 overlaps the consumer's work on item N"""
+        def prepare(i):
+            time.sleep(0.1)
+            return i
+
+        started = time.time()
+        for _ in run_ahead(range(4), prepare):
+            time.sleep(0.1)
+        # Sequential would take 0.8 s; overlapped about 0.5 s
+        self.assertLess(time.time() - started, 0.7)
+
+    def test_never_more_than_depth_ahead(self):
+        lock = threading.Lock()
+        state = {'prepared': 0, 'consumed': 0, 'max_ahead': 0}
+
+        def prepare(i):
+            with lock:
+                state['prepared'] += 1
+                ahead = state['prepared'] - state['consumed']
+                state['max_ahead'] = max(state['max_ahead'], ahead)
+            return i
+
+        for _ in run_ahead(range(10), prepare, depth=2):
+            time.sleep(0.02)
+            with lock:
+                state['consumed'] += 1
+        self.assertLessEqual(state['max_ahead'], 3)  # current item + 2 ahead
+
+    def test_errors_are_handed_to_the_consumer(self):
+        def prepare(i):
+            if i == 1:
+                raise RuntimeError('boom')
+            return i
+
+        results = list(run_ahead(range(3), prepare))
+        self.assertEqual([r[1] for r in results], [0, None, 2])
+        self.assertIsInstance(results[1][2], RuntimeError)
+
+    def test_unconsumed_items_are_discarded_on_early_stop(self):
+        discarded = []
+        for item, _, _ in run_ahead(range(10), lambda i: i, depth=2, discard=discarded.append):
+            if item == 0:
+                time.sleep(0.05)  # let the worker fill its slots
+                break
+        self.assertTrue(discarded)
+        self.assertTrue(all(i > 0 for i in discarded))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from audiogram_generator import cli
+from audiogram_generator.services import cache as asset_cache
+from audiogram_generator.services.cache import AssetCache
+from audiogram_generator.services.prefetch import PrefetchItem, plan_prefetch, prefetch
+
+from tests.http_fixtures import LocalHttpServer
+from tests.mp3_fixtures import make_frames
+from tests.test_rss_service import SAMPLE_FEED
+
+
+class TestPlanPrefetch(unittest.TestCase):
+    def test_collects_unique_assets(self):
+        podcast = {'image_url': 'http://h/cover.jpg'}
+        episodes = [
+            {'transcript_url': 'http://h/1.srt', 'audio_url': 'http://h/1.mp3', 'image_url': 'http://h/e1.jpg'},
+            {'transcript_url': 'http://h/2.srt', 'audio_url': 'http://h/2.mp3', 'image_url': None},
+        ]
+        items = plan_prefetch(episodes, podcast)
+        self.assertEqual([(i.url, i.kind) for i in items], [
+            ('http://h/1.srt', 'srt'), ('http://h/cover.jpg', 'artwork'), ('http://h/2.srt', 'srt'),
+        ])
+        items = plan_prefetch(episodes, podcast, use_episode_cover=True, audio=True)
+        urls = [i.url for i in items]
+        self.assertIn('http://h/e1.jpg', urls)
+        self.assertIn('http://h/cover.jpg', urls)  # fallback for episode 2
+        self.assertIn('http://h/2.mp3', urls)
+
+
+class TestPrefetch(unittest.TestCase):
+    def test_fills_cache_concurrently_within_host_limit(self):
+        with LocalHttpServer() as srv, tempfile.TemporaryDirectory() as tmp:
+            cache = AssetCache(tmp, max_bytes=10 * 1024 * 1024)
+            items = [
+                PrefetchItem(srv.add(f'/{n}.srt', os.urandom(1000), delay=0.2), 'srt')
+                for n in range(8)
+            ]
+            result = prefetch(items, per_host=3, cache=cache)
+            self.assertEqual(result.fetched, 8)
+            self.assertEqual(result.failed, [])
+            self.assertEqual(srv.max_inflight, 3)
+            # 8 requests of 0.2 s, 3 at a time: about 3 rounds, not 8
+            self.assertLess(result.elapsed, 1.2)
+            for item in items:
+                self.assertIsNotNone(cache.lookup_url(item.url))
+            cache.close()
+
+    def test_failures_are_collected_not_raised(self):
+        with LocalHttpServer() as srv, tempfile.TemporaryDirectory() as tmp:
+            cache = AssetCache(tmp, max_bytes=10 * 1024 * 1024)
+            ok = srv.add('/ok.jpg', b'img')
+            items = [PrefetchItem(ok, 'artwork'), PrefetchItem(srv.url('/gone.jpg'), 'artwork')]
+            result = prefetch(items, cache=cache)
+            self.assertEqual(result.fetched, 1)
+            self.assertEqual(result.failed[0][0], srv.url('/gone.jpg'))
+            cache.close()
+
+    def test_without_cache_nothing_is_fetched(self):
+        result = prefetch([PrefetchItem('http://127.0.0.1:9/x.srt', 'srt')], cache=None)
+        self.assertEqual(result.fetched, 0)
+
+
+class TestPrefetchCommand(unittest.TestCase):
+    def test_subcommand_warms_cache_without_rendering(self):
+        with LocalHttpServer() as srv, tempfile.TemporaryDirectory() as tmp:
+            base = srv.url('')
+            feed = SAMPLE_FEED.replace('https://example.com/', base + '/')
+            feed_url = srv.add('/feed.xml', feed.encode('utf-8'))
+            srv.add('/podcast.jpg', b'jpeg')
+            for name in ('ep-a', 'ep-b'):
+                srv.add(f'/{name}.mp3', make_frames(500))
+                srv.add(f'/{name}.srt', b'1\n00:00:00,000 --> 00:00:01,000\nHi\n')
+            out = io.StringIO()
+            try:
+                with contextlib.redirect_stdout(out):
+                    rc = cli.main(['prefetch', '--feed-url', feed_url, '--episode', '1-2',
+                                   '--cache-dir', os.path.join(tmp, 'cache')])
+                cache = asset_cache.get_cache()
+                for path in ('/ep-a.mp3', '/ep-b.mp3', '/ep-a.srt', '/ep-b.srt', '/podcast.jpg'):
+                    self.assertIsNotNone(cache.lookup_url(srv.url(path)), path)
+            finally:
+                asset_cache.configure(enabled=False)
+            self.assertEqual(rc, 0)
+            self.assertIn('Prefetched 5 assets', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import io
+import os
+import pstats
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+import numpy as np
+
+from audiogram_generator import cli, video_generator
+from audiogram_generator.rendering import facade
+from audiogram_generator.telemetry import profiling
+
+CHUNKS = [{'start': 0.0, 'end': 2.0, 'text': 'Una frase di prova per i sottotitoli'}]
+
+
+def _render_frames(n=3):
+    # Looked up on the module, as the video generator's make_frame does
+    for i in range(n):
+        video_generator.create_audiogram_frame(
+            270, 480, '/nonexistent.png', 'Podcast', 'Episodio', np.linspace(0, 1, 48),
+            i / 24, CHUNKS, 2.0, None, None, 'vertical',
+        )
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(profiling.configure, None)
+        self.prefix = os.path.join(tmp.name, 'ep1_sb1_vertical')
+
+    def test_off_by_default(self):
+        with profiling.profile_job(self.prefix, video_generator, facade.PROFILED_HOT_PATH):
+            pass
+        self.assertEqual(os.listdir(os.path.dirname(self.prefix)), [])
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            profiling.configure('gpu')
+
+    def test_cpu_profile_attributes_the_hot_path(self):
+        profiling.configure('cpu')
+        with profiling.profile_job(self.prefix, video_generator, facade.PROFILED_HOT_PATH):
+            _render_frames()
+        functions = {func for _file, _line, func in pstats.Stats(self.prefix + '.pstats').stats}
+        for name in facade.PROFILED_HOT_PATH:
+            self.assertIn(name, functions)
+        with open(self.prefix + '.cpu.txt') as f:
+            summary = f.read()
+        row = next(line for line in summary.splitlines()
+                   if line.strip().startswith('create_audiogram_frame'))
+        self.assertEqual(row.split()[1], '3')
+
+    def test_mem_profile_reports_hot_path_and_top_allocations(self):
+        profiling.configure('mem')
+        original = video_generator.create_audiogram_frame
+        with profiling.profile_job(self.prefix, video_generator, facade.PROFILED_HOT_PATH):
+            _render_frames()
+        # The wrappers are removed after the job
+        self.assertIs(video_generator.create_audiogram_frame, original)
+        with open(self.prefix + '.alloc.txt') as f:
+            summary = f.read()
+        self.assertIn('Peak traced memory', summary)
+        rows = {line.split()[0]: line.split() for line in summary.splitlines()
+                if line.startswith('  _') or line.startswith('  create')}
+        self.assertEqual(rows['create_audiogram_frame'][1], '3')
+        self.assertGreater(int(rows['_render_subtitle_lines'][1]), 0)
+        self.assertIn('#1 ', summary)
+
+    def test_failed_job_still_writes_its_profile(self):
+        profiling.configure('cpu')
+        with self.assertRaises(RuntimeError):
+            with profiling.profile_job(self.prefix):
+                raise RuntimeError('encoder died')
+        self.assertTrue(os.path.exists(self.prefix + '.pstats'))
+
+    def test_cli_profile_flag_profiles_each_render(self):
+        selected = {
+            'number': 1, 'title': 'Ep', 'link': 'https://example/ep1', 'transcript_url': None,
+            'audio_url': 'https://example/a.mp3', 'image_url': None,
+            'soundbites': [{'start': 0, 'duration': 5, 'title': 'SB1'}],
+        }
+        def load(feed_url, index_path=None):
+            return [(1, 'Ep')], {'title': 'Podcast'}, lambda nums: {1: selected}, None, None
+        out = os.path.dirname(self.prefix)
+        config_path = os.path.join(out, 'config.yaml')
+        with open(config_path, 'w') as f:
+            f.write("formats:\n  vertical: {enabled: false}\n  horizontal: {enabled: false}\n")
+        with patch('audiogram_generator.cli._load_episodes', side_effect=load), \
+                patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3'), \
+                patch('audiogram_generator.cli.extract_audio_segment',
+                      return_value='/tmp/seg.mp3'), \
+                patch('audiogram_generator.video_generator.generate_audiogram',
+                      side_effect=lambda *a, **k: _render_frames(1)), \
+                patch('audiogram_generator.cli.generate_caption_file'), \
+                redirect_stdout(io.StringIO()):
+            cli.main(['--config', config_path, '--feed-url', 'https://example/feed.xml',
+                      '--output-dir', out, '--episode', '1', '--soundbites', '1',
+                      '--no-cache', '--force', '--profile', 'cpu'])
+        self.assertTrue(os.path.exists(os.path.join(out, 'ep1_sb1_square.pstats')))
+        self.assertTrue(os.path.exists(os.path.join(out, 'ep1_sb1_square.cpu.txt')))
+        self.assertIsNone(profiling.get_mode())
+
+
+if __name__ == '__main__':
+    unittest.main()
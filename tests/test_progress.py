@@ -0,0 +1,158 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest.mock import patch
+
+from audiogram_generator import cli
+from audiogram_generator.rendering.executor import RenderExecutor
+from audiogram_generator.services.http_client import DownloadStats
+from audiogram_generator.telemetry import progress
+
+
+def _worker_job():
+    # Runs in a worker process with workers > 1
+    with progress.job('/out/ep1_sb1_square.mp4', 2.0):
+        for index in range(48):
+            progress.frame_done(index / 24)
+    return os.getpid()
+
+
+class TestProgressReporter(unittest.TestCase):
+    def setUp(self):
+        self.reporter = progress.ProgressReporter(io.StringIO(), tty=False)
+        self.reporter._started = 1000.0
+
+    def test_jobs_rates_queue_and_eta(self):
+        r = self.reporter
+        r.queue('/out/ep1_sb2_square.mp4', 30.0)
+        r.queue('/out/ep1_sb1_square.mp4', 20.0)
+        r.handle(('start', '/out/ep1_sb1_square.mp4', 42, 20.0, 1000.0))
+        r.handle(('frames', '/out/ep1_sb1_square.mp4', 240, 10.0, 1010.0))
+        status = r.status(now=1010.0)
+        self.assertEqual(status['queued'], 1)
+        job, = status['running']
+        self.assertEqual((job['name'], job['pid']), ('ep1_sb1_square.mp4', 42))
+        self.assertAlmostEqual(job['fps'], 24.0)
+        self.assertAlmostEqual(job['percent'], 50.0)
+        self.assertAlmostEqual(status['realtime'], 1.0)
+        # 30 s queued + 10 s left of the running job, at 1x realtime
+        self.assertAlmostEqual(status['eta'], 40.0)
+        line = r.format_status(status)
+        self.assertIn('0 done, 1 running, 1 queued', line)
+        self.assertIn('ep1_sb1_square.mp4 50% 24 fps', line)
+        self.assertIn('ETA 40s', line)
+
+    def test_finished_failed_and_stalled_jobs(self):
+        r = self.reporter
+        r.handle(('start', 'a.mp4', 1, 10.0, 1000.0))
+        r.handle(('end', 'a.mp4', True, 240, 10.0, 1005.0))
+        r.handle(('start', 'b.mp4', 1, 10.0, 1005.0))
+        r.handle(('end', 'b.mp4', False, 0, 0.0, 1006.0))
+        r.handle(('start', 'c.mp4', 2, 10.0, 1000.0))
+        status = r.status(now=1000.0 + progress.STALL_SECONDS + 5)
+        self.assertEqual((status['done'], status['failed']), (1, 1))
+        self.assertEqual(status['running'][0]['stalled'], progress.STALL_SECONDS + 5)
+        self.assertIn('c.mp4 0% stalled 35s', r.format_status(status))
+
+    def test_skipped_videos_leave_the_queue(self):
+        self.reporter.queue('a.mp4', 10.0)
+        self.reporter.skip('a.mp4')
+        self.assertEqual(self.reporter.status(now=1001.0)['queued'], 0)
+
+    def test_download_throughput(self):
+        r = self.reporter
+        r._started = time.time() - progress.RATE_WINDOW
+        stats = DownloadStats(url='https://example/a.mp3', resumed_from=1_000_000)
+        stats.bytes_done = 16_000_000
+        r.on_download(stats, False)
+        stats.bytes_done = 31_000_000
+        r.on_download(stats, True)
+        self.assertAlmostEqual(r.status()['download_mbps'], 30.0 / progress.RATE_WINDOW)
+
+    def test_log_lines_off_a_terminal(self):
+        self.reporter.render()
+        self.reporter.render()
+        lines = self.reporter.stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn(' progress: 0 done', lines[0])
+
+    def test_status_line_on_a_terminal(self):
+        reporter = progress.ProgressReporter(io.StringIO(), tty=True)
+        self.assertEqual(reporter.interval, 0.5)
+        reporter.render()
+        self.assertTrue(reporter.stream.getvalue().startswith('\r\x1b[K0 done'))
+        self.assertNotIn('\n', reporter.stream.getvalue())
+
+
+class TestProgressEvents(unittest.TestCase):
+    def tearDown(self):
+        progress.stop_reporter()
+
+    def test_no_events_without_a_sink(self):
+        self.assertFalse(progress.active())
+        with progress.job('a.mp4', 1.0):
+            progress.frame_done(0.0)
+
+    def test_frame_updates_are_throttled(self):
+        events = []
+        progress.set_sink(events.append)
+        try:
+            with progress.job('a.mp4', 2.0):
+                for index in range(48):
+                    progress.frame_done(index / 24)
+        finally:
+            progress.set_sink(None)
+        kinds = [event[0] for event in events]
+        self.assertEqual((kinds[0], kinds[-1]), ('start', 'end'))
+        self.assertEqual(kinds.count('frames'), 1)
+        self.assertEqual(events[-1][2:5], (True, 48, 47 / 24))
+
+    def test_worker_processes_report_to_the_parent(self):
+        reporter = progress.start_reporter(io.StringIO(), interval=60)
+        with RenderExecutor(2) as executor:
+            executor.submit(_worker_job).result(timeout=60)
+        deadline = time.time() + 10
+        while reporter.done < 1 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(reporter.done, 1)
+        progress.stop_reporter()
+        self.assertFalse(progress.active())
+        self.assertIn('1 done', reporter.stream.getvalue())
+
+    def test_cli_progress_flag(self):
+        selected = {
+            'number': 1, 'title': 'Ep', 'link': 'https://example/ep1', 'transcript_url': None,
+            'audio_url': 'https://example/a.mp3', 'image_url': None,
+            'soundbites': [{'start': 0, 'duration': 5, 'title': 'SB1'}],
+        }
+        def load(feed_url, index_path=None):
+            return [(1, 'Ep')], {'title': 'Podcast'}, lambda nums: {1: selected}, None, None
+
+        def render(*args, **kwargs):
+            for index in range(5):
+                progress.frame_done(index / 24)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config_path = os.path.join(tmp, 'config.yaml')
+            with open(config_path, 'w') as f:
+                f.write("formats:\n  vertical: {enabled: false}\n  horizontal: {enabled: false}\n")
+            with patch('audiogram_generator.cli._load_episodes', side_effect=load), \
+                    patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3'), \
+                    patch('audiogram_generator.cli.extract_audio_segment',
+                          return_value='/tmp/seg.mp3'), \
+                    patch('audiogram_generator.video_generator.generate_audiogram',
+                          side_effect=render), \
+                    patch('audiogram_generator.cli.generate_caption_file'), \
+                    redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()) as stderr:
+                cli.main(['--config', config_path, '--feed-url', 'https://example/feed.xml',
+                          '--output-dir', tmp, '--episode', '1', '--soundbites', '1',
+                          '--no-cache', '--force', '--progress'])
+        self.assertIn('progress: 1 done, 0 running, 0 queued', stderr.getvalue())
+        self.assertIsNone(progress.get_reporter())
+
+
+if __name__ == '__main__':
+    unittest.main()
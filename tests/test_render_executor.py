@@ -0,0 +1,88 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from audiogram_generator.core.cost import RENDER_BASE_MEMORY
+from audiogram_generator.rendering.executor import RenderExecutor
+
+# Budgets below are in units of 1/20 of a worker's base memory
+UNIT = RENDER_BASE_MEMORY // 20
+
+
+class TestRenderExecutor(unittest.TestCase):
+    def test_single_worker_runs_inline(self):
+        calls = []
+        with RenderExecutor(1) as executor:
+            future = executor.submit(calls.append, 'x')
+            self.assertTrue(future.done())
+        self.assertEqual(calls, ['x'])
+
+    def test_inline_errors_are_held_by_the_future(self):
+        future = RenderExecutor(1).submit(int, 'not a number')
+        with self.assertRaises(ValueError):
+            future.result()
+
+    def test_inline_warm_up_loads_the_renderer_in_process(self):
+        self.assertEqual(RenderExecutor(1).warm_up(), [os.getpid()])
+
+    def test_process_pool(self):
+        with RenderExecutor(2) as executor:
+            futures = [executor.submit(pow, n, 2) for n in range(4)]
+            self.assertEqual([f.result(timeout=60) for f in futures], [0, 1, 4, 9])
+
+    def test_cancelling_shutdown_without_cancel_futures(self):
+        # Python 3.8: ProcessPoolExecutor.shutdown has no cancel_futures
+        executor = RenderExecutor(2)
+        running = executor.submit(time.sleep, 0.5)
+        queued = [executor.submit(time.sleep, 0.5) for _ in range(6)]
+        with patch('audiogram_generator.rendering.executor.sys.version_info', (3, 8, 18)):
+            executor.shutdown(cancel=True)
+        self.assertTrue(running.done())
+        self.assertTrue(any(f.cancelled() for f in queued))
+        self.assertEqual(executor._pending, set())
+
+    def test_memory_budget_holds_back_tasks_that_do_not_fit(self):
+        with RenderExecutor(2, memory_budget=100 * UNIT) as executor:
+            first = executor.submit_within_budget(80 * UNIT, time.sleep, 0.2)
+            self.assertEqual(executor.reserved_memory, 80 * UNIT)
+            # Blocks until the first task releases its share
+            second = executor.submit_within_budget(80 * UNIT, time.sleep, 0)
+            self.assertTrue(first.done())
+            second.result(timeout=60)
+        self.assertEqual(executor.reserved_memory, 0)
+
+    def test_tasks_within_the_budget_run_together(self):
+        with RenderExecutor(2, memory_budget=200 * UNIT) as executor:
+            executor.warm_up()
+            first = executor.submit_within_budget(80 * UNIT, time.sleep, 1.0)
+            executor.submit_within_budget(80 * UNIT, time.sleep, 0)
+            self.assertFalse(first.done())
+
+    def test_decoded_audio_of_the_parent_counts_against_the_budget(self):
+        with RenderExecutor(2, memory_budget=100 * UNIT) as executor, \
+                patch('audiogram_generator.audio_utils.decoded_bytes', return_value=30 * UNIT):
+            executor.warm_up()
+            first = executor.submit_within_budget(50 * UNIT, time.sleep, 0.5)
+            # 50 + 40 fits, but not with 30 of decoded audio
+            executor.submit_within_budget(40 * UNIT, time.sleep, 0)
+            self.assertTrue(first.done())
+
+    def test_workers_are_capped_by_the_budget(self):
+        with self.assertLogs('audiogram_generator.rendering.executor', 'WARNING'):
+            self.assertEqual(RenderExecutor(8, memory_budget=3 * RENDER_BASE_MEMORY).workers, 3)
+            self.assertEqual(RenderExecutor(8, memory_budget=1).workers, 1)
+
+    def test_oversized_task_runs_alone(self):
+        with RenderExecutor(2, memory_budget=100 * UNIT) as executor:
+            with self.assertLogs('audiogram_generator.rendering.executor', 'WARNING'):
+                future = executor.submit_within_budget(500 * UNIT, pow, 2, 3)
+            self.assertEqual(future.result(timeout=60), 8)
+
+    def test_budget_is_ignored_inline(self):
+        executor = RenderExecutor(1, memory_budget=1)
+        self.assertEqual(executor.submit_within_budget(10, pow, 2, 2).result(), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
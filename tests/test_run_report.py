@@ -0,0 +1,191 @@
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from audiogram_generator import cli
+from audiogram_generator.rendering.executor import RenderExecutor, timed_call
+from audiogram_generator.services.cache import AssetCache
+from audiogram_generator.services.errors import AssetDownloadError
+from audiogram_generator.telemetry import stages
+
+
+def _render_stub(seconds):
+    # Runs in a worker process with workers > 1
+    with stages.stage('frame_composition'):
+        time.sleep(seconds)
+    stages.sample('frame_composition', seconds)
+    stages.count('http.bytes', 10)
+    return os.getpid()
+
+
+def _failing_stub(error):
+    stages.count('http.bytes', 10)
+    if isinstance(error, AssetDownloadError):
+        raise stages.failure(error)
+    raise error
+
+
+class TestStageTimes(unittest.TestCase):
+    def tearDown(self):
+        stages.end_run()
+
+    def test_percentiles_use_nearest_rank(self):
+        result = stages.percentiles([float(n) for n in range(1, 101)])
+        self.assertEqual(result['count'], 100)
+        self.assertEqual(result['p50'], 50.0)
+        self.assertEqual(result['p90'], 90.0)
+        self.assertEqual(result['p99'], 99.0)
+        self.assertEqual(result['max'], 100.0)
+        self.assertEqual(stages.percentiles([]), {'count': 0, 'total': 0.0})
+
+    def test_samples_are_bounded(self):
+        times = stages.StageTimes()
+        with patch.object(stages, 'MAX_SAMPLES', 50):
+            for n in range(200):
+                times.sample('frame', n)
+        self.assertEqual(len(times.samples['frame']), 50)
+
+    def test_nothing_is_recorded_without_a_run(self):
+        self.assertIsNone(stages.get_run())
+        with stages.stage('waveform') as measured:
+            stages.count('http.bytes', 5)
+        self.assertGreaterEqual(measured.wall, 0.0)
+
+    def test_job_scope_isolates_measurements_from_the_run(self):
+        run = stages.start_run()
+        stages.count('http.bytes', 100)
+        with stages.job_scope() as job:
+            with stages.stage('encode'):
+                pass
+            stages.count('http.bytes', 7)
+        self.assertEqual(job.counters, {'http.bytes': 7})
+        self.assertEqual(job.stages['encode']['count'], 1)
+        self.assertEqual(run.times.counters, {'http.bytes': 100})
+        self.assertNotIn('encode', run.times.stages)
+
+    def test_failed_stage_is_still_timed(self):
+        stages.start_run()
+        with self.assertRaises(ValueError):
+            with stages.stage('feed_parse'):
+                raise ValueError('bad xml')
+        self.assertEqual(stages.get_run().times.stages['feed_parse']['count'], 1)
+
+    def test_cache_lookups_are_counted_per_kind(self):
+        with tempfile.TemporaryDirectory() as root:
+            cache = AssetCache(root, max_bytes=1024 * 1024)
+            try:
+                stages.start_run()
+                cache.get_derived('missing', kind='waveform')
+                cache.put_derived_bytes('present', b'x', kind='waveform')
+                cache.get_derived('present', kind='waveform')
+            finally:
+                cache.close()
+        counters = stages.end_run().times.counters
+        self.assertEqual(counters['cache.waveform.misses'], 1)
+        self.assertEqual(counters['cache.waveform.hits'], 1)
+
+
+class TestRunReport(unittest.TestCase):
+    def tearDown(self):
+        stages.end_run()
+
+    def test_timed_call_returns_the_job_snapshot(self):
+        _result, seconds, snapshot, error = timed_call(_render_stub, 0.01)
+        self.assertIsNone(error)
+        self.assertGreater(seconds, 0)
+        self.assertEqual(snapshot['stages']['frame_composition']['count'], 1)
+        self.assertEqual(snapshot['counters'], {'http.bytes': 10})
+
+    def test_timed_call_returns_failures_with_their_snapshot(self):
+        for error in (OSError('ffmpeg died'), AssetDownloadError('gone')):
+            result, _seconds, snapshot, returned = timed_call(_failing_stub, error)
+            self.assertIsNone(result)
+            self.assertIs(returned, error)
+            # Counted once, by type, also when raised with stages.failure
+            self.assertEqual(snapshot['counters'],
+                             {'http.bytes': 10, f'failures.{type(error).__name__}': 1})
+
+    def test_worker_process_measurements_reach_the_parent(self):
+        run = stages.start_run()
+        with RenderExecutor(2) as executor:
+            futures = [executor.submit(timed_call, _render_stub, 0.01) for _ in range(2)]
+            for future in futures:
+                pid, _seconds, snapshot, _error = future.result(timeout=60)
+                self.assertNotEqual(pid, os.getpid())
+                run.add_job({'output': f'/out/v{len(run.jobs)}.mp4'}, snapshot)
+        data = run.to_dict()
+        self.assertEqual(data['stages']['frame_composition']['count'], 2)
+        self.assertEqual(data['counters']['http.bytes'], 20)
+        self.assertEqual(data['samples']['frame_composition']['count'], 2)
+        self.assertEqual(len(data['jobs']), 2)
+
+    def test_write_creates_run_and_job_files(self):
+        run = stages.start_run()
+        run.add_job({'output': '/out/ep1_sb1_square.mp4'},
+                    {'stages': {'encode': {'count': 1, 'wall': 2.0, 'cpu': 1.5}}})
+        stages.end_run()
+        with tempfile.TemporaryDirectory() as report_dir:
+            path = run.write(report_dir, name='run-test')
+            with open(path) as f:
+                data = json.load(f)
+            self.assertEqual(data['stages']['encode']['wall'], 2.0)
+            with open(os.path.join(report_dir, 'run-test', 'ep1_sb1_square.json')) as f:
+                job = json.load(f)
+            self.assertEqual(job['stages']['encode']['cpu'], 1.5)
+
+    def test_cli_writes_a_report_per_run_and_per_video(self):
+        selected = {
+            'number': 1, 'title': 'Ep', 'link': 'https://example/ep1', 'transcript_url': None,
+            'audio_url': 'https://example/a.mp3', 'image_url': None,
+            'soundbites': [{'start': 0, 'duration': 5, 'title': 'SB1'}],
+        }
+
+        def load(feed_url, index_path=None):
+            with stages.stage('feed_fetch'):
+                pass
+            return [(1, 'Ep')], {'title': 'Podcast'}, lambda nums: {1: selected}, None, None
+
+        def render(*args, **kwargs):
+            for _ in range(3):
+                with stages.stage('frame_composition'):
+                    pass
+                stages.sample('frame_composition', 0.01)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config_path = os.path.join(tmp, 'config.yaml')
+            with open(config_path, 'w') as f:
+                f.write("formats:\n  vertical: {enabled: false}\n  horizontal: {enabled: false}\n")
+            report_dir = os.path.join(tmp, 'reports')
+            with patch('audiogram_generator.cli._load_episodes', side_effect=load), \
+                    patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3'), \
+                    patch('audiogram_generator.cli.extract_audio_segment',
+                          return_value='/tmp/seg.mp3'), \
+                    patch('audiogram_generator.cli.generate_audiogram', side_effect=render), \
+                    patch('audiogram_generator.cli.generate_caption_file'), \
+                    redirect_stdout(io.StringIO()) as stdout:
+                cli.main(['--config', config_path, '--feed-url', 'https://example/feed.xml',
+                          '--output-dir', tmp, '--episode', '1', '--soundbites', '1',
+                          '--no-cache', '--force', '--report-dir', report_dir])
+            self.assertIn('Run report:', stdout.getvalue())
+            self.assertIsNone(stages.get_run())
+            [name] = [n for n in os.listdir(report_dir) if n.endswith('.json')]
+            with open(os.path.join(report_dir, name)) as f:
+                data = json.load(f)
+            for stage in ('feed_fetch', 'audio_download', 'segment_extract', 'caption_write',
+                          'frame_composition'):
+                self.assertIn(stage, data['stages'])
+            [job] = data['jobs']
+            self.assertEqual((job['episode'], job['soundbite'], job['format']), (1, 1, 'square'))
+            self.assertEqual(job['stages']['frame_composition']['count'], 3)
+            self.assertEqual(job['samples']['frame_composition']['count'], 3)
+            job_report = os.path.join(report_dir, name[:-5], 'ep1_sb1_square.json')
+            self.assertTrue(os.path.exists(job_report))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import json
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+from audiogram_generator import cli
+from audiogram_generator.core.jobs import parse_jobs
+from audiogram_generator.server import RenderService, ServiceJob, make_server
+
+FEED = 'https://example.com/feed.xml'
+
+
+def _episode():
+    return {
+        'number': 142,
+        'guid': 'guid-142',
+        'title': 'Titolo episodio',
+        'link': 'https://example.com/ep142',
+        'soundbites': [{'start': 5, 'duration': 4, 'title': 'SB1'},
+                       {'start': 12, 'duration': 3, 'title': 'SB2'}],
+        'transcript_url': None,
+        'audio_url': 'https://example.com/ep142.mp3',
+        'keywords': None,
+        'image_url': None,
+    }
+
+
+def _render(*args):
+    with open(args[1], 'wb') as f:
+        f.write(b'video')
+
+
+class TestRenderServer(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        episode = _episode()
+        self.feed_loads = 0
+
+        def load_feed(feed_url):
+            self.feed_loads += 1
+            return ([(142, episode['title'])], {'title': 'Podcast'},
+                    lambda nums: {n: episode for n in nums if n == 142}, None, None)
+
+        self.service = RenderService(
+            {
+                'feed_url': FEED,
+                'colors': cli.Config.DEFAULT_CONFIG['colors'],
+                'formats': {'square': {'width': 1080, 'height': 1080},
+                            'vertical': {'width': 1080, 'height': 1920}},
+                'hashtags': [],
+                'show_subtitles': True,
+                'output_dir': self._tmp.name,
+                'incremental': False,
+            },
+            workers=1, load_feed=load_feed,
+        )
+        patches = [
+            patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3'),
+            patch('audiogram_generator.cli.extract_audio_segment', return_value='/tmp/seg.mp3'),
+            patch('audiogram_generator.cli.download_image', return_value=None),
+            patch('builtins.print'),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        render = patch('audiogram_generator.cli.generate_audiogram', side_effect=_render)
+        self.render = render.start()
+        self.addCleanup(render.stop)
+        self.service.start(warm=False)
+        self.server = make_server(self.service, '127.0.0.1', 0)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.service.stop()
+        self._tmp.cleanup()
+
+    def _request(self, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base + path, data=data,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=10) as resp:
+                return resp.status, resp.read(), resp.headers
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), e.headers
+
+    def test_submit_poll_and_download(self):
+        status, body, headers = self._request(
+            '/jobs', {'episode': 142, 'soundbites': [2], 'formats': ['square']})
+        self.assertEqual(status, 202)
+        job_id = json.loads(body)['id']
+        self.assertEqual(headers['Location'], f'/jobs/{job_id}')
+        self.service.wait(job_id, timeout=10)
+
+        status, body, _ = self._request(f'/jobs/{job_id}')
+        job = json.loads(body)
+        self.assertEqual((status, job['status'], job['videos']), (200, 'done', 1))
+        names = [o['name'] for o in job['outputs']]
+        self.assertEqual(names, ['ep142_sb2_square.mp4', 'ep142_sb2_caption.txt'])
+
+        self.assertEqual(self.render.call_count, 1)
+        self.assertEqual(self.render.call_args[0][2], 'square')
+        status, body, headers = self._request(job['outputs'][0]['url'])
+        self.assertEqual((status, body, headers['Content-Type']), (200, b'video', 'video/mp4'))
+        status, _, _ = self._request(f'/jobs/{job_id}/outputs/..%2Fsecret.txt')
+        self.assertEqual(status, 404)
+
+    def test_feed_is_parsed_once_across_requests(self):
+        ids = [json.loads(self._request('/jobs', {'guid': 'guid-142', 'soundbites': [n]})[1])['id']
+               for n in (1, 2)]
+        for job_id in ids:
+            self.assertEqual(self.service.wait(job_id, timeout=10).status, 'done')
+        self.assertEqual(self.feed_loads, 1)
+        status, body, _ = self._request('/health')
+        self.assertEqual((status, json.loads(body)['jobs']['done']), (200, 2))
+
+    def test_invalid_and_unknown_requests(self):
+        self.assertEqual(self._request('/jobs', {'soundbites': 'all'})[0], 400)
+        self.assertEqual(self._request('/jobs', ['not', 'an', 'object'])[0], 400)
+        self.assertEqual(self._request('/jobs/nope')[0], 404)
+        status, body, _ = self._request('/jobs', {'episode': 9})
+        job = self.service.wait(json.loads(body)['id'], timeout=10)
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('episode 9 not found', job.error)
+
+    def test_requests_for_the_same_outputs_never_render_at_once(self):
+        running, overlaps = [], []
+
+        def render(*args):
+            running.append(args[1])
+            if len(running) > 1:
+                overlaps.append(list(running))
+            time.sleep(0.1)
+            _render(*args)
+            running.remove(args[1])
+
+        self.render.side_effect = render
+        request = {'episode': 142, 'soundbites': [1], 'formats': ['square']}
+        jobs = [ServiceJob(str(n), FEED, request, spec=parse_jobs([request])[0]) for n in range(2)]
+        # Run as two scheduler threads do with workers=2
+        threads = [threading.Thread(target=self.service._run, args=(job,)) for job in jobs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(overlaps, [])
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_job_with_a_missing_video_fails(self):
+        self.render.side_effect = None
+        request = {'episode': 142, 'soundbites': [1], 'formats': ['square']}
+        status, body, _ = self._request('/jobs', request)
+        job = self.service.wait(json.loads(body)['id'], timeout=10)
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error, 'missing outputs: ep142_sb1_square.mp4')
+        self.assertEqual([o['name'] for o in job.to_dict()['outputs']], ['ep142_sb1_caption.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
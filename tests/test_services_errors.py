@@ -6,13 +6,16 @@ from audiogram_generator.services import rss as rss_svc
 from audiogram_generator.services.errors import SrtFetchError, RssError
 
 
+HTTP_GET = "audiogram_generator.services.http_client.HttpClient.get"
+
+
 class TestServicesErrors(unittest.TestCase):
-    @patch("urllib.request.urlopen", side_effect=RuntimeError("boom"))
+    @patch(HTTP_GET, side_effect=RuntimeError("boom"))
     def test_fetch_srt_raises_typed_error(self, _):
         with self.assertRaises(SrtFetchError):
             transcript_svc.fetch_srt("https://example/bad.srt")
 
-    @patch("urllib.request.urlopen", side_effect=RuntimeError("boom"))
+    @patch(HTTP_GET, side_effect=RuntimeError("boom"))
     def test_fetch_feed_raises_typed_error(self, _):
         with self.assertRaises(RssError):
             rss_svc.fetch_feed("https://example/feed.xml")
@@ -0,0 +1,115 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from audiogram_generator import cli
+from audiogram_generator.rendering.executor import RenderExecutor, timed_call
+from audiogram_generator.telemetry import stages
+from audiogram_generator.telemetry.trace import trace_events
+
+
+def _traced_job():
+    # Runs in a worker process with workers > 1
+    for index in range(20):
+        with stages.stage('frame_composition', trace=stages.traced_frame(index)):
+            pass
+    return os.getpid()
+
+
+class TestTraceEvents(unittest.TestCase):
+    def tearDown(self):
+        stages.end_run()
+
+    def test_no_events_without_tracing(self):
+        run = stages.start_run()
+        with stages.stage('waveform'), stages.span('render', cat='job'):
+            pass
+        self.assertEqual(run.times.events, [])
+        self.assertNotIn('events', run.times.snapshot())
+
+    def test_stages_and_spans_become_complete_events(self):
+        run = stages.start_run(trace_path='unused.json')
+        with stages.span('render', cat='job', output='ep1_sb1_square.mp4'):
+            with stages.stage('waveform'):
+                pass
+        waveform, render = run.times.events
+        self.assertEqual((render['name'], render['cat'], render['ph']), ('render', 'job', 'X'))
+        self.assertEqual(render['args'], {'output': 'ep1_sb1_square.mp4'})
+        self.assertEqual(waveform['cat'], 'stage')
+        self.assertLessEqual(render['ts'], waveform['ts'])
+        self.assertGreaterEqual(render['ts'] + render['dur'], waveform['ts'] + waveform['dur'])
+        self.assertEqual(waveform['pid'], os.getpid())
+
+    def test_frames_are_sampled(self):
+        stages.configure_trace(True, frame_sample=10)
+        try:
+            self.assertEqual([i for i in range(25) if stages.traced_frame(i)], [0, 10, 20])
+        finally:
+            stages.configure_trace(False)
+        self.assertFalse(stages.traced_frame(0))
+
+    def test_end_run_turns_tracing_off(self):
+        stages.start_run(trace_path='unused.json')
+        self.assertTrue(stages.trace_settings()['enabled'])
+        stages.end_run()
+        self.assertFalse(stages.trace_settings()['enabled'])
+
+    def test_worker_events_keep_their_process(self):
+        run = stages.start_run(trace_path='unused.json')
+        with RenderExecutor(2) as executor:
+            future = executor.submit(timed_call, _traced_job)
+            pid, _seconds, snapshot, _error = future.result(timeout=60)
+        run.add_job({'output': 'v.mp4'}, snapshot)
+        events = trace_events(run.times.snapshot(), os.getpid())
+        frames = [e for e in events if e['name'] == 'frame_composition']
+        self.assertEqual(len(frames), 2)
+        self.assertEqual({e['pid'] for e in frames}, {pid})
+        names = {(e['pid'], e['name']): e['args'].get('name') for e in events if e['ph'] == 'M'}
+        self.assertEqual(names[(pid, 'process_name')], f'render worker {pid}')
+        self.assertEqual(names[(os.getpid(), 'process_name')], 'audiogram-generator')
+        self.assertEqual(names[(pid, 'thread_name')], 'MainThread')
+
+    def test_cli_writes_a_trace(self):
+        selected = {
+            'number': 1, 'title': 'Ep', 'link': 'https://example/ep1', 'transcript_url': None,
+            'audio_url': 'https://example/a.mp3', 'image_url': None,
+            'soundbites': [{'start': 0, 'duration': 5, 'title': 'SB1'}],
+        }
+        def load(feed_url, index_path=None):
+            return [(1, 'Ep')], {'title': 'Podcast'}, lambda nums: {1: selected}, None, None
+
+        def render(*args, **kwargs):
+            with stages.stage('waveform'):
+                pass
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config_path = os.path.join(tmp, 'config.yaml')
+            with open(config_path, 'w') as f:
+                f.write("formats:\n  vertical: {enabled: false}\n  horizontal: {enabled: false}\n")
+            trace_path = os.path.join(tmp, 'trace', 'out.json')
+            with patch('audiogram_generator.cli._load_episodes', side_effect=load), \
+                    patch('audiogram_generator.cli.download_audio', return_value='/tmp/full.mp3'), \
+                    patch('audiogram_generator.cli.extract_audio_segment',
+                          return_value='/tmp/seg.mp3'), \
+                    patch('audiogram_generator.cli.generate_audiogram', side_effect=render), \
+                    patch('audiogram_generator.cli.generate_caption_file'), \
+                    redirect_stdout(io.StringIO()) as stdout:
+                cli.main(['--config', config_path, '--feed-url', 'https://example/feed.xml',
+                          '--output-dir', tmp, '--episode', '1', '--soundbites', '1',
+                          '--no-cache', '--force', '--trace', trace_path])
+            self.assertIn('Trace:', stdout.getvalue())
+            with open(trace_path) as f:
+                document = json.load(f)
+        names = {event['name'] for event in document['traceEvents']}
+        for name in ('process_name', 'thread_name', 'audio_download', 'segment_extract', 'waveform',
+                     'caption_write', 'wait_prepared'):
+            self.assertIn(name, names)
+        self.assertFalse(stages.trace_settings()['enabled'])
+
+
+if __name__ == '__main__':
+    unittest.main()
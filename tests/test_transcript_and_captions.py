@@ -4,7 +4,7 @@ Test per funzioni di trascrizione e generazione caption in cli.py
 import io
 import tempfile
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 
 from audiogram_generator import cli
 
@@ -31,20 +31,9 @@ Parzialmente dentro (da escludere)
 class TestTranscriptAndCaptions(unittest.TestCase):
     """Test parsing SRT e generazione file caption"""
 
-    def _mock_urlopen(self):
-        # Restituisce un oggetto simile a HTTPResponse con read() -> bytes
-        mm = MagicMock()
-        mm.read.return_value = FAKE_SRT.encode("utf-8")
-        # Contesto per with ... as response
-        mock_ctx = MagicMock()
-        mock_ctx.__enter__.return_value = mm
-        mock_ctx.__exit__.return_value = False
-        return mock_ctx
-
-    @patch("urllib.request.urlopen")
-    def test_get_transcript_text_range(self, mock_urlopen):
+    @patch("audiogram_generator.services.http_client.HttpClient.get_text", return_value=FAKE_SRT)
+    def test_get_transcript_text_range(self, _):
         """Estrae solo i blocchi SRT interamente contenuti nell'intervallo"""
-        mock_urlopen.return_value = self._mock_urlopen()
         # Intervallo: start=5s, durata=4s -> [5,9]
         text = cli.get_transcript_text("http://example/srt", 5, 4)
         # Deve includere i blocchi 2 e 3, ma non 1 (fuori) né 4 (parziale)
@@ -54,17 +43,15 @@ class TestTranscriptAndCaptions(unittest.TestCase):
         self.assertNotIn("Fuori", text)
         self.assertNotIn("Parzialmente", text)
 
-    @patch("urllib.request.urlopen")
-    def test_get_transcript_text_no_matches(self, mock_urlopen):
+    @patch("audiogram_generator.services.http_client.HttpClient.get_text", return_value=FAKE_SRT)
+    def test_get_transcript_text_no_matches(self, _):
         """Restituisce None se nessun blocco è interamente contenuto"""
-        mock_urlopen.return_value = self._mock_urlopen()
         text = cli.get_transcript_text("http://example/srt", 20, 3)
         self.assertIsNone(text)
 
-    @patch("urllib.request.urlopen")
-    def test_get_transcript_chunks_relative_timing(self, mock_urlopen):
+    @patch("audiogram_generator.services.http_client.HttpClient.get_text", return_value=FAKE_SRT)
+    def test_get_transcript_chunks_relative_timing(self, _):
         """I chunk hanno tempi relativi al soundbite e rispettano i limiti"""
-        mock_urlopen.return_value = self._mock_urlopen()
         chunks = cli.get_transcript_chunks("http://example/srt", 5, 4)
         self.assertEqual(len(chunks), 2)
         # Primo chunk: [5,7] -> relativo [0,2]
@@ -0,0 +1,189 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from audiogram_generator import cli
+from audiogram_generator.services import http_client
+from audiogram_generator.config import Config
+from audiogram_generator.core.jobs import RenderJob
+from audiogram_generator.services.episode_index import EpisodeIndex
+from audiogram_generator.services.job_queue import JobQueue
+
+from tests.http_fixtures import LocalHttpServer
+from tests.test_rss_service import SAMPLE_FEED
+
+NEW_ITEM = """
+        <item>
+          <guid>g3</guid>
+          <title>Episode C</title>
+          <enclosure url="https://example.com/ep-c.mp3" type="audio/mpeg" />
+          <podcast:soundbite startTime="1" duration="2">Segmento C1</podcast:soundbite>
+          <podcast:soundbite startTime="8" duration="2">Segmento C2</podcast:soundbite>
+        </item>
+"""
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.out = self._tmp.name
+        http_client.configure()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _watch(self, url):
+        with redirect_stdout(io.StringIO()) as out:
+            status = cli.main(['watch', '--once', '--feed-url', url, '--output-dir', self.out,
+                               '--no-cache'])
+        self.assertEqual(status, 0)
+        return out.getvalue()
+
+    def _queued(self):
+        with JobQueue(os.path.join(self.out, '.audiogram-queue.sqlite')) as queue:
+            rows = queue._conn.execute("SELECT key FROM jobs ORDER BY key").fetchall()
+        return [row['key'] for row in rows]
+
+    def test_only_new_episodes_and_soundbites_are_queued(self):
+        with LocalHttpServer() as srv:
+            srv.add('/rss.xml', SAMPLE_FEED.encode('utf-8'))
+            url = srv.url('/rss.xml')
+            self.assertIn('watching 2 episodes', self._watch(url))
+            self.assertEqual(self._queued(), [])
+
+            # Unchanged feed: answered with 304, nothing queued
+            self.assertIn('unchanged', self._watch(url))
+            self.assertIsNotNone(srv.requests[-1]['headers'].get('If-None-Match'))
+
+            # A new episode and one soundbite added to episode A (number 1)
+            updated = SAMPLE_FEED.replace(
+                '<podcast:soundbite startTime="10" duration="3">Segmento A</podcast:soundbite>',
+                '<podcast:soundbite startTime="10" duration="3">Segmento A</podcast:soundbite>\n'
+                '          <podcast:soundbite startTime="30" duration="3">'
+                'Segmento A2</podcast:soundbite>',
+            ).replace('<!-- Newest item first (common in feeds) -->', NEW_ITEM)
+            srv.add('/rss.xml', updated.encode('utf-8'))
+            self._watch(url)
+
+        formats = [name for name, fmt in cli.Config.DEFAULT_CONFIG['formats'].items()
+                   if fmt.get('enabled', True)]
+        expected = sorted(
+            [f"g1:sb2:{fmt}" for fmt in formats]
+            + [f"g3:sb{sb}:{fmt}" for sb in (1, 2) for fmt in formats]
+        )
+        self.assertEqual(self._queued(), expected)
+
+    def test_render_uses_the_feed_as_just_synced(self):
+        config = Config()
+        config.config['output_dir'] = self.out
+        targets = cli._FeedTargets(config)
+        seen = []
+
+        def prepare(selected, soundbites, *args, **kwargs):
+            seen.append([sb['text'] for sb in selected['soundbites']])
+            raise RuntimeError('not rendering in this test')
+
+        feeds = {}
+        with LocalHttpServer() as srv, \
+                EpisodeIndex(os.path.join(self.out, 'index.sqlite')) as index, \
+                JobQueue(os.path.join(self.out, 'queue.sqlite')) as queue, \
+                redirect_stdout(io.StringIO()), \
+                patch('audiogram_generator.cli.prepare_episode', side_effect=prepare):
+            srv.add('/rss.xml', SAMPLE_FEED.encode('utf-8'))
+            url = srv.url('/rss.xml')
+            cli._watch_once([url], index, queue, targets, 1, feeds=feeds)
+            # A parsed feed cached by an earlier drain
+            listing, info, lookup, _sync, _index = cli._load_episodes(url)
+            feeds[url] = (info, cli._queued_episode_resolver(listing, lookup))
+
+            srv.add('/rss.xml', SAMPLE_FEED.replace(
+                '<podcast:soundbite startTime="10" duration="3">Segmento A</podcast:soundbite>',
+                '<podcast:soundbite startTime="10" duration="3">Segmento A</podcast:soundbite>\n'
+                '          <podcast:soundbite startTime="30" duration="3">'
+                'Segmento A2</podcast:soundbite>',
+            ).encode('utf-8'))
+            cli._watch_once([url], index, queue, targets, 1, feeds=feeds)
+            cli._drain_queue(queue, 'w', targets, 60, 0, 32, poll=0, feeds=feeds)
+        self.assertEqual(seen, [['Segmento A', 'Segmento A2']])
+
+
+
+class TestFeedTargets(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.config = Config()
+        self.config.config['output_dir'] = self._tmp.name
+        self.config.config['feeds'] = [
+            {'name': 'alpha', 'feed_url': 'https://a/feed.xml'},
+            {'name': 'beta', 'feed_url': 'https://b/feed.xml', 'show_subtitles': False},
+        ]
+
+    def test_each_listed_feed_renders_to_its_own_directory(self):
+        targets = cli._FeedTargets(self.config)
+        alpha, alpha_manifest = targets.resolve('https://a/feed.xml')
+        beta, beta_manifest = targets.resolve('https://b/feed.xml')
+        self.assertEqual(alpha['output_dir'], os.path.join(self._tmp.name, 'alpha'))
+        self.assertEqual(beta['output_dir'], os.path.join(self._tmp.name, 'beta'))
+        self.assertFalse(beta['show_subtitles'])
+        self.assertIsNot(alpha_manifest, beta_manifest)
+        # One other feed may use the global output directory, a second may not
+        default, _manifest = targets.resolve('https://c/feed.xml')
+        self.assertEqual(default['output_dir'], self._tmp.name)
+        with self.assertRaises(ValueError):
+            targets.resolve('https://d/feed.xml')
+        with self.assertRaises(ValueError):
+            targets.check(['https://c/feed.xml', 'https://d/feed.xml'])
+        targets.check(['https://a/feed.xml', 'https://b/feed.xml', 'https://c/feed.xml'])
+
+    def test_feeds_sharing_an_output_directory_are_refused(self):
+        for entry in self.config.config['feeds']:
+            entry['output_dir'] = os.path.join(self._tmp.name, 'shared')
+        with self.assertRaises(ValueError):
+            cli._FeedTargets(self.config)
+
+    def test_worker_fails_jobs_of_a_second_feed_without_a_directory(self):
+        self.config.config.pop('feeds')
+        with JobQueue(os.path.join(self._tmp.name, 'queue.sqlite')) as queue:
+            queue.enqueue('https://c/feed.xml', [RenderJob(1, 1, 'square', True)], max_attempts=1)
+            queue.enqueue('https://d/feed.xml', [RenderJob(1, 1, 'square', True)], max_attempts=1)
+            targets = cli._FeedTargets(self.config)
+            targets.resolve('https://c/feed.xml')
+            with redirect_stdout(io.StringIO()), \
+                    patch('audiogram_generator.cli._load_episodes', side_effect=OSError('offline')):
+                # The first feed is unreachable here; the second never renders
+                cli._drain_queue(queue, 'w', targets, 60, 0, 32, poll=0)
+            failures = {f['feed_url']: f['last_error'] for f in queue.failures()}
+        self.assertIn("add https://d/feed.xml to the 'feeds' section", failures['https://d/feed.xml'])
+
+    def test_worker_fails_a_job_whose_episode_left_the_feed(self):
+        self.config.config.pop('feeds')
+        # Episode 1 is now another item: the queued one dropped out of the feed
+        other = {'number': 1, 'guid': 'g-new', 'title': 'Newer', 'soundbites': []}
+        loaded = ([(1, 'Newer')], {}, lambda numbers: {1: other} if 1 in numbers else {},
+                  None, None)
+        with JobQueue(os.path.join(self._tmp.name, 'queue.sqlite')) as queue:
+            queue.enqueue('https://c/feed.xml', [RenderJob(1, 1, 'square', True, 'g-old')],
+                          max_attempts=1)
+            targets = cli._FeedTargets(self.config)
+            with redirect_stdout(io.StringIO()), \
+                    patch('audiogram_generator.cli._load_episodes', return_value=loaded), \
+                    patch('audiogram_generator.cli.prepare_episode') as prepare:
+                cli._drain_queue(queue, 'w', targets, 60, 0, 32, poll=0)
+            [failure] = queue.failures()
+        prepare.assert_not_called()
+        self.assertEqual(failure['last_error'], 'episode g-old not found in the feed')
+
+    def test_watch_render_refuses_feeds_sharing_the_output_directory(self):
+        with redirect_stdout(io.StringIO()) as out:
+            status = cli.main(['watch', '--once', '--render', '--output-dir', self._tmp.name,
+                               '--feed-url', 'https://c/feed.xml', '--feed-url', 'https://d/feed.xml'])
+        self.assertEqual(status, 2)
+        self.assertIn("'feeds' section", out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()